@@ -0,0 +1,285 @@
+# Administrativo/archivo.py
+
+"""
+Archivo de meses cerrados (datos fríos) de ControlDeIngreso y Produccion.
+
+Las dos tablas crecen sin límite en el mismo archivo SQLite que atiende el
+tráfico en vivo, lo que infla índices y respaldos. `manage.py archivar` pasa
+los meses cerrados a una base aparte (`db.archivo.sqlite3`, junto a la
+principal) y los borra de la tabla viva; también los puede restaurar.
+
+La base de archivo se adjunta en cada conexión como esquema `archivo` (ver
+Koal_Group/sqlite/base.py) y tiene una copia de cada tabla sin claves ni los
+índices de la tabla viva (solo id y el orden de los listados); se compacta con
+VACUUM. Una sola base y no una por mes porque SQLite adjunta como mucho 10
+bases por conexión; el registro por mes va en la tabla `archivo_meses`.
+
+Lectura transparente: `historico(queryset)` (o `Modelo.objects.historico()`)
+cambia el FROM de la consulta por `(vivo UNION ALL archivo)` con el mismo
+alias, sin tocar filtros, joins ni anotaciones; SQLite empuja los filtros a
+las dos partes y resuelve el ORDER BY ... LIMIT de los listados con un MERGE
+de los dos índices. La usan los listados y el detalle de la API, los
+informes, la asistencia y la reconstrucción de resúmenes y de la búsqueda.
+Lo archivado es de solo lectura: PUT/DELETE van a la tabla viva y dan 404.
+
+Archivar no pasa por señales a propósito: los resúmenes de producción ya
+incluyen esas filas, los índices de búsqueda las conservan, y no son borrados
+para /api/sync/. Si se corta a mitad (con WAL la transacción no es atómica
+entre las dos bases), volver a correr el comando lo completa.
+"""
+
+import datetime
+import sqlite3
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models.sql.datastructures import BaseTable
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+
+from .models import ControlDeIngreso, Produccion
+from .resumenes import aplicar_produccion
+from .versiones import subir_version
+
+ESQUEMA = 'archivo'
+MESES_VIVOS = getattr(settings, 'ARCHIVO_MESES_VIVOS', 3)
+
+# Modelo -> (campo de fecha que define el mes, columnas del índice del archivo).
+# El índice sigue el orden de los listados, para que el UNION ALL ordenado se
+# resuelva con un MERGE de los dos índices.
+MODELOS = {
+    ControlDeIngreso: ('fecha', ['fecha', 'hora_entrada', 'id']),
+    Produccion: ('fecha', ['fecha', 'id']),
+}
+_POR_TABLA = {modelo._meta.db_table: modelo for modelo in MODELOS}
+
+
+class ErrorArchivo(Exception):
+    pass
+
+
+def archivable(modelo):
+    return modelo in MODELOS
+
+
+def _conexion(using):
+    connection = connections[using]
+    connection.ensure_connection()
+    return connection
+
+
+def _columnas(modelo):
+    return ', '.join(f'"{campo.column}"' for campo in modelo._meta.concrete_fields)
+
+
+def preparar(connection):
+    """
+    Crea (o completa) las tablas del archivo con las columnas actuales de cada
+    modelo. Se llama al abrir cada conexión con archivo adjunto (signals.py),
+    fuera de toda transacción; así las consultas no tienen que comprobar nada.
+    """
+    if not getattr(connection, 'archivo', None):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {ESQUEMA}.archivo_meses '
+            '(tabla TEXT, mes TEXT, filas INTEGER, archivado_en TEXT, PRIMARY KEY (tabla, mes))'
+        )
+        for modelo, (_, orden) in MODELOS.items():
+            tabla = modelo._meta.db_table
+            cursor.execute(f'PRAGMA {ESQUEMA}.table_info("{tabla}")')
+            existentes = {fila[1] for fila in cursor.fetchall()}
+            # Sin PK ni FK (no hay padres en esta base): los tipos solo dan la afinidad
+            faltan = [
+                f'"{campo.column}" {campo.db_type(connection) or ""}'.strip()
+                for campo in modelo._meta.concrete_fields if campo.column not in existentes
+            ]
+            if not existentes:
+                columnas = ', '.join(f'"{columna}"' for columna in orden)
+                cursor.execute(f'CREATE TABLE {ESQUEMA}."{tabla}" ({", ".join(faltan)})')
+                cursor.execute(f'CREATE UNIQUE INDEX {ESQUEMA}."{tabla}_id" ON "{tabla}" ("id")')
+                cursor.execute(f'CREATE INDEX {ESQUEMA}."{tabla}_orden" ON "{tabla}" ({columnas})')
+            else:
+                # Columnas que agregó una migración después de archivar: quedan NULL en lo archivado
+                for columna in faltan:
+                    cursor.execute(f'ALTER TABLE {ESQUEMA}."{tabla}" ADD COLUMN {columna}')
+
+
+def crear_base(using=None):
+    """Crea la base de archivo si no existe y reconecta para adjuntarla. Devuelve su ruta."""
+    connection = _conexion(using or router.db_for_write(Produccion))
+    if getattr(connection, 'archivo', None):
+        return connection.archivo
+    ruta = connection.ruta_archivo() if hasattr(connection, 'ruta_archivo') else None
+    if not ruta:
+        raise ErrorArchivo('El backend de la base no admite archivo (ENGINE Koal_Group.sqlite).')
+    if connection.in_atomic_block:
+        raise ErrorArchivo('La base de archivo no se puede adjuntar dentro de una transacción.')
+    sqlite3.connect(ruta).close()
+    connection.close()
+    connection.ensure_connection()
+    return connection.archivo
+
+
+class TablaHistorica(BaseTable):
+    """
+    FROM de la tabla viva reemplazado por `(vivo UNION ALL archivo)` con el mismo
+    alias, así filtros, joins y anotaciones no cambian. Si la conexión no tiene
+    archivo adjunto queda la tabla viva tal cual.
+    """
+
+    def as_sql(self, compiler, connection):
+        # El archivo se adjunta al conectar: hay que saber si está antes de armar el SQL
+        connection.ensure_connection()
+        if not getattr(connection, 'archivo', None):
+            return super().as_sql(compiler, connection)
+        columnas = _columnas(_POR_TABLA[self.table_name])
+        return (
+            f'(SELECT {columnas} FROM main."{self.table_name}" UNION ALL '
+            f'SELECT {columnas} FROM {ESQUEMA}."{self.table_name}") {connection.ops.quote_name(self.table_alias)}'
+        ), []
+
+
+def historico(queryset):
+    """El mismo queryset leyendo filas vivas y archivadas (para otros modelos no cambia). Solo lectura."""
+    if not archivable(queryset.model):
+        return queryset
+    queryset = queryset.all()
+    query = queryset.query
+    alias = query.get_initial_alias()
+    if not isinstance(query.alias_map[alias], TablaHistorica):
+        query.alias_map[alias] = TablaHistorica(query.alias_map[alias].table_name, alias)
+    return queryset
+
+
+class HistoricoMixin:
+    """Para los ViewSets de modelos archivables: los GET (listado y detalle) incluyen lo archivado."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in SAFE_METHODS:
+            queryset = historico(queryset)
+        return queryset
+
+
+def _mes(mes):
+    inicio = mes.replace(day=1)
+    fin = (inicio + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    return inicio, fin
+
+
+def limite(hoy=None):
+    """Primer mes que sigue vivo: se archiva lo anterior a ARCHIVO_MESES_VIVOS meses."""
+    hoy = hoy or datetime.date.today()
+    mes = hoy.year * 12 + hoy.month - 1 - MESES_VIVOS
+    return datetime.date(mes // 12, mes % 12 + 1, 1)
+
+
+def meses_vivos(modelo, antes_de, using=None):
+    """Meses (primer día) con filas vivas anteriores a `antes_de`."""
+    campo = MODELOS[modelo][0]
+    using = using or router.db_for_write(modelo)
+    with _conexion(using).cursor() as cursor:
+        cursor.execute(
+            f'SELECT DISTINCT substr("{campo}", 1, 7) FROM main."{modelo._meta.db_table}" WHERE "{campo}" < %s ORDER BY 1',
+            [antes_de.isoformat()],
+        )
+        return [datetime.date.fromisoformat(f'{fila[0]}-01') for fila in cursor.fetchall()]
+
+
+def archivar(modelo, mes, using=None):
+    """Pasa un mes cerrado al archivo. Devuelve cuántas filas se movieron."""
+    using = using or router.db_for_write(modelo)
+    inicio, fin = _mes(mes)
+    if inicio >= datetime.date.today().replace(day=1):
+        raise ErrorArchivo(f'{inicio:%Y-%m} no es un mes cerrado.')
+    campo, tabla = MODELOS[modelo][0], modelo._meta.db_table
+    if not getattr(_conexion(using), 'archivo', None):
+        raise ErrorArchivo('No hay base de archivo adjunta (ver crear_base).')
+    rango = [inicio.isoformat(), fin.isoformat()]
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        if modelo is ControlDeIngreso:
+            abiertos = ControlDeIngreso.objects.using(using).filter(
+                fecha__range=(inicio, fin), hora_entrada__isnull=False, hora_salida__isnull=True,
+            ).count()
+            if abiertos:
+                raise ErrorArchivo(f'{inicio:%Y-%m} tiene {abiertos} ingresos sin salida.')
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {ESQUEMA}."{tabla}" ({_columnas(modelo)}) '
+            f'SELECT {_columnas(modelo)} FROM main."{tabla}" WHERE "{campo}" BETWEEN %s AND %s', rango,
+        )
+        cursor.execute(f'DELETE FROM main."{tabla}" WHERE "{campo}" BETWEEN %s AND %s', rango)
+        movidas = cursor.rowcount
+        cursor.execute(f'SELECT count(*) FROM {ESQUEMA}."{tabla}" WHERE "{campo}" BETWEEN %s AND %s', rango)
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {ESQUEMA}.archivo_meses VALUES (%s, %s, %s, %s)',
+            [tabla, f'{inicio:%Y-%m}', cursor.fetchone()[0], timezone.localtime().isoformat(timespec='seconds')],
+        )
+    subir_version(modelo)
+    return movidas
+
+
+def restaurar(modelo, mes, using=None):
+    """Devuelve un mes archivado a la tabla viva. Devuelve cuántas filas volvieron."""
+    using = using or router.db_for_write(modelo)
+    inicio, fin = _mes(mes)
+    campo, tabla = MODELOS[modelo][0], modelo._meta.db_table
+    if not getattr(_conexion(using), 'archivo', None):
+        return 0
+    rango = [inicio.isoformat(), fin.isoformat()]
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR IGNORE INTO main."{tabla}" ({_columnas(modelo)}) '
+            f'SELECT {_columnas(modelo)} FROM {ESQUEMA}."{tabla}" WHERE "{campo}" BETWEEN %s AND %s', rango,
+        )
+        cursor.execute(f'DELETE FROM {ESQUEMA}."{tabla}" WHERE "{campo}" BETWEEN %s AND %s', rango)
+        devueltas = cursor.rowcount
+        cursor.execute(f'DELETE FROM {ESQUEMA}.archivo_meses WHERE tabla = %s AND mes = %s', [tabla, f'{inicio:%Y-%m}'])
+    subir_version(modelo)
+    return devueltas
+
+
+def registro(using=None):
+    """[(tabla, mes, filas, archivado_en)] de lo archivado."""
+    connection = _conexion(using or router.db_for_read(Produccion))
+    if not getattr(connection, 'archivo', None):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT tabla, mes, filas, archivado_en FROM {ESQUEMA}.archivo_meses ORDER BY tabla, mes')
+        return cursor.fetchall()
+
+
+def borrar_relacionados(campo, pks, using=None):
+    """
+    Borra del archivo las filas de `campo` (empleado_id / proyecto_id) en `pks`:
+    el CASCADE de la tabla viva no llega a la otra base. La producción borrada
+    se descuenta de los resúmenes, como el post_delete de Produccion.
+    """
+    connection = _conexion(using or router.db_for_write(Produccion))
+    if not getattr(connection, 'archivo', None) or not pks:
+        return
+    marcas = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        for modelo in MODELOS:
+            tabla = modelo._meta.db_table
+            if modelo is Produccion:
+                cursor.execute(
+                    f'SELECT proyecto_id, empleado_id, fecha, cantidad_producida FROM {ESQUEMA}."{tabla}" '
+                    f'WHERE "{campo}" IN ({marcas})', list(pks),
+                )
+                # Las columnas tienen los tipos de Django: fecha y cantidad ya vienen convertidas
+                for proyecto_id, empleado_id, fecha, cantidad in cursor.fetchall():
+                    aplicar_produccion({
+                        'proyecto_id': proyecto_id, 'empleado_id': empleado_id,
+                        'fecha': fecha, 'cantidad_producida': cantidad,
+                    }, None)
+            cursor.execute(f'DELETE FROM {ESQUEMA}."{tabla}" WHERE "{campo}" IN ({marcas})', list(pks))
+
+
+def compactar(using=None):
+    """VACUUM de la base viva y del archivo (fuera de toda transacción)."""
+    connection = _conexion(using or router.db_for_write(Produccion))
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM main')
+        if getattr(connection, 'archivo', None):
+            cursor.execute(f'VACUUM {ESQUEMA}')
@@ -0,0 +1,150 @@
+# Administrativo/asistencia.py
+
+"""
+Horas trabajadas, horas extra, horas nocturnas y ausencias por empleado en un
+período, calculadas desde ControlDeIngreso (hora_entrada / hora_salida) para
+nómina. Antes RR. HH. exportaba los ingresos y hacía estas cuentas a mano.
+
+Los registros del período se leen en una sola consulta ya convertidos a
+números (día relativo al inicio y segundos desde medianoche, los hace SQLite)
+y todo se calcula con NumPy sobre columnas, sin un bucle de Python por fila:
+
+- Un turno cuya salida es menor que la entrada cruza la medianoche: la salida
+  es del día siguiente. El turno se asigna al día de la entrada.
+- Horas extra: por empleado y día, lo trabajado por encima de
+  `ASISTENCIA_JORNADA_HORAS` (matriz empleados x días con bincount).
+- Horas nocturnas: intersección de cada turno con la franja
+  `ASISTENCIA_FRANJA_NOCTURNA` (por defecto 21:00 a 06:00) del día anterior,
+  del mismo día y del siguiente.
+- Ausencias: días laborables (`ASISTENCIA_DIAS_LABORABLES`, 0 = lunes) sin
+  ningún registro, desde la fecha de registro del empleado y hasta hoy.
+- Los registros sin hora de salida cuentan como asistencia pero no suman
+  horas; se informan en `registros_abiertos`.
+
+Entran los empleados activos y los que tengan registros en el período. Los
+meses archivados también cuentan (archivo.py).
+"""
+
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import ControlDeIngreso, Empleado
+
+JORNADA_HORAS = getattr(settings, 'ASISTENCIA_JORNADA_HORAS', 8)
+FRANJA_NOCTURNA = getattr(settings, 'ASISTENCIA_FRANJA_NOCTURNA', (21, 6))
+DIAS_LABORABLES = getattr(settings, 'ASISTENCIA_DIAS_LABORABLES', (0, 1, 2, 3, 4, 5))
+MAXIMO_DIAS = getattr(settings, 'ASISTENCIA_MAXIMO_DIAS', 366)
+
+DIA = 86400
+COLUMNAS = [
+    'empleado_id', 'cedula', 'nombres', 'horas_trabajadas', 'horas_ordinarias', 'horas_extra',
+    'horas_nocturnas', 'dias_trabajados', 'ausencias', 'registros_abiertos',
+]
+
+
+def _segundos(campo):
+    # 'HH:MM:SS[.ffffff]' -> segundos desde medianoche (NULL sigue siendo NULL)
+    columna = f'"{ControlDeIngreso._meta.db_table}"."{campo}"'
+    return RawSQL(
+        f'CAST(substr({columna}, 1, 2) AS INTEGER) * 3600 + CAST(substr({columna}, 4, 2) AS INTEGER) * 60'
+        f' + CAST(substr({columna}, 7, 2) AS INTEGER)', [],
+    )
+
+
+def _dia(desde):
+    columna = f'"{ControlDeIngreso._meta.db_table}"."fecha"'
+    return RawSQL(f'CAST(julianday({columna}) - julianday(%s) AS INTEGER)', [desde.isoformat()])
+
+
+def segundos_nocturnos(entrada, salida, franja=FRANJA_NOCTURNA):
+    """
+    Segundos de cada turno [entrada, salida) dentro de la franja nocturna.
+    entrada/salida en segundos desde la medianoche del día del turno (salida < 2 días).
+    """
+    inicio, fin = franja[0] * 3600, franja[1] * 3600
+    if fin <= inicio:
+        fin += DIA
+    total = np.zeros(len(entrada))
+    # Un turno de menos de 24 h puede tocar la franja de ayer, la de hoy y la de mañana
+    for k in (-1, 0, 1):
+        total += np.clip(np.minimum(salida, fin + k * DIA) - np.maximum(entrada, inicio + k * DIA), 0, None)
+    return total
+
+
+def calcular(desde, hasta, empleados=None, hoy=None):
+    """Una fila (dict con COLUMNAS) por empleado, ordenadas por nombre."""
+    hoy = hoy or timezone.localdate()
+    dias = (hasta - desde).days + 1
+    registros = ControlDeIngreso.objects.historico().filter(fecha__range=(desde, hasta))
+    personas = Empleado.objects.filter(Q(estado='activo') | Q(pk__in=registros.values('empleado_id')))
+    if empleados is not None:
+        registros = registros.filter(empleado_id__in=empleados)
+        personas = personas.filter(pk__in=empleados)
+    personas = list(personas.order_by('nombres', 'id').values_list('id', 'cedula', 'nombres', 'fecha_registro'))
+    filas = registros.annotate(
+        dia=_dia(desde), entrada=_segundos('hora_entrada'), salida=_segundos('hora_salida'),
+    ).values_list('empleado_id', 'dia', 'entrada', 'salida')
+    # None -> nan
+    datos = np.array(list(filas), dtype=np.float64).reshape(-1, 4)
+
+    n = len(personas)
+    ids = np.array([p[0] for p in personas], dtype=np.int64)
+    orden = np.argsort(ids)
+    empleado = orden[np.searchsorted(ids, datos[:, 0].astype(np.int64), sorter=orden)]
+    dia = datos[:, 1].astype(np.int64)
+    entrada, salida = datos[:, 2], datos[:, 3]
+
+    abiertos = ~np.isnan(entrada) & np.isnan(salida)
+    completos = ~np.isnan(entrada) & ~np.isnan(salida)
+    entrada = np.where(completos, entrada, 0)
+    salida = np.where(completos, salida, 0)
+    salida = np.where(salida < entrada, salida + DIA, salida)  # cruza la medianoche
+    duracion = salida - entrada
+    nocturnos = segundos_nocturnos(entrada, salida)
+
+    celda = empleado * dias + dia
+    trabajado = np.bincount(celda, weights=duracion, minlength=n * dias).reshape(n, dias)
+    presente = np.bincount(celda, minlength=n * dias).reshape(n, dias) > 0
+    extra = np.clip(trabajado - JORNADA_HORAS * 3600, 0, None).sum(axis=1)
+    total = trabajado.sum(axis=1)
+    nocturnos = np.bincount(empleado, weights=nocturnos, minlength=n)
+    abiertos = np.bincount(empleado, weights=abiertos, minlength=n)
+
+    posicion = np.arange(dias)
+    laborable = np.isin((posicion + desde.weekday()) % 7, DIAS_LABORABLES) & (posicion <= (hoy - desde).days)
+    registrado = np.array([(p[3] - desde).days for p in personas], dtype=np.int64).reshape(-1, 1)
+    ausencias = (laborable & (posicion >= registrado) & ~presente).sum(axis=1)
+    dias_trabajados = presente.sum(axis=1)
+
+    total, extra, nocturnos = total.tolist(), extra.tolist(), nocturnos.tolist()
+    return [
+        {
+            'empleado_id': id_, 'cedula': cedula, 'nombres': nombres,
+            'horas_trabajadas': round(total[i] / 3600, 2),
+            'horas_ordinarias': round((total[i] - extra[i]) / 3600, 2),
+            'horas_extra': round(extra[i] / 3600, 2),
+            'horas_nocturnas': round(nocturnos[i] / 3600, 2),
+            'dias_trabajados': int(dias_trabajados[i]),
+            'ausencias': int(ausencias[i]),
+            'registros_abiertos': int(abiertos[i]),
+        } for i, (id_, cedula, nombres, _) in enumerate(personas)
+    ]
+
+
+def periodo(desde=None, hasta=None):
+    """Fechas por defecto (el mes en curso) y validación. ValueError si no sirven."""
+    hoy = timezone.localdate()
+    desde = desde or hoy.replace(day=1)
+    if hasta is None:
+        siguiente = (desde.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        hasta = siguiente - datetime.timedelta(days=1)
+    if hasta < desde:
+        raise ValueError('hasta debe ser igual o posterior a desde.')
+    if (hasta - desde).days + 1 > MAXIMO_DIAS:
+        raise ValueError(f'El período no puede pasar de {MAXIMO_DIAS} días.')
+    return desde, hasta
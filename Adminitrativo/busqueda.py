@@ -0,0 +1,248 @@
+# Administrativo/busqueda.py
+
+"""
+Búsqueda de texto (`?search=`) con índices FTS5 de SQLite.
+
+Antes se filtraba con `empleado__nombres__icontains`, que recorre todo el
+registro de ingresos con un JOIN y no ignora acentos ("Nunez" no encuentra
+"Núñez"). Aquí cada modelo buscable tiene una tabla FTS5 con el tokenizador
+`unicode61 remove_diacritics 2` (sin mayúsculas ni acentos), con rowid = pk:
+
+- busqueda_empleado: nombres, cédula (también solo los dígitos) y email.
+- busqueda_proyecto: nombre.
+- busqueda_ingreso: observación de ControlDeIngreso. Buscar en ingresos
+  también encuentra los del empleado o del proyecto que coincide, a través
+  de sus índices (sin JOIN contra todo el registro).
+
+Cada palabra buscada es un prefijo y todas deben aparecer ("ana nu" encuentra
+a "Ana Núñez"). Empleados y proyectos se devuelven ordenados por relevancia
+(bm25) con su propio cursor; en ingresos el filtro se aplica sobre el orden
+cronológico y la paginación normales.
+
+Los índices se mantienen en la misma transacción que la escritura: post_save /
+post_delete y `escritura_masiva` (signals.py). Si se cargan datos por fuera del
+ORM: manage.py reconstruir_busqueda.
+"""
+
+import base64
+import json
+import re
+from collections import namedtuple
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .archivo import historico
+
+Indice = namedtuple('Indice', ['tabla', 'campos', 'relaciones'])
+
+# Modelo (label_lower) -> índice. relaciones: {campo FK: modelo cuyo índice también cuenta}
+INDICES = {
+    'Adminitrativo.empleado': Indice('busqueda_empleado', ['nombres', 'cedula', 'email'], {}),
+    'Adminitrativo.proyecto': Indice('busqueda_proyecto', ['nombre'], {}),
+    'Adminitrativo.controldeingreso': Indice(
+        'busqueda_ingreso', ['observacion'],
+        {'empleado_id': 'Adminitrativo.empleado', 'proyecto_id': 'Adminitrativo.proyecto'},
+    ),
+}
+TOKENIZADOR = 'unicode61 remove_diacritics 2'
+PARAMETRO = 'search'
+BATCH_SIZE = 500
+
+
+def indexado(modelo):
+    return modelo._meta.label_lower in INDICES
+
+
+def _indice(modelo):
+    return INDICES[modelo._meta.label_lower]
+
+
+def crear_tablas(connection):
+    with connection.cursor() as cursor:
+        for indice in INDICES.values():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {indice.tabla} "
+                f"USING fts5({', '.join(indice.campos)}, tokenize='{TOKENIZADOR}')"
+            )
+
+
+def borrar_tablas(connection):
+    with connection.cursor() as cursor:
+        for indice in INDICES.values():
+            cursor.execute(f'DROP TABLE IF EXISTS {indice.tabla}')
+
+
+def _texto(campo, valor):
+    if valor is None:
+        return ''
+    valor = str(valor)
+    if campo == 'cedula':
+        # "1.234.567" se indexa también como "1234567"
+        digitos = re.sub(r'\D', '', valor)
+        if digitos and digitos != valor:
+            valor = f'{valor} {digitos}'
+    return valor
+
+
+def indexar_filas(modelo, filas, using=None):
+    """Reemplaza en el índice las filas [(pk, valor_campo1, ...)]; las que quedan vacías se quitan."""
+    indice = _indice(modelo)
+    using = using or router.db_for_write(modelo)
+    filas = list(filas)
+    documentos = []
+    for pk, *valores in filas:
+        textos = [_texto(campo, valor) for campo, valor in zip(indice.campos, valores)]
+        if any(textos):
+            documentos.append((pk, *textos))
+    columnas = ', '.join(indice.campos)
+    marcas = ', '.join(['%s'] * (len(indice.campos) + 1))
+    with connections[using].cursor() as cursor:
+        for i in range(0, len(filas), BATCH_SIZE):
+            pks = [fila[0] for fila in filas[i:i + BATCH_SIZE]]
+            cursor.execute(f"DELETE FROM {indice.tabla} WHERE rowid IN ({', '.join(['%s'] * len(pks))})", pks)
+        if documentos:
+            cursor.executemany(f'INSERT INTO {indice.tabla} (rowid, {columnas}) VALUES ({marcas})', documentos)
+
+
+def indexar(modelo, pks, using=None):
+    """Vuelve a indexar los pk dados leyendo sus valores actuales (rutas masivas)."""
+    using = using or router.db_for_write(modelo)
+    campos = _indice(modelo).campos
+    pks = list(pks)
+    filas = []
+    for i in range(0, len(pks), BATCH_SIZE):
+        filas += modelo._base_manager.using(using).filter(pk__in=pks[i:i + BATCH_SIZE]).values_list('pk', *campos)
+    # Los que ya no existen solo se borran del índice
+    encontrados = {fila[0] for fila in filas}
+    filas += [(pk, *[None] * len(campos)) for pk in pks if pk not in encontrados]
+    indexar_filas(modelo, filas, using)
+
+
+def quitar(modelo, pks, using=None):
+    indexar_filas(modelo, [(pk, *[None] * len(_indice(modelo).campos)) for pk in pks], using)
+
+
+def reconstruir(modelo, using=None):
+    """Vacía y vuelve a llenar el índice de un modelo. Devuelve cuántas filas se indexaron."""
+    indice = _indice(modelo)
+    using = using or router.db_for_write(modelo)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {indice.tabla}')
+    # Los ingresos archivados también se siguen encontrando (archivo.py)
+    consulta = historico(modelo._base_manager.using(using).order_by('pk')).values_list('pk', *indice.campos)
+    lote, total = [], 0
+    for fila in consulta.iterator(chunk_size=2000):
+        lote.append(fila)
+        if len(lote) == 2000:
+            indexar_filas(modelo, lote, using)
+            total += len(lote)
+            lote = []
+    indexar_filas(modelo, lote, using)
+    return total + len(lote)
+
+
+def consulta_fts(texto):
+    """Texto libre -> consulta FTS5 (cada palabra como prefijo, todas requeridas), o None."""
+    palabras = re.findall(r'\w+', texto or '')
+    if not palabras:
+        return None
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def _coincidencias(etiqueta, consulta):
+    tabla = INDICES[etiqueta].tabla
+    return RawSQL(f'SELECT rowid FROM {tabla} WHERE {tabla} MATCH %s', [consulta])
+
+
+def filtrar(queryset, texto):
+    """Filtra un queryset de un modelo indexado (sin cambiar su orden)."""
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return queryset.none()
+    etiqueta = queryset.model._meta.label_lower
+    condicion = Q(pk__in=_coincidencias(etiqueta, consulta))
+    for campo, relacionado in INDICES[etiqueta].relaciones.items():
+        condicion |= Q(**{f'{campo}__in': _coincidencias(relacionado, consulta)})
+    return queryset.filter(condicion)
+
+
+def ranking(modelo, texto, limite, despues=None, using=None):
+    """
+    [(pk, rank)] de los más relevantes primero (rank de bm25, menor es mejor),
+    hasta `limite`, empezando después de la posición `despues` = (rank, pk).
+    """
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return []
+    tabla = _indice(modelo).tabla
+    sql = f'SELECT rowid, rank FROM {tabla} WHERE {tabla} MATCH %s'
+    parametros = [consulta]
+    if despues is not None:
+        sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        parametros += [despues[0], despues[0], despues[1]]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    with connections[using or router.db_for_read(modelo)].cursor() as cursor:
+        cursor.execute(sql, parametros + [limite])
+        return cursor.fetchall()
+
+
+class BusquedaMixin:
+    """
+    Para ModelViewSets de modelos indexados: `?search=texto`. Con
+    busqueda_por_relevancia la lista sale ordenada por bm25 (cursor propio);
+    si no, solo filtra y el listado sigue con su orden y paginación.
+    """
+    busqueda_por_relevancia = True
+
+    def texto_busqueda(self):
+        return self.request.query_params.get(PARAMETRO)
+
+    def modelos_busqueda(self):
+        if self.texto_busqueda() is None:
+            return []
+        modelo = self.get_queryset().model
+        return [modelo._meta.get_field(campo).related_model for campo in _indice(modelo).relaciones]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        texto = self.texto_busqueda()
+        if texto is not None and self.action == 'list':
+            queryset = filtrar(queryset, texto)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        texto = self.texto_busqueda()
+        if texto is None or not self.busqueda_por_relevancia or self.paginator is None:
+            return super().list(request, *args, **kwargs)
+
+        tamano = self.paginator.get_page_size(request)
+        modelo = self.get_queryset().model
+        filas = ranking(modelo, texto, tamano + 1, self._posicion(request))
+        mas, filas = len(filas) > tamano, filas[:tamano]
+        # Los demás filtros del ViewSet y el ?expand= se aplican sobre la página
+        objetos = self.filter_queryset(self.get_queryset()).in_bulk([pk for pk, _ in filas])
+        pagina = [objetos[pk] for pk, _ in filas if pk in objetos]
+        siguiente = None
+        if mas:
+            cursor = base64.urlsafe_b64encode(json.dumps({'b': list(filas[-1][::-1])}).encode()).decode('ascii')
+            siguiente = replace_query_param(request.build_absolute_uri(), self.paginator.cursor_query_param, cursor)
+        return Response({
+            'next': siguiente,
+            'previous': None,
+            'results': self.get_serializer(pagina, many=True).data,
+        })
+
+    def _posicion(self, request):
+        cursor = request.query_params.get(self.paginator.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            rank, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))['b']
+            return float(rank), int(pk)
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.paginator.invalid_cursor_message)
@@ -0,0 +1,117 @@
+# Administrativo/cedulas.py
+
+"""
+Búsqueda de empleados por cédula para los torniquetes, con caché en memoria.
+
+Antes la portería hacía dos llamadas por lectura (buscar_por_cedula y luego
+area_por_cedula, esta última cargando `cargo` aparte). Ahora una sola
+consulta trae nombre, cargo/área, estado y nivel de acceso, y el resultado
+queda en un LRU acotado por proceso (cédula -> datos), así que las lecturas
+repetidas no tocan la base de datos. También se guardan las cédulas que no
+existen, para que una tarjeta desconocida no consulte en cada intento.
+
+Invalidación (signals.py): guardar o borrar un Empleado saca su cédula (la
+nueva y la anterior), un Cargo saca a sus empleados, y las escrituras
+masivas (`escritura_masiva`) vacían el caché. Se invalida otra vez al hacer
+commit por si alguien volvió a leer la fila vieja mientras tanto. Cambios de
+otros workers llegan por el vencimiento `CEDULAS_TTL_SEGUNDOS`, como la
+recarga del índice de huellas.
+
+Las estadísticas salen en /api/cache/estadisticas/ bajo 'cedulas'.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Empleado
+from .versiones import contadores
+
+MAXIMO = getattr(settings, 'CEDULAS_CACHE_MAXIMO', 10000)
+TTL_SEGUNDOS = getattr(settings, 'CEDULAS_TTL_SEGUNDOS', 60)
+
+CAMPOS = ['id', 'cedula', 'nombres', 'estado', 'nivel_acceso', 'cargo_id', 'cargo__nombre_cargo']
+_FALTA = object()
+
+
+class CacheCedulas:
+    """LRU cédula -> (datos o None si no existe, vence_en)."""
+
+    def __init__(self, maximo=MAXIMO, ttl=TTL_SEGUNDOS):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._datos = OrderedDict()
+        self._generacion = 0  # Sube con cada invalidación
+
+    def __len__(self):
+        return len(self._datos)
+
+    def obtener(self, cedula):
+        """Los datos guardados (None = no existe) o _FALTA."""
+        with self._lock:
+            entrada = self._datos.get(cedula)
+            if entrada is None or entrada[1] < time.monotonic():
+                return _FALTA
+            self._datos.move_to_end(cedula)
+            return entrada[0]
+
+    def generacion(self):
+        return self._generacion
+
+    def guardar(self, cedula, datos, generacion):
+        # Si hubo una invalidación mientras se leía, lo leído puede estar viejo
+        with self._lock:
+            if generacion != self._generacion:
+                return
+            self._datos[cedula] = (datos, time.monotonic() + self.ttl)
+            self._datos.move_to_end(cedula)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def invalidar_empleado(self, empleado_id, *cedulas):
+        with self._lock:
+            self._generacion += 1
+            for cedula in cedulas:
+                self._datos.pop(cedula, None)
+            # La cédula pudo cambiar: también la entrada vieja de ese id
+            for cedula in [c for c, (datos, _) in self._datos.items() if datos and datos['id'] == empleado_id]:
+                del self._datos[cedula]
+
+    def invalidar_cargo(self, cargo_id):
+        with self._lock:
+            self._generacion += 1
+            for cedula in [c for c, (datos, _) in self._datos.items() if datos and datos['cargo'] == cargo_id]:
+                del self._datos[cedula]
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._datos.clear()
+
+
+cache_cedulas = CacheCedulas()
+
+
+def _formatear(fila):
+    fila['cargo'] = fila.pop('cargo_id')
+    # 'nombre' y 'area' son los nombres que usaba backent (buscar_por_cedula / area_por_cedula)
+    fila['nombre'] = fila['nombres']
+    fila['area'] = fila.pop('cargo__nombre_cargo')
+    return fila
+
+
+async def abuscar(cedula):
+    """Datos de portería del empleado (dict) o None si la cédula no existe."""
+    datos = cache_cedulas.obtener(cedula)
+    if datos is not _FALTA:
+        contadores.sumar('cedulas', 'hits')
+        return datos
+    contadores.sumar('cedulas', 'misses')
+    generacion = cache_cedulas.generacion()
+    fila = await Empleado.objects.filter(cedula=cedula).values(*CAMPOS).afirst()
+    datos = _formatear(fila) if fila is not None else None
+    cache_cedulas.guardar(cedula, datos, generacion)
+    return datos
@@ -0,0 +1,114 @@
+# Administrativo/condicional.py
+
+"""
+GET condicional (ETag / Last-Modified / 304) para la API.
+
+- Listados: el validador se arma con la versión por modelo (versiones.py) del
+  modelo del ViewSet y de los modelos que entran con `?expand=`, más la ruta
+  completa (filtros, cursor, page_size). No cuesta ninguna consulta.
+- Detalle: `fecha_actualizacion` de la fila (una consulta de una columna por
+  pk) más las versiones de lo expandido.
+
+Si el cliente ya tiene la versión se responde 304 sin tocar el serializer.
+Last-Modified tiene resolución de un segundo; el ETag es el validador fuerte
+que conviene usar (If-None-Match gana sobre If-Modified-Since).
+"""
+
+import calendar
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .serializers import parse_expand
+from .versiones import ultima_modificacion, version
+
+
+def etag_de(*partes):
+    digest = hashlib.sha1('|'.join(str(parte) for parte in partes).encode()).hexdigest()
+    return 'W/' + quote_etag(digest[:32])
+
+
+def no_modificado(request, etag, ultima=None):
+    """HttpResponseNotModified si el cliente ya tiene esta versión, si no None."""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(ultima) if ultima is not None else None,
+    )
+    if response is not None:
+        poner_validadores(response, etag, ultima)
+    return response
+
+
+def poner_validadores(response, etag, ultima=None):
+    response['ETag'] = etag
+    if ultima is not None:
+        response['Last-Modified'] = http_date(ultima)
+    return response
+
+
+def modelos_expandidos(modelo, rutas):
+    """Modelos a los que llega cada ruta de select/prefetch_related ('cargo', 'lista__herramienta')."""
+    modelos = set()
+    for ruta in rutas:
+        actual = modelo
+        for nombre in ruta.split('__'):
+            actual = actual._meta.get_field(nombre).related_model
+            modelos.add(actual)
+    return modelos
+
+
+class ConditionalGetMixin:
+    """
+    Para ModelViewSets: list y retrieve responden 304 cuando el If-None-Match
+    o el If-Modified-Since del cliente siguen vigentes.
+    """
+    campo_actualizacion = 'fecha_actualizacion'
+
+    def modelos_dependientes(self):
+        serializer_class = self.get_serializer_class()
+        modelo = serializer_class.Meta.model
+        expand = parse_expand(self.request.query_params.get('expand'))
+        select_related, prefetch_related, _ = serializer_class.expansion_plan(expand)
+        relacionados = modelos_expandidos(modelo, select_related + prefetch_related)
+        # Otros modelos que cambian el resultado (p. ej. ?search= en ingresos, busqueda.py)
+        if hasattr(self, 'modelos_busqueda'):
+            relacionados |= set(self.modelos_busqueda())
+        relacionados -= {modelo}
+        return [modelo, *sorted(relacionados, key=lambda m: m._meta.label)]
+
+    def list(self, request, *args, **kwargs):
+        modelos = self.modelos_dependientes()
+        versiones = '.'.join(str(version(modelo)) for modelo in modelos)
+        etag = etag_de(request.get_full_path(), versiones)
+        ultima = ultima_modificacion(*modelos)
+        return self._condicional(request, etag, ultima, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            actualizado = (
+                self.filter_queryset(self.get_queryset())
+                .filter(**{self.lookup_field: kwargs[lookup]})
+                .values_list(self.campo_actualizacion, flat=True).first()
+            )
+        except (TypeError, ValueError, ValidationError):  # p. ej. /api/empleados/abc/
+            actualizado = None
+        if actualizado is None:  # No existe: que lo resuelva el 404 normal
+            return super().retrieve(request, *args, **kwargs)
+        relacionados = self.modelos_dependientes()[1:]
+        versiones = '.'.join(str(version(modelo)) for modelo in relacionados)
+        etag = etag_de(request.get_full_path(), actualizado.isoformat(), versiones)
+        ultima = calendar.timegm(actualizado.utctimetuple())
+        if relacionados:
+            ultima = max(ultima, ultima_modificacion(*relacionados))
+        return self._condicional(request, etag, ultima, super().retrieve, *args, **kwargs)
+
+    def _condicional(self, request, etag, ultima, vista, *args, **kwargs):
+        response = no_modificado(request, etag, ultima)
+        if response is not None:
+            return response
+        response = vista(request, *args, **kwargs)
+        if response.status_code == 200:
+            poner_validadores(response, etag, ultima)
+        return response
@@ -0,0 +1,68 @@
+# Administrativo/disponibilidad.py
+
+"""
+Disponibilidad de herramientas en tiempo real (`Herramienta.disponible`).
+
+En vez de contar los préstamos abiertos de cada herramienta en cada pantalla,
+el contador se mueve con un UPDATE condicional en la misma transacción que el
+préstamo:
+
+    UPDATE herramienta SET disponible = disponible - 1 WHERE id = %s AND disponible >= 1
+
+Si no actualiza ninguna fila no quedan unidades y se lanza SinDisponibilidad
+(se revierte el préstamo). La condición va en el mismo UPDATE, así que dos
+préstamos simultáneos nunca toman la misma última unidad; además la base
+tiene CHECK 0 <= disponible <= cantidad.
+
+- Prestamo.save(): entrega, devolución, reapertura o cambio de herramienta.
+- post_delete de Prestamo (signals.py): borrar un préstamo abierto libera la unidad.
+- Escrituras masivas de Prestamo (`escritura_masiva`): se recalcula todo con
+  HerramientaQuerySet.recalcular_disponibilidad (si el resultado sobrepasa la
+  cantidad, el CHECK hace fallar la operación completa).
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Herramienta
+
+
+class SinDisponibilidad(Exception):
+    pass
+
+
+def _abierto(valores):
+    return valores is not None and valores['fecha_devolucion'] is None
+
+
+def _mover(herramienta_id, delta):
+    consulta = Herramienta.objects.filter(pk=herramienta_id)
+    if delta < 0:
+        consulta = consulta.filter(disponible__gte=-delta)
+    if not consulta.update(disponible=F('disponible') + delta) and delta < 0:
+        raise SinDisponibilidad(f'No quedan unidades disponibles de la herramienta {herramienta_id}.')
+
+
+@transaction.atomic
+def aplicar_prestamo(anterior, actual):
+    """
+    Aplica el cambio de un préstamo al contador. `anterior` y `actual` son dicts
+    con herramienta_prestada_id y fecha_devolucion (None si se creó o se borró).
+    """
+    deltas = {}
+    for valores, signo in ((anterior, 1), (actual, -1)):
+        if _abierto(valores):
+            herramienta_id = valores['herramienta_prestada_id']
+            deltas[herramienta_id] = deltas.get(herramienta_id, 0) + signo
+    # Primero se devuelve y después se presta
+    for herramienta_id, delta in sorted(deltas.items(), key=lambda item: -item[1]):
+        if delta:
+            _mover(herramienta_id, delta)
+
+
+def recalcular(herramientas=None):
+    """Recalcula el contador de las herramientas dadas (todas si es None)."""
+    consulta = Herramienta.objects.all()
+    if herramientas is not None:
+        consulta = consulta.filter(pk__in=list(herramientas))
+    return consulta.recalcular_disponibilidad()
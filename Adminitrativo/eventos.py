@@ -0,0 +1,166 @@
+# Administrativo/eventos.py
+
+"""
+Bus en memoria de los eventos de portería (entradas y salidas) para el
+stream SSE de la sala de control (GET /api/control-ingresos/eventos/).
+
+Las escrituras de ControlDeIngreso (save, los lotes de ingesta.py y el
+check-in async) se publican al hacer commit (signals.py): un SELECT por
+commit con los registros tocados, sin importar cuántos paneles estén
+escuchando. Cada evento se arma una sola vez como texto SSE y se reparte a
+las colas asyncio de los suscriptores con call_soon_threadsafe (la escritura
+puede venir de otro hilo o de un WSGI).
+
+Los ids son "<época>-<secuencia>": la época cambia en cada arranque del
+proceso. Al reconectar, EventSource manda Last-Event-ID y se reenvían los
+eventos que quedan en los últimos EVENTOS_RECIENTES. Si ya no están (o el id
+es de otro arranque) se manda un evento `reinicio` y el panel vuelve a bajar
+el listado; lo mismo si un panel lento llena su cola.
+
+Es un bus por proceso: con varios workers, cada panel solo ve lo que se
+escribió en su proceso. Hay que servirlo con un solo worker ASGI (ver
+Koal_Group/asgi.py).
+"""
+
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque, namedtuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ControlDeIngreso
+
+RECIENTES = getattr(settings, 'EVENTOS_RECIENTES', 1000)
+COLA = getattr(settings, 'EVENTOS_COLA', 1000)  # eventos sin mandar por panel antes de un reinicio
+PING_SEGUNDOS = getattr(settings, 'EVENTOS_PING_SEGUNDOS', 15)
+REINTENTO_MS = 3000  # `retry:` para EventSource
+CAMPOS = [
+    'id', 'empleado', 'empleado__nombres', 'proyecto', 'lugar_trabajo', 'fecha', 'hora_entrada', 'hora_salida',
+    'estado', 'estado_salud',
+]
+LOTE = 500  # ids por SELECT al publicar
+
+# proyecto None: se manda a todos (reinicio)
+Evento = namedtuple('Evento', 'secuencia proyecto marco')
+
+
+def tipo(registro):
+    return 'salida' if registro['hora_salida'] is not None else 'entrada'
+
+
+class Suscripcion:
+    """Un panel conectado. `cola` solo se toca desde su event loop."""
+
+    def __init__(self, bus, proyectos, loop):
+        self.bus = bus
+        self.proyectos = proyectos
+        self.loop = loop
+        self.cola = asyncio.Queue(COLA)
+
+    def quiere(self, evento):
+        return evento.proyecto is None or self.proyectos is None or evento.proyecto in self.proyectos
+
+    def entregar(self, eventos):
+        for evento in eventos:
+            try:
+                self.cola.put_nowait(evento)
+            except asyncio.QueueFull:
+                # Se perdió algo: mejor que el panel vuelva a bajar todo
+                while not self.cola.empty():
+                    self.cola.get_nowait()
+                self.cola.put_nowait(self.bus.reinicio(eventos[-1].secuencia))
+                return
+
+    async def siguientes(self, espera=PING_SEGUNDOS):
+        """Lo que haya en la cola (espera el primero hasta `espera` s; [] si no llegó nada)."""
+        try:
+            eventos = [await asyncio.wait_for(self.cola.get(), espera)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.cola.empty():
+            eventos.append(self.cola.get_nowait())
+        return eventos
+
+
+class Bus:
+    def __init__(self, recientes=RECIENTES):
+        self._lock = threading.Lock()
+        self._recientes = deque(maxlen=recientes)
+        self._suscripciones = set()
+        self.epoca = secrets.token_hex(4)
+        self.secuencia = 0
+
+    def _marco(self, secuencia, evento, datos):
+        datos = json.dumps(datos, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return f'id: {self.epoca}-{secuencia}\nevent: {evento}\ndata: {datos}\n\n'.encode()
+
+    def reinicio(self, secuencia):
+        return Evento(secuencia, None, self._marco(secuencia, 'reinicio', {}))
+
+    def publicar(self, eventos):
+        """eventos: [(tipo, datos)] con datos['proyecto']. Se puede llamar desde cualquier hilo."""
+        with self._lock:
+            nuevos = []
+            for nombre, datos in eventos:
+                self.secuencia += 1
+                nuevos.append(Evento(self.secuencia, datos['proyecto'], self._marco(self.secuencia, nombre, datos)))
+            self._recientes.extend(nuevos)
+            # Dentro del lock: una suscripción nueva no puede ver un evento dos veces ni saltárselo
+            for suscripcion in list(self._suscripciones):
+                propios = [evento for evento in nuevos if suscripcion.quiere(evento)]
+                if not propios:
+                    continue
+                try:
+                    suscripcion.loop.call_soon_threadsafe(suscripcion.entregar, propios)
+                except RuntimeError:  # su event loop ya se cerró
+                    self._suscripciones.discard(suscripcion)
+
+    def suscribir(self, proyectos=None, ultimo=None):
+        """
+        Suscribe al event loop actual. `proyectos`: ids a filtrar (None: todos);
+        `ultimo`: Last-Event-ID. Devuelve (suscripción, eventos pendientes desde `ultimo`).
+        """
+        suscripcion = Suscripcion(self, proyectos, asyncio.get_running_loop())
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+            if not ultimo:
+                return suscripcion, []
+            epoca, _, secuencia = ultimo.rpartition('-')
+            primero = self._recientes[0].secuencia if self._recientes else self.secuencia + 1
+            if epoca != self.epoca or not secuencia.isdigit() or not primero - 1 <= int(secuencia) <= self.secuencia:
+                return suscripcion, [self.reinicio(self.secuencia)]
+            secuencia = int(secuencia)
+            return suscripcion, [e for e in self._recientes if e.secuencia > secuencia and suscripcion.quiere(e)]
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def suscriptores(self):
+        with self._lock:
+            return len(self._suscripciones)
+
+
+bus = Bus()
+
+
+def publicar_registros(pks, using=None):
+    """Publica el estado actual de los registros (se llama en on_commit)."""
+    pks = list(pks)
+    for i in range(0, len(pks), LOTE):
+        filas = (
+            ControlDeIngreso.objects.using(using).filter(pk__in=pks[i:i + LOTE])
+            .order_by('id').values(*CAMPOS)
+        )
+        eventos = []
+        for fila in filas:
+            fila['nombres'] = fila.pop('empleado__nombres')
+            eventos.append((tipo(fila), fila))
+        bus.publicar(eventos)
+
+
+def publicar_borrado(pk, proyecto_id):
+    bus.publicar([('borrado', {'id': pk, 'proyecto': proyecto_id})])
@@ -0,0 +1,474 @@
+# Administrativo/gases.py
+
+"""
+Monitoreo de gases: lecturas de muchos sensores (metano, CO...) cada pocos
+segundos, por lotes (POST /api/sensores-gas/lecturas/).
+
+- Crudo compacto: BloqueLecturasGas guarda un blob por sensor y minuto con
+  (ms desde el inicio del minuto: uint16, valor: float32), 6 bytes por
+  lectura en vez de una fila. Cada lote lee los bloques que toca y los
+  reescribe con un upsert; la transacción de SQLite es IMMEDIATE, así que dos
+  lotes no se pisan. Una lectura repetida (mismo sensor y mismo ms, p. ej. un
+  reenvío del equipo) se descarta.
+- Resúmenes por minuto y por hora (ResumenGas: registros, suma, mínimo,
+  máximo) que se suman solo con las lecturas nuevas de cada lote.
+- Umbrales en cada lote (los del sensor o `LIMITES`): un AlertaGas por
+  sensor con la peor lectura del lote, y la respuesta las devuelve.
+- `anillos`: las últimas `GASES_ULTIMAS` lecturas de cada sensor en memoria
+  (arreglos circulares de numpy, por proceso). Se llenan al hacer commit de
+  cada lote y se recargan de la base cada `GASES_RECARGA_SEGUNDOS`, para ver
+  lo que ingresaron otros workers (como el índice de huellas).
+- `serie`: consulta por rango con la resolución más gruesa que todavía da el
+  paso pedido (crudo, minuto u hora, entre las que se conservan para ese
+  rango), agrupada en cubetas de ese paso.
+
+Retención (manage.py purgar_gases): el crudo `GASES_CRUDO_DIAS` y los
+minutos `GASES_MINUTOS_DIAS`; las horas se quedan.
+"""
+
+import datetime
+import math
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AlertaGas, BloqueLecturasGas, ResumenGas, SensorGas
+
+FORMATO = np.dtype([('ms', '<u2'), ('valor', '<f4')])
+MINUTO_MS = 60_000
+HORA_MS = 3_600_000
+
+ULTIMAS = getattr(settings, 'GASES_ULTIMAS', 300)
+RECARGA_SEGUNDOS = getattr(settings, 'GASES_RECARGA_SEGUNDOS', 60)
+CRUDO_DIAS = getattr(settings, 'GASES_CRUDO_DIAS', 7)
+MINUTOS_DIAS = getattr(settings, 'GASES_MINUTOS_DIAS', 90)
+MAXIMO_LOTE = 50_000  # lecturas por petición
+PUNTOS = 1000  # cubetas por defecto de una serie
+MAXIMO_PUNTOS = 10_000
+ADELANTO_MAXIMO = datetime.timedelta(minutes=5)  # reloj del equipo adelantado
+
+# tipo de gas -> (alerta, alarma, unidad). Con la alarma por debajo de la alerta (oxígeno) se alarma por debajo
+LIMITES = {
+    'CH4': (1.0, 1.5, '%'),
+    'CO': (25.0, 50.0, 'ppm'),
+    'CO2': (0.5, 1.0, '%'),
+    'H2S': (10.0, 15.0, 'ppm'),
+    'O2': (19.5, 19.0, '%'),
+}
+
+# nombre, ancho en ms (0: cada lectura), días que se conserva (None: siempre); de la más fina a la más gruesa
+RESOLUCIONES = [
+    ('crudo', 0, CRUDO_DIAS),
+    (ResumenGas.PERIODO_MINUTO, MINUTO_MS, MINUTOS_DIAS),
+    (ResumenGas.PERIODO_HORA, HORA_MS, None),
+]
+
+
+class ErrorLectura(Exception):
+    def __init__(self, errores):
+        super().__init__(errores)
+        self.errores = errores
+
+
+def _ms(fecha):
+    return round(fecha.timestamp() * 1000)
+
+
+def _fecha(ms):
+    return datetime.datetime.fromtimestamp(ms / 1000, tz=datetime.timezone.utc)
+
+
+def _grupos(*claves):
+    """Inicios y fines de los tramos con las mismas claves (arreglos ya ordenados)."""
+    cambia = np.zeros(len(claves[0]) - 1, dtype=bool)
+    for clave in claves:
+        cambia |= clave[1:] != clave[:-1]
+    corte = np.flatnonzero(cambia) + 1
+    return np.concatenate(([0], corte)), np.concatenate((corte, [len(claves[0])]))
+
+
+def _por_claves(queryset, campo, claves):
+    """Filas con (sensor_id, campo) en `claves`; un OR por instante y de a 200, no uno por clave."""
+    por_instante = defaultdict(set)
+    for sensor_id, instante in claves:
+        por_instante[instante].add(sensor_id)
+    instantes = sorted(por_instante)
+    for i in range(0, len(instantes), 200):
+        filtro = Q()
+        for instante in instantes[i:i + 200]:
+            filtro |= Q(**{campo: _fecha(instante)}, sensor_id__in=por_instante[instante])
+        yield from queryset.filter(filtro)
+
+
+def decodificar(minuto, datos):
+    """(ms de época int64, valores float32) de un bloque."""
+    lecturas = np.frombuffer(bytes(datos), dtype=FORMATO)
+    return _ms(minuto) + lecturas['ms'].astype(np.int64), lecturas['valor']
+
+
+def limites(sensor):
+    """(alerta, alarma, por_debajo) del sensor."""
+    alerta, alarma, _ = LIMITES.get(sensor.tipo_gas, (None, None, ''))
+    if sensor.limite_alerta is not None:
+        alerta = sensor.limite_alerta
+    if sensor.limite_alarma is not None:
+        alarma = sensor.limite_alarma
+    return alerta, alarma, alerta is not None and alarma is not None and alarma < alerta
+
+
+# --- Ingesta ---
+
+def _instante(valor, tope):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor):
+        ms = round(valor * 1000)  # segundos de época
+    elif isinstance(valor, str):
+        try:
+            fecha = parse_datetime(valor)
+        except ValueError:
+            fecha = None
+        if fecha is None:
+            raise ErrorLectura({'t': ['Fecha y hora inválida (ISO 8601 o segundos de época).']})
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        ms = _ms(fecha)
+    else:
+        raise ErrorLectura({'t': ['Este campo es requerido (ISO 8601 o segundos de época).']})
+    if ms > tope:
+        raise ErrorLectura({'t': ['La lectura es del futuro (¿reloj del equipo adelantado?).']})
+    if ms < 0:
+        raise ErrorLectura({'t': ['Fecha y hora inválida.']})
+    return ms
+
+
+def _lectura(lectura, sensores, tope):
+    if not isinstance(lectura, dict):
+        raise ErrorLectura({'lectura': ['Debe ser un objeto JSON.']})
+    codigo = lectura.get('sensor')
+    sensor = sensores.get(codigo) if isinstance(codigo, str) else None
+    if sensor is None:
+        raise ErrorLectura({'sensor': [f"No existe un sensor activo con código {codigo!r}."]})
+    valor = lectura.get('valor')
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        raise ErrorLectura({'valor': ['Debe ser un número.']})
+    return sensor.pk, _instante(lectura.get('t'), tope), valor
+
+
+def ingresar_lecturas(lecturas):
+    """
+    Guarda un lote de lecturas {"sensor": código, "t": ISO 8601 o segundos de época, "valor": n}.
+    Devuelve {'recibidas', 'guardadas', 'repetidas', 'errores', 'lecturas_con_error', 'alertas'};
+    las lecturas inválidas se reportan por índice sin tumbar el resto.
+    """
+    codigos = {l.get('sensor') for l in lecturas if isinstance(l, dict) and isinstance(l.get('sensor'), str)}
+    sensores = {sensor.codigo: sensor for sensor in SensorGas.objects.filter(codigo__in=codigos, activo=True)}
+    tope = _ms(timezone.now() + ADELANTO_MAXIMO)
+
+    validas, errores = [], []
+    for i, lectura in enumerate(lecturas):
+        try:
+            validas.append(_lectura(lectura, sensores, tope))
+        except ErrorLectura as exc:
+            errores.append({'indice': i, 'errores': exc.errores})
+    resumen = {
+        'recibidas': len(lecturas), 'guardadas': 0, 'repetidas': 0, 'errores': len(errores),
+        'lecturas_con_error': errores, 'alertas': [],
+    }
+    if not validas:
+        return resumen
+
+    sid, ms, valor = (np.array(columna) for columna in zip(*validas))
+    orden = np.lexsort((ms, sid))
+    sid, ms, valor = sid[orden].astype(np.int64), ms[orden].astype(np.int64), valor[orden].astype(np.float32)
+    # Repetidas dentro del lote: queda la primera
+    unicas = np.ones(len(sid), dtype=bool)
+    unicas[1:] = (sid[1:] != sid[:-1]) | (ms[1:] != ms[:-1])
+    sid, ms, valor = sid[unicas], ms[unicas], valor[unicas]
+
+    with transaction.atomic():
+        nuevas = _guardar_crudo(sid, ms, valor)
+        sid, ms, valor = sid[nuevas], ms[nuevas], valor[nuevas]
+        if len(sid):
+            for periodo, ancho in ((ResumenGas.PERIODO_MINUTO, MINUTO_MS), (ResumenGas.PERIODO_HORA, HORA_MS)):
+                _sumar_resumenes(periodo, sid, ms // ancho * ancho, valor)
+            alertas = _evaluar(sid, ms, valor, {sensor.pk: sensor for sensor in sensores.values()})
+            AlertaGas.objects.bulk_create(alertas)
+            transaction.on_commit(lambda: anillos.agregar(sid, ms, valor))
+        else:
+            alertas = []
+
+    resumen['guardadas'] = len(sid)
+    resumen['repetidas'] = len(validas) - len(sid)
+    codigos = {sensor.pk: codigo for codigo, sensor in sensores.items()}
+    resumen['alertas'] = [
+        {'sensor': codigos[alerta.sensor_id], 'nivel': alerta.nivel, 'inicio': alerta.inicio,
+         'valor': alerta.valor, 'limite': alerta.limite, 'lecturas': alerta.lecturas}
+        for alerta in alertas
+    ]
+    return resumen
+
+
+def _guardar_crudo(sid, ms, valor):
+    """Agrega las lecturas (ordenadas) a los bloques de su minuto. Devuelve la máscara de las que no estaban."""
+    minuto = ms // MINUTO_MS * MINUTO_MS
+    inicios, fines = _grupos(sid, minuto)
+    claves = [(int(sid[a]), int(minuto[a])) for a in inicios]
+    existentes = {
+        (bloque.sensor_id, _ms(bloque.minuto)): bloque
+        for bloque in _por_claves(BloqueLecturasGas.objects.all(), 'minuto', claves)
+    }
+
+    nuevas = np.ones(len(sid), dtype=bool)
+    bloques = []
+    for (sensor_id, inicio), a, b in zip(claves, inicios, fines):
+        lecturas = np.empty(b - a, dtype=FORMATO)
+        lecturas['ms'] = ms[a:b] - inicio
+        lecturas['valor'] = valor[a:b]
+        bloque = existentes.get((sensor_id, inicio))
+        if bloque is not None:
+            anteriores = np.frombuffer(bytes(bloque.datos), dtype=FORMATO)
+            frescas = ~np.isin(lecturas['ms'], anteriores['ms'])
+            nuevas[a:b] = frescas
+            if not frescas.any():
+                continue
+            lecturas = np.sort(np.concatenate((anteriores, lecturas[frescas])), order='ms')
+        bloques.append(BloqueLecturasGas(
+            sensor_id=sensor_id, minuto=_fecha(inicio), registros=len(lecturas), datos=lecturas.tobytes(),
+        ))
+    BloqueLecturasGas.objects.bulk_create(
+        bloques, update_conflicts=True, unique_fields=['sensor', 'minuto'], update_fields=['registros', 'datos'],
+    )
+    return nuevas
+
+
+def _sumar_resumenes(periodo, sid, inicio, valor):
+    """Suma las lecturas nuevas a los resúmenes del período (`inicio`: el de cada lectura, en ms)."""
+    a, _ = _grupos(sid, inicio)
+    registros = np.diff(np.concatenate((a, [len(sid)])))
+    sumas = np.add.reduceat(valor.astype(np.float64), a)
+    minimos = np.minimum.reduceat(valor, a)
+    maximos = np.maximum.reduceat(valor, a)
+    claves = list(zip(sid[a].tolist(), inicio[a].tolist()))
+    existentes = {
+        (fila.sensor_id, _ms(fila.inicio)): fila
+        for fila in _por_claves(ResumenGas.objects.filter(periodo=periodo), 'inicio', claves)
+    }
+
+    filas = []
+    for (sensor_id, ms), n, suma, minimo, maximo in zip(
+        claves, registros.tolist(), sumas.tolist(), minimos.tolist(), maximos.tolist(),
+    ):
+        anterior = existentes.get((sensor_id, ms))
+        if anterior is not None:
+            n, suma = n + anterior.registros, suma + anterior.suma
+            minimo, maximo = min(minimo, anterior.minimo), max(maximo, anterior.maximo)
+        filas.append(ResumenGas(
+            sensor_id=sensor_id, periodo=periodo, inicio=_fecha(ms),
+            registros=n, suma=suma, minimo=minimo, maximo=maximo,
+        ))
+    ResumenGas.objects.bulk_create(
+        filas, update_conflicts=True, unique_fields=['sensor', 'periodo', 'inicio'],
+        update_fields=['registros', 'suma', 'minimo', 'maximo'],
+    )
+
+
+def _evaluar(sid, ms, valor, sensores):
+    """Un AlertaGas (sin guardar) por sensor con lecturas fuera de umbral: el peor nivel y la peor lectura."""
+    alertas = []
+    inicios, fines = _grupos(sid)
+    for a, b in zip(inicios, fines):
+        sensor = sensores[int(sid[a])]
+        alerta, alarma, por_debajo = limites(sensor)
+        signo = -1 if por_debajo else 1
+        valores = valor[a:b] * signo
+        for nivel, limite in ((AlertaGas.NIVEL_ALARMA, alarma), (AlertaGas.NIVEL_ALERTA, alerta)):
+            if limite is None:
+                continue
+            fuera = valores >= limite * signo
+            if fuera.any():
+                alertas.append(AlertaGas(
+                    sensor_id=sensor.pk, nivel=nivel, inicio=_fecha(int(ms[a + np.argmax(fuera)])),
+                    valor=float(valores.max() * signo), limite=limite, lecturas=int(fuera.sum()),
+                ))
+                break
+    return alertas
+
+
+# --- Últimas lecturas en memoria ---
+
+class Anillo:
+    """Arreglo circular con las últimas lecturas recibidas de un sensor."""
+    __slots__ = ('ms', 'valores', 'posicion', 'llenas', 'cargado_en')
+
+    def __init__(self, tamano):
+        self.ms = np.zeros(tamano, dtype=np.int64)
+        self.valores = np.zeros(tamano, dtype=np.float32)
+        self.posicion = 0
+        self.llenas = 0
+        self.cargado_en = time.monotonic()
+
+    def escribir(self, ms, valores):
+        tamano = len(self.ms)
+        ms, valores = ms[-tamano:], valores[-tamano:]
+        indices = (self.posicion + np.arange(len(ms))) % tamano
+        self.ms[indices] = ms
+        self.valores[indices] = valores
+        self.posicion = (self.posicion + len(ms)) % tamano
+        self.llenas = min(self.llenas + len(ms), tamano)
+
+    def leer(self):
+        # En orden de tiempo (un lote atrasado pudo llegar después) y sin repetidas
+        ms, indices = np.unique(self.ms[:self.llenas], return_index=True)
+        return ms, self.valores[:self.llenas][indices]
+
+
+class Anillos:
+    def __init__(self, tamano=ULTIMAS):
+        self.tamano = tamano
+        self._lock = threading.Lock()
+        self._anillos = {}  # sensor_id -> Anillo
+
+    def agregar(self, sid, ms, valor):
+        """Lecturas ordenadas por sensor; solo para los sensores ya cargados en este proceso."""
+        if not len(sid):
+            return
+        inicios, fines = _grupos(sid)
+        with self._lock:
+            for a, b in zip(inicios, fines):
+                anillo = self._anillos.get(int(sid[a]))
+                if anillo is not None:
+                    anillo.escribir(ms[a:b], valor[a:b])
+
+    def ultimas(self, sensor_id):
+        """(ms, valores) de las últimas lecturas; lee la base si no está cargado o venció."""
+        with self._lock:
+            anillo = self._anillos.get(sensor_id)
+        if anillo is None or time.monotonic() - anillo.cargado_en > RECARGA_SEGUNDOS:
+            anillo = Anillo(self.tamano)
+            anillo.escribir(*crudo(sensor_id, ultimas=self.tamano))
+            with self._lock:
+                self._anillos[sensor_id] = anillo
+        with self._lock:
+            return anillo.leer()
+
+    def limpiar(self):
+        with self._lock:
+            self._anillos.clear()
+
+
+anillos = Anillos()
+
+
+def ultimas(sensor_id):
+    ms, valores = anillos.ultimas(sensor_id)
+    return [{'t': _fecha(t), 'valor': round(valor, 4)} for t, valor in zip(ms.tolist(), valores.tolist())]
+
+
+# --- Consultas ---
+
+def crudo(sensor_id, desde=None, hasta=None, ultimas=None):
+    """(ms, valores) crudos de un sensor en [desde, hasta) (ms), o sus `ultimas` lecturas."""
+    bloques = BloqueLecturasGas.objects.filter(sensor_id=sensor_id)
+    if desde is not None:
+        bloques = bloques.filter(minuto__gte=_fecha(desde // MINUTO_MS * MINUTO_MS))
+    if hasta is not None:
+        bloques = bloques.filter(minuto__lt=_fecha(hasta))
+    partes, total = [], 0
+    orden = '-minuto' if ultimas else 'minuto'
+    for minuto, datos in bloques.order_by(orden).values_list('minuto', 'datos').iterator(chunk_size=100):
+        partes.append(decodificar(minuto, datos))
+        total += len(partes[-1][0])
+        if ultimas and total >= ultimas:
+            break
+    if ultimas:
+        partes.reverse()
+    if not partes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    ms = np.concatenate([p[0] for p in partes])
+    valores = np.concatenate([p[1] for p in partes])
+    if ultimas:
+        return ms[-ultimas:], valores[-ultimas:]
+    dentro = (ms >= (desde if desde is not None else ms.min())) & (ms < (hasta if hasta is not None else ms.max() + 1))
+    return ms[dentro], valores[dentro]
+
+
+def resolucion(desde, paso, ahora=None):
+    """
+    (nombre, ancho) de la resolución más gruesa cuyo ancho no pasa de `paso`
+    (ms) entre las que se conservan desde `desde` (un datetime); si ninguna
+    alcanza, la más fina que se conserva.
+    """
+    ahora = ahora or timezone.now()
+    conservadas = [
+        (nombre, ancho) for nombre, ancho, dias in RESOLUCIONES
+        if dias is None or desde >= ahora - datetime.timedelta(days=dias)
+    ]
+    aptas = [r for r in conservadas if r[1] <= paso]
+    return aptas[-1] if aptas else conservadas[0]
+
+
+def serie(sensor_id, desde, hasta, puntos=PUNTOS, paso=None, ahora=None):
+    """
+    Lecturas de un sensor entre `desde` y `hasta` (datetimes) en cubetas de
+    `paso` segundos (por defecto el rango / `puntos`).
+    """
+    desde_ms, hasta_ms = _ms(desde), _ms(hasta)
+    rango = max(hasta_ms - desde_ms, 1)
+    paso_ms = max(round(paso * 1000) if paso else math.ceil(rango / max(puntos, 1)), math.ceil(rango / MAXIMO_PUNTOS), 1)
+    nombre, ancho = resolucion(desde, paso_ms, ahora)
+    if ancho:
+        # Las cubetas de un resumen no se parten: el paso es un múltiplo del ancho
+        paso_ms = math.ceil(paso_ms / ancho) * ancho
+        filas = list(
+            ResumenGas.objects.filter(
+                sensor_id=sensor_id, periodo=nombre,
+                inicio__gte=_fecha(desde_ms // ancho * ancho), inicio__lt=_fecha(hasta_ms),
+            ).order_by('inicio').values_list('inicio', 'registros', 'suma', 'minimo', 'maximo')
+        )
+        ms = np.array([_ms(fila[0]) for fila in filas], dtype=np.int64)
+        registros = np.array([fila[1] for fila in filas], dtype=np.int64)
+        sumas, minimos, maximos = (np.array([fila[i] for fila in filas], dtype=np.float64) for i in (2, 3, 4))
+    else:
+        ms, valores = crudo(sensor_id, desde_ms, hasta_ms)
+        registros = np.ones(len(ms), dtype=np.int64)
+        sumas = minimos = maximos = valores.astype(np.float64)
+
+    resultado = {
+        'sensor': sensor_id, 'resolucion': nombre, 'paso_segundos': paso_ms / 1000,
+        'desde': desde, 'hasta': hasta, 'puntos': [],
+    }
+    if not len(ms):
+        return resultado
+    cubeta = ms // paso_ms * paso_ms
+    a, _ = _grupos(cubeta)
+    n = np.add.reduceat(registros, a)
+    promedio = np.add.reduceat(sumas, a) / n
+    minimo, maximo = np.minimum.reduceat(minimos, a), np.maximum.reduceat(maximos, a)
+    resultado['puntos'] = [
+        {'inicio': _fecha(inicio), 'registros': cuantas, 'promedio': round(prom, 4),
+         'minimo': round(mini, 4), 'maximo': round(maxi, 4)}
+        for inicio, cuantas, prom, mini, maxi in zip(
+            cubeta[a].tolist(), n.tolist(), promedio.tolist(), minimo.tolist(), maximo.tolist(),
+        )
+    ]
+    return resultado
+
+
+def purgar(ahora=None):
+    """Borra el crudo y los minutos más viejos que su retención. Devuelve {modelo: filas}."""
+    ahora = ahora or timezone.now()
+    crudo_viejo = BloqueLecturasGas.objects.filter(minuto__lt=ahora - datetime.timedelta(days=CRUDO_DIAS))
+    minutos_viejos = ResumenGas.objects.filter(
+        periodo=ResumenGas.PERIODO_MINUTO, inicio__lt=ahora - datetime.timedelta(days=MINUTOS_DIAS),
+    )
+    # _raw_delete: un DELETE por tabla, sin cargar filas ni señales
+    return {
+        'BloqueLecturasGas': crudo_viejo._raw_delete(crudo_viejo.db),
+        'ResumenGas': minutos_viejos._raw_delete(minutos_viejos.db),
+    }
@@ -0,0 +1,201 @@
+# Administrativo/huellas.py
+
+"""
+Índice en memoria para identificación 1:N de huellas (torniquetes).
+
+Todas las plantillas de `Empleado.huella` de empleados activos se guardan en
+una sola matriz uint8 empaquetada (una fila por empleado). Cada plantilla se
+trata como una cadena de bits de `HUELLAS_TAMANO_PLANTILLA` bytes y el puntaje
+es la fracción de bits iguales (1 - distancia de Hamming normalizada), que se
+calcula para todo el índice a la vez con NumPy: XOR + popcount por fila.
+
+Con 10.000 empleados la matriz ocupa ~2,5 MB y una identificación toma pocos
+milisegundos. El índice se actualiza incrementalmente desde las señales de
+Empleado (ver signals.py); cada proceso tiene su propia copia y además la
+recarga completa si pasa más de `HUELLAS_RECARGA_SEGUNDOS` sin recargar, para
+recoger cambios hechos por otros workers.
+"""
+
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+TAMANO_PLANTILLA = getattr(settings, 'HUELLAS_TAMANO_PLANTILLA', 256)
+UMBRAL = getattr(settings, 'HUELLAS_UMBRAL', 0.80)
+RECARGA_SEGUNDOS = getattr(settings, 'HUELLAS_RECARGA_SEGUNDOS', 300)
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:  # NumPy < 2.0
+    _POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(matriz):
+        return _POPCOUNT[matriz]
+
+
+def empaquetar(plantilla, tamano=TAMANO_PLANTILLA):
+    """Convierte una plantilla (bytes) a un vector uint8 de largo fijo (rellena con ceros o recorta)."""
+    vector = np.zeros(tamano, dtype=np.uint8)
+    datos = np.frombuffer(bytes(plantilla), dtype=np.uint8)[:tamano]
+    vector[:len(datos)] = datos
+    return vector
+
+
+class IndiceHuellas:
+    """Matriz empaquetada de plantillas + posiciones por empleado, con actualización incremental."""
+
+    def __init__(self, tamano=TAMANO_PLANTILLA):
+        self.tamano = tamano
+        self._lock = threading.RLock()
+        self._plantillas = np.zeros((0, tamano), dtype=np.uint8)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._ocupadas = np.zeros(0, dtype=bool)
+        self._posiciones = {}  # empleado_id -> fila
+        self._libres = []  # filas liberadas, se reutilizan antes de crecer
+        self._filas = 0
+        self.cargado_en = None
+        self._identificaciones = 0
+        self._latencia_total_ms = 0.0
+        self._latencia_max_ms = 0.0
+        self._latencia_ultima_ms = 0.0
+
+    def __len__(self):
+        return len(self._posiciones)
+
+    def __contains__(self, empleado_id):
+        return empleado_id in self._posiciones
+
+    # --- Carga y actualización ---
+
+    def cargar(self):
+        """Recarga todas las plantillas de empleados activos desde la base de datos."""
+        from .models import Empleado
+
+        consulta = (
+            Empleado.objects.filter(estado='activo').exclude(huella_hash='')
+            .values_list('id', 'huella').order_by('id')
+        )
+        ids, filas = [], []
+        for empleado_id, huella in consulta.iterator(chunk_size=1000):
+            ids.append(empleado_id)
+            filas.append(empaquetar(huella, self.tamano))
+
+        with self._lock:
+            total = len(ids)
+            self._plantillas = np.vstack(filas) if filas else np.zeros((0, self.tamano), dtype=np.uint8)
+            self._ids = np.array(ids, dtype=np.int64)
+            self._ocupadas = np.ones(total, dtype=bool)
+            self._posiciones = {empleado_id: fila for fila, empleado_id in enumerate(ids)}
+            self._libres = []
+            self._filas = total
+            self.cargado_en = time.monotonic()
+
+    def asegurar_cargado(self):
+        vencido = self.cargado_en is None or time.monotonic() - self.cargado_en > RECARGA_SEGUNDOS
+        if vencido:
+            self.cargar()
+
+    def vencer(self):
+        """La próxima identificación recarga todo (después de escrituras masivas de empleados)."""
+        self.cargado_en = None
+
+    def actualizar(self, empleado_id, plantilla):
+        """Inserta o reemplaza la plantilla de un empleado."""
+        if not plantilla:
+            self.eliminar(empleado_id)
+            return
+        vector = empaquetar(plantilla, self.tamano)
+        with self._lock:
+            fila = self._posiciones.get(empleado_id)
+            if fila is None:
+                fila = self._libres.pop() if self._libres else self._nueva_fila()
+                self._posiciones[empleado_id] = fila
+            self._plantillas[fila] = vector
+            self._ids[fila] = empleado_id
+            self._ocupadas[fila] = True
+
+    def eliminar(self, empleado_id):
+        """Saca a un empleado del índice (inactivo, borrado o sin huella)."""
+        with self._lock:
+            fila = self._posiciones.pop(empleado_id, None)
+            if fila is not None:
+                self._ocupadas[fila] = False
+                self._plantillas[fila] = 0
+                self._libres.append(fila)
+
+    def _nueva_fila(self):
+        # Crecimiento amortizado: se duplica la capacidad cuando se llena
+        if self._filas == len(self._ids):
+            capacidad = max(16, 2 * len(self._ids))
+            plantillas = np.zeros((capacidad, self.tamano), dtype=np.uint8)
+            plantillas[:self._filas] = self._plantillas[:self._filas]
+            ids = np.zeros(capacidad, dtype=np.int64)
+            ids[:self._filas] = self._ids[:self._filas]
+            ocupadas = np.zeros(capacidad, dtype=bool)
+            ocupadas[:self._filas] = self._ocupadas[:self._filas]
+            self._plantillas, self._ids, self._ocupadas = plantillas, ids, ocupadas
+        self._filas += 1
+        return self._filas - 1
+
+    # --- Identificación ---
+
+    def puntajes(self, plantilla):
+        """Devuelve (ids, puntajes) para todas las plantillas del índice."""
+        sonda = empaquetar(plantilla, self.tamano)
+        with self._lock:
+            plantillas = self._plantillas[:self._filas]
+            ids = self._ids[:self._filas]
+            ocupadas = self._ocupadas[:self._filas]
+            distintos = _popcount(np.bitwise_xor(plantillas, sonda)).sum(axis=1, dtype=np.int32)
+        puntajes = 1.0 - distintos / (8.0 * self.tamano)
+        return ids[ocupadas], puntajes[ocupadas]
+
+    def identificar(self, plantilla, umbral=UMBRAL, candidatos=3):
+        """
+        Compara la sonda contra todo el índice. Devuelve un dict con el mejor
+        empleado (o None si no supera el umbral), los mejores candidatos y la
+        latencia de la comparación en milisegundos.
+        """
+        inicio = time.perf_counter()
+        ids, puntajes = self.puntajes(plantilla)
+        mejores = []
+        if len(ids):
+            k = min(candidatos, len(ids))
+            top = np.argpartition(-puntajes, k - 1)[:k]
+            top = top[np.argsort(-puntajes[top])]
+            mejores = [(int(ids[i]), float(puntajes[i])) for i in top]
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        self._registrar_latencia(latencia_ms)
+
+        empleado_id = mejores[0][0] if mejores and mejores[0][1] >= umbral else None
+        return {
+            'empleado': empleado_id,
+            'puntaje': mejores[0][1] if mejores else None,
+            'candidatos': [{'empleado': pk, 'puntaje': round(p, 4)} for pk, p in mejores],
+            'latencia_ms': round(latencia_ms, 3),
+        }
+
+    def _registrar_latencia(self, latencia_ms):
+        with self._lock:
+            self._identificaciones += 1
+            self._latencia_total_ms += latencia_ms
+            self._latencia_ultima_ms = latencia_ms
+            self._latencia_max_ms = max(self._latencia_max_ms, latencia_ms)
+
+    def estadisticas(self):
+        with self._lock:
+            n = self._identificaciones
+            return {
+                'plantillas': len(self._posiciones),
+                'tamano_plantilla': self.tamano,
+                'memoria_bytes': int(self._plantillas.nbytes),
+                'identificaciones': n,
+                'latencia_ultima_ms': round(self._latencia_ultima_ms, 3),
+                'latencia_promedio_ms': round(self._latencia_total_ms / n, 3) if n else None,
+                'latencia_max_ms': round(self._latencia_max_ms, 3),
+            }
+
+
+indice = IndiceHuellas()
@@ -0,0 +1,272 @@
+# Administrativo/importacion.py
+
+"""
+Importación masiva de empleados desde la planilla de RR. HH. (CSV o XLSX).
+
+RR. HH. manda cada semana la nómina completa. En vez de un POST/PUT por
+empleado, el archivo se lee en streaming (csv.reader o openpyxl en modo
+read_only) y se escribe por lotes de `LOTE` filas con un upsert sobre la
+cédula: `bulk_create(update_conflicts=True, unique_fields=['cedula'])`.
+Los cargos se resuelven por nombre con una sola consulta al principio.
+Por lote hay una consulta para las cédulas y emails que ya existen y el
+upsert; la memoria no crece con el archivo (solo las cédulas y emails ya
+vistos, para detectar repetidos, y los errores).
+
+Columnas (la primera fila es el encabezado; sin importar mayúsculas ni
+tildes): cedula, nombres, cargo (nombre del cargo), telefono, email, estado,
+nivel_acceso. Solo se actualizan las columnas que trae el archivo; para
+crear hacen falta nombres y cargo. Una celda vacía deja telefono/email en
+NULL, estado en 'activo' y nivel_acceso con el del cargo.
+
+Las filas inválidas se reportan con su número de fila (como en la planilla)
+sin tumbar el resto. Cada lote se guarda en su propia transacción: el cerrojo
+de escritura de SQLite se suelta entre lotes y el check-in de las porterías
+no espera a que termine el archivo. Si la importación se corta a la mitad
+queda guardado lo anterior; volver a importar el archivo es seguro (es un
+upsert). Con `simular` todo va en una transacción que se deshace al final.
+"""
+
+import contextlib
+import csv
+import io
+import unicodedata
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Cargo, Empleado
+
+LOTE = 1000
+COLUMNAS = ['cedula', 'nombres', 'cargo', 'telefono', 'email', 'estado', 'nivel_acceso']
+SINONIMOS = {'nombre': 'nombres', 'nombre_cargo': 'cargo', 'correo': 'email', 'nivel': 'nivel_acceso'}
+REQUERIDOS_NUEVO = ['nombres', 'cargo']
+# Campos de la fila que se leen de la base para los empleados que ya existen
+CAMPOS_EXISTENTE = ['id', 'cedula', 'nombres', 'cargo_id', 'telefono', 'email', 'estado', 'nivel_acceso']
+
+
+class ErrorImportacion(Exception):
+    """El archivo entero no sirve (formato o encabezado)."""
+
+
+class ErrorFila(Exception):
+    def __init__(self, errores):
+        super().__init__(errores)
+        self.errores = errores
+
+
+def _columna(nombre):
+    texto = unicodedata.normalize('NFKD', str(nombre or '')).encode('ascii', 'ignore').decode()
+    texto = '_'.join(texto.strip().lower().split())
+    return SINONIMOS.get(texto, texto)
+
+
+def _texto(valor):
+    # openpyxl entrega números: una cédula 12345 puede venir como 12345.0
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def filas_csv(archivo):
+    """(número de fila, valores) de un CSV en bytes; detecta ',' ';' o tabulador."""
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.read(8192)
+        muestra += texto.readline()  # hasta el fin de la línea, para no partir una fila
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(_con_muestra(muestra, texto), dialecto)
+        yield from enumerate(lector, start=1)
+    except UnicodeDecodeError:
+        raise ErrorImportacion('El CSV debe estar en UTF-8.')
+    finally:
+        texto.detach()
+
+
+def _con_muestra(muestra, texto):
+    yield from io.StringIO(muestra)
+    yield from texto
+
+
+def filas_xlsx(archivo):
+    """(número de fila, valores) de la primera hoja de un XLSX."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErrorImportacion('El formato xlsx requiere openpyxl (pip install openpyxl).')
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as exc:  # zipfile/openpyxl lanzan de todo con un archivo roto
+        raise ErrorImportacion(f'No se pudo leer el XLSX: {exc}')
+    try:
+        yield from enumerate(libro.active.iter_rows(values_only=True), start=1)
+    finally:
+        libro.close()
+
+
+def leer(archivo, nombre=''):
+    """Elige el lector por extensión o, si no hay, por la firma del archivo (un XLSX es un ZIP)."""
+    extension = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+    if not extension and hasattr(archivo, 'seek'):
+        extension = 'xlsx' if archivo.read(4) == b'PK\x03\x04' else 'csv'
+        archivo.seek(0)
+    if extension == 'xlsx':
+        return filas_xlsx(archivo)
+    if extension in ('csv', 'txt', ''):
+        return filas_csv(archivo)
+    raise ErrorImportacion(f'Formato no soportado: .{extension} (se espera CSV o XLSX).')
+
+
+def _limpiar(nombre, valor):
+    """Valida y convierte con el campo del modelo (largos, formato del email)."""
+    campo = Empleado._meta.get_field(nombre)
+    if valor == '' and campo.null:
+        return None
+    try:
+        return campo.clean(valor, None)
+    except ValidationError as exc:
+        raise ErrorFila({nombre: exc.messages})
+
+
+class Importacion:
+    def __init__(self, encabezado):
+        self.columnas = [_columna(nombre) for nombre in encabezado]
+        desconocidas = [c for c in self.columnas if c and c not in COLUMNAS]
+        if 'cedula' not in self.columnas:
+            raise ErrorImportacion('El encabezado no tiene la columna cedula.')
+        if desconocidas:
+            raise ErrorImportacion(f"Columnas desconocidas: {', '.join(desconocidas)}.")
+        repetidas = {c for c in self.columnas if c and self.columnas.count(c) > 1}
+        if repetidas:
+            raise ErrorImportacion(f"Columnas repetidas: {', '.join(sorted(repetidas))}.")
+        self.presentes = [c for c in COLUMNAS if c in self.columnas]
+        # Al empleado que ya existe solo se le tocan las columnas del archivo
+        self.actualizables = [{'cargo': 'cargo_id'}.get(c, c) for c in self.presentes if c != 'cedula']
+        # Un solo viaje para todos los cargos; se comparan sin mayúsculas
+        self.cargos = {
+            nombre.casefold(): (pk, nivel)
+            for pk, nombre, nivel in Cargo.objects.values_list('id', 'nombre_cargo', 'nivel_acceso')
+        }
+        self.nivel_cargo = dict(self.cargos.values())
+        self.cedulas, self.emails = set(), set()
+        self.resumen = {'filas': 0, 'creados': 0, 'actualizados': 0, 'errores': 0, 'filas_con_error': []}
+
+    def error(self, numero, cedula, errores):
+        self.resumen['errores'] += 1
+        self.resumen['filas_con_error'].append({'fila': numero, 'cedula': cedula, 'errores': errores})
+
+    def valores(self, fila):
+        valores = {}
+        for columna, valor in zip(self.columnas, fila):
+            if columna:
+                valores[columna] = _texto(valor)
+        return valores
+
+    @transaction.atomic
+    def lote(self, filas):
+        """Valida y escribe un lote de (número, valores), en su propia transacción."""
+        cedulas = [valores['cedula'] for _, valores in filas]
+        emails = [valores['email'] for _, valores in filas if valores.get('email')]
+        existentes = {
+            datos['cedula']: datos
+            for datos in Empleado.objects.filter(cedula__in=cedulas).values(*CAMPOS_EXISTENTE)
+        }
+        duenos_email = dict(Empleado.objects.filter(email__in=emails).values_list('email', 'cedula')) if emails else {}
+
+        empleados = []
+        for numero, valores in filas:
+            try:
+                empleados.append(self.empleado(valores, existentes.get(valores['cedula']), duenos_email))
+            except ErrorFila as exc:
+                self.error(numero, valores['cedula'], exc.errores)
+                continue
+            self.cedulas.add(valores['cedula'])
+            if empleados[-1].email:
+                self.emails.add(empleados[-1].email)
+            self.resumen['actualizados' if valores['cedula'] in existentes else 'creados'] += 1
+        if empleados:
+            Empleado.objects.bulk_create(
+                empleados, update_conflicts=True, unique_fields=['cedula'],
+                update_fields=[*self.actualizables, 'fecha_actualizacion'],
+            )
+
+    def empleado(self, valores, existente, duenos_email):
+        cedula = valores['cedula']
+        if cedula in self.cedulas:
+            raise ErrorFila({'cedula': ['Cédula repetida en el archivo.']})
+        datos = dict(existente or {})
+        if existente is None:
+            faltan = {c: ['Este campo es requerido.'] for c in REQUERIDOS_NUEVO if not valores.get(c)}
+            if faltan:
+                raise ErrorFila(faltan)
+
+        errores = {}
+        for columna in self.presentes:
+            try:
+                self.aplicar(datos, columna, valores.get(columna, ''))
+            except ErrorFila as exc:
+                errores.update(exc.errores)
+        if errores:
+            raise ErrorFila(errores)
+
+        email = datos.get('email')
+        if email and (email in self.emails or duenos_email.get(email, cedula) != cedula):
+            raise ErrorFila({'email': [f'El email {email} ya es de otro empleado.']})
+        if not datos.get('nivel_acceso'):
+            datos['nivel_acceso'] = self.nivel_cargo[datos['cargo_id']]
+        datos.setdefault('estado', 'activo')
+        datos.pop('id', None)
+        return Empleado(**datos)
+
+    def aplicar(self, datos, columna, valor):
+        if columna == 'cargo':
+            if not valor:
+                raise ErrorFila({'cargo': ['Este campo es requerido.']})
+            cargo = self.cargos.get(valor.casefold())
+            if cargo is None:
+                raise ErrorFila({'cargo': [f'No existe el cargo "{valor}".']})
+            datos['cargo_id'] = cargo[0]
+        elif columna in ('nombres', 'cedula') and not valor:
+            raise ErrorFila({columna: ['Este campo es requerido.']})
+        elif columna == 'estado' and not valor:
+            datos['estado'] = 'activo'
+        elif columna == 'nivel_acceso' and not valor:
+            datos['nivel_acceso'] = ''  # se completa con el del cargo
+        else:
+            datos[columna] = _limpiar(columna, valor)
+
+
+def importar_empleados(filas, simular=False, lote=LOTE):
+    """
+    Importa (número de fila, valores) con la primera fila de encabezado.
+    Devuelve {'filas', 'creados', 'actualizados', 'errores', 'filas_con_error': [...]}.
+    Lanza ErrorImportacion si el archivo no se puede usar.
+    """
+    filas = iter(filas)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        raise ErrorImportacion('El archivo está vacío.')
+    with transaction.atomic() if simular else contextlib.nullcontext():
+        importacion = Importacion(encabezado[1])
+        pendientes = []
+        for numero, fila in filas:
+            valores = importacion.valores(fila)
+            if not any(valores.values()):
+                continue  # filas vacías al final de la planilla
+            importacion.resumen['filas'] += 1
+            if not valores.get('cedula'):
+                importacion.error(numero, '', {'cedula': ['Este campo es requerido.']})
+                continue
+            pendientes.append((numero, valores))
+            if len(pendientes) >= lote:
+                importacion.lote(pendientes)
+                pendientes = []
+        if pendientes:
+            importacion.lote(pendientes)
+        if simular:
+            transaction.set_rollback(True)
+    return importacion.resumen
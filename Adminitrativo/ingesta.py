@@ -0,0 +1,209 @@
+# Administrativo/ingesta.py
+
+"""
+Ingesta por lotes de eventos de torniquete (entradas y salidas).
+
+Las terminales guardan eventos mientras la red de la mina está caída y luego
+los reenvían de a cientos. En vez de un POST + transacción + 2 consultas de FK
+por evento, aquí se valida todo el lote con una consulta por modelo y se
+escribe con bulk_create/bulk_update en una sola transacción. Los eventos
+inválidos se reportan uno a uno sin tumbar el resto del lote.
+
+Formato de cada evento:
+    {"tipo": "entrada", "empleado": 1, "proyecto": 2, "fecha": "2024-03-01",
+     "hora_entrada": "06:01", "lugar_trabajo": "...", "estado_salud": "ok", "observacion": "..."}
+    {"tipo": "salida", "empleado": 1, "hora_salida": "14:02"}   # cierra su último registro abierto
+    {"tipo": "salida", "id": 55, "hora_salida": "14:02"}        # o un registro concreto
+
+`aregistrar_evento` es la versión de un solo evento con el ORM async, para el
+check-in en línea de vistas_async.py.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from .models import ControlDeIngreso, Empleado, Proyecto
+
+CAMPOS_ENTRADA = ['fecha', 'hora_entrada', 'estado_salud', 'lugar_trabajo', 'estado', 'observacion']
+REQUERIDOS_ENTRADA = ['fecha', 'empleado', 'proyecto']
+BATCH_SIZE = 500
+
+
+class ErrorEvento(Exception):
+    def __init__(self, errores):
+        super().__init__(errores)
+        self.errores = errores
+
+
+def _limpiar(nombre, valor):
+    """Valida y convierte un valor con el campo del modelo (fechas, horas, largos)."""
+    campo = ControlDeIngreso._meta.get_field(nombre)
+    if valor in (None, '') and campo.null:
+        return None
+    if isinstance(campo, (models.CharField, models.TextField)) and not isinstance(valor, str):
+        raise ErrorEvento({nombre: ['Debe ser un texto.']})
+    try:
+        return campo.clean(valor, None)
+    except ValidationError as exc:
+        raise ErrorEvento({nombre: exc.messages})
+    except (TypeError, ValueError):
+        # parse_date/parse_time con un número o una lista
+        raise ErrorEvento({nombre: ['Formato inválido.']})
+
+
+def _entero(evento, nombre):
+    try:
+        return int(evento[nombre])
+    except (KeyError, TypeError, ValueError):
+        raise ErrorEvento({nombre: ['Debe ser un id entero.']})
+
+
+def ingresar_eventos(eventos):
+    """
+    Procesa una lista de eventos y devuelve un resumen:
+    {'creados': n, 'cerrados': n, 'errores': n, 'resultados': [...]}
+    con un resultado por evento en el mismo orden de entrada.
+    """
+    resultados = [None] * len(eventos)
+
+    # 1) Validación de FKs: una consulta por modelo para todo el lote
+    empleados_ids, proyectos_ids, registros_ids = set(), set(), set()
+    for evento in eventos:
+        if not isinstance(evento, dict):
+            continue
+        for nombre, destino in (('empleado', empleados_ids), ('proyecto', proyectos_ids), ('id', registros_ids)):
+            try:
+                destino.add(int(evento[nombre]))
+            except (KeyError, TypeError, ValueError):
+                pass
+    empleados = set(Empleado.objects.filter(pk__in=empleados_ids).values_list('id', flat=True))
+    proyectos = set(Proyecto.objects.filter(pk__in=proyectos_ids).values_list('id', flat=True))
+
+    with transaction.atomic():
+        # 2) Registros abiertos que pueden cerrar las salidas del lote (una consulta)
+        abiertos = list(
+            ControlDeIngreso.objects
+            .filter(hora_salida__isnull=True, empleado_id__in=empleados)
+            .order_by('fecha', 'hora_entrada', 'id')
+        )
+        # Un solo objeto por fila: una salida por id y otra por empleado sobre el mismo
+        # registro tienen que ver el mismo hora_salida
+        por_id = {registro.pk: registro for registro in abiertos if registro.pk in registros_ids}
+        faltan = registros_ids - por_id.keys()
+        por_id.update(ControlDeIngreso.objects.in_bulk(faltan) if faltan else {})
+        # El último registro abierto de cada empleado gana (orden ascendente)
+        abierto_por_empleado = {registro.empleado_id: registro for registro in abiertos}
+
+        nuevos, cerrados = [], {}
+        for i, evento in enumerate(eventos):
+            try:
+                if not isinstance(evento, dict):
+                    raise ErrorEvento({'evento': ['Debe ser un objeto JSON.']})
+                tipo = evento.get('tipo', 'entrada')
+                if tipo == 'entrada':
+                    registro = _entrada(evento, empleados, proyectos)
+                    nuevos.append(registro)
+                    abierto_por_empleado[registro.empleado_id] = registro
+                    resultados[i] = {'indice': i, 'estado': 'creado', 'registro': registro}
+                elif tipo == 'salida':
+                    registro = _salida(evento, empleados, abierto_por_empleado, por_id)
+                    if registro.pk is not None:
+                        cerrados[registro.pk] = registro
+                    resultados[i] = {'indice': i, 'estado': 'cerrado', 'registro': registro}
+                else:
+                    raise ErrorEvento({'tipo': ["Debe ser 'entrada' o 'salida'."]})
+            except ErrorEvento as exc:
+                resultados[i] = {'indice': i, 'estado': 'error', 'errores': exc.errores}
+
+        # 3) Escritura en bloque
+        ControlDeIngreso.objects.bulk_create(nuevos, batch_size=BATCH_SIZE)
+        ControlDeIngreso.objects.bulk_update(cerrados.values(), ['hora_salida', 'estado'], batch_size=BATCH_SIZE)
+
+    resumen = {'creados': 0, 'cerrados': 0, 'errores': 0}
+    for resultado in resultados:
+        resumen[{'creado': 'creados', 'cerrado': 'cerrados', 'error': 'errores'}[resultado['estado']]] += 1
+        registro = resultado.pop('registro', None)
+        if registro is not None:
+            resultado['id'] = registro.pk
+    resumen['resultados'] = resultados
+    return resumen
+
+
+def _entrada(evento, empleados, proyectos):
+    errores = {nombre: ['Este campo es requerido.'] for nombre in REQUERIDOS_ENTRADA if evento.get(nombre) in (None, '')}
+    if errores:
+        raise ErrorEvento(errores)
+    empleado_id, proyecto_id = _entero(evento, 'empleado'), _entero(evento, 'proyecto')
+    if empleado_id not in empleados:
+        raise ErrorEvento({'empleado': [f'El empleado {empleado_id} no existe.']})
+    if proyecto_id not in proyectos:
+        raise ErrorEvento({'proyecto': [f'El proyecto {proyecto_id} no existe.']})
+    datos = {nombre: _limpiar(nombre, evento[nombre]) for nombre in CAMPOS_ENTRADA if nombre in evento}
+    return ControlDeIngreso(empleado_id=empleado_id, proyecto_id=proyecto_id, **datos)
+
+
+def _salida(evento, empleados, abierto_por_empleado, por_id):
+    if evento.get('hora_salida') in (None, ''):
+        raise ErrorEvento({'hora_salida': ['Este campo es requerido.']})
+    hora_salida = _limpiar('hora_salida', evento['hora_salida'])
+    if 'id' in evento:
+        registro = por_id.get(_entero(evento, 'id'))
+        if registro is None:
+            raise ErrorEvento({'id': [f"El registro {evento['id']} no existe."]})
+        if registro.hora_salida is not None:
+            raise ErrorEvento({'id': [f'El registro {registro.pk} ya tiene salida.']})
+    else:
+        empleado_id = _entero(evento, 'empleado')
+        if empleado_id not in empleados:
+            raise ErrorEvento({'empleado': [f'El empleado {empleado_id} no existe.']})
+        registro = abierto_por_empleado.get(empleado_id)
+        if registro is None or registro.hora_salida is not None:
+            raise ErrorEvento({'empleado': ['El empleado no tiene un ingreso abierto.']})
+    registro.hora_salida = hora_salida
+    registro.estado = 'cerrado'
+    return registro
+
+
+async def _existentes(modelo, valor):
+    try:
+        pk = int(valor)
+    except (TypeError, ValueError):
+        return set()
+    return {pk async for pk in modelo.objects.filter(pk=pk).values_list('id', flat=True)}
+
+
+async def aregistrar_evento(evento):
+    """Un evento en línea (mismas reglas que el lote). Devuelve {'estado', 'id'} o lanza ErrorEvento."""
+    if not isinstance(evento, dict):
+        raise ErrorEvento({'evento': ['Debe ser un objeto JSON.']})
+    tipo = evento.get('tipo', 'entrada')
+    if tipo == 'entrada':
+        empleados = await _existentes(Empleado, evento.get('empleado'))
+        proyectos = await _existentes(Proyecto, evento.get('proyecto'))
+        registro = _entrada(evento, empleados, proyectos)
+        await registro.asave()
+        return {'estado': 'creado', 'id': registro.pk}
+    if tipo == 'salida':
+        empleados = await _existentes(Empleado, evento.get('empleado'))
+        abierto_por_empleado, por_id = {}, {}
+        if 'id' in evento:
+            try:
+                pk = int(evento['id'])
+            except (TypeError, ValueError):
+                pk = None
+            registro = await ControlDeIngreso.objects.filter(pk=pk).afirst() if pk is not None else None
+            if registro is not None:
+                por_id[pk] = registro
+        elif empleados:
+            # El último registro abierto del empleado (el mismo que toma el lote)
+            registro = await (
+                ControlDeIngreso.objects
+                .filter(hora_salida__isnull=True, empleado_id__in=empleados)
+                .order_by('-fecha', '-hora_entrada', '-id').afirst()
+            )
+            if registro is not None:
+                abierto_por_empleado[registro.empleado_id] = registro
+        registro = _salida(evento, empleados, abierto_por_empleado, por_id)
+        await registro.asave(update_fields=['hora_salida', 'estado'])
+        return {'estado': 'cerrado', 'id': registro.pk}
+    raise ErrorEvento({'tipo': ["Debe ser 'entrada' o 'salida'."]})
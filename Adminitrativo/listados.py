@@ -0,0 +1,194 @@
+# Administrativo/listados.py
+
+"""
+Camino rápido de solo lectura para los listados de los ViewSets.
+
+En listados grandes casi todo el tiempo se va en el ModelSerializer (un
+to_representation por campo y por fila) y en el JSONRenderer. Aquí las filas
+se arman directamente con `.values()` usando los mismos campos (y en el
+mismo orden) que el serializer, y se renderizan con orjson, que convierte
+date/time/datetime de forma nativa; los Decimal pasan por `default`.
+
+La salida es idéntica a la del serializer. Solo aplica a campos simples del
+modelo (lo que genera ModelSerializer); con `?expand=` o con campos propios
+(SerializerMethodField, source con puntos, etc.) se usa el serializer normal.
+"""
+
+import datetime
+import decimal
+import json
+
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+try:
+    import orjson
+except ImportError:  # Opcional: sin orjson se usa json de la stdlib
+    orjson = None
+
+from .metricas import serializando
+from .serializers import parse_expand
+
+# Campos de DRF cuya representación es el valor tal cual sale de la BD
+# (o lo que el renderer convierte igual que el serializer).
+CAMPOS_DIRECTOS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.DateField, serializers.TimeField, serializers.DateTimeField,
+    serializers.FloatField, serializers.PrimaryKeyRelatedField, serializers.ChoiceField,
+)
+
+
+def _por_defecto(obj):
+    if isinstance(obj, decimal.Decimal):
+        return f'{obj:f}'
+    raise TypeError(f'Tipo no serializable: {type(obj).__name__}')
+
+
+def _por_defecto_json(obj):
+    # Igual que las representaciones de DRF (isoformat completo, 'Z' para UTC)
+    if isinstance(obj, datetime.datetime):
+        valor = obj.isoformat()
+        return valor[:-6] + 'Z' if valor.endswith('+00:00') else valor
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    return _por_defecto(obj)
+
+
+def dumps(datos):
+    if orjson is not None:
+        return orjson.dumps(datos, default=_por_defecto, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        datos, default=_por_defecto_json, ensure_ascii=False, separators=(',', ':'), allow_nan=False,
+    ).encode('utf-8')
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """JSONRenderer con orjson. Para datos que no sabe convertir usa el renderer de DRF."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            contenido = dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Mismos escapes que JSONRenderer (U+2028/U+2029 rompen JavaScript)
+        if b'\xe2\x80\xa8' in contenido or b'\xe2\x80\xa9' in contenido:
+            contenido = contenido.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return contenido
+
+
+def columnas(serializer):
+    """
+    [(nombre, convertidor o None)] con los campos del serializer en su orden,
+    o None si alguno no se puede leer tal cual con values().
+    """
+    resultado = []
+    for nombre, campo in serializer.fields.items():
+        if campo.write_only:
+            continue
+        if campo.source != nombre or not isinstance(campo, CAMPOS_DIRECTOS + (serializers.DecimalField,)):
+            return None
+        if isinstance(campo, serializers.PrimaryKeyRelatedField) and campo.pk_field is not None:
+            return None
+        if isinstance(campo, (serializers.DateField, serializers.TimeField, serializers.DateTimeField)):
+            if _formato(campo) != ISO_8601:
+                return None
+        if isinstance(campo, serializers.DecimalField):
+            coerce = getattr(campo, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            if campo.localize or campo.normalize_output or not coerce:
+                return None
+            resultado.append((nombre, _decimal(campo)))
+        elif isinstance(campo, serializers.DateTimeField):
+            resultado.append((nombre, _fecha_hora()))
+        else:
+            resultado.append((nombre, None))
+    return resultado
+
+
+FORMATOS = [
+    (serializers.DateTimeField, 'DATETIME_FORMAT'),
+    (serializers.DateField, 'DATE_FORMAT'),
+    (serializers.TimeField, 'TIME_FORMAT'),
+]
+
+
+def _formato(campo):
+    formato = getattr(campo, 'format', empty)
+    if formato is empty:
+        ajuste = next(ajuste for tipo, ajuste in FORMATOS if isinstance(campo, tipo))
+        formato = getattr(api_settings, ajuste)
+    return formato
+
+
+def _decimal(campo):
+    cuanto = decimal.Decimal(1).scaleb(-campo.decimal_places) if campo.decimal_places is not None else None
+
+    def convertir(valor):
+        if valor is None:
+            return ''  # Lo mismo que DecimalField con coerce_to_string
+        return valor.quantize(cuanto) if cuanto is not None else valor
+    return convertir
+
+
+def _fecha_hora():
+    # Con USE_TZ DRF pasa las fechas a la zona horaria actual; en UTC no hace falta
+    if timezone.get_current_timezone_name() == 'UTC':
+        return None
+    return lambda valor: timezone.localtime(valor) if valor is not None else None
+
+
+def preparar(cols):
+    """Función fila -> dict de salida: aplica los convertidores y quita los campos extra."""
+    nombres = [nombre for nombre, _ in cols]
+    conversiones = [(nombre, convertir) for nombre, convertir in cols if convertir is not None]
+
+    def salida(fila):
+        resultado = {nombre: fila[nombre] for nombre in nombres}
+        for nombre, convertir in conversiones:
+            resultado[nombre] = convertir(resultado[nombre])
+        return resultado
+    return salida
+
+
+class ListadoRapidoMixin:
+    """Para ModelViewSets: `list` sin serializer cuando la respuesta es JSON y no hay ?expand=."""
+    listado_rapido = True
+    renderer_classes = [JSONRapidoRenderer, BrowsableAPIRenderer]
+
+    def usar_listado_rapido(self, request):
+        return (
+            self.listado_rapido
+            and isinstance(getattr(request, 'accepted_renderer', None), JSONRapidoRenderer)
+            and not parse_expand(request.query_params.get('expand'))
+        )
+
+    def list(self, request, *args, **kwargs):
+        cols = columnas(self.get_serializer()) if self.usar_listado_rapido(request) else None
+        if cols is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        lectura = [nombre for nombre, _ in cols]
+        if self.paginator is not None:
+            # El cursor necesita los campos del ordenamiento aunque ?fields= no los pida
+            lectura += [n for n, _ in self.paginator.get_ordering(queryset) if n not in lectura]
+        queryset = queryset.values(*lectura)
+        salida = preparar(cols)
+
+        pagina = self.paginate_queryset(queryset)
+        if pagina is not None:
+            with serializando():
+                filas = [salida(fila) for fila in pagina]
+            return self.get_paginated_response(filas)
+        filas = list(queryset)
+        with serializando():
+            filas = [salida(fila) for fila in filas]
+        return Response(filas)
@@ -0,0 +1,73 @@
+import datetime
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from Adminitrativo import archivo
+from Adminitrativo.models import ControlDeIngreso, Produccion
+
+MODELOS = {'ingresos': ControlDeIngreso, 'produccion': Produccion}
+
+
+def _mes(valor):
+    try:
+        return datetime.date.fromisoformat(f'{valor}-01')
+    except ValueError:
+        raise ValueError(valor)
+
+
+class Command(BaseCommand):
+    help = (
+        'Pasa los meses cerrados de ingresos y producción a la base de archivo (db.archivo.sqlite3) '
+        'o los restaura. Sin --mes archiva todo lo anterior a ARCHIVO_MESES_VIVOS meses. '
+        'Lo archivado se sigue viendo en la API, los informes y los resúmenes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', type=_mes, action='append', help='AAAA-MM (se puede repetir).')
+        parser.add_argument('--hasta', type=_mes, help='Archiva los meses anteriores a AAAA-MM.')
+        parser.add_argument('--modelo', choices=sorted(MODELOS), action='append', help='Por defecto ambos.')
+        parser.add_argument('--restaurar', action='store_true', help='Devuelve los --mes a las tablas vivas.')
+        parser.add_argument('--listar', action='store_true', help='Muestra los meses archivados.')
+        parser.add_argument('--compactar', action='store_true', help='VACUUM de las dos bases al terminar.')
+
+    def handle(self, *args, **options):
+        if options['listar']:
+            for tabla, mes, filas, archivado_en in archivo.registro():
+                self.stdout.write(f'{tabla} {mes}: {filas} filas (archivado {archivado_en})')
+            return
+        if options['restaurar'] and not options['mes']:
+            raise CommandError('--restaurar requiere --mes.')
+        try:
+            ruta = archivo.crear_base()
+        except archivo.ErrorArchivo as exc:
+            raise CommandError(str(exc))
+
+        modelos = [MODELOS[nombre] for nombre in options['modelo'] or sorted(MODELOS)]
+        errores = 0
+        for modelo in modelos:
+            if options['mes']:
+                meses = options['mes']
+            else:
+                meses = archivo.meses_vivos(modelo, options['hasta'] or archivo.limite())
+            for mes in meses:
+                if options['restaurar']:
+                    filas = archivo.restaurar(modelo, mes)
+                    self.stdout.write(f'{modelo.__name__} {mes:%Y-%m}: {filas} filas restauradas')
+                    continue
+                try:
+                    filas = archivo.archivar(modelo, mes)
+                except archivo.ErrorArchivo as exc:
+                    errores += 1
+                    self.stderr.write(f'{modelo.__name__} {mes:%Y-%m}: {exc}')
+                    continue
+                self.stdout.write(f'{modelo.__name__} {mes:%Y-%m}: {filas} filas archivadas')
+
+        if options['compactar']:
+            archivo.compactar()
+            if not connection.is_in_memory_db():
+                for nombre in (connection.settings_dict['NAME'], ruta):
+                    self.stdout.write(f'{nombre}: {os.path.getsize(nombre) / 2 ** 20:.1f} MB')
+        if errores:
+            raise CommandError(f'{errores} meses no se pudieron archivar.')
@@ -0,0 +1,60 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Adminitrativo import rendimiento
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide todos los endpoints de la API (router y vistas propias) en el mismo proceso: latencia '
+        'p50/p95/p99, consultas SQL y pico de memoria por endpoint. Guarda un JSON estable para diff '
+        'y, con --base, falla si algo empeoró. Pensado para una base de generar_datos: '
+        'KOAL_SQLITE=/tmp/carga.sqlite3 manage.py benchmark_api --base benchmark-base.json'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=30)
+        parser.add_argument('--calentamiento', type=int, default=3, help='Peticiones sin medir antes de cada caso.')
+        parser.add_argument('--frio', action='store_true', help='Vacía el caché de respuestas antes de cada petición.')
+        parser.add_argument('--solo', action='append', help='Solo los casos cuyo nombre contenga el texto (se puede repetir).')
+        parser.add_argument('--salida', help='Archivo JSON (por defecto benchmark-AAAAMMDD-HHMMSS.json).')
+        parser.add_argument('--base', help='JSON de una corrida anterior para comparar.')
+        parser.add_argument('--tolerancia', type=float, default=0.2, help='Aumento permitido de latencia y memoria (0.2 = 20 %%).')
+
+    def handle(self, *args, **options):
+        base = rendimiento.cargar(options['base']) if options['base'] else None
+        self.stdout.write(f"{'caso':<45} {'estado':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'SQL':>4} {'mem KB':>9}")
+
+        def avisar(nombre, r):
+            self.stdout.write(
+                f"{nombre[:45]:<45} {r['estado']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+                f"{r['consultas']:>4} {r['memoria_pico_kb']:>9.1f}"
+            )
+
+        try:
+            resultado = rendimiento.correr(
+                options['repeticiones'], options['calentamiento'], options['frio'], options['solo'], avisar,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        salida = options['salida'] or f'benchmark-{datetime.datetime.now():%Y%m%d-%H%M%S}.json'
+        rendimiento.guardar(resultado, salida)
+        self.stdout.write(f'Resultados en {salida}')
+        for nombre in resultado['sin_caso']:
+            self.stderr.write(f'Sin caso de benchmark: {nombre}')
+
+        if base is None:
+            return
+        nuevos = sorted(set(resultado['endpoints']) - set(base.get('endpoints', {})))
+        quitados = sorted(set(base.get('endpoints', {})) - set(resultado['endpoints']))
+        for nombre in nuevos:
+            self.stdout.write(f'Nuevo (sin línea base): {nombre}')
+        for nombre in quitados if not options['solo'] else []:
+            self.stdout.write(f'Ya no se mide: {nombre}')
+        regresiones = rendimiento.comparar(resultado, base, options['tolerancia'])
+        for nombre, metrica, antes, ahora in regresiones:
+            self.stderr.write(f'{nombre}: {metrica} {antes} -> {ahora}')
+        if regresiones:
+            raise CommandError(f'{len(regresiones)} regresiones contra {options["base"]}.')
+        self.stdout.write(self.style.SUCCESS(f'Sin regresiones contra {options["base"]}.'))
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from Adminitrativo.models import Cargo, Empleado
+
+ALIAS = 'carga_servidores'
+CEDULA = '1000000001'
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga WSGI vs ASGI: levanta gunicorn y uvicorn con un solo worker '
+        'sobre una base temporal y lanza N clientes lentos concurrentes contra '
+        '/api/empleados/cedula/<cedula>/. Cada cliente manda la petición en dos partes con una '
+        'pausa (red lenta), como las terminales del frente. Requiere gunicorn y uvicorn.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=200, help='Conexiones concurrentes.')
+        parser.add_argument('--peticiones', type=int, default=5, help='Peticiones por cliente.')
+        parser.add_argument('--demora', type=float, default=0.2, help='Segundos entre las dos partes de cada petición.')
+        parser.add_argument('--hilos', type=int, default=4, help='Hilos del worker WSGI (gunicorn --threads; 1 = worker sync).')
+        parser.add_argument('--solo', choices=['wsgi', 'asgi'], default=None)
+
+    def handle(self, *args, **options):
+        servidores = {
+            'wsgi': ['gunicorn', 'Koal_Group.wsgi:application', '--workers', '1',
+                     '--threads', str(options['hilos'])],
+            'asgi': ['uvicorn', 'Koal_Group.asgi:application', '--workers', '1'],
+        }
+        if options['solo']:
+            servidores = {options['solo']: servidores[options['solo']]}
+        for comando in servidores.values():
+            try:
+                __import__(comando[0])
+            except ImportError:
+                raise CommandError(f'Hace falta {comando[0]} (pip install {comando[0]}).')
+
+        with tempfile.TemporaryDirectory() as directorio:
+            base = Path(directorio) / 'carga.sqlite3'
+            cookie = self.preparar_base(base)
+            resultados = {}
+            for nombre, comando in servidores.items():
+                resultados[nombre] = self.medir(nombre, comando, base, cookie, options)
+
+        for nombre, r in resultados.items():
+            self.stdout.write(
+                f"{nombre.upper()}: {r['ok']}/{r['total']} ok en {r['segundos']:.2f} s "
+                f"({r['ok'] / r['segundos']:.0f} peticiones/s), latencia p50 {r['p50'] * 1000:.0f} ms, "
+                f"p95 {r['p95'] * 1000:.0f} ms, errores: {r['errores']}"
+            )
+        if any(r['errores'] for r in resultados.values()):
+            raise CommandError('Hubo peticiones fallidas.')
+
+    def preparar_base(self, base):
+        """Migra la base temporal, crea un empleado y una sesión; devuelve la cookie."""
+        config = {**connections.settings[DEFAULT_DB_ALIAS], 'NAME': base}
+        config.pop('TEST', None)
+        connections.settings[ALIAS] = connections.configure_settings({DEFAULT_DB_ALIAS: {}, ALIAS: config})[ALIAS]
+        try:
+            call_command('migrate', database=ALIAS, verbosity=0)
+            cargo = Cargo.objects.using(ALIAS).create(nombre_cargo='Minero', descripcion='')
+            Empleado.objects.using(ALIAS).create(cargo=cargo, cedula=CEDULA, nombres='Carga Prueba', nivel_acceso='1')
+            user = get_user_model().objects.db_manager(ALIAS).create_user('carga', password=get_random_string(20))
+            # Sesión armada a mano: con Basic cada petición pagaría el hash de la clave
+            clave = get_random_string(32)
+            Session.objects.using(ALIAS).create(
+                session_key=clave,
+                session_data=SessionStore().encode({
+                    '_auth_user_id': str(user.pk),
+                    '_auth_user_backend': 'django.contrib.auth.backends.ModelBackend',
+                    '_auth_user_hash': user.get_session_auth_hash(),
+                }),
+                expire_date=timezone.now() + timedelta(hours=1),
+            )
+        finally:
+            connections[ALIAS].close()
+            del connections[ALIAS]
+            del connections.settings[ALIAS]
+        return f'{settings.SESSION_COOKIE_NAME}={clave}'
+
+    def medir(self, nombre, comando, base, cookie, options):
+        puerto = _puerto_libre()
+        bind = ['--bind', f'127.0.0.1:{puerto}'] if comando[0] == 'gunicorn' else ['--port', str(puerto)]
+        entorno = {**os.environ, 'KOAL_SQLITE': str(base)}
+        proceso = subprocess.Popen(
+            [sys.executable, '-m', *comando, *bind], cwd=settings.BASE_DIR, env=entorno,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        try:
+            _esperar_puerto(puerto, proceso)
+            return asyncio.run(_carga(puerto, cookie, options))
+        except CommandError:
+            raise
+        except Exception as exc:
+            raise CommandError(f'{nombre}: {exc}')
+        finally:
+            proceso.terminate()
+            try:
+                proceso.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _esperar_puerto(puerto, proceso, limite=30):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            raise CommandError(f'El servidor terminó al arrancar: {proceso.stderr.read().decode()[-2000:]}')
+        try:
+            with socket.create_connection(('127.0.0.1', puerto), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise CommandError(f'El servidor no abrió el puerto {puerto} en {limite} s.')
+
+
+async def _peticion(puerto, cookie, demora):
+    inicio = time.perf_counter()
+    lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+    try:
+        escritor.write(f'GET /api/empleados/cedula/{CEDULA}/ HTTP/1.1\r\nHost: 127.0.0.1\r\n'.encode())
+        await escritor.drain()
+        # Red lenta: el resto de las cabeceras llega después
+        await asyncio.sleep(demora)
+        escritor.write(f'Cookie: {cookie}\r\nConnection: close\r\n\r\n'.encode())
+        await escritor.drain()
+        respuesta = await lector.read()
+    finally:
+        escritor.close()
+    return respuesta.startswith(b'HTTP/1.1 200'), time.perf_counter() - inicio
+
+
+async def _carga(puerto, cookie, options):
+    latencias, errores = [], 0
+
+    async def cliente():
+        nonlocal errores
+        for _ in range(options['peticiones']):
+            try:
+                ok, segundos = await _peticion(puerto, cookie, options['demora'])
+            except OSError:
+                ok, segundos = False, 0
+            if ok:
+                latencias.append(segundos)
+            else:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(options['clientes'])))
+    segundos = time.perf_counter() - inicio
+    ordenadas = sorted(latencias) or [0]
+    return {
+        'total': options['clientes'] * options['peticiones'], 'ok': len(latencias), 'errores': errores,
+        'segundos': segundos, 'p50': statistics.median(ordenadas),
+        'p95': ordenadas[int(len(ordenadas) * 0.95) - 1] if len(ordenadas) > 1 else ordenadas[0],
+    }
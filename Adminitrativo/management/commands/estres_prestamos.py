@@ -0,0 +1,119 @@
+import argparse
+import datetime
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+
+from Adminitrativo.disponibilidad import SinDisponibilidad
+from Adminitrativo.models import Cargo, Empleado, Herramienta, ListaDeChequeo, Prestamo, Verificacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de préstamos concurrentes: N hilos piden y devuelven unidades de una herramienta '
+        'con pocas unidades, sobre una base temporal. Falla si en algún momento hubo más préstamos '
+        'abiertos que unidades o si el contador `disponible` no cuadra al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=20)
+        parser.add_argument('--operaciones', type=int, default=20, help='Operaciones por hilo.')
+        parser.add_argument('--unidades', type=int, default=3, help='Cantidad de la herramienta.')
+        parser.add_argument('--interno', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['interno']:
+            # Solo contra la base temporal que prepara la llamada externa
+            if not os.environ.get('KOAL_SQLITE'):
+                raise CommandError('--interno requiere KOAL_SQLITE.')
+            return self.correr(options['hilos'], options['operaciones'], options['unidades'])
+
+        manage = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py')]
+        with tempfile.TemporaryDirectory() as directorio:
+            entorno = {**os.environ, 'KOAL_SQLITE': str(Path(directorio) / 'prestamos.sqlite3')}
+            subprocess.run(manage + ['migrate', '-v0'], env=entorno, check=True)
+            resultado = subprocess.run(
+                manage + ['estres_prestamos', '--interno', '--hilos', str(options['hilos']),
+                          '--operaciones', str(options['operaciones']), '--unidades', str(options['unidades'])],
+                env=entorno, capture_output=True, text=True,
+            )
+        self.stdout.write(resultado.stdout, ending='')
+        if resultado.returncode:
+            raise CommandError(resultado.stderr.strip().splitlines()[-1] if resultado.stderr.strip() else 'Falló la prueba.')
+
+    def correr(self, hilos, operaciones, unidades):
+        cargo = Cargo.objects.create(nombre_cargo='Bodega', nivel_acceso='bajo')
+        empleado = Empleado.objects.create(cargo=cargo, cedula='estres', nombres='Estrés', nivel_acceso='bajo')
+        herramienta = Herramienta.objects.create(nombre='Taladro', cantidad=unidades)
+        lista = ListaDeChequeo.objects.create(nombre='Taladro - revisión', herramienta=herramienta)
+        connection.close()
+
+        contadores = {'prestados': 0, 'devueltos': 0, 'rechazados': 0, 'errores': 0, 'abiertos_max': 0}
+        lock = threading.Lock()
+        barrera = threading.Barrier(hilos)
+
+        def sumar(nombre, valor=1):
+            with lock:
+                contadores[nombre] += valor
+
+        def trabajador(semilla):
+            azar = random.Random(semilla)
+            mios = []
+            barrera.wait()
+            try:
+                for _ in range(operaciones):
+                    try:
+                        if mios and azar.random() < 0.5:
+                            prestamo = mios.pop()
+                            prestamo.fecha_devolucion = datetime.date.today()
+                            prestamo.save()
+                            sumar('devueltos')
+                            continue
+                        with transaction.atomic():
+                            verificacion = Verificacion.objects.create(lista=lista, estado='aprobado')
+                            prestamo = Prestamo(
+                                verificacion=verificacion, fecha_entrega=datetime.date.today(),
+                                empleado=empleado, herramienta_prestada=herramienta,
+                            )
+                            prestamo.save()
+                            abiertos = Prestamo.objects.filter(
+                                herramienta_prestada=herramienta, fecha_devolucion__isnull=True,
+                            ).count()
+                        with lock:
+                            contadores['abiertos_max'] = max(contadores['abiertos_max'], abiertos)
+                        mios.append(prestamo)
+                        sumar('prestados')
+                    except SinDisponibilidad:
+                        sumar('rechazados')
+                    except OperationalError:
+                        sumar('errores')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        segundos = time.perf_counter() - inicio
+
+        herramienta.refresh_from_db()
+        abiertos = Prestamo.objects.filter(herramienta_prestada=herramienta, fecha_devolucion__isnull=True).count()
+        self.stdout.write(
+            f"{hilos} hilos x {operaciones} operaciones en {segundos:.2f} s: prestados {contadores['prestados']}, "
+            f"devueltos {contadores['devueltos']}, rechazados {contadores['rechazados']}, "
+            f"errores {contadores['errores']}, máximo abiertos {contadores['abiertos_max']}/{unidades}, "
+            f"disponible {herramienta.disponible} = {unidades} - {abiertos} abiertos"
+        )
+        if contadores['errores'] or contadores['abiertos_max'] > unidades or herramienta.disponible != unidades - abiertos:
+            raise CommandError('La disponibilidad no cuadra.')
@@ -0,0 +1,94 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+ALIAS = 'estres_sqlite'
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de concurrencia de SQLite: N hilos escriben a la vez (leer-modificar-escribir '
+        'dentro de una transacción, como un check-in) sobre una base temporal con la misma '
+        'configuración que DATABASES["default"]. Falla si hubo errores de bloqueo o '
+        'actualizaciones perdidas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=50)
+        parser.add_argument('--transacciones', type=int, default=20, help='Transacciones por escritor.')
+        parser.add_argument(
+            '--motor', default=None,
+            help='ENGINE a probar (por defecto el de DATABASES["default"]), '
+                 'p. ej. django.db.backends.sqlite3 para comparar.',
+        )
+
+    def handle(self, *args, **options):
+        escritores, transacciones = options['escritores'], options['transacciones']
+        with tempfile.TemporaryDirectory() as directorio:
+            config = {**connections.settings[DEFAULT_DB_ALIAS], 'NAME': Path(directorio) / 'estres.sqlite3'}
+            if options['motor']:
+                config['ENGINE'] = options['motor']
+                if options['motor'] == 'django.db.backends.sqlite3':
+                    config['OPTIONS'] = {}
+            config.pop('TEST', None)
+            connections.settings[ALIAS] = connections.configure_settings({DEFAULT_DB_ALIAS: {}, ALIAS: config})[ALIAS]
+            try:
+                resultado = self.correr(escritores, transacciones)
+            finally:
+                connections[ALIAS].close()
+                del connections[ALIAS]
+                del connections.settings[ALIAS]
+
+        esperado = escritores * transacciones
+        self.stdout.write(
+            f"{config['ENGINE']} (journal_mode={resultado['journal']}): {escritores} escritores x {transacciones} transacciones en "
+            f"{resultado['segundos']:.2f} s ({esperado / resultado['segundos']:.0f} tx/s), "
+            f"errores de bloqueo: {resultado['errores']}, contador: {resultado['contador']}/{esperado}"
+        )
+        if resultado['errores'] or resultado['contador'] != esperado:
+            raise CommandError('Hubo escrituras fallidas o perdidas.')
+
+    def correr(self, escritores, transacciones):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('CREATE TABLE contador (id INTEGER PRIMARY KEY, valor INTEGER NOT NULL)')
+            cursor.execute('CREATE TABLE evento (id INTEGER PRIMARY KEY, hilo INTEGER, valor INTEGER)')
+            cursor.execute('INSERT INTO contador (id, valor) VALUES (1, 0)')
+
+        errores = []
+        barrera = threading.Barrier(escritores)
+
+        def escritor(hilo):
+            barrera.wait()
+            try:
+                for _ in range(transacciones):
+                    try:
+                        # Leer y luego escribir en la misma transacción: con BEGIN diferido
+                        # es justo el caso que termina en "database is locked"
+                        with transaction.atomic(using=ALIAS), connections[ALIAS].cursor() as cursor:
+                            cursor.execute('SELECT valor FROM contador WHERE id = 1')
+                            valor = cursor.fetchone()[0]
+                            cursor.execute('INSERT INTO evento (hilo, valor) VALUES (%s, %s)', [hilo, valor])
+                            cursor.execute('UPDATE contador SET valor = %s WHERE id = 1', [valor + 1])
+                    except OperationalError as exc:
+                        errores.append(str(exc))
+            finally:
+                connections[ALIAS].close()
+
+        hilos = [threading.Thread(target=escritor, args=(i,)) for i in range(escritores)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('SELECT valor FROM contador WHERE id = 1')
+            contador = cursor.fetchone()[0]
+            cursor.execute('PRAGMA journal_mode')
+            journal = cursor.fetchone()[0]
+        return {'segundos': segundos, 'errores': len(errores), 'contador': contador, 'journal': journal}
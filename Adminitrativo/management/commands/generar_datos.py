@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.dateparse import parse_date
+
+from Adminitrativo import sintetico
+
+
+def _fecha(valor):
+    fecha = parse_date(valor)
+    if fecha is None:
+        raise ValueError(valor)
+    return fecha
+
+
+class Command(BaseCommand):
+    help = (
+        'Llena una base recién migrada con datos sintéticos deterministas (misma semilla y misma --hasta, '
+        'mismas filas) para medir la API con benchmark_api. Por defecto unos 10.000 empleados, 5 millones '
+        'de ingresos, 1 millón de producciones y 200.000 préstamos (ingresos y producciones salen '
+        'aproximados); --escala 0.01 para una prueba rápida. '
+        'Conviene apuntar a otra base: KOAL_SQLITE=/tmp/carga.sqlite3 manage.py migrate && ... generar_datos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument(
+            '--escala', type=float, default=1.0, help='Multiplica empleados, ingresos, producciones y préstamos.',
+        )
+        parser.add_argument('--empleados', type=int, default=10_000)
+        parser.add_argument('--ingresos', type=int, default=5_000_000)
+        parser.add_argument('--producciones', type=int, default=1_000_000)
+        parser.add_argument('--prestamos', type=int, default=200_000)
+        parser.add_argument('--proyectos', type=int, default=24)
+        parser.add_argument('--herramientas', type=int, default=400)
+        parser.add_argument('--dias', type=int, default=730, help='Días con datos, hacia atrás desde --hasta.')
+        parser.add_argument('--hasta', type=_fecha, help='Último día con datos, AAAA-MM-DD (por defecto hoy).')
+        parser.add_argument('--huellas', type=float, default=0.5, help='Fracción de empleados con huella.')
+        parser.add_argument('--sensores', type=int, default=30, help='Sensores de gas (repartidos por proyecto).')
+        parser.add_argument(
+            '--horas-gas', type=int, default=24, help='Horas de lecturas de gas (una cada 10 s) antes de --hasta.',
+        )
+
+    def handle(self, *args, **options):
+        escala = options['escala']
+        tamanos = {
+            nombre: max(int(options[nombre] * escala), 1)
+            for nombre in ('empleados', 'ingresos', 'producciones', 'prestamos')
+        }
+        self.stdout.write(f"Base: {connection.settings_dict['NAME']}")
+        inicio = time.perf_counter()
+        try:
+            totales = sintetico.generar(
+                **tamanos, proyectos=options['proyectos'], herramientas=options['herramientas'],
+                dias=options['dias'], hasta=options['hasta'], huellas=options['huellas'],
+                sensores=options['sensores'], horas_gas=options['horas_gas'], semilla=options['semilla'], avisar=self.stdout.write,
+            )
+        except (sintetico.BaseNoVacia, ValueError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(totales.values())} filas en {time.perf_counter() - inicio:.1f} s.'
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Adminitrativo import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa la nómina de RR. HH. (CSV o XLSX, primera fila de encabezado: cedula, nombres, cargo, '
+        'telefono, email, estado, nivel_acceso) con upsert por cédula. Las filas con error se listan y '
+        'no detienen el resto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--simular', action='store_true', help='Valida y cuenta, pero no guarda nada.')
+        parser.add_argument('--lote', type=int, default=importacion.LOTE)
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resumen = importacion.importar_empleados(
+                    importacion.leer(archivo, options['archivo']), options['simular'], options['lote'],
+                )
+        except (OSError, importacion.ErrorImportacion) as exc:
+            raise CommandError(str(exc))
+        for error in resumen['filas_con_error']:
+            detalle = '; '.join(f"{campo}: {' '.join(mensajes)}" for campo, mensajes in error['errores'].items())
+            self.stderr.write(f"Fila {error['fila']} ({error['cedula'] or 'sin cédula'}): {detalle}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['filas']} filas: {resumen['creados']} creados, {resumen['actualizados']} actualizados, "
+            f"{resumen['errores']} con error en {time.perf_counter() - inicio:.1f} s"
+            + (' (simulado, no se guardó nada).' if options['simular'] else '.')
+        ))
@@ -0,0 +1,34 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Adminitrativo.models import Cambio
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra del registro de sincronización los cambios más viejos que --dias. '
+        'Las tablets con un token anterior tendrán que sincronizar todo de nuevo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=getattr(settings, 'SYNC_RETENCION_DIAS', 30),
+            help='Días de cambios que se conservan (por defecto SYNC_RETENCION_DIAS o 30).',
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - datetime.timedelta(days=options['dias'])
+        ultimo = Cambio.objects.order_by('-id').values_list('id', flat=True).first()
+        corte = Cambio.objects.filter(fecha__lt=limite).order_by('-id').values_list('id', flat=True).first()
+        if ultimo is None or corte is None:
+            self.stdout.write('No hay cambios para purgar.')
+            return
+        # Se borra un prefijo de la secuencia y nunca la última fila: el id
+        # mínimo que queda es el que usa la vista para saber si un token venció.
+        # _raw_delete: un solo DELETE, sin cargar filas ni enviar señales.
+        viejos = Cambio.objects.filter(id__lte=min(corte, ultimo - 1))
+        borrados = viejos._raw_delete(viejos.db)
+        self.stdout.write(self.style.SUCCESS(f'{borrados} cambios purgados.'))
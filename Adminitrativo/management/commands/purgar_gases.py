@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from Adminitrativo import gases
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra las lecturas crudas de gases más viejas que GASES_CRUDO_DIAS y los resúmenes por minuto '
+        'más viejos que GASES_MINUTOS_DIAS. Los resúmenes por hora se conservan.'
+    )
+
+    def handle(self, *args, **options):
+        for modelo, filas in gases.purgar().items():
+            self.stdout.write(f'{modelo}: {filas} filas')
+        self.stdout.write(self.style.SUCCESS('Lecturas de gases purgadas.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Adminitrativo import presencia
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye desde ControlDeIngreso quién está adentro (tabla Presencia) y muestra lo que corrigió. '
+        'Los otros workers ven el cambio cuando recargan su copia (PRESENCIA_RECARGA_SEGUNDOS).'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            resumen = presencia.recalcular()
+        self.stdout.write(
+            f"Corregidos: {resumen['entraron']} faltaban, {resumen['salieron']} sobraban, "
+            f"{resumen['movidos']} con otro registro o lugar."
+        )
+        self.stdout.write(self.style.SUCCESS(f"Presencia al día: {resumen['adentro']} adentro."))
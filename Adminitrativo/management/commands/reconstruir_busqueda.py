@@ -0,0 +1,15 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from Adminitrativo import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Vuelve a llenar los índices FTS5 de ?search= (empleados, proyectos, observaciones de ingresos).'
+
+    def handle(self, *args, **options):
+        for modelo in apps.get_app_config('Adminitrativo').get_models():
+            if busqueda.indexado(modelo):
+                filas = busqueda.reconstruir(modelo)
+                self.stdout.write(f'{modelo.__name__}: {filas} filas')
+        self.stdout.write(self.style.SUCCESS('Índices de búsqueda reconstruidos.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from Adminitrativo.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los resúmenes de producción (día, mes y total) por proyecto y por empleado.'
+
+    def handle(self, *args, **options):
+        creados = reconstruir()
+        for modelo, filas in creados.items():
+            self.stdout.write(f'{modelo}: {filas} filas')
+        self.stdout.write(self.style.SUCCESS('Resúmenes reconstruidos.'))
@@ -0,0 +1,333 @@
+# Administrativo/metricas.py
+
+"""
+Métricas por ruta para Prometheus (GET /api/metricas/).
+
+`MetricasMiddleware` mide cada petición y la agrega por ruta resuelta (el
+nombre de la URL: `produccion-list`, `dashboard-stats`...; "sin_ruta" si no
+resolvió):
+
+- koal_http_peticiones_total{ruta, metodo, estado}
+- koal_http_duracion_segundos{ruta, metodo}: histograma de latencia
+- koal_http_sql_consultas_total / koal_http_sql_segundos_total{ruta}
+- koal_http_respuesta_bytes_total{ruta}
+- koal_http_serializacion_segundos_total{ruta}: serializers + render
+
+Las consultas se cuentan con un execute_wrapper que se instala una vez en
+cada conexión (signals.py, connection_created) y que anota en la medida de la
+petición en curso, guardada en un ContextVar: así también cuentan las
+consultas de las vistas async, que corren en el hilo de sync_to_async. Fuera
+de una petición (comandos, hilos de informes) el wrapper no hace nada.
+
+La serialización es el `to_representation` más externo de los serializers
+(ExpandableModelSerializer), la conversión de filas del listado rápido y el
+render de la respuesta (post-render callback); lo anidado no se cuenta dos veces.
+
+Cada proceso agrega en memoria (un lock y unos diccionarios: se puede dejar
+siempre activo). Con varios workers hay que definir `METRICAS_DIR`
+(KOAL_METRICAS_DIR): cada proceso vuelca su copia a un archivo propio cada
+`METRICAS_INTERVALO` segundos y el endpoint suma todos los archivos, así
+cualquier worker que atienda el scrape devuelve el total. Los archivos de
+procesos que ya terminaron se siguen sumando (los contadores no bajan); se
+pueden borrar al desplegar.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+
+CUBETAS = tuple(getattr(settings, 'METRICAS_CUBETAS', (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)))
+INTERVALO = getattr(settings, 'METRICAS_INTERVALO', 5)
+SIN_RUTA = 'sin_ruta'
+
+CONTADORES = {
+    'koal_http_peticiones_total': 'Peticiones atendidas.',
+    'koal_http_sql_consultas_total': 'Consultas SQL hechas por las peticiones.',
+    'koal_http_sql_segundos_total': 'Tiempo en consultas SQL.',
+    'koal_http_respuesta_bytes_total': 'Bytes de respuesta enviados.',
+    'koal_http_serializacion_segundos_total': 'Tiempo en serializers y render de la respuesta.',
+}
+HISTOGRAMA = 'koal_http_duracion_segundos'
+
+logger = logging.getLogger(__name__)
+
+_actual = ContextVar('metricas_peticion', default=None)
+
+
+def directorio():
+    valor = getattr(settings, 'METRICAS_DIR', None)
+    return Path(valor) if valor else None
+
+
+class Medida:
+    """Lo que va sumando una petición mientras se atiende."""
+    __slots__ = ('consultas', 'sql', 'serializacion', 'desde')
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+        self.serializacion = 0.0
+        self.desde = None  # inicio de la serialización en curso
+
+    def terminar_serializacion(self, *args):
+        if self.desde is not None:
+            self.serializacion += time.perf_counter() - self.desde
+            self.desde = None
+
+
+@contextmanager
+def serializando():
+    """Suma el bloque al tiempo de serialización de la petición (solo el más externo)."""
+    medida = _actual.get()
+    if medida is None or medida.desde is not None:
+        yield
+        return
+    medida.desde = time.perf_counter()
+    try:
+        yield
+    finally:
+        medida.terminar_serializacion()
+
+
+def contar_consulta(execute, sql, params, many, context):
+    medida = _actual.get()
+    if medida is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medida.consultas += 1
+        medida.sql += time.perf_counter() - inicio
+
+
+def instalar(connection):
+    if contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(contar_consulta)
+
+
+class Registro:
+    """Contadores e histogramas de un proceso."""
+
+    def __init__(self, cubetas=CUBETAS):
+        self.cubetas = cubetas
+        self._lock = threading.Lock()
+        self._volcando = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.contadores = defaultdict(float)  # (métrica, etiquetas) -> valor
+        self.histogramas = {}  # etiquetas -> [conteo por cubeta (sin acumular) ..., +Inf, suma]
+        self.nombre = f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+        self.volcado = time.monotonic()
+
+    def observar(self, ruta, metodo, estado, segundos, medida, tamano):
+        with self._lock:
+            por_ruta = (('ruta', ruta),)
+            peticion = (*por_ruta, ('metodo', metodo), ('estado', str(estado)))
+            self.contadores['koal_http_peticiones_total', peticion] += 1
+            self.contadores['koal_http_sql_consultas_total', por_ruta] += medida.consultas
+            self.contadores['koal_http_sql_segundos_total', por_ruta] += medida.sql
+            self.contadores['koal_http_respuesta_bytes_total', por_ruta] += tamano
+            self.contadores['koal_http_serializacion_segundos_total', por_ruta] += medida.serializacion
+            etiquetas = (('ruta', ruta), ('metodo', metodo))
+            histograma = self.histogramas.get(etiquetas)
+            if histograma is None:
+                histograma = self.histogramas[etiquetas] = [0] * (len(self.cubetas) + 1) + [0.0]
+            histograma[bisect.bisect_left(self.cubetas, segundos)] += 1
+            histograma[-1] += segundos
+            toca_volcar = time.monotonic() - self.volcado >= INTERVALO
+        if toca_volcar:
+            self.volcar()
+
+    def sumar_bytes(self, ruta, tamano):
+        with self._lock:
+            self.contadores['koal_http_respuesta_bytes_total', (('ruta', ruta),)] += tamano
+
+    def datos(self):
+        with self._lock:
+            return {
+                'cubetas': list(self.cubetas),
+                'contadores': [[m, [list(e) for e in etiquetas], v] for (m, etiquetas), v in self.contadores.items()],
+                'histogramas': [[[list(e) for e in etiquetas], list(h)] for etiquetas, h in self.histogramas.items()],
+            }
+
+    def volcar(self):
+        """Escribe la copia de este proceso en METRICAS_DIR (si está definido)."""
+        self.volcado = time.monotonic()
+        carpeta = directorio()
+        # Si otro hilo ya está escribiendo, con eso basta
+        if carpeta is None or not self._volcando.acquire(blocking=False):
+            return
+        try:
+            carpeta.mkdir(parents=True, exist_ok=True)
+            temporal = carpeta / f'.{self.nombre}.tmp'
+            temporal.write_text(json.dumps(self.datos()), encoding='utf-8')
+            os.replace(temporal, carpeta / self.nombre)
+        except OSError:
+            # Las métricas no pueden tumbar la petición
+            logger.exception('No se pudieron volcar las métricas en %s', carpeta)
+        finally:
+            self._volcando.release()
+
+
+registro = Registro()
+# Un hijo de fork empieza de cero y con su propio archivo
+os.register_at_fork(after_in_child=registro.reiniciar)
+
+
+def combinar(copias):
+    """Suma las copias de varios procesos -> (contadores, histogramas, cubetas)."""
+    contadores, histogramas, cubetas = defaultdict(float), {}, list(CUBETAS)
+    for copia in copias:
+        if copia['cubetas'] != cubetas:
+            continue  # otro proceso con otras cubetas (cambio de configuración a medias)
+        for metrica, etiquetas, valor in copia['contadores']:
+            contadores[metrica, tuple(map(tuple, etiquetas))] += valor
+        for etiquetas, valores in copia['histogramas']:
+            clave = tuple(map(tuple, etiquetas))
+            actual = histogramas.setdefault(clave, [0] * len(valores))
+            for i, valor in enumerate(valores):
+                actual[i] += valor
+    return contadores, histogramas, cubetas
+
+
+def copias():
+    """Las copias de todos los procesos (la de este, recién volcada)."""
+    carpeta = directorio()
+    if carpeta is None:
+        return [registro.datos()]
+    registro.volcar()
+    resultado = []
+    for archivo in sorted(carpeta.glob('*.json')):
+        try:
+            resultado.append(json.loads(archivo.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            continue  # se está reemplazando o lo borraron
+    return resultado
+
+
+def _etiquetas(pares):
+    texto = ','.join(
+        '{}="{}"'.format(nombre, str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for nombre, valor in pares
+    )
+    return f'{{{texto}}}' if texto else ''
+
+
+def _numero(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+def exposicion(lista=None):
+    """Texto en formato de exposición de Prometheus (0.0.4)."""
+    lista = copias() if lista is None else lista
+    contadores, histogramas, cubetas = combinar(lista)
+    lineas = [
+        '# HELP koal_metricas_procesos Procesos cuyas métricas se sumaron.',
+        '# TYPE koal_metricas_procesos gauge',
+        f'koal_metricas_procesos {len(lista)}',
+    ]
+    for metrica, ayuda in CONTADORES.items():
+        lineas += [f'# HELP {metrica} {ayuda}', f'# TYPE {metrica} counter']
+        for (nombre, etiquetas), valor in sorted(contadores.items()):
+            if nombre == metrica:
+                lineas.append(f'{metrica}{_etiquetas(etiquetas)} {_numero(valor)}')
+    lineas += [f'# HELP {HISTOGRAMA} Duración de las peticiones.', f'# TYPE {HISTOGRAMA} histogram']
+    for etiquetas, valores in sorted(histogramas.items()):
+        acumulado = 0
+        for limite, conteo in zip([*map(str, cubetas), '+Inf'], valores[:-1]):
+            acumulado += conteo
+            lineas.append(f'{HISTOGRAMA}_bucket{_etiquetas([*etiquetas, ("le", limite)])} {acumulado}')
+        lineas.append(f'{HISTOGRAMA}_sum{_etiquetas(etiquetas)} {_numero(valores[-1])}')
+        lineas.append(f'{HISTOGRAMA}_count{_etiquetas(etiquetas)} {acumulado}')
+    return '\n'.join(lineas) + '\n'
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data.encode(self.charset) if isinstance(data, str) else json.dumps(data).encode(self.charset)
+
+
+def _contar_stream(contenido, ruta):
+    tamano = 0
+    try:
+        for parte in contenido:
+            tamano += len(parte)
+            yield parte
+    finally:
+        registro.sumar_bytes(ruta, tamano)
+
+
+class MetricasMiddleware:
+    """Va primero en MIDDLEWARE para medir la petición completa. Sirve en WSGI y en ASGI."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        medida = Medida()
+        token = _actual.set(medida)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self.registrar(request, response, medida, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medida = Medida()
+        token = _actual.set(medida)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self.registrar(request, response, medida, time.perf_counter() - inicio)
+
+    def process_template_response(self, request, response):
+        # Las respuestas DRF se renderizan justo después de este hook
+        medida = _actual.get()
+        if medida is not None and medida.desde is None:
+            medida.desde = time.perf_counter()
+            response.add_post_render_callback(medida.terminar_serializacion)
+        return response
+
+    def registrar(self, request, response, medida, segundos):
+        match = getattr(request, 'resolver_match', None)
+        ruta = (match.view_name if match else None) or SIN_RUTA
+        tamano = 0
+        if not response.streaming:
+            tamano = len(response.content)
+        elif response.has_header('Content-Length'):
+            tamano = int(response['Content-Length'])
+        elif not response.is_async:
+            # El cuerpo se manda después: los bytes se suman cuando termine
+            response.streaming_content = _contar_stream(response.streaming_content, ruta)
+        registro.observar(ruta, request.method, response.status_code, segundos, medida, tamano)
+        return response
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='controldeingreso',
+            index=models.Index(fields=['fecha', 'hora_entrada', 'id'], name='ingreso_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='controldeingreso',
+            index=models.Index(fields=['empleado', 'fecha'], name='ingreso_empleado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='controldeingreso',
+            index=models.Index(fields=['proyecto', 'fecha'], name='ingreso_proyecto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='controldeingreso',
+            index=models.Index(condition=models.Q(('hora_salida__isnull', True)), fields=['proyecto', 'empleado'], name='ingreso_abierto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=models.Index(fields=['nombres', 'id'], name='empleado_nombres_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=models.Index(condition=models.Q(('estado', 'activo')), fields=['cargo'], name='empleado_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='herramienta',
+            index=models.Index(fields=['nombre', 'id'], name='herramienta_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listadechequeo',
+            index=models.Index(fields=['nombre', 'id'], name='lista_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['fecha_entrega', 'id'], name='prestamo_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(condition=models.Q(('fecha_devolucion__isnull', True)), fields=['herramienta_prestada'], name='prestamo_abierto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produccion',
+            index=models.Index(fields=['fecha', 'id'], name='produccion_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produccion',
+            index=models.Index(fields=['proyecto', 'fecha'], name='produccion_proyecto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produccion',
+            index=models.Index(fields=['empleado', 'fecha'], name='produccion_empleado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='proyecto_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['estado'], name='proyecto_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verificacion',
+            index=models.Index(fields=['fecha_verificacion', 'id'], name='verificacion_orden_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:56
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def calcular_hashes(apps, schema_editor):
+    Empleado = apps.get_model('Adminitrativo', 'Empleado')
+    alias = schema_editor.connection.alias
+    pendientes = Empleado.objects.using(alias).filter(huella__isnull=False).values_list('id', 'huella')
+    for pk, huella in pendientes.iterator(chunk_size=500):
+        if huella:
+            Empleado.objects.using(alias).filter(pk=pk).update(huella_hash=hashlib.sha1(bytes(huella)).hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0002_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='huella_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.RunPython(calcular_hashes, migrations.RunPython.noop),
+    ]
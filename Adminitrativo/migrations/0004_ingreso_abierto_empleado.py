@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0003_huella_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='controldeingreso',
+            index=models.Index(condition=models.Q(('hora_salida__isnull', True)), fields=['empleado', 'fecha'], name='ingreso_abierto_empleado_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0004_ingreso_abierto_empleado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenProduccionEmpleado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('dia', 'Día'), ('mes', 'Mes'), ('total', 'Total')], max_length=5)),
+                ('fecha', models.DateField(blank=True, null=True)),
+                ('cantidad_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('registros', models.PositiveIntegerField(default=0)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_produccion', to='Adminitrativo.empleado')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['periodo', 'fecha'], name='resumen_empleado_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('empleado', 'periodo', 'fecha'), name='resumen_empleado_unico'), models.UniqueConstraint(condition=models.Q(('periodo', 'total')), fields=('empleado',), name='resumen_empleado_total_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenProduccionProyecto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('dia', 'Día'), ('mes', 'Mes'), ('total', 'Total')], max_length=5)),
+                ('fecha', models.DateField(blank=True, null=True)),
+                ('cantidad_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('registros', models.PositiveIntegerField(default=0)),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_produccion', to='Adminitrativo.proyecto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['periodo', 'fecha'], name='resumen_proyecto_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('proyecto', 'periodo', 'fecha'), name='resumen_proyecto_unico'), models.UniqueConstraint(condition=models.Q(('periodo', 'total')), fields=('proyecto',), name='resumen_proyecto_total_unico')],
+            },
+        ),
+    ]
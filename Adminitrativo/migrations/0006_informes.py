@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:06
+
+import Adminitrativo.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0005_resumenes_produccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Informe',
+            fields=[
+                ('id', models.CharField(default=Adminitrativo.models.nuevo_id_informe, editable=False, max_length=22, primary_key=True, serialize=False)),
+                ('tipo', models.CharField(max_length=30)),
+                ('formato', models.CharField(default='csv', max_length=4)),
+                ('fecha_inicio', models.DateField(blank=True, null=True)),
+                ('fecha_fin', models.DateField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=12)),
+                ('archivo', models.CharField(blank=True, default='', max_length=255)),
+                ('tamano', models.PositiveBigIntegerField(default=0)),
+                ('filas', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin_proceso', models.DateTimeField(blank=True, null=True)),
+                ('proyecto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='informes', to='Adminitrativo.proyecto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado'], name='informe_estado_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:02
+
+from django.db import migrations
+
+from Adminitrativo import busqueda
+
+
+def crear_indices(apps, schema_editor):
+    # Tablas FTS5 (Adminitrativo/busqueda.py), llenadas con los datos actuales
+    busqueda.crear_tablas(schema_editor.connection)
+    for modelo in apps.get_app_config('Adminitrativo').get_models():
+        if busqueda.indexado(modelo):
+            busqueda.reconstruir(modelo, using=schema_editor.connection.alias)
+
+
+def borrar_indices(apps, schema_editor):
+    busqueda.borrar_tablas(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0008_cambios'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
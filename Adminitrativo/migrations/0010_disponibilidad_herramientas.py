@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:35
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Greatest
+
+
+def calcular_disponible(apps, schema_editor):
+    Herramienta = apps.get_model('Adminitrativo', 'Herramienta')
+    Prestamo = apps.get_model('Adminitrativo', 'Prestamo')
+    alias = schema_editor.connection.alias
+    abiertos = (
+        Prestamo.objects.using(alias)
+        .filter(herramienta_prestada=models.OuterRef('pk'), fecha_devolucion__isnull=True)
+        .order_by().values('herramienta_prestada').annotate(n=models.Count('id')).values('n')
+    )
+    # Datos viejos con más préstamos abiertos que unidades quedan en 0
+    Herramienta.objects.using(alias).update(
+        disponible=Greatest(models.F('cantidad') - Coalesce(models.Subquery(abiertos), 0), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0009_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='herramienta',
+            name='disponible',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_disponible, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='herramienta',
+            constraint=models.CheckConstraint(condition=models.Q(('disponible__lte', models.F('cantidad'))), name='herramienta_disponible_valido'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0010_disponibilidad_herramientas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorGas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(max_length=50, unique=True)),
+                ('tipo_gas', models.CharField(choices=[('CH4', 'Metano (CH₄)'), ('CO', 'Monóxido de carbono (CO)'), ('CO2', 'Dióxido de carbono (CO₂)'), ('H2S', 'Sulfuro de hidrógeno (H₂S)'), ('O2', 'Oxígeno (O₂)')], max_length=5)),
+                ('ubicacion', models.CharField(blank=True, default='', max_length=100)),
+                ('limite_alerta', models.FloatField(blank=True, null=True)),
+                ('limite_alarma', models.FloatField(blank=True, null=True)),
+                ('activo', models.BooleanField(default=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('proyecto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sensores_gas', to='Adminitrativo.proyecto')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenGas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('minuto', 'Minuto'), ('hora', 'Hora')], max_length=6)),
+                ('inicio', models.DateTimeField()),
+                ('registros', models.PositiveIntegerField(default=0)),
+                ('suma', models.FloatField(default=0)),
+                ('minimo', models.FloatField()),
+                ('maximo', models.FloatField()),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes', to='Adminitrativo.sensorgas')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BloqueLecturasGas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minuto', models.DateTimeField()),
+                ('registros', models.PositiveIntegerField(default=0)),
+                ('datos', models.BinaryField()),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bloques', to='Adminitrativo.sensorgas')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AlertaGas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nivel', models.CharField(choices=[('alerta', 'Alerta'), ('alarma', 'Alarma')], max_length=6)),
+                ('inicio', models.DateTimeField()),
+                ('valor', models.FloatField()),
+                ('limite', models.FloatField()),
+                ('lecturas', models.PositiveIntegerField(default=1)),
+                ('fecha_registro', models.DateTimeField(auto_now_add=True)),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='Adminitrativo.sensorgas')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='sensorgas',
+            index=models.Index(fields=['codigo', 'id'], name='sensor_gas_codigo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumengas',
+            index=models.Index(fields=['periodo', 'inicio'], name='resumen_gas_inicio_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumengas',
+            constraint=models.UniqueConstraint(fields=('sensor', 'periodo', 'inicio'), name='resumen_gas_unico'),
+        ),
+        migrations.AddIndex(
+            model_name='bloquelecturasgas',
+            index=models.Index(fields=['minuto'], name='bloque_gas_minuto_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bloquelecturasgas',
+            constraint=models.UniqueConstraint(fields=('sensor', 'minuto'), name='bloque_gas_unico'),
+        ),
+        migrations.AddIndex(
+            model_name='alertagas',
+            index=models.Index(fields=['inicio', 'id'], name='alerta_gas_orden_idx'),
+        ),
+    ]
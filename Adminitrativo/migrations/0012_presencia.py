@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Q
+
+
+def llenar_presencia(apps, schema_editor):
+    # La misma regla que presencia.ultimos_abiertos, con los modelos de la migración
+    ControlDeIngreso = apps.get_model('Adminitrativo', 'ControlDeIngreso')
+    Presencia = apps.get_model('Adminitrativo', 'Presencia')
+    alias = schema_editor.connection.alias
+    posteriores = ControlDeIngreso.objects.using(alias).filter(
+        Q(fecha__gt=OuterRef('fecha'))
+        | Q(fecha=OuterRef('fecha'), hora_entrada__gt=OuterRef('hora_entrada'))
+        | Q(fecha=OuterRef('fecha'), hora_entrada=OuterRef('hora_entrada'), pk__gt=OuterRef('pk')),
+        empleado_id=OuterRef('empleado_id'), hora_entrada__isnull=False,
+    )
+    abiertos = ControlDeIngreso.objects.using(alias).filter(
+        ~Exists(posteriores), hora_entrada__isnull=False, hora_salida__isnull=True,
+    ).values('id', 'empleado_id', 'proyecto_id', 'lugar_trabajo', 'fecha', 'hora_entrada')
+    Presencia.objects.using(alias).bulk_create([
+        Presencia(
+            empleado_id=fila['empleado_id'], registro_id=fila['id'], proyecto_id=fila['proyecto_id'],
+            lugar_trabajo=fila['lugar_trabajo'] or '', fecha=fila['fecha'], hora_entrada=fila['hora_entrada'],
+        )
+        for fila in abiertos
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0011_gases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Presencia',
+            fields=[
+                ('empleado', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='presencia', serialize=False, to='Adminitrativo.empleado')),
+                ('lugar_trabajo', models.CharField(blank=True, default='', max_length=100)),
+                ('fecha', models.DateField()),
+                ('hora_entrada', models.TimeField()),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presentes', to='Adminitrativo.proyecto')),
+                ('registro', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='presencia', to='Adminitrativo.controldeingreso')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['proyecto', 'lugar_trabajo'], name='presencia_lugar_idx')],
+            },
+        ),
+        migrations.RunPython(llenar_presencia, migrations.RunPython.noop),
+    ]
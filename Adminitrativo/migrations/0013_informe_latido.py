@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Adminitrativo', '0012_presencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='informe',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='informe',
+            name='proceso',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -1,7 +1,13 @@
-from django.db import models
+import hashlib
+
+import shortuuid
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.apps import AppConfig
 
+from .versiones import ModeloVersionado, VersionadoQuerySet
+
 # Asumimos que necesitarás un modelo de Usuario para el supervisor,
 # aunque no está explícitamente en el diagrama principal.
 # Para simplificar, usaremos un modelo de Empleado como supervisor por ahora,
@@ -9,17 +15,18 @@ from django.apps import AppConfig
 # Por la estructura, parece que 'supervisor_id' apunta a la tabla 'Empleados'.
 # Vamos a definir Empleado primero ya que Cargos depende de él.
 
-class Cargo(models.Model):
+class Cargo(ModeloVersionado):
     """Representa los cargos o puestos de trabajo."""
     nombre_cargo = models.CharField(max_length=100, unique=True)
     descripcion = models.TextField(blank=True, null=True)
     # Podrías usar Choices para nivel_acceso si los niveles son fijos (ej: 'bajo', 'medio', 'alto')
     nivel_acceso = models.CharField(max_length=50)
+    fecha_actualizacion = models.DateTimeField(auto_now=True) # Validador para GET condicional (ETag / Last-Modified)
 
     def __str__(self):
         return self.nombre_cargo
 
-class Empleado(models.Model):
+class Empleado(ModeloVersionado):
     """Representa a los empleados de la organización."""
     # cargo_id es una clave foránea a la tabla Cargo
     cargo = models.ForeignKey(Cargo, on_delete=models.PROTECT) # Proteger: no permitir borrar un Cargo si tiene empleados asociados
@@ -32,13 +39,33 @@ class Empleado(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True) # Se guarda la fecha/hora al crearse
     fecha_registro = models.DateField(auto_now_add=True) # Se guarda la fecha al crearse
     huella = models.BinaryField(blank=True, null=True) # Para datos binarios como una huella dactilar
+    # SHA-1 de la huella: sirve de ETag sin tener que leer el blob
+    huella_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
     # nivel_acceso podría ser redundante si ya está en Cargo, pero lo incluimos si es específico del empleado
     nivel_acceso = models.CharField(max_length=50)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Listado del ViewSet (order_by nombres, id)
+            models.Index(fields=['nombres', 'id'], name='empleado_nombres_idx'),
+            # Conteo de personal activo en el dashboard
+            models.Index(fields=['cargo'], name='empleado_activo_idx', condition=models.Q(estado='activo')),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Si la huella no está diferida puede haber cambiado: recalculamos su hash
+        if 'huella' not in self.get_deferred_fields():
+            self.huella_hash = hashlib.sha1(bytes(self.huella)).hexdigest() if self.huella else ''
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'huella' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'huella_hash'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.nombres} ({self.cedula})"
 
-class Proyecto(models.Model):
+class Proyecto(ModeloVersionado):
     """Representa los proyectos."""
     nombre = models.CharField(max_length=200)
     descripcion = models.TextField(blank=True, null=True)
@@ -48,11 +75,40 @@ class Proyecto(models.Model):
     # supervisor_id es una clave foránea a la tabla Empleados
     supervisor = models.ForeignKey(Empleado, on_delete=models.SET_NULL, null=True, blank=True, related_name='proyectos_supervisados') # Permite que un proyecto no tenga supervisor
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_creacion', 'id'], name='proyecto_creacion_idx'),
+            models.Index(fields=['estado'], name='proyecto_estado_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
 
-class ControlDeIngreso(models.Model):
+class HistoricoQuerySet(VersionadoQuerySet):
+    def historico(self):
+        """Incluye los meses archivados (ver archivo.py). Solo lectura."""
+        from .archivo import historico
+        return historico(self)
+
+
+class ProduccionQuerySet(HistoricoQuerySet):
+    """update() que cambia proyecto, empleado o fecha recalcula también los resúmenes de antes."""
+    CLAVES_RESUMEN = {'proyecto', 'proyecto_id', 'empleado', 'empleado_id', 'fecha'}
+
+    def update(self, **kwargs):
+        if not self.CLAVES_RESUMEN & set(kwargs):
+            return super().update(**kwargs)  # los de ahora los recalcula escritura_masiva
+        from .resumenes import recalcular
+        with transaction.atomic(using=self.db):
+            antes = list(self.values_list('proyecto_id', 'empleado_id', 'fecha').distinct())
+            filas = super().update(**kwargs)
+            recalcular(claves=antes, using=self.db)
+        return filas
+
+
+class ControlDeIngreso(ModeloVersionado):
     """Registra los ingresos y salidas de empleados en proyectos/lugares."""
     fecha = models.DateField()
     hora_entrada = models.TimeField(blank=True, null=True)
@@ -67,11 +123,62 @@ class ControlDeIngreso(models.Model):
     # estado puede referirse al estado del registro (ej: 'activo', 'cerrado', 'pendiente')
     estado = models.CharField(max_length=50, default='activo')
     observacion = models.TextField(blank=True, null=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    objects = HistoricoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Listado paginado (order_by -fecha, -hora_entrada, -id)
+            models.Index(fields=['fecha', 'hora_entrada', 'id'], name='ingreso_orden_idx'),
+            models.Index(fields=['empleado', 'fecha'], name='ingreso_empleado_fecha_idx'),
+            models.Index(fields=['proyecto', 'fecha'], name='ingreso_proyecto_fecha_idx'),
+            # Registros abiertos: quién sigue adentro
+            models.Index(
+                fields=['proyecto', 'empleado'], name='ingreso_abierto_idx',
+                condition=models.Q(hora_salida__isnull=True),
+            ),
+            # Último ingreso abierto de cada empleado (cierre de salidas por lote)
+            models.Index(
+                fields=['empleado', 'fecha'], name='ingreso_abierto_empleado_idx',
+                condition=models.Q(hora_salida__isnull=True),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Quién está adentro (presencia.py) se actualiza en la misma transacción
+        from .presencia import actualizar
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            actualizar([self.pk], [self.empleado_id])
 
     def __str__(self):
         return f"Registro de {self.empleado} en {self.proyecto} el {self.fecha}"
 
-class Produccion(models.Model):
+
+class Presencia(models.Model):
+    """
+    Quién está adentro ahora: una fila por empleado cuyo último ingreso (por
+    fecha, hora de entrada e id) sigue sin salida. La mantiene presencia.py
+    en la misma transacción que ControlDeIngreso.
+    """
+    empleado = models.OneToOneField(Empleado, on_delete=models.CASCADE, primary_key=True, related_name='presencia')
+    registro = models.OneToOneField(ControlDeIngreso, on_delete=models.CASCADE, related_name='presencia')
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='presentes')
+    lugar_trabajo = models.CharField(max_length=100, blank=True, default='')
+    fecha = models.DateField()
+    hora_entrada = models.TimeField()
+
+    class Meta:
+        indexes = [
+            # Conteo y lista por proyecto y frente
+            models.Index(fields=['proyecto', 'lugar_trabajo'], name='presencia_lugar_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.empleado_id} en {self.proyecto_id} ({self.lugar_trabajo or 'sin lugar'})"
+
+class Produccion(ModeloVersionado):
     """Registra la producción de los empleados en proyectos."""
     # proyecto_id es clave foránea a Proyecto
     proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='producciones')
@@ -81,22 +188,169 @@ class Produccion(models.Model):
     cantidad_producida = models.DecimalField(max_digits=10, decimal_places=2) # Usamos DecimalField para cantidades que pueden no ser enteras
     observaciones = models.TextField(blank=True, null=True)
     fecha_registro = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    objects = ProduccionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha', 'id'], name='produccion_orden_idx'),
+            models.Index(fields=['proyecto', 'fecha'], name='produccion_proyecto_fecha_idx'),
+            models.Index(fields=['empleado', 'fecha'], name='produccion_empleado_fecha_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Los resúmenes se actualizan en la misma transacción que el registro
+        from .resumenes import aplicar_produccion
+        with transaction.atomic():
+            anterior = None
+            if self.pk is not None:
+                anterior = Produccion.objects.filter(pk=self.pk).values(
+                    'proyecto_id', 'empleado_id', 'fecha', 'cantidad_producida'
+                ).first()
+            super().save(*args, **kwargs)
+            aplicar_produccion(anterior, self.valores_resumen())
+
+    def valores_resumen(self):
+        return {
+            'proyecto_id': self.proyecto_id, 'empleado_id': self.empleado_id,
+            'fecha': self.fecha, 'cantidad_producida': self.cantidad_producida,
+        }
 
     def __str__(self):
         return f"Producción de {self.cantidad_producida} por {self.empleado} en {self.proyecto} el {self.fecha}"
 
-class Herramienta(models.Model):
+
+class ResumenProduccion(ModeloVersionado):
+    """
+    Base de los resúmenes de producción que alimentan el dashboard. Se mantienen
+    incrementalmente desde Produccion (ver resumenes.py) y se pueden reconstruir
+    con `manage.py reconstruir_resumenes`.
+    """
+    PERIODO_DIA = 'dia'
+    PERIODO_MES = 'mes'
+    PERIODO_TOTAL = 'total'
+    PERIODOS = [(PERIODO_DIA, 'Día'), (PERIODO_MES, 'Mes'), (PERIODO_TOTAL, 'Total')]
+
+    periodo = models.CharField(max_length=5, choices=PERIODOS)
+    fecha = models.DateField(blank=True, null=True) # Día, primer día del mes, o nulo para el total
+    cantidad_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    registros = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ResumenProduccionProyecto(ResumenProduccion):
+    """Producción acumulada por proyecto y período."""
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='resumenes_produccion')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['proyecto', 'periodo', 'fecha'], name='resumen_proyecto_unico'),
+            models.UniqueConstraint(
+                fields=['proyecto'], condition=models.Q(periodo='total'), name='resumen_proyecto_total_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['periodo', 'fecha'], name='resumen_proyecto_fecha_idx'),
+        ]
+
+
+class ResumenProduccionEmpleado(ResumenProduccion):
+    """Producción acumulada por empleado y período."""
+    empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE, related_name='resumenes_produccion')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['empleado', 'periodo', 'fecha'], name='resumen_empleado_unico'),
+            models.UniqueConstraint(
+                fields=['empleado'], condition=models.Q(periodo='total'), name='resumen_empleado_total_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['periodo', 'fecha'], name='resumen_empleado_fecha_idx'),
+        ]
+
+class HerramientaQuerySet(VersionadoQuerySet):
+    """Las escrituras masivas que tocan `cantidad` mueven `disponible` en el mismo UPDATE."""
+
+    def update(self, **kwargs):
+        if 'cantidad' in kwargs:
+            # En el SET, F('cantidad') es el valor anterior de la fila
+            kwargs['disponible'] = models.F('disponible') + kwargs['cantidad'] - models.F('cantidad')
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.disponible = obj.cantidad
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = [campo for campo in fields if campo != 'disponible']
+        if 'cantidad' not in fields:
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        for obj in objs:
+            obj.disponible = models.F('disponible') + obj.cantidad - models.F('cantidad')
+        filas = super().bulk_update(objs, [*fields, 'disponible'], *args, **kwargs)
+        valores = dict(self.model.objects.using(self.db).filter(pk__in=[obj.pk for obj in objs]).values_list('pk', 'disponible'))
+        for obj in objs:
+            obj.disponible = valores.get(obj.pk)
+        return filas
+
+    def recalcular_disponibilidad(self):
+        """disponible = cantidad - préstamos abiertos, en un solo UPDATE (usa prestamo_abierto_idx)."""
+        abiertos = (
+            Prestamo.objects.filter(herramienta_prestada=models.OuterRef('pk'), fecha_devolucion__isnull=True)
+            .order_by().values('herramienta_prestada').annotate(n=models.Count('id')).values('n')
+        )
+        return self.update(disponible=models.F('cantidad') - Coalesce(models.Subquery(abiertos), 0))
+
+
+class Herramienta(ModeloVersionado):
     """Representa las herramientas disponibles."""
     nombre = models.CharField(max_length=100)
     categoria = models.CharField(max_length=100, blank=True, null=True)
     cantidad = models.PositiveIntegerField(default=0) # Cantidad total disponible
+    # cantidad - préstamos abiertos; lo mantienen Prestamo (ver disponibilidad.py) y HerramientaQuerySet
+    disponible = models.PositiveIntegerField(default=0, editable=False)
     # estado puede ser CharField (ej: 'disponible', 'prestado', 'en_mantenimiento')
     estado = models.CharField(max_length=50, default='disponible')
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    objects = HerramientaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='herramienta_nombre_idx'),
+        ]
+        constraints = [
+            # Junto con el >= 0 de PositiveIntegerField: nunca más préstamos que unidades
+            models.CheckConstraint(
+                condition=models.Q(disponible__lte=models.F('cantidad')), name='herramienta_disponible_valido',
+            ),
+        ]
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if self._state.adding:
+            self.disponible = self.cantidad
+            return super().save(*args, update_fields=update_fields, **kwargs)
+        if update_fields is not None and 'cantidad' not in update_fields:
+            return super().save(*args, update_fields=[f for f in update_fields if f != 'disponible'], **kwargs)
+        if update_fields is not None:
+            update_fields = {*update_fields, 'disponible'}
+        # El contador de la instancia puede estar viejo: no se pisa, se mueve con la diferencia de cantidad
+        self.disponible = models.F('disponible') + self.cantidad - models.F('cantidad')
+        with transaction.atomic():
+            super().save(*args, update_fields=update_fields, **kwargs)
+            self.disponible = Herramienta.objects.filter(pk=self.pk).values_list('disponible', flat=True).get()
 
     def __str__(self):
-        return f"{self.nombre} ({self.cantidad} disponibles)"
+        return f"{self.nombre} ({self.disponible} de {self.cantidad} disponibles)"
 
-class ListaDeChequeo(models.Model):
+class ListaDeChequeo(ModeloVersionado):
     """Representa listas de chequeo, posiblemente asociadas a herramientas."""
     nombre = models.CharField(max_length=150)
     categoria = models.CharField(max_length=100, blank=True, null=True)
@@ -104,11 +358,17 @@ class ListaDeChequeo(models.Model):
     estado = models.CharField(max_length=50, default='activo')
     # id_herramienta es clave foránea a Herramienta
     herramienta = models.ForeignKey(Herramienta, on_delete=models.SET_NULL, null=True, blank=True, related_name='listas_chequeo') # Una lista de chequeo puede no estar asociada a una herramienta específica
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='lista_nombre_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
 
-class Verificacion(models.Model):
+class Verificacion(ModeloVersionado):
     """Representa una verificación, posiblemente de una lista de chequeo o herramienta."""
     # id_lista es clave foránea a ListaDeChequeo
     lista = models.ForeignKey(ListaDeChequeo, on_delete=models.PROTECT, related_name='verificaciones') # Proteger: no borrar una lista si tiene verificaciones
@@ -116,11 +376,17 @@ class Verificacion(models.Model):
     estado = models.CharField(max_length=50)
     observaciones = models.TextField(blank=True, null=True)
     fecha_verificacion = models.DateTimeField(auto_now_add=True) # Añadimos fecha de verificación para saber cuándo se realizó
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_verificacion', 'id'], name='verificacion_orden_idx'),
+        ]
 
     def __str__(self):
         return f"Verificación de {self.lista} - {self.estado}"
 
-class Prestamo(models.Model):
+class Prestamo(ModeloVersionado):
     """Registra el préstamo de herramientas."""
     # id_verificacion es clave foránea a Verificacion.
     # Asumimos que un préstamo requiere una verificación previa o está ligado a ella.
@@ -134,11 +400,193 @@ class Prestamo(models.Model):
     # Podrías ajustar esto si la lógica de negocio es diferente.
     empleado = models.ForeignKey(Empleado, on_delete=models.PROTECT, related_name='prestamos')
     herramienta_prestada = models.ForeignKey(Herramienta, on_delete=models.PROTECT, related_name='prestamos')
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_entrega', 'id'], name='prestamo_orden_idx'),
+            # Préstamos sin devolver por herramienta
+            models.Index(
+                fields=['herramienta_prestada'], name='prestamo_abierto_idx',
+                condition=models.Q(fecha_devolucion__isnull=True),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # La disponibilidad de la herramienta se mueve en la misma transacción
+        from .disponibilidad import aplicar_prestamo
+        with transaction.atomic():
+            anterior = None
+            if self.pk is not None:
+                anterior = Prestamo.objects.filter(pk=self.pk).values(
+                    'herramienta_prestada_id', 'fecha_devolucion'
+                ).first()
+            super().save(*args, **kwargs)
+            aplicar_prestamo(anterior, self.valores_disponibilidad())
+
+    def valores_disponibilidad(self):
+        return {'herramienta_prestada_id': self.herramienta_prestada_id, 'fecha_devolucion': self.fecha_devolucion}
 
     def __str__(self):
         return f"Préstamo de {self.herramienta_prestada} a {self.empleado} ({self.fecha_entrega})"
 
+def nuevo_id_informe():
+    # Función de módulo para que las migraciones puedan serializar el default
+    return shortuuid.uuid()
+
+class Informe(ModeloVersionado):
+    """Informe generado en segundo plano (ver reportes.py) y guardado en disco."""
+    ESTADO_PENDIENTE = 'pendiente'
+    ESTADO_PROCESANDO = 'procesando'
+    ESTADO_LISTO = 'listo'
+    ESTADO_ERROR = 'error'
+    ESTADOS = [
+        (ESTADO_PENDIENTE, 'Pendiente'), (ESTADO_PROCESANDO, 'Procesando'),
+        (ESTADO_LISTO, 'Listo'), (ESTADO_ERROR, 'Error'),
+    ]
+
+    id = models.CharField(max_length=22, primary_key=True, default=nuevo_id_informe, editable=False)
+    tipo = models.CharField(max_length=30)
+    formato = models.CharField(max_length=4, default='csv')
+    # Filtros con los que se pidió: proyecto, fecha_inicio, fecha_fin
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.SET_NULL, null=True, blank=True, related_name='informes')
+    fecha_inicio = models.DateField(blank=True, null=True)
+    fecha_fin = models.DateField(blank=True, null=True)
+    estado = models.CharField(max_length=12, choices=ESTADOS, default=ESTADO_PENDIENTE)
+    archivo = models.CharField(max_length=255, blank=True, default='') # Ruta relativa a INFORMES_DIR
+    tamano = models.PositiveBigIntegerField(default=0)
+    filas = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_fin_proceso = models.DateTimeField(blank=True, null=True)
+    # Quién lo genera (host:pid) y su latido: el worker lo refresca mientras escribe
+    proceso = models.CharField(max_length=100, blank=True, default='')
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Conteo de informes listos del dashboard
+            models.Index(fields=['estado'], name='informe_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Informe {self.tipo} ({self.estado})"
+
+class Cambio(models.Model):
+    """
+    Registro de cambios para la sincronización incremental de las tablets
+    (ver sincronizacion.py). El id es la secuencia: el token de sync guarda
+    el último id entregado. Los borrados quedan como lápidas.
+    """
+    OPERACION_GUARDADO = 'guardado'
+    OPERACION_BORRADO = 'borrado'
+    OPERACIONES = [(OPERACION_GUARDADO, 'Guardado'), (OPERACION_BORRADO, 'Borrado')]
+
+    modelo = models.CharField(max_length=50) # label_lower, p. ej. 'adminitrativo.empleado'
+    objeto_id = models.BigIntegerField()
+    operacion = models.CharField(max_length=10, choices=OPERACIONES)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Purga de cambios viejos (purgar_cambios)
+            models.Index(fields=['fecha'], name='cambio_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.operacion} {self.modelo} #{self.objeto_id}"
+
+class SensorGas(ModeloVersionado):
+    """Sensor fijo de gases en la mina. Las lecturas llegan por lotes (ver gases.py)."""
+    TIPOS = [
+        ('CH4', 'Metano (CH₄)'), ('CO', 'Monóxido de carbono (CO)'), ('CO2', 'Dióxido de carbono (CO₂)'),
+        ('H2S', 'Sulfuro de hidrógeno (H₂S)'), ('O2', 'Oxígeno (O₂)'),
+    ]
+
+    codigo = models.CharField(max_length=50, unique=True) # El que manda el equipo en cada lectura
+    tipo_gas = models.CharField(max_length=5, choices=TIPOS)
+    ubicacion = models.CharField(max_length=100, blank=True, default='') # p. ej. 'Mina Norte - Sección A'
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.SET_NULL, null=True, blank=True, related_name='sensores_gas')
+    # Umbrales propios; nulos = los de gases.LIMITES. Si la alarma es menor que la alerta (oxígeno), se alarma por debajo
+    limite_alerta = models.FloatField(blank=True, null=True)
+    limite_alarma = models.FloatField(blank=True, null=True)
+    activo = models.BooleanField(default=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['codigo', 'id'], name='sensor_gas_codigo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.codigo} ({self.tipo_gas})"
+
+
+class BloqueLecturasGas(models.Model):
+    """
+    Lecturas crudas de un sensor en un minuto, empaquetadas: por lectura los ms
+    desde el inicio del minuto (uint16) y el valor (float32), 6 bytes. Ver gases.py.
+    """
+    sensor = models.ForeignKey(SensorGas, on_delete=models.CASCADE, related_name='bloques')
+    minuto = models.DateTimeField()
+    registros = models.PositiveIntegerField(default=0)
+    datos = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sensor', 'minuto'], name='bloque_gas_unico'),
+        ]
+        indexes = [
+            # Purga del crudo viejo (purgar_gases)
+            models.Index(fields=['minuto'], name='bloque_gas_minuto_idx'),
+        ]
+
+
+class ResumenGas(models.Model):
+    """Lecturas de un sensor agregadas por minuto u hora; se suman en cada lote (gases.py)."""
+    PERIODO_MINUTO = 'minuto'
+    PERIODO_HORA = 'hora'
+    PERIODOS = [(PERIODO_MINUTO, 'Minuto'), (PERIODO_HORA, 'Hora')]
+
+    sensor = models.ForeignKey(SensorGas, on_delete=models.CASCADE, related_name='resumenes')
+    periodo = models.CharField(max_length=6, choices=PERIODOS)
+    inicio = models.DateTimeField()
+    registros = models.PositiveIntegerField(default=0)
+    suma = models.FloatField(default=0)
+    minimo = models.FloatField()
+    maximo = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sensor', 'periodo', 'inicio'], name='resumen_gas_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['periodo', 'inicio'], name='resumen_gas_inicio_idx'),
+        ]
+
+
+class AlertaGas(models.Model):
+    """Lecturas fuera de umbral de un sensor en un lote (la peor y cuántas)."""
+    NIVEL_ALERTA = 'alerta'
+    NIVEL_ALARMA = 'alarma'
+    NIVELES = [(NIVEL_ALERTA, 'Alerta'), (NIVEL_ALARMA, 'Alarma')]
+
+    sensor = models.ForeignKey(SensorGas, on_delete=models.CASCADE, related_name='alertas')
+    nivel = models.CharField(max_length=6, choices=NIVELES)
+    inicio = models.DateTimeField() # Primera lectura fuera de umbral del lote
+    valor = models.FloatField() # La peor lectura
+    limite = models.FloatField()
+    lecturas = models.PositiveIntegerField(default=1)
+    fecha_registro = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['inicio', 'id'], name='alerta_gas_orden_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nivel} {self.sensor_id}: {self.valor} ({self.inicio})"
+
 class AdminitrativoConfig(AppConfig):  # Cambiado de EmpleadosConfig a AdminitrativoConfig
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Adminitrativo'
@@ -0,0 +1,243 @@
+# Administrativo/pagination.py
+
+import base64
+import datetime
+import json
+from collections import OrderedDict
+from urllib import parse
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Como DjangoJSONEncoder pero sin recortar microsegundos (el cursor debe ser exacto)."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre el ordenamiento del queryset del ViewSet.
+
+    El cursor guarda los valores de la última fila entregada para TODAS las
+    columnas del ordenamiento (más el id como desempate), así que cada página
+    es un `WHERE (fecha, hora_entrada, id) < (...) LIMIT n` que cuesta lo mismo
+    en la página 1 que en la 10.000. Nunca se hace COUNT(*).
+
+    Los NULL se tratan como el valor más pequeño (igual que SQLite), por eso
+    se ordena con nulls_first en ascendente y nulls_last en descendente.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 500
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+
+        position, reverse = self.decode_cursor(request)
+        self.position = position
+        queryset = self.get_page_queryset(queryset, position, reverse)
+
+        # Pedimos una fila de más para saber si hay otra página sin contar.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_page_queryset(self, queryset, position=None, reverse=False):
+        """Aplica el ordenamiento keyset y el filtro de posición (sin LIMIT)."""
+        ordering = [(name, not desc) if reverse else (name, desc) for name, desc in self.ordering]
+        queryset = queryset.order_by(*[self._order_expression(name, desc) for name, desc in ordering])
+        if position is not None:
+            queryset = queryset.filter(self._after_position(ordering, position))
+        return queryset
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """Devuelve [(campo, descendente)] con el pk al final como desempate."""
+        order_by = queryset.query.order_by or queryset.model._meta.ordering
+        if not order_by:
+            raise ImproperlyConfigured(
+                f'{self.__class__.__name__} necesita un queryset ordenado ({queryset.model.__name__}).'
+            )
+        ordering = []
+        for item in order_by:
+            if not isinstance(item, str) or '__' in item or item.startswith('?'):
+                raise ImproperlyConfigured(
+                    f'{self.__class__.__name__} solo admite ordenamientos por campos propios, no {item!r}.'
+                )
+            desc = item.startswith('-')
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = queryset.model._meta.pk.name
+            ordering.append((name, desc))
+
+        pk_name = queryset.model._meta.pk.name
+        if pk_name not in [name for name, _ in ordering]:
+            ordering.append((pk_name, ordering[-1][1]))
+        return ordering
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._row_position(self.page[-1]) if self.page else self.position
+        return self.encode_cursor(position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._row_position(self.page[0]) if self.page else self.position
+        return self.encode_cursor(position, reverse=True)
+
+    def _row_position(self, row):
+        # Las filas pueden ser instancias o dicts de .values() (listados.py)
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.ordering]
+        return [getattr(row, name) for name, _ in self.ordering]
+
+    # --- Cursor ---
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, cls=CursorEncoder, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            raw = base64.urlsafe_b64decode(parse.unquote(encoded).encode('ascii'))
+            payload = json.loads(raw)
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                None if value is None else self.model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError, FieldDoesNotExist):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get('r'))
+
+    # --- Construcción de la consulta ---
+
+    def _order_expression(self, name, desc):
+        if desc:
+            return F(name).desc(nulls_last=True)
+        return F(name).asc(nulls_first=True)
+
+    def _after_position(self, ordering, position):
+        """
+        Construye `(a, b, c) > (x, y, z)` respetando la dirección de cada columna:
+        a "después" de x  OR  (a = x AND b "después" de y)  OR  ...
+
+        Se añade además una cota redundante sobre la primera columna (`fecha <= x`)
+        porque SQLite no sabe buscar en el índice con el OR expandido; con la
+        cota hace un SEARCH por rango en vez de recorrer el índice desde el inicio.
+        """
+        condition = Q(pk__in=[])
+        equal_prefix = Q()
+        for (name, desc), value in zip(ordering, position):
+            condition |= equal_prefix & self._after_value(name, desc, value)
+            if value is None:
+                equal_prefix &= Q(**{f'{name}__isnull': True})
+            else:
+                equal_prefix &= Q(**{name: value})
+        return self._leading_bound(*ordering[0], position[0]) & condition
+
+    def _leading_bound(self, name, desc, value):
+        nullable = self.model._meta.get_field(name).null
+        if value is None:
+            return Q(**{f'{name}__isnull': True}) if desc else Q()
+        if desc:
+            bound = Q(**{f'{name}__lte': value})
+            if nullable:
+                bound |= Q(**{f'{name}__isnull': True})
+            return bound
+        return Q(**{f'{name}__gte': value})
+
+    def _after_value(self, name, desc, value):
+        nullable = self.model._meta.get_field(name).null
+        if desc:
+            if value is None:
+                return Q(pk__in=[])  # NULL es lo último en descendente
+            after = Q(**{f'{name}__lt': value})
+            if nullable:
+                after |= Q(**{f'{name}__isnull': True})
+            return after
+        if value is None:
+            return Q(**{f'{name}__isnull': False})
+        return Q(**{f'{name}__gt': value})
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor de paginación devuelto en next/previous.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Número de resultados por página (máximo {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -0,0 +1,225 @@
+# Administrativo/presencia.py
+
+"""
+Quién está adentro, por proyecto y lugar de trabajo (llamado a lista de
+emergencia y conteo en la sala de control).
+
+Sacarlo del log es recorrer ControlDeIngreso buscando ingresos sin salida de
+todas las fechas, y además cuenta dos veces a quien olvidó marcar la salida
+de un turno viejo. En cambio, la tabla `Presencia` tiene una fila por
+empleado adentro: la de su último ingreso (por fecha, hora de entrada e id)
+si sigue sin salida. Se mantiene en la misma transacción que el registro:
+
+- ControlDeIngreso.save() (el check-in en línea y la API);
+- `escritura_masiva` de ControlDeIngreso (los lotes de ingesta.py).
+
+Los borrados (post_delete, signals.py) llegan de a uno por registro: borrar
+un proyecto son miles. Ahí los empleados se juntan por transacción y se
+recalculan una sola vez al hacer commit (`recalcular_al_confirmar`).
+
+Cada actualización recalcula solo a los empleados tocados, con el índice de
+ingresos abiertos por empleado, y escribe la diferencia. `recalcular()` sin
+empleados la reconstruye entera desde el log (manage.py reconciliar_presencia,
+p. ej. después de restaurar meses del archivo o de SQL a mano).
+
+Encima hay una copia en memoria (`indice`) con nombres y cédulas, agrupada
+por (proyecto, lugar de trabajo): el conteo y la lista salen sin consultas.
+Se actualiza al hacer commit y, como el índice de huellas, se recarga entera
+si pasan más de PRESENCIA_RECARGA_SEGUNDOS, para recoger lo que escriben
+otros workers.
+"""
+
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Exists, F, OuterRef, Q
+
+from .models import ControlDeIngreso, Presencia
+from .versiones import subir_version
+
+RECARGA_SEGUNDOS = getattr(settings, 'PRESENCIA_RECARGA_SEGUNDOS', 60)
+# Lo que se compara entre Presencia y el log
+CAMPOS = ['registro_id', 'proyecto_id', 'lugar_trabajo', 'fecha', 'hora_entrada']
+# Lo que va en memoria, además
+DETALLE = ['proyecto__nombre', 'empleado__nombres', 'empleado__cedula']
+
+Presente = namedtuple(
+    'Presente', 'empleado registro proyecto proyecto_nombre lugar_trabajo nombres cedula fecha hora_entrada',
+)
+
+
+def ultimos_abiertos(empleados=None, using=None):
+    """Ingresos sin salida que son el último de su empleado (de `empleados`, o de todos)."""
+    posteriores = ControlDeIngreso.objects.using(using).filter(
+        Q(fecha__gt=OuterRef('fecha'))
+        | Q(fecha=OuterRef('fecha'), hora_entrada__gt=OuterRef('hora_entrada'))
+        | Q(fecha=OuterRef('fecha'), hora_entrada=OuterRef('hora_entrada'), pk__gt=OuterRef('pk')),
+        empleado_id=OuterRef('empleado_id'), hora_entrada__isnull=False,
+    )
+    abiertos = ControlDeIngreso.objects.using(using).filter(hora_entrada__isnull=False, hora_salida__isnull=True)
+    if empleados is not None:
+        abiertos = abiertos.filter(empleado_id__in=empleados)
+    return abiertos.filter(~Exists(posteriores))
+
+
+def _clave(presente):
+    # Los mismos valores que CAMPOS, para comparar con la tabla
+    return presente.registro, presente.proyecto, presente.lugar_trabajo, presente.fecha, presente.hora_entrada
+
+
+def _presente(fila):
+    return Presente(
+        fila['empleado_id'], fila['registro_id'], fila['proyecto_id'], fila['proyecto__nombre'],
+        fila['lugar_trabajo'] or '', fila['empleado__nombres'], fila['empleado__cedula'], fila['fecha'],
+        fila['hora_entrada'],
+    )
+
+
+def recalcular(empleados=None, registros=(), using=None):
+    """
+    Deja Presencia igual al log para `empleados` (todos si es None) y para
+    quienes hoy apuntan a alguno de `registros`. Va dentro de la transacción
+    de la escritura. Devuelve {'entraron', 'salieron', 'movidos', 'adentro'}.
+    """
+    actuales = Presencia.objects.using(using)
+    if empleados is not None:
+        actuales = actuales.filter(Q(empleado_id__in=empleados) | Q(registro_id__in=registros))
+    actuales = {fila[0]: fila[1:] for fila in actuales.values_list('empleado_id', *CAMPOS)}
+    if empleados is not None:
+        empleados = {*empleados, *actuales}
+    deseados = {
+        fila['empleado_id']: _presente(fila)
+        for fila in ultimos_abiertos(empleados, using).values('empleado_id', *CAMPOS[1:], *DETALLE, registro_id=F('id'))
+    }
+
+    salieron = [empleado for empleado in actuales if empleado not in deseados]
+    cambiados = {
+        empleado: presente for empleado, presente in deseados.items()
+        if actuales.get(empleado) != _clave(presente)
+    }
+    resumen = {
+        'entraron': sum(empleado not in actuales for empleado in cambiados), 'salieron': len(salieron),
+        'movidos': sum(empleado in actuales for empleado in cambiados), 'adentro': None,
+    }
+    if salieron or cambiados:
+        # Borrar y volver a insertar: un registro puede pasar de un empleado a otro (registro es único)
+        viejas = Presencia.objects.using(using).filter(empleado_id__in=[*salieron, *cambiados])
+        viejas._raw_delete(viejas.db)
+        Presencia.objects.using(using).bulk_create([
+            Presencia(
+                empleado_id=p.empleado, registro_id=p.registro, proyecto_id=p.proyecto,
+                lugar_trabajo=p.lugar_trabajo, fecha=p.fecha, hora_entrada=p.hora_entrada,
+            )
+            for p in cambiados.values()
+        ], batch_size=500)
+        subir_version(Presencia)
+        if indice.cargado_en is not None:
+            cambios = {**dict.fromkeys(salieron), **cambiados}
+            transaction.on_commit(lambda: indice.aplicar(cambios), using=using)
+    if empleados is None:
+        resumen['adentro'] = len(deseados)
+    return resumen
+
+
+def actualizar(registros, empleados=None, using=None):
+    """Después de escribir `registros` (ids de ControlDeIngreso), en la misma transacción."""
+    if empleados is None:
+        empleados = ControlDeIngreso.objects.using(using).filter(pk__in=registros).values_list('empleado_id', flat=True)
+    return recalcular(set(empleados), list(registros), using)
+
+
+def recalcular_al_confirmar(empleados, using=None):
+    """Junta `empleados` con los de la transacción en curso y los recalcula una vez al hacer commit."""
+    using = using or DEFAULT_DB_ALIAS
+    conexion = connections[using]
+    if not conexion.in_atomic_block:
+        with transaction.atomic(using=using):
+            recalcular(set(empleados), using=using)
+        return
+    lista, pendientes = getattr(conexion, 'presencia_pendientes', (None, None))
+    # Django cambia run_on_commit por otra lista en cada commit o rollback, y el
+    # callback suelta su conjunto al correr: en cualquiera de los dos casos se empieza otro
+    if lista is not conexion.run_on_commit or pendientes is None:
+        pendientes = set()
+        transaction.on_commit(lambda: _recalcular_pendientes(pendientes, using), using=using)
+        conexion.presencia_pendientes = (conexion.run_on_commit, pendientes)
+    pendientes.update(empleados)
+
+
+def _recalcular_pendientes(empleados, using):
+    conexion = connections[using]
+    if getattr(conexion, 'presencia_pendientes', (None, None))[1] is empleados:
+        conexion.presencia_pendientes = (None, None)
+    with transaction.atomic(using=using):
+        recalcular(empleados, using=using)
+
+
+class IndicePresencia:
+    """Copia en memoria de Presencia con nombres, agrupada por (proyecto, lugar de trabajo)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._presentes = {}  # empleado_id -> Presente
+        self._lugares = defaultdict(set)  # (proyecto_id, lugar_trabajo) -> empleado_ids
+        self.cargado_en = None
+
+    def __len__(self):
+        return len(self._presentes)
+
+    def cargar(self):
+        filas = Presencia.objects.values('empleado_id', *CAMPOS, *DETALLE)
+        presentes = {fila['empleado_id']: _presente(fila) for fila in filas}
+        with self._lock:
+            self._presentes = {}
+            self._lugares = defaultdict(set)
+            self._poner(presentes)
+            self.cargado_en = time.monotonic()
+
+    def asegurar_cargado(self):
+        vencido = self.cargado_en is None or time.monotonic() - self.cargado_en > RECARGA_SEGUNDOS
+        if vencido:
+            self.cargar()
+
+    def vencer(self):
+        self.cargado_en = None
+
+    def _poner(self, cambios):
+        for empleado, presente in cambios.items():
+            anterior = self._presentes.pop(empleado, None)
+            if anterior is not None:
+                lugar = (anterior.proyecto, anterior.lugar_trabajo)
+                self._lugares[lugar].discard(empleado)
+                if not self._lugares[lugar]:
+                    del self._lugares[lugar]
+            if presente is not None:
+                self._presentes[empleado] = presente
+                self._lugares[presente.proyecto, presente.lugar_trabajo].add(empleado)
+
+    def aplicar(self, cambios):
+        """{empleado_id: Presente, o None si salió} (al hacer commit)."""
+        with self._lock:
+            self._poner(cambios)
+
+    def quitar(self, empleado, registro):
+        """Saca al empleado si sigue con ese registro (la fila se borró en cascada)."""
+        with self._lock:
+            presente = self._presentes.get(empleado)
+            if presente is not None and presente.registro == registro:
+                self._poner({empleado: None})
+
+    def lugares(self, proyecto=None, lugar_trabajo=None):
+        """[(Presentes del lugar)] por proyecto y lugar, ordenados por nombre."""
+        with self._lock:
+            grupos = [
+                [self._presentes[empleado] for empleado in empleados]
+                for (proyecto_id, lugar), empleados in self._lugares.items()
+                if (proyecto is None or proyecto_id == proyecto) and (lugar_trabajo is None or lugar == lugar_trabajo)
+            ]
+        grupos = [sorted(grupo, key=lambda p: (p.nombres, p.empleado)) for grupo in grupos]
+        return sorted(grupos, key=lambda grupo: (grupo[0].proyecto_nombre, grupo[0].proyecto, grupo[0].lugar_trabajo))
+
+
+indice = IndicePresencia()
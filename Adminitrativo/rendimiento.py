@@ -0,0 +1,328 @@
+# Administrativo/rendimiento.py
+
+"""
+Benchmark de la API (manage.py benchmark_api), pensado para correr sobre una
+base llenada con generar_datos (sintetico.py).
+
+Recorre todos los endpoints del router (listado, detalle, acciones propias,
+`?search=`, `?expand=` y la misma petición con If-None-Match) y todas las vistas propias,
+con el test Client de Django en el mismo proceso, y mide por endpoint:
+
+- latencia p50 / p95 / p99 (y media y máximo) en milisegundos,
+- consultas SQL de una petición,
+- pico de memoria de Python (tracemalloc) de una petición,
+- código de estado y bytes de la respuesta.
+
+Las consultas y la memoria se miden en una pasada aparte, después de las
+repeticiones con reloj: tracemalloc y CaptureQueriesContext hacen más lenta
+cada petición. Por defecto el caché de respuestas queda como lo ven los
+clientes (la primera petición lo llena, las demás aciertan); con `frio=True`
+se vacía antes de cada petición.
+
+Los endpoints que escriben (POST) se corren dentro de una transacción que se
+deshace, así la base queda igual entre corridas. El resultado es un JSON
+ordenado y estable, para comparar con `comparar()` contra una línea base y
+para diff.
+"""
+
+import csv
+import datetime
+import io
+import json
+import platform
+import sqlite3
+import time
+import tracemalloc
+from collections import namedtuple
+
+import django
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import Client
+from django.test.client import BOUNDARY, encode_multipart
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from . import reportes, sincronizacion, urls
+from .busqueda import BusquedaMixin
+from .models import ControlDeIngreso, Empleado, Informe, Proyecto, ResumenGas, SensorGas
+from .sintetico import MODELOS
+from .urls import router
+from .views import ExpandableViewSetMixin
+
+FORMATO = 1
+USUARIO = 'benchmark'
+LOTE = 200  # eventos del caso de /control-ingresos/lote/
+# Sin caso a propósito: el stream SSE no termina (se prueba en EventosIngresosTests)
+SIN_MEDIR = {'api-root', 'controlingreso-eventos'}
+# Texto de ?search= por basename del router (que encuentre algo en los datos de sintetico.py)
+BUSQUEDAS = {'empleado': 'gomez', 'proyecto': 'mina', 'controlingreso': 'transporte'}
+# El detalle de estos modelos usa una fila que tenga el dato pesado
+FILTROS_DETALLE = {Empleado: ~Q(huella_hash='')}
+
+Caso = namedtuple('Caso', ['nombre', 'vista', 'metodo', 'ruta', 'datos', 'content_type', 'cabeceras', 'escribe'])
+
+
+def caso(nombre, vista, ruta, metodo='get', datos=None, content_type='application/json', cabeceras=None,
+         escribe=False):
+    if content_type == 'application/json' and datos is not None:
+        datos = json.dumps(datos)
+    return Caso(nombre, vista, metodo, ruta, datos, content_type, cabeceras or {}, escribe)
+
+
+def _pk(modelo):
+    consulta = modelo._base_manager.order_by('-pk')
+    return (
+        consulta.filter(FILTROS_DETALLE.get(modelo, Q())).values_list('pk', flat=True).first()
+        or consulta.values_list('pk', flat=True).first()
+    )
+
+
+def casos_router():
+    casos = []
+    for prefijo, viewset, basename in router.registry:
+        modelo = viewset.queryset.model
+        lista = reverse(f'{basename}-list')
+        casos.append(caso(f'{prefijo} listado', f'{basename}-list', lista))
+        if issubclass(viewset, BusquedaMixin) and basename in BUSQUEDAS:
+            casos.append(caso(f'{prefijo} ?search=', f'{basename}-list', f'{lista}?search={BUSQUEDAS[basename]}'))
+        relaciones = []
+        if issubclass(viewset, ExpandableViewSetMixin):
+            relaciones = list(viewset.serializer_class.expandable_fields())
+        if relaciones:
+            casos.append(caso(f'{prefijo} ?expand=', f'{basename}-list', f"{lista}?expand={','.join(relaciones)}"))
+        pk = _pk(modelo)
+        if pk is not None:
+            casos.append(caso(f'{prefijo} detalle', f'{basename}-detail', reverse(f'{basename}-detail', args=[pk])))
+        for accion in viewset.get_extra_actions():
+            if 'get' not in accion.mapping or (accion.detail and pk is None):
+                continue
+            vista = f'{basename}-{accion.url_name}'
+            ruta = reverse(vista, args=[pk] if accion.detail else [])
+            casos.append(caso(f'{prefijo} {accion.url_path}', vista, ruta))
+    return casos
+
+
+def casos_vistas(informe=None):
+    """Las vistas que no son del router. `informe`: uno ya generado para estado y descarga."""
+    casos = [
+        caso('dashboard stats', 'dashboard-stats', reverse('dashboard-stats')),
+        caso('dashboard producción por proyecto', 'dashboard-production-by-project',
+             reverse('dashboard-production-by-project')),
+        caso('asistencia mes', 'asistencia', reverse('asistencia')),
+        caso('caché estadísticas', 'cache-estadisticas', reverse('cache-estadisticas')),
+        caso('métricas', 'metricas', reverse('metricas')),
+        caso('huellas estadísticas', 'huellas-estadisticas', reverse('huellas-estadisticas')),
+        caso('presencia', 'presencia', reverse('presencia')),
+        caso('sync sin token', 'sync', reverse('sync')),
+        caso('sync desde el inicio', 'sync', f"{reverse('sync')}?token={sincronizacion.generar_token(0)}"),
+    ]
+    # Un empleado activo con huella (el índice de huellas solo tiene activos)
+    activos = Empleado.objects.filter(estado='activo').order_by('-pk').values('cedula', 'huella')
+    empleado = activos.exclude(huella_hash='').first() or activos.first()
+    if empleado:
+        casos.append(caso('empleado por cédula', 'empleado-por-cedula',
+                          reverse('empleado-por-cedula', args=[empleado['cedula']])))
+    if empleado and empleado['huella']:
+        casos.append(caso(
+            'huellas identificar', 'huellas-identificar', reverse('huellas-identificar'), metodo='post',
+            datos=bytes(empleado['huella']), content_type='application/octet-stream',
+        ))
+    if informe is not None:
+        casos.append(caso('informe estado', 'report-status', reverse('report-status', args=[informe.pk])))
+        descarga = reverse('report-download', args=[informe.pk])
+        casos.append(caso('informe descarga', 'report-download', descarga))
+        casos.append(caso('informe descarga con Range', 'report-download', descarga,
+                          cabeceras={'Range': 'bytes=0-65535'}))
+
+    # Escrituras (se deshacen): entradas de empleados activos que no están adentro
+    libres = list(
+        Empleado.objects.filter(estado='activo')
+        .exclude(pk__in=ControlDeIngreso.objects.filter(hora_salida__isnull=True).values('empleado_id'))
+        .order_by('-pk').values_list('pk', flat=True)[:LOTE]
+    )
+    proyecto = Proyecto.objects.order_by('-pk').values_list('pk', flat=True).first()
+    if libres and proyecto:
+        entrada = {'tipo': 'entrada', 'proyecto': proyecto, 'fecha': timezone.localdate().isoformat(),
+                   'hora_entrada': '06:00', 'estado_salud': 'ok'}
+        casos.append(caso('ingreso registrar', 'controlingreso-registrar', reverse('controlingreso-registrar'),
+                          metodo='post', datos={**entrada, 'empleado': libres[0]}, escribe=True))
+        casos.append(caso('ingresos lote', 'controlingreso-lote', reverse('controlingreso-lote'),
+                          metodo='post', datos=[{**entrada, 'empleado': pk} for pk in libres], escribe=True))
+    # Nómina de RR. HH. con los últimos LOTE empleados tal cual: todo el upsert actualiza
+    nomina = Empleado.objects.order_by('-pk').values_list('cedula', 'nombres', 'cargo__nombre_cargo', 'estado')[:LOTE]
+    if nomina:
+        texto = io.StringIO()
+        csv.writer(texto).writerows([('cedula', 'nombres', 'cargo', 'estado'), *nomina])
+        archivo = ContentFile(texto.getvalue().encode(), name='nomina.csv')
+        # Ya codificado: el content_type no es MULTIPART_CONTENT para que el Client no lo vuelva a codificar
+        casos.append(caso('empleados importar', 'empleado-importar', reverse('empleado-importar'), metodo='post',
+                          datos=encode_multipart(BOUNDARY, {'archivo': archivo}),
+                          content_type=f'multipart/form-data; boundary={BOUNDARY}', escribe=True))
+    # Serie de un día entero con lo último que hay, y diez minutos de lecturas de todos los sensores
+    ultimo = ResumenGas.objects.filter(periodo=ResumenGas.PERIODO_HORA).order_by('-inicio').first()
+    if ultimo:
+        hasta = ultimo.inicio + datetime.timedelta(hours=1)
+        rango = urlencode({'desde': (hasta - datetime.timedelta(days=1)).isoformat(), 'hasta': hasta.isoformat()})
+        casos.append(caso('sensores-gas serie 24 h', 'sensorgas-serie',
+                          f"{reverse('sensorgas-serie', args=[ultimo.sensor_id])}?{rango}"))
+    codigos = list(SensorGas.objects.order_by('pk').values_list('codigo', flat=True))
+    if codigos:
+        ahora = time.time()
+        lecturas = [
+            {'sensor': codigo, 't': ahora - segundos, 'valor': 0.3} for segundos in range(600, 0, -10) for codigo in codigos
+        ]
+        casos.append(caso('sensores-gas lecturas', 'sensorgas-lecturas', reverse('sensorgas-lecturas'), metodo='post',
+                          datos=lecturas, escribe=True))
+    casos.append(caso('informe generar', 'report-generate', reverse('report-generate'), metodo='post',
+                      datos={'reportType': 'employee_list', 'format': 'csv'}, escribe=True))
+    return casos
+
+
+def sin_caso(casos):
+    """Nombres de URL de la app sin ningún caso (endpoints nuevos que nadie está midiendo)."""
+    nombres = {patron.name for patron in [*urls.urlpatterns, *router.urls] if getattr(patron, 'name', None)}
+    return sorted(nombres - {c.vista for c in casos} - SIN_MEDIR)
+
+
+def _pedir(cliente, caso):
+    """Hace la petición y lee todo el cuerpo. Devuelve (response, bytes)."""
+    if caso.metodo == 'get':
+        response = cliente.get(caso.ruta, headers=caso.cabeceras)
+    elif caso.escribe:
+        with transaction.atomic():
+            response = cliente.post(caso.ruta, caso.datos, content_type=caso.content_type, headers=caso.cabeceras)
+            transaction.set_rollback(True)
+    else:
+        response = cliente.post(caso.ruta, caso.datos, content_type=caso.content_type, headers=caso.cabeceras)
+    contenido = b''.join(response.streaming_content) if response.streaming else response.content
+    return response, len(contenido)
+
+
+def medir(cliente, caso, repeticiones=30, calentamiento=3, frio=False):
+    """Resultado de un caso (dict) y la última respuesta."""
+    tiempos = []
+    for i in range(calentamiento + repeticiones):
+        if frio:
+            cache.clear()
+        inicio = time.perf_counter()
+        response, tamano = _pedir(cliente, caso)
+        if i >= calentamiento:
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    # Consultas y memoria en una pasada aparte, para no inflar los tiempos
+    if frio:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as consultas:
+            _pedir(cliente, caso)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(tiempos, [50, 95, 99]).tolist()
+    return {
+        'metodo': caso.metodo.upper(), 'ruta': caso.ruta, 'estado': response.status_code, 'bytes': tamano,
+        'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3),
+        'media_ms': round(sum(tiempos) / len(tiempos), 3), 'max_ms': round(max(tiempos), 3),
+        'consultas': len(consultas), 'memoria_pico_kb': round(pico / 1024, 1),
+    }, response
+
+
+def _informe():
+    informe = Informe.objects.create(tipo='employee_list', formato='csv')
+    reportes.generar(informe.pk)
+    informe.refresh_from_db()
+    return informe
+
+
+def correr(repeticiones=30, calentamiento=3, frio=False, solo=None, avisar=None):
+    """
+    Mide todos los casos (o los que contengan alguno de los textos de `solo`).
+    Devuelve el dict que se guarda como JSON. `avisar(nombre, resultado)` por cada caso.
+    """
+    if repeticiones < 2:
+        raise ValueError('Hacen falta al menos 2 repeticiones.')
+    usuario, _ = get_user_model().objects.get_or_create(username=USUARIO)
+    cliente = Client()
+    cliente.force_login(usuario)
+    informe = _informe()
+    resultados = {}
+    try:
+        casos = casos_router() + casos_vistas(informe)
+        faltan = sin_caso(casos)
+        if solo:
+            casos = [c for c in casos if any(texto in c.nombre for texto in solo)]
+        # Primero las lecturas: las escrituras suben las versiones del caché
+        casos.sort(key=lambda c: c.escribe)
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for c in casos:
+                resultado, response = medir(cliente, c, repeticiones, calentamiento, frio)
+                resultados[c.nombre] = resultado
+                if avisar:
+                    avisar(c.nombre, resultado)
+                etag = response.get('ETag')
+                if c.metodo == 'get' and response.status_code == 200 and etag and not frio:
+                    condicional = c._replace(
+                        nombre=f'{c.nombre} (If-None-Match)', cabeceras={**c.cabeceras, 'If-None-Match': etag},
+                    )
+                    resultados[condicional.nombre], _ = medir(cliente, condicional, repeticiones, calentamiento)
+                    if avisar:
+                        avisar(condicional.nombre, resultados[condicional.nombre])
+    finally:
+        reportes.ruta(informe).unlink(missing_ok=True)
+        informe.delete()
+
+    return {
+        'formato': FORMATO,
+        'fecha': timezone.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(), 'django': django.get_version(), 'sqlite': sqlite3.sqlite_version,
+            'base': str(connection.settings_dict['NAME']),
+        },
+        'filas': {modelo.__name__: modelo._base_manager.count() for modelo in MODELOS},
+        'parametros': {'repeticiones': repeticiones, 'calentamiento': calentamiento, 'frio': frio},
+        'sin_caso': faltan,
+        'endpoints': resultados,
+    }
+
+
+def guardar(resultado, ruta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2, sort_keys=True)
+        archivo.write('\n')
+
+
+def cargar(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def comparar(actual, base, tolerancia=0.2, piso_ms=1.0, piso_kb=64):
+    """
+    Regresiones de `actual` contra `base`: [(endpoint, métrica, antes, ahora)].
+    Latencia y memoria cuentan si suben más de `tolerancia` (fracción) y más
+    del piso absoluto (ruido); las consultas y el código de estado, con cualquier cambio.
+    """
+    regresiones = []
+    anteriores = base.get('endpoints', {})
+    for nombre, ahora in sorted(actual['endpoints'].items()):
+        antes = anteriores.get(nombre)
+        if antes is None:
+            continue
+        for metrica, piso in (('p50_ms', piso_ms), ('p95_ms', piso_ms), ('memoria_pico_kb', piso_kb)):
+            if ahora[metrica] > antes[metrica] * (1 + tolerancia) and ahora[metrica] - antes[metrica] > piso:
+                regresiones.append((nombre, metrica, antes[metrica], ahora[metrica]))
+        if ahora['consultas'] > antes['consultas']:
+            regresiones.append((nombre, 'consultas', antes['consultas'], ahora['consultas']))
+        if ahora['estado'] != antes['estado']:
+            regresiones.append((nombre, 'estado', antes['estado'], ahora['estado']))
+    return regresiones
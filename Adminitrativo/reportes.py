@@ -0,0 +1,283 @@
+# Administrativo/reportes.py
+
+"""
+Generación de informes (CSV / XLSX) fuera del hilo de la petición.
+
+ReportGeneratorView crea un `Informe` en estado 'pendiente' y, al hacer commit,
+lo encola en un pool de hilos del proceso. El trabajo recorre la consulta con
+`values_list(...).iterator(chunk_size=...)` y va escribiendo fila por fila:
+nunca hay más de un bloque en memoria, así que un año de ControlDeIngreso se
+exporta con memoria constante. El XLSX usa el modo write_only de openpyxl,
+que también escribe en streaming.
+
+El archivo se escribe como `<id>.<formato>.part` y se renombra al terminar,
+de modo que la descarga nunca ve un archivo a medias.
+
+El pool es del proceso: si el proceso se reinicia, sus informes quedan en
+'pendiente' o 'procesando'. Mientras escribe, el worker guarda quién es
+(`proceso`) y refresca cada INFORMES_LATIDO_SEGUNDOS el `fecha_actualizacion`
+de los informes que tiene en su pool. Al consultar uno sin terminar cuyo
+latido tiene más de INFORMES_VENCIMIENTO_SEGUNDOS, cualquier worker lo marca
+con error para que el cliente deje de esperar y lo vuelva a pedir; si aun así
+el dueño termina, ya no lo pasa a 'listo'.
+"""
+
+import csv
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .archivo import historico
+from .models import ControlDeIngreso, Empleado, Informe, Prestamo, Produccion
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# tipo -> (nombre legible, modelo, campo de fecha, campo de proyecto, orden, columnas)
+# columnas: [(encabezado, ruta para values_list)]
+TIPOS = {
+    'attendance': (
+        'Ingreso y salida', ControlDeIngreso, 'fecha', 'proyecto', ['fecha', 'hora_entrada', 'id'], [
+            ('ID', 'id'), ('Fecha', 'fecha'), ('Hora entrada', 'hora_entrada'), ('Hora salida', 'hora_salida'),
+            ('Cédula', 'empleado__cedula'), ('Empleado', 'empleado__nombres'), ('Proyecto', 'proyecto__nombre'),
+            ('Lugar de trabajo', 'lugar_trabajo'), ('Estado de salud', 'estado_salud'), ('Estado', 'estado'),
+            ('Observación', 'observacion'),
+        ],
+    ),
+    'production': (
+        'Producción', Produccion, 'fecha', 'proyecto', ['fecha', 'id'], [
+            ('ID', 'id'), ('Fecha', 'fecha'), ('Proyecto', 'proyecto__nombre'), ('Cédula', 'empleado__cedula'),
+            ('Empleado', 'empleado__nombres'), ('Cantidad producida', 'cantidad_producida'),
+        ],
+    ),
+    'tool_loans': (
+        'Préstamo de herramientas', Prestamo, 'fecha_entrega', None, ['fecha_entrega', 'id'], [
+            ('ID', 'id'), ('Fecha entrega', 'fecha_entrega'), ('Fecha devolución', 'fecha_devolucion'),
+            ('Herramienta', 'herramienta_prestada__nombre'), ('Cédula', 'empleado__cedula'),
+            ('Empleado', 'empleado__nombres'), ('Verificación', 'verificacion__estado'),
+        ],
+    ),
+    'employee_list': (
+        'Empleados', Empleado, 'fecha_registro', None, ['nombres', 'id'], [
+            ('ID', 'id'), ('Cédula', 'cedula'), ('Nombres', 'nombres'), ('Cargo', 'cargo__nombre_cargo'),
+            ('Estado', 'estado'), ('Fecha de registro', 'fecha_registro'),
+        ],
+    ),
+}
+# Nombres que usa el frontend (Reports.tsx)
+ALIAS = {'personnel': 'attendance', 'project': 'employee_list', 'tools': 'tool_loans'}
+
+VENCIMIENTO_SEGUNDOS = getattr(settings, 'INFORMES_VENCIMIENTO_SEGUNDOS', 900)
+LATIDO_SEGUNDOS = getattr(settings, 'INFORMES_LATIDO_SEGUNDOS', 60)
+SIN_TERMINAR = [Informe.ESTADO_PENDIENTE, Informe.ESTADO_PROCESANDO]
+
+_pool = None
+_pool_lock = threading.Lock()
+_en_curso = set()  # ids encolados en el pool de este proceso
+
+
+class ErrorInforme(Exception):
+    pass
+
+
+def tipo_canonico(tipo):
+    tipo = ALIAS.get(tipo, tipo)
+    if tipo not in TIPOS:
+        raise ErrorInforme(f"Tipo de informe desconocido: {tipo!r}. Opciones: {', '.join(sorted(TIPOS))}.")
+    return tipo
+
+
+def directorio():
+    return Path(getattr(settings, 'INFORMES_DIR', Path(settings.BASE_DIR) / 'informes'))
+
+
+def proceso():
+    # Se calcula cada vez: los workers pueden salir de un fork después de importar
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def ruta(informe):
+    return directorio() / informe.archivo
+
+
+def nombre(informe):
+    titulo = TIPOS[informe.tipo][0]
+    alcance = informe.proyecto.nombre if informe.proyecto_id else 'Todos'
+    return f"Informe de {titulo} ({alcance})"
+
+
+def filas(informe):
+    """Encabezado + generador de tuplas, leyendo la base de datos por bloques."""
+    _, modelo, campo_fecha, campo_proyecto, orden, columnas = TIPOS[informe.tipo]
+    # Ingresos y producción incluyen los meses archivados (archivo.py)
+    consulta = historico(modelo.objects.all())
+    if informe.proyecto_id:
+        if campo_proyecto is None:
+            # Empleados con algún ingreso en el proyecto
+            campo = 'id' if modelo is Empleado else 'empleado_id'
+            ids = ControlDeIngreso.objects.historico().filter(proyecto_id=informe.proyecto_id).values('empleado_id')
+            consulta = consulta.filter(**{f'{campo}__in': ids})
+        else:
+            consulta = consulta.filter(**{f'{campo_proyecto}_id': informe.proyecto_id})
+    if informe.fecha_inicio:
+        consulta = consulta.filter(**{f'{campo_fecha}__gte': informe.fecha_inicio})
+    if informe.fecha_fin:
+        consulta = consulta.filter(**{f'{campo_fecha}__lte': informe.fecha_fin})
+    consulta = consulta.order_by(*orden).values_list(*[camino for _, camino in columnas])
+    return [encabezado for encabezado, _ in columnas], consulta.iterator(chunk_size=CHUNK_SIZE)
+
+
+def escribir_csv(destino, encabezado, datos):
+    n = 0
+    # utf-8-sig para que Excel reconozca los acentos
+    with open(destino, 'w', newline='', encoding='utf-8-sig') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(encabezado)
+        for fila in datos:
+            escritor.writerow(fila)
+            n += 1
+    return n
+
+
+def escribir_xlsx(destino, encabezado, datos):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ErrorInforme('El formato xlsx requiere openpyxl (pip install openpyxl).')
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Informe')
+    hoja.append(encabezado)
+    n = 0
+    for fila in datos:
+        hoja.append(list(fila))
+        n += 1
+    libro.save(destino)
+    return n
+
+
+ESCRITORES = {'csv': escribir_csv, 'xlsx': escribir_xlsx}
+
+
+def _latir(informe_id):
+    """Refresca el latido de lo que tiene este proceso. Falla si a `informe_id` ya lo dieron por perdido."""
+    with _pool_lock:
+        ids = _en_curso | {informe_id}
+    Informe.objects.filter(pk__in=ids, estado__in=SIN_TERMINAR).update(fecha_actualizacion=timezone.now())
+    if not Informe.objects.filter(pk=informe_id, estado=Informe.ESTADO_PROCESANDO).exists():
+        raise ErrorInforme('Otro worker dio el informe por perdido.')
+
+
+def _con_latido(informe_id, datos):
+    siguiente = time.monotonic() + LATIDO_SEGUNDOS
+    for fila in datos:
+        if time.monotonic() >= siguiente:
+            _latir(informe_id)
+            siguiente = time.monotonic() + LATIDO_SEGUNDOS
+        yield fila
+
+
+def generar(informe_id):
+    """Genera el archivo de un informe. Se ejecuta en el pool (o en línea con INFORMES_SINCRONO)."""
+    informe = Informe.objects.select_related('proyecto').get(pk=informe_id)
+    # Si mientras esperaba en la cola lo dieron por perdido, el cliente ya lo pidió de nuevo
+    if not Informe.objects.filter(pk=informe.pk, estado__in=SIN_TERMINAR).update(
+        estado=Informe.ESTADO_PROCESANDO, proceso=proceso(),
+    ):
+        return
+    informe.archivo = f'{informe.pk}.{informe.formato}'
+    destino = ruta(informe)
+    temporal = destino.with_name(destino.name + '.part')
+    try:
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        encabezado, datos = filas(informe)
+        total = ESCRITORES[informe.formato](temporal, encabezado, _con_latido(informe.pk, datos))
+        os.replace(temporal, destino)
+    except Exception as exc:
+        logger.exception('Error generando el informe %s', informe.pk)
+        temporal.unlink(missing_ok=True)
+        Informe.objects.filter(pk=informe.pk, estado=Informe.ESTADO_PROCESANDO).update(
+            estado=Informe.ESTADO_ERROR, error=str(exc), fecha_fin_proceso=timezone.now(),
+        )
+        return
+    listo = Informe.objects.filter(pk=informe.pk, estado=Informe.ESTADO_PROCESANDO).update(
+        estado=Informe.ESTADO_LISTO, archivo=informe.archivo, filas=total,
+        tamano=destino.stat().st_size, fecha_fin_proceso=timezone.now(),
+    )
+    if not listo:
+        destino.unlink(missing_ok=True)
+
+
+def _tarea(informe_id):
+    try:
+        generar(informe_id)
+    finally:
+        with _pool_lock:
+            _en_curso.discard(informe_id)
+        # Cada hilo del pool abre su propia conexión; se cierra al terminar
+        connection.close()
+
+
+def _ejecutor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'INFORMES_HILOS', 2), thread_name_prefix='informes',
+            )
+        return _pool
+
+
+def _enviar(informe_id):
+    pool = _ejecutor()
+    with _pool_lock:
+        _en_curso.add(informe_id)
+    pool.submit(_tarea, informe_id)
+
+
+def encolar(informe):
+    """Programa la generación para después del commit (el hilo debe ver la fila)."""
+    if getattr(settings, 'INFORMES_SINCRONO', False):
+        transaction.on_commit(lambda: generar(informe.pk))
+    else:
+        transaction.on_commit(lambda: _enviar(informe.pk))
+
+
+def revisar_interrumpido(informe):
+    """
+    Marca con error un informe sin terminar cuyo latido venció: ya nadie lo va
+    a generar (su proceso se reinició). Se llama al leer el estado, desde
+    cualquier worker; devuelve el informe.
+    """
+    if informe.estado not in SIN_TERMINAR:
+        return informe
+    with _pool_lock:
+        if informe.pk in _en_curso:
+            return informe
+    limite = timezone.now() - datetime.timedelta(seconds=VENCIMIENTO_SEGUNDOS)
+    if informe.fecha_actualizacion >= limite:
+        return informe
+    error = 'Se interrumpió la generación (se reinició el servidor). Vuelva a pedir el informe.'
+    ahora = timezone.now()
+    # Solo si sigue sin terminar y sin latido: su dueño pudo terminar o latir recién
+    marcados = Informe.objects.filter(
+        pk=informe.pk, estado__in=SIN_TERMINAR, fecha_actualizacion__lt=limite,
+    ).update(estado=Informe.ESTADO_ERROR, error=error, fecha_fin_proceso=ahora)
+    if marcados:
+        informe.estado, informe.error, informe.fecha_fin_proceso = Informe.ESTADO_ERROR, error, ahora
+    else:
+        informe.refresh_from_db()
+    return informe
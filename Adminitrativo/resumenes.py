@@ -0,0 +1,151 @@
+# Administrativo/resumenes.py
+
+"""
+Resúmenes (rollups) de producción por proyecto y por empleado, a nivel día,
+mes y total. Produccion.save() y la señal post_delete llaman a
+`aplicar_produccion` dentro de la misma transacción que el cambio, así que el
+dashboard puede leer solo estas tablas: su costo depende del número de
+proyectos, no de cuántos años de producción se guardan.
+
+Las escrituras masivas (update, bulk_create, bulk_update) no pasan por save():
+la señal `escritura_masiva` llama a `recalcular` con los registros tocados, y
+ProduccionQuerySet.update le pasa además las claves que tenían antes.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Produccion, ResumenProduccion, ResumenProduccionEmpleado, ResumenProduccionProyecto
+from .versiones import subir_version
+
+LOTE = 5000
+
+DIMENSIONES = [
+    (ResumenProduccionProyecto, 'proyecto_id'),
+    (ResumenProduccionEmpleado, 'empleado_id'),
+]
+
+
+def _periodos(fecha):
+    return [
+        (ResumenProduccion.PERIODO_DIA, fecha),
+        (ResumenProduccion.PERIODO_MES, fecha.replace(day=1)),
+        (ResumenProduccion.PERIODO_TOTAL, None),
+    ]
+
+
+def _sumar(modelo, clave, valor, fecha, cantidad, registros):
+    for periodo, inicio in _periodos(fecha):
+        filtro = {clave: valor, 'periodo': periodo, 'fecha': inicio}
+        actualizados = modelo.objects.filter(**filtro).update(
+            cantidad_total=F('cantidad_total') + cantidad, registros=F('registros') + registros,
+        )
+        if not actualizados and registros > 0:
+            modelo.objects.create(cantidad_total=cantidad, registros=registros, **filtro)
+        elif registros < 0:
+            modelo.objects.filter(registros__lte=0, **filtro).delete()
+
+
+@transaction.atomic
+def aplicar_produccion(anterior, actual):
+    """
+    Aplica a los resúmenes el cambio de un registro de Produccion. `anterior` y
+    `actual` son dicts con proyecto_id, empleado_id, fecha y cantidad_producida
+    (None si el registro se creó o se borró).
+    """
+    for valores, signo in ((anterior, -1), (actual, 1)):
+        if valores is None:
+            continue
+        cantidad = Decimal(valores['cantidad_producida']) * signo
+        for modelo, clave in DIMENSIONES:
+            _sumar(modelo, clave, valores[clave], valores['fecha'], cantidad, signo)
+
+
+@transaction.atomic
+def recalcular(pks=(), claves=(), using=None):
+    """
+    Recalcula los resúmenes que tocan los registros `pks` (con sus valores
+    actuales) y las `claves` (proyecto_id, empleado_id, fecha) de antes de la
+    escritura. Los días salen de Produccion; los meses y el total, de los días.
+    """
+    claves = set(claves)
+    if pks:
+        claves.update(
+            Produccion.objects.using(using).filter(pk__in=list(pks))
+            .values_list('proyecto_id', 'empleado_id', 'fecha').distinct()
+        )
+    for modelo, clave in DIMENSIONES:
+        dias = defaultdict(set)
+        for proyecto_id, empleado_id, fecha in claves:
+            dias[proyecto_id if clave == 'proyecto_id' else empleado_id].add(fecha)
+        for valor, fechas in dias.items():
+            _recalcular_valor(modelo, clave, valor, fechas, using)
+
+
+def _recalcular_valor(modelo, clave, valor, dias, using):
+    resumenes = modelo.objects.using(using).filter(**{clave: valor})
+
+    def reemplazar(periodo, fechas, filas):
+        # filas: [(fecha, total, registros)]; fechas None es el total
+        viejas = resumenes.filter(periodo=periodo)
+        viejas = viejas.filter(fecha__isnull=True) if fechas is None else viejas.filter(fecha__in=fechas)
+        viejas.delete()
+        modelo.objects.using(using).bulk_create([
+            modelo(periodo=periodo, fecha=fecha, cantidad_total=total, registros=n, **{clave: valor})
+            for fecha, total, n in filas
+        ], batch_size=500)
+
+    por_dia = (
+        Produccion.objects.using(using).historico().filter(**{clave: valor, 'fecha__in': dias})
+        .values('fecha').annotate(total=Sum('cantidad_producida'), n=Count('id')).order_by()
+    )
+    reemplazar(ResumenProduccion.PERIODO_DIA, dias, [(f['fecha'], f['total'], f['n']) for f in por_dia])
+    meses = {dia.replace(day=1) for dia in dias}
+    por_mes = (
+        resumenes.filter(periodo=ResumenProduccion.PERIODO_DIA).annotate(mes=TruncMonth('fecha'))
+        .filter(mes__in=meses).values('mes').annotate(total=Sum('cantidad_total'), n=Sum('registros')).order_by()
+    )
+    reemplazar(ResumenProduccion.PERIODO_MES, meses, [(f['mes'], f['total'], f['n']) for f in por_mes])
+    total = resumenes.filter(periodo=ResumenProduccion.PERIODO_MES).aggregate(
+        total=Sum('cantidad_total'), n=Sum('registros'),
+    )
+    reemplazar(ResumenProduccion.PERIODO_TOTAL, None, [(None, total['total'], total['n'])] if total['n'] else [])
+
+
+@transaction.atomic
+def reconstruir():
+    """Borra y recalcula todos los resúmenes desde Produccion (con lo archivado). Devuelve filas creadas por modelo."""
+    creados = {}
+    for modelo, clave in DIMENSIONES:
+        modelo.objects.all().delete()
+        filas, total = [], 0
+        agrupaciones = [
+            (ResumenProduccion.PERIODO_DIA, {'inicio': F('fecha')}),
+            (ResumenProduccion.PERIODO_MES, {'inicio': TruncMonth('fecha')}),
+            (ResumenProduccion.PERIODO_TOTAL, {}),
+        ]
+        for periodo, agrupacion in agrupaciones:
+            consulta = (
+                Produccion.objects.historico().annotate(**agrupacion)
+                .values(clave, *agrupacion)
+                .annotate(total=Sum('cantidad_producida'), n=Count('id'))
+                .order_by()
+            )
+            for fila in consulta.iterator(chunk_size=2000):
+                filas.append(modelo(
+                    periodo=periodo, fecha=fila.get('inicio'),
+                    cantidad_total=fila['total'], registros=fila['n'], **{clave: fila[clave]},
+                ))
+                if len(filas) >= LOTE:
+                    modelo.objects.bulk_create(filas, batch_size=500)
+                    total += len(filas)
+                    filas = []
+        modelo.objects.bulk_create(filas, batch_size=500)
+        creados[modelo.__name__] = total + len(filas)
+    # Los resúmenes no tienen versión propia: lo cacheado del dashboard va con la de Produccion
+    subir_version(Produccion)
+    return creados
@@ -1,17 +1,147 @@
 # administrativo/serializers.py
 
+import base64
+import binascii
+
 from rest_framework import serializers
-from .models import Cargo, Empleado, Proyecto, ControlDeIngreso, Produccion, Herramienta, ListaDeChequeo, Verificacion, Prestamo
+
+from .metricas import serializando
+from .models import Cargo, Empleado, Proyecto, ControlDeIngreso, Produccion, Herramienta, ListaDeChequeo, Verificacion, Prestamo, SensorGas
 # Asegúrate de importar todos los modelos que necesites serializar
 
-class CargoSerializer(serializers.ModelSerializer):
+
+def parse_expand(value):
+    """Convierte '?expand=empleado.cargo,proyecto' en ['empleado.cargo', 'proyecto']."""
+    if not value:
+        return []
+    return [path.strip() for path in value.split(',') if path.strip()]
+
+
+class ExpandableModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer plano por defecto. Los serializers anidados declarados
+    (p. ej. `empleado_detalle = EmpleadoSerializer(source='empleado')`) solo se
+    incluyen si la relación (su `source`) aparece en `?expand=`; se admiten
+    rutas con punto como `proyecto.supervisor.cargo`.
+    `?fields=id,fecha` limita los campos de primer nivel (sparse fieldsets).
+    """
+
+    def __init__(self, *args, expand=None, fields=None, **kwargs):
+        self._expand = expand
+        self._only_fields = fields
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def expandable_fields(cls):
+        """{relación: (nombre del campo, serializer anidado)} de los campos *_detalle."""
+        return {
+            field.source: (name, field)
+            for name, field in cls._declared_fields.items()
+            if isinstance(field, serializers.BaseSerializer)
+        }
+
+    @classmethod
+    def expansion_plan(cls, expand, prefix=''):
+        """
+        Devuelve (select_related, prefetch_related, defer) necesarios para
+        `expand`, de modo que el listado cueste un número fijo de consultas y
+        no lea columnas pesadas que el serializer nunca devuelve
+        (`Meta.deferred_fields`).
+        """
+        select_related, prefetch_related = [], []
+        defer = [f'{prefix}{name}' for name in getattr(cls.Meta, 'deferred_fields', [])]
+        model = cls.Meta.model
+        for relation, (name, field) in cls.expandable_fields().items():
+            if relation not in cls._expanded_relations(expand):
+                continue
+            path = f'{prefix}{relation}'
+            model_field = model._meta.get_field(relation)
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch_related.append(path)
+            else:
+                select_related.append(path)
+            child = getattr(field, 'child', field)
+            if isinstance(child, ExpandableModelSerializer):
+                sub_select, sub_prefetch, sub_defer = type(child).expansion_plan(
+                    cls._sub_expand(expand, relation), prefix=f'{path}__'
+                )
+                # Lo que cuelga de un prefetch también se resuelve en el prefetch
+                if path in prefetch_related:
+                    prefetch_related.extend(sub_select + sub_prefetch)
+                else:
+                    select_related.extend(sub_select)
+                    prefetch_related.extend(sub_prefetch)
+                    defer.extend(sub_defer)
+        return select_related, prefetch_related, defer
+
+    @staticmethod
+    def _expanded_relations(expand):
+        return {path.split('.', 1)[0] for path in expand}
+
+    @staticmethod
+    def _sub_expand(expand, relation):
+        return [path.split('.', 1)[1] for path in expand if path.startswith(relation + '.')]
+
+    def _requested(self, param):
+        request = self.context.get('request')
+        if request is None:
+            return []
+        return parse_expand(request.query_params.get(param))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self._expand
+        only_fields = self._only_fields
+        if expand is None:  # Serializer raíz: se lee la petición
+            expand = self._requested('expand')
+            only_fields = self._requested('fields') or None
+
+        expanded = self._expanded_relations(expand)
+        for relation, (name, field) in self.expandable_fields().items():
+            if relation not in expanded:
+                fields.pop(name, None)
+            elif isinstance(field, ExpandableModelSerializer):
+                fields[name] = type(field)(
+                    *field._args, **{**field._kwargs, 'expand': self._sub_expand(expand, relation)}
+                )
+
+        if only_fields:
+            keep = set(only_fields) | {
+                name for relation, (name, _) in self.expandable_fields().items() if relation in expanded
+            }
+            for name in list(fields):
+                if name not in keep:
+                    fields.pop(name)
+        return fields
+
+    def to_representation(self, instance):
+        # Tiempo de serialización por ruta (metricas.py); los anidados no suman aparte
+        with serializando():
+            return super().to_representation(instance)
+
+
+class CargoSerializer(ExpandableModelSerializer):
     class Meta:
         model = Cargo
         fields = '__all__' # Incluye todos los campos
 
-class EmpleadoSerializer(serializers.ModelSerializer):
+class HuellaBase64Field(serializers.Field):
+    """La huella en base64, como la manda el frontend al crear/editar. Solo de escritura."""
+    default_error_messages = {'invalid': 'Debe ser base64.'}
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        try:
+            return base64.b64decode(data, validate=True) or None
+        except binascii.Error:
+            self.fail('invalid')
+
+
+class EmpleadoSerializer(ExpandableModelSerializer):
     # Para mostrar detalles del cargo en lugar de solo el ID (opcional)
     cargo_detalle = CargoSerializer(source='cargo', read_only=True)
+    huella = HuellaBase64Field(write_only=True, required=False, allow_null=True)
     # Para permitir asignar por ID al crear/actualizar
     # cargo = serializers.PrimaryKeyRelatedField(queryset=Cargo.objects.all()) # Si no quieres el detalle al escribir
 
@@ -22,11 +152,14 @@ class EmpleadoSerializer(serializers.ModelSerializer):
             'email', 'estado', 'fecha_creacion', 'fecha_registro',
             'huella', 'nivel_acceso'
         ]
-        # 'huella' es BinaryField. DRF lo maneja, usualmente como string base64 en JSON.
+        # 'huella' (BinaryField) no sale en las respuestas ni se carga de la BD: se lee
+        # en bytes crudos por /empleados/<id>/huella/ y /empleados/huellas/. En JSON
+        # solo se puede escribir (base64), como antes.
         read_only_fields = ['fecha_creacion', 'fecha_registro', 'cargo_detalle']
+        deferred_fields = ['huella']
 
 
-class ProyectoSerializer(serializers.ModelSerializer):
+class ProyectoSerializer(ExpandableModelSerializer):
     supervisor_detalle = EmpleadoSerializer(source='supervisor', read_only=True)
     # supervisor = serializers.PrimaryKeyRelatedField(queryset=Empleado.objects.all(), allow_null=True, required=False)
 
@@ -41,7 +174,7 @@ class ProyectoSerializer(serializers.ModelSerializer):
 # --- Serializers para los otros modelos ---
 # (Como los que te proporcioné en respuestas anteriores)
 
-class ControlDeIngresoSerializer(serializers.ModelSerializer):
+class ControlDeIngresoSerializer(ExpandableModelSerializer):
     empleado_detalle = EmpleadoSerializer(source='empleado', read_only=True)
     proyecto_detalle = ProyectoSerializer(source='proyecto', read_only=True)
     class Meta:
@@ -50,7 +183,7 @@ class ControlDeIngresoSerializer(serializers.ModelSerializer):
         read_only_fields = ['empleado_detalle', 'proyecto_detalle']
 
 
-class ProduccionSerializer(serializers.ModelSerializer):
+class ProduccionSerializer(ExpandableModelSerializer):
     empleado_detalle = EmpleadoSerializer(source='empleado', read_only=True)
     proyecto_detalle = ProyectoSerializer(source='proyecto', read_only=True)
     class Meta:
@@ -59,13 +192,21 @@ class ProduccionSerializer(serializers.ModelSerializer):
         read_only_fields = ['empleado_detalle', 'proyecto_detalle', 'fecha_registro']
 
 
-class HerramientaSerializer(serializers.ModelSerializer):
+class HerramientaSerializer(ExpandableModelSerializer):
     class Meta:
         model = Herramienta
         fields = '__all__'
 
+    def validate_cantidad(self, value):
+        # `disponible` no puede quedar negativo (ver disponibilidad.py)
+        if self.instance is not None:
+            prestadas = self.instance.prestamos.filter(fecha_devolucion__isnull=True).count()
+            if value < prestadas:
+                raise serializers.ValidationError(f'Hay {prestadas} unidades prestadas.')
+        return value
 
-class ListaDeChequeoSerializer(serializers.ModelSerializer):
+
+class ListaDeChequeoSerializer(ExpandableModelSerializer):
     herramienta_detalle = HerramientaSerializer(source='herramienta', read_only=True)
     class Meta:
         model = ListaDeChequeo
@@ -73,7 +214,7 @@ class ListaDeChequeoSerializer(serializers.ModelSerializer):
         read_only_fields = ['herramienta_detalle']
 
 
-class VerificacionSerializer(serializers.ModelSerializer):
+class VerificacionSerializer(ExpandableModelSerializer):
     lista_detalle = ListaDeChequeoSerializer(source='lista', read_only=True)
     class Meta:
         model = Verificacion
@@ -81,11 +222,19 @@ class VerificacionSerializer(serializers.ModelSerializer):
         read_only_fields = ['lista_detalle', 'fecha_verificacion']
 
 
-class PrestamoSerializer(serializers.ModelSerializer):
+class PrestamoSerializer(ExpandableModelSerializer):
     verificacion_detalle = VerificacionSerializer(source='verificacion', read_only=True)
     empleado_detalle = EmpleadoSerializer(source='empleado', read_only=True)
     herramienta_prestada_detalle = HerramientaSerializer(source='herramienta_prestada', read_only=True)
     class Meta:
         model = Prestamo
         fields = '__all__'
-        read_only_fields = ['verificacion_detalle', 'empleado_detalle', 'herramienta_prestada_detalle']
\ No newline at end of file
+        read_only_fields = ['verificacion_detalle', 'empleado_detalle', 'herramienta_prestada_detalle']
+
+
+class SensorGasSerializer(ExpandableModelSerializer):
+    proyecto_detalle = ProyectoSerializer(source='proyecto', read_only=True)
+    class Meta:
+        model = SensorGas
+        fields = '__all__'
+        read_only_fields = ['proyecto_detalle']
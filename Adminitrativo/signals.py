@@ -0,0 +1,229 @@
+# Administrativo/signals.py
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import archivo, busqueda, disponibilidad, eventos, metricas, presencia, resumenes
+from .cedulas import cache_cedulas
+from .huellas import indice as indice_huellas
+from .models import Cambio, Cargo, ControlDeIngreso, Empleado, Presencia, Prestamo, Produccion, Proyecto
+from .resumenes import aplicar_produccion
+from .sincronizacion import MODELOS, registrar, sincronizado
+from .versiones import escritura_masiva, subir_version
+
+
+@receiver(post_save, dispatch_uid='adminitrativo_subir_version_save')
+@receiver(post_delete, dispatch_uid='adminitrativo_subir_version_delete')
+def subir_version_modelo(sender, **kwargs):
+    # Invalida las respuestas cacheadas que dependen de este modelo
+    if sender._meta.app_label == 'Adminitrativo':
+        subir_version(sender)
+
+
+@receiver(post_save, dispatch_uid='adminitrativo_cambio_save')
+def registrar_guardado(sender, instance, using, **kwargs):
+    # Registro para la sincronización incremental (sincronizacion.py)
+    if sincronizado(sender):
+        registrar(sender, [instance.pk], Cambio.OPERACION_GUARDADO, using)
+
+
+@receiver(post_delete, dispatch_uid='adminitrativo_cambio_delete')
+def registrar_borrado(sender, instance, using, **kwargs):
+    if sincronizado(sender):
+        registrar(sender, [instance.pk], Cambio.OPERACION_BORRADO, using)
+
+
+def registrar_masivo(sender, pks, using=None, **kwargs):
+    registrar(sender, pks, Cambio.OPERACION_GUARDADO, using)
+
+
+# Solo para los modelos sincronizados: con receptor, update() lee antes los pk
+for modelo, _ in MODELOS.values():
+    escritura_masiva.connect(registrar_masivo, sender=modelo, dispatch_uid=f'adminitrativo_cambio_{modelo.__name__}')
+
+
+@receiver(post_save, sender=Empleado)
+def actualizar_indice_huellas(sender, instance, **kwargs):
+    if indice_huellas.cargado_en is None:  # Aún no se ha cargado en este proceso
+        return
+    empleado_id = instance.pk
+    if instance.estado != 'activo':
+        transaction.on_commit(lambda: indice_huellas.eliminar(empleado_id))
+    elif 'huella' not in instance.get_deferred_fields():
+        huella = instance.huella
+        transaction.on_commit(lambda: indice_huellas.actualizar(empleado_id, huella))
+    elif empleado_id not in indice_huellas and instance.huella_hash:
+        # Reactivado sin tocar la huella: hay que leerla una vez
+        transaction.on_commit(lambda: indice_huellas.actualizar(
+            empleado_id, Empleado.objects.filter(pk=empleado_id).values_list('huella', flat=True).first()
+        ))
+
+
+def vencer_indice_huellas(sender, **kwargs):
+    # Un upsert masivo (importacion.py) puede activar o desactivar empleados
+    if indice_huellas.cargado_en is not None:
+        transaction.on_commit(indice_huellas.vencer)
+
+
+escritura_masiva.connect(vencer_indice_huellas, sender=Empleado, dispatch_uid='adminitrativo_huellas_masivo')
+
+
+@receiver(post_delete, sender=Empleado)
+def sacar_del_indice_huellas(sender, instance, **kwargs):
+    if indice_huellas.cargado_en is not None:
+        empleado_id = instance.pk
+        transaction.on_commit(lambda: indice_huellas.eliminar(empleado_id))
+
+
+@receiver(post_save, dispatch_uid='adminitrativo_busqueda_save')
+def indexar_busqueda(sender, instance, using, **kwargs):
+    # Índices FTS5 de ?search= (busqueda.py), en la misma transacción
+    if busqueda.indexado(sender):
+        campos = busqueda.INDICES[sender._meta.label_lower].campos
+        busqueda.indexar_filas(sender, [(instance.pk, *[getattr(instance, campo) for campo in campos])], using)
+
+
+@receiver(post_delete, dispatch_uid='adminitrativo_busqueda_delete')
+def quitar_de_busqueda(sender, instance, using, **kwargs):
+    if busqueda.indexado(sender):
+        busqueda.quitar(sender, [instance.pk], using)
+
+
+def indexar_busqueda_masivo(sender, pks, using=None, **kwargs):
+    busqueda.indexar(sender, pks, using)
+
+
+for modelo, _ in MODELOS.values():
+    if busqueda.indexado(modelo):
+        escritura_masiva.connect(indexar_busqueda_masivo, sender=modelo, dispatch_uid=f'adminitrativo_busqueda_{modelo.__name__}')
+
+
+def _invalidar_cedulas(funcion, *args):
+    # Ahora y de nuevo al hacer commit (alguien pudo leer la fila vieja entre medio)
+    funcion(*args)
+    transaction.on_commit(lambda: funcion(*args))
+
+
+@receiver(post_save, sender=Empleado, dispatch_uid='adminitrativo_cedulas_empleado_save')
+@receiver(post_delete, sender=Empleado, dispatch_uid='adminitrativo_cedulas_empleado_delete')
+def invalidar_cedula_empleado(sender, instance, **kwargs):
+    _invalidar_cedulas(cache_cedulas.invalidar_empleado, instance.pk, instance.cedula)
+
+
+@receiver(post_save, sender=Cargo, dispatch_uid='adminitrativo_cedulas_cargo_save')
+@receiver(post_delete, sender=Cargo, dispatch_uid='adminitrativo_cedulas_cargo_delete')
+def invalidar_cedulas_cargo(sender, instance, **kwargs):
+    _invalidar_cedulas(cache_cedulas.invalidar_cargo, instance.pk)
+
+
+def limpiar_cedulas(sender, **kwargs):
+    _invalidar_cedulas(cache_cedulas.limpiar)
+
+
+for modelo in (Empleado, Cargo):
+    escritura_masiva.connect(limpiar_cedulas, sender=modelo, dispatch_uid=f'adminitrativo_cedulas_{modelo.__name__}')
+
+
+@receiver(post_delete, sender=Produccion)
+def descontar_de_resumenes(sender, instance, **kwargs):
+    # Corre dentro de la transacción del delete (también en borrados por queryset)
+    aplicar_produccion(instance.valores_resumen(), None)
+
+
+def recalcular_resumenes(sender, pks, using=None, **kwargs):
+    # Las escrituras masivas no pasan por Produccion.save() (resumenes.py)
+    resumenes.recalcular(pks, using=using)
+
+
+escritura_masiva.connect(recalcular_resumenes, sender=Produccion, dispatch_uid='adminitrativo_resumenes_produccion')
+
+
+@receiver(post_delete, sender=Prestamo)
+def liberar_herramienta(sender, instance, **kwargs):
+    # Borrar un préstamo abierto devuelve la unidad (disponibilidad.py)
+    disponibilidad.aplicar_prestamo(instance.valores_disponibilidad(), None)
+
+
+def recalcular_disponibilidad(sender, **kwargs):
+    # Las escrituras masivas no pasan por Prestamo.save()
+    disponibilidad.recalcular()
+
+
+escritura_masiva.connect(recalcular_disponibilidad, sender=Prestamo, dispatch_uid='adminitrativo_disponibilidad')
+
+
+@receiver(connection_created, dispatch_uid='adminitrativo_archivo_conexion')
+def preparar_archivo(sender, connection, **kwargs):
+    # Tablas del archivo al día con los modelos (archivo.py)
+    archivo.preparar(connection)
+
+
+@receiver(connection_created, dispatch_uid='adminitrativo_metricas_conexion')
+def contar_consultas(sender, connection, **kwargs):
+    # Consultas y tiempo SQL por ruta (metricas.py)
+    metricas.instalar(connection)
+
+
+@receiver(post_delete, sender=Empleado, dispatch_uid='adminitrativo_archivo_empleado')
+@receiver(post_delete, sender=Proyecto, dispatch_uid='adminitrativo_archivo_proyecto')
+def borrar_archivados(sender, instance, using, **kwargs):
+    # El CASCADE no llega a los meses archivados (archivo.py)
+    campo = 'empleado_id' if sender is Empleado else 'proyecto_id'
+    archivo.borrar_relacionados(campo, [instance.pk], using)
+
+
+@receiver(post_save, sender=ControlDeIngreso, dispatch_uid='adminitrativo_eventos_save')
+def publicar_ingreso(sender, instance, using, **kwargs):
+    # Al stream de la sala de control (eventos.py), solo si el commit se hace
+    pk = instance.pk
+    transaction.on_commit(lambda: eventos.publicar_registros([pk], using), using=using)
+
+
+def publicar_ingresos_masivo(sender, pks, using=None, **kwargs):
+    transaction.on_commit(lambda: eventos.publicar_registros(pks, using), using=using)
+
+
+escritura_masiva.connect(publicar_ingresos_masivo, sender=ControlDeIngreso, dispatch_uid='adminitrativo_eventos_masivo')
+
+
+@receiver(post_delete, sender=ControlDeIngreso, dispatch_uid='adminitrativo_eventos_delete')
+def publicar_borrado_ingreso(sender, instance, using, **kwargs):
+    pk, proyecto_id = instance.pk, instance.proyecto_id
+    transaction.on_commit(lambda: eventos.publicar_borrado(pk, proyecto_id), using=using)
+
+
+def actualizar_presencia_masivo(sender, pks, using=None, **kwargs):
+    # Los lotes de ingesta.py no pasan por ControlDeIngreso.save() (presencia.py)
+    presencia.actualizar(pks, using=using)
+
+
+escritura_masiva.connect(
+    actualizar_presencia_masivo, sender=ControlDeIngreso, dispatch_uid='adminitrativo_presencia_masivo',
+)
+
+
+@receiver(post_delete, sender=ControlDeIngreso, dispatch_uid='adminitrativo_presencia_delete')
+def recalcular_presencia(sender, instance, using, **kwargs):
+    # Su fila de Presencia ya se fue en cascada; un ingreso anterior sin salida puede volver a ser el último.
+    # Uno por registro borrado: se juntan y se recalculan una vez al hacer commit
+    presencia.recalcular_al_confirmar([instance.empleado_id], using=using)
+
+
+@receiver(post_delete, sender=Presencia, dispatch_uid='adminitrativo_presencia_cascada')
+def quitar_de_presencia(sender, instance, using, **kwargs):
+    if presencia.indice.cargado_en is not None:
+        empleado_id, registro_id = instance.empleado_id, instance.registro_id
+        transaction.on_commit(lambda: presencia.indice.quitar(empleado_id, registro_id), using=using)
+
+
+@receiver(post_save, sender=Empleado, dispatch_uid='adminitrativo_presencia_empleado')
+@receiver(post_save, sender=Proyecto, dispatch_uid='adminitrativo_presencia_proyecto')
+def vencer_presencia(sender, **kwargs):
+    # La copia en memoria guarda nombres y cédulas
+    if presencia.indice.cargado_en is not None:
+        transaction.on_commit(presencia.indice.vencer)
+
+
+escritura_masiva.connect(vencer_presencia, sender=Empleado, dispatch_uid='adminitrativo_presencia_empleado_masivo')
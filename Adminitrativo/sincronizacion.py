@@ -0,0 +1,143 @@
+# Administrativo/sincronizacion.py
+
+"""
+Sincronización incremental ("cambios desde") para las tablets de los frentes.
+
+Cada escritura en un modelo sincronizado deja una fila en `Cambio` dentro de
+la misma transacción: post_save / post_delete (signals.py) y las operaciones
+masivas vía `escritura_masiva` (versiones.py). El id de `Cambio` es una
+secuencia; el token que recibe la tablet es ese id firmado. Con SQLite las
+escrituras son serializadas, así que el orden de los ids es el orden de commit.
+
+GET /api/sync/?token=... devuelve solo lo que cambió desde el token (cada
+objeto una vez, con su estado actual) y los ids borrados. El costo depende
+de la cantidad de cambios, no del tamaño de las tablas.
+
+Sin token se devuelve solo el token actual: la tablet lo guarda, baja los
+listados completos y desde ahí sincroniza (repetir filas no hace daño). Si
+el token es anterior a lo que conserva `purgar_cambios` se responde 410 y
+hay que volver a bajar todo.
+"""
+
+from django.core import signing
+from django.db import connections, router
+from django.utils import timezone
+
+from .listados import columnas, preparar
+from .models import (
+    Cambio, Cargo, Empleado, Proyecto, ControlDeIngreso,
+    Produccion, Herramienta, ListaDeChequeo, Verificacion, Prestamo,
+)
+from .serializers import (
+    CargoSerializer, EmpleadoSerializer, ProyectoSerializer, ControlDeIngresoSerializer,
+    ProduccionSerializer, HerramientaSerializer, ListaDeChequeoSerializer,
+    VerificacionSerializer, PrestamoSerializer,
+)
+
+# Nombre en la respuesta (el mismo del router) -> (modelo, serializer)
+MODELOS = {
+    'cargos': (Cargo, CargoSerializer),
+    'empleados': (Empleado, EmpleadoSerializer),
+    'proyectos': (Proyecto, ProyectoSerializer),
+    'control-ingresos': (ControlDeIngreso, ControlDeIngresoSerializer),
+    'produccion': (Produccion, ProduccionSerializer),
+    'herramientas': (Herramienta, HerramientaSerializer),
+    'listas-chequeo': (ListaDeChequeo, ListaDeChequeoSerializer),
+    'verificaciones': (Verificacion, VerificacionSerializer),
+    'prestamos': (Prestamo, PrestamoSerializer),
+}
+NOMBRES = {modelo._meta.label_lower: nombre for nombre, (modelo, _) in MODELOS.items()}
+SALT = 'Adminitrativo.sincronizacion'
+LIMITE = 1000
+LIMITE_MAXIMO = 10000
+
+
+class TokenInvalido(Exception):
+    pass
+
+
+class TokenVencido(Exception):
+    pass
+
+
+def sincronizado(modelo):
+    return modelo._meta.label_lower in NOMBRES
+
+
+def registrar(modelo, pks, operacion, using=None):
+    """Anota cambios de `modelo` (se llama dentro de la transacción de la escritura)."""
+    # executemany directo: con bulk_create armar el SQL costaba más que escribirlo
+    # (una importación de 50k empleados son 50k filas aquí)
+    connection = connections[using or router.db_for_write(Cambio)]
+    etiqueta = modelo._meta.label_lower
+    fecha = Cambio._meta.get_field('fecha').get_db_prep_save(timezone.now(), connection)
+    tabla = connection.ops.quote_name(Cambio._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {tabla} (modelo, objeto_id, operacion, fecha) VALUES (%s, %s, %s, %s)',
+            [(etiqueta, pk, operacion, fecha) for pk in pks],
+        )
+
+
+def generar_token(secuencia):
+    return signing.dumps(secuencia, salt=SALT, compress=True)
+
+
+def leer_token(token):
+    try:
+        secuencia = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise TokenInvalido('Token de sincronización inválido.')
+    if not isinstance(secuencia, int) or secuencia < 0:
+        raise TokenInvalido('Token de sincronización inválido.')
+    return secuencia
+
+
+def secuencia_actual():
+    return Cambio.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def cambios_desde(secuencia, limite=LIMITE):
+    """
+    {'token', 'mas', 'cambios': {nombre: [filas]}, 'eliminados': {nombre: [ids]}}
+    con a lo sumo `limite` entradas del registro; si `mas` es True hay que
+    volver a llamar con el token nuevo.
+    """
+    # purgar_cambios siempre deja la última fila, así que el mínimo marca el corte
+    minimo = Cambio.objects.order_by('id').values_list('id', flat=True).first()
+    if minimo is not None and secuencia < minimo - 1:
+        raise TokenVencido('El token es anterior a los cambios conservados; hay que sincronizar todo.')
+
+    entradas = list(
+        Cambio.objects.filter(id__gt=secuencia).order_by('id')
+        .values_list('id', 'modelo', 'objeto_id', 'operacion')[:limite + 1]
+    )
+    mas = len(entradas) > limite
+    entradas = entradas[:limite]
+
+    # Gana la última operación de cada objeto dentro de la ventana
+    ultima = {}
+    for _, etiqueta, objeto_id, operacion in entradas:
+        if etiqueta in NOMBRES:
+            ultima[(etiqueta, objeto_id)] = operacion
+
+    guardados, eliminados = {}, {}
+    for (etiqueta, objeto_id), operacion in ultima.items():
+        destino = eliminados if operacion == Cambio.OPERACION_BORRADO else guardados
+        destino.setdefault(NOMBRES[etiqueta], []).append(objeto_id)
+
+    cambios = {}
+    for nombre, ids in guardados.items():
+        modelo, serializer_class = MODELOS[nombre]
+        cols = columnas(serializer_class(expand=[]))
+        salida = preparar(cols)
+        # Un objeto borrado después de la ventana no aparece: su lápida llega en la próxima llamada
+        filas = modelo.objects.filter(pk__in=ids).order_by('pk').values(*[n for n, _ in cols])
+        cambios[nombre] = [salida(fila) for fila in filas.iterator(chunk_size=2000)]
+
+    return {
+        'token': generar_token(entradas[-1][0] if entradas else secuencia),
+        'mas': mas,
+        'cambios': cambios,
+        'eliminados': {nombre: sorted(ids) for nombre, ids in eliminados.items()},
+    }
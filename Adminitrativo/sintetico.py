@@ -0,0 +1,481 @@
+# Administrativo/sintetico.py
+
+"""
+Datos sintéticos para medir la API a escala real (manage.py generar_datos).
+
+Con la misma semilla, la misma fecha final y los mismos tamaños se generan
+exactamente las mismas filas, con los mismos ids, así que dos corridas de
+benchmark.py sobre bases generadas igual son comparables.
+
+Lo que se genera se parece a la operación:
+
+- Cargos fijos (mineros, operadores, supervisores...) y proyectos (frentes,
+  socavones) con supervisor.
+- Empleados con nombres, cédulas, teléfonos y, una parte, huella. Algunos
+  ingresaron durante el período, otros se retiraron o están de vacaciones.
+- Ingresos día por día en tres turnos que rotan cada semana (el de la noche
+  cruza la medianoche), con retrasos, horas extra, domingos casi vacíos y los
+  turnos de la noche del último día todavía abiertos.
+- Producción para una parte de los turnos de los cargos que producen.
+- Herramientas con su lista de chequeo, y préstamos (cada uno con su
+  verificación) que se devuelven en pocos días; los recientes pueden seguir
+  abiertos sin pasar de la cantidad de cada herramienta.
+- Sensores de gas por proyecto con una lectura cada 10 s en las últimas
+  horas antes de `hasta` (ruido alrededor de un valor normal y, en el
+  metano, algún pico que dispara alertas).
+
+Las filas se insertan con SQL directo por lotes, sin señales: millones de
+save() o de escritura_masiva tardarían horas. Al final se reconstruyen los
+resúmenes, los índices de búsqueda, los contadores de disponibilidad y la
+presencia (quién sigue adentro), y se suben las versiones del caché. No se escribe el registro de cambios de la
+sincronización (las tablets arrancan con una sincronización completa) ni se
+generan informes. Las lecturas de gas sí pasan por gases.ingresar_lecturas,
+para que los bloques, los resúmenes y las alertas queden como en producción.
+Solo se genera sobre una base vacía.
+"""
+
+import datetime
+import hashlib
+import random
+import unicodedata
+
+import numpy as np
+from django.apps import apps
+from django.db import connection, transaction
+
+from . import busqueda, disponibilidad, gases, presencia, resumenes
+from .huellas import TAMANO_PLANTILLA
+from .models import (
+    AlertaGas, BloqueLecturasGas, Cargo, ControlDeIngreso, Empleado, Herramienta, ListaDeChequeo, Presencia,
+    Prestamo, Produccion, Proyecto, ResumenGas, SensorGas, Verificacion,
+)
+from .versiones import subir_version
+
+LOTE = 50_000
+
+# nombre, nivel de acceso, peso en la planta, toneladas medias por turno (None: no produce)
+CARGOS = [
+    ('Minero', 'bajo', 40, 12.0),
+    ('Ayudante de minero', 'bajo', 18, 6.0),
+    ('Operador de maquinaria', 'medio', 10, 30.0),
+    ('Conductor', 'medio', 6, None),
+    ('Mecánico', 'medio', 5, None),
+    ('Electricista', 'medio', 4, None),
+    ('Bodeguero', 'medio', 3, None),
+    ('Topógrafo', 'medio', 2, None),
+    ('Auxiliar SST', 'medio', 3, None),
+    ('Supervisor', 'alto', 5, None),
+    ('Ingeniero de minas', 'alto', 2, None),
+    ('Geólogo', 'alto', 2, None),
+]
+NOMBRES = [
+    'Ana', 'Andrés', 'Camilo', 'Carlos', 'Carolina', 'Catalina', 'Daniel', 'Diana', 'Diego', 'Edwin', 'Fabián',
+    'Felipe', 'Gloria', 'Héctor', 'Jairo', 'Javier', 'Jhon', 'Jorge', 'José', 'Juan', 'Julián', 'Laura', 'Leidy',
+    'Luis', 'Luz', 'Marcela', 'María', 'Mauricio', 'Miguel', 'Nelson', 'Óscar', 'Paola', 'Pedro', 'Ramiro',
+    'Ricardo', 'Rubén', 'Sandra', 'Sebastián', 'Sergio', 'Wilson', 'Yamile', 'Yesid',
+]
+APELLIDOS = [
+    'Acosta', 'Ávila', 'Barrera', 'Beltrán', 'Cárdenas', 'Castañeda', 'Castro', 'Díaz', 'Duarte', 'Forero',
+    'García', 'Gómez', 'González', 'Guerrero', 'Gutiérrez', 'Hernández', 'Jiménez', 'López', 'Martínez', 'Medina',
+    'Moreno', 'Muñoz', 'Niño', 'Núñez', 'Ortiz', 'Pérez', 'Pinzón', 'Quintero', 'Ramírez', 'Reyes', 'Rincón',
+    'Rodríguez', 'Rojas', 'Salazar', 'Sánchez', 'Suárez', 'Torres', 'Vargas', 'Vega', 'Zambrano',
+]
+LUGARES_PROYECTO = ['Mina', 'Socavón', 'Frente', 'Bocamina', 'Patio de acopio', 'Tajo']
+NOMBRES_PROYECTO = [
+    'La Esperanza', 'San Jorge', 'El Roble', 'Santa Bárbara', 'La Ceiba', 'El Diamante', 'Las Palmas',
+    'San Cayetano', 'El Hoyo', 'La Chapa', 'Los Pinos', 'El Volcán', 'La Aurora', 'Buenavista',
+]
+LUGARES_TRABAJO = ['Nivel 1', 'Nivel 2', 'Nivel 3', 'Tambor', 'Clavada', 'Patio', 'Taller', 'Malacate', 'Tolva']
+HERRAMIENTAS = [
+    ('Pica', 'Manual'), ('Pala', 'Manual'), ('Barra', 'Manual'), ('Martillo neumático', 'Neumática'),
+    ('Taladro percutor', 'Eléctrica'), ('Lámpara minera', 'Iluminación'), ('Detector de gases', 'Seguridad'),
+    ('Autorrescatador', 'Seguridad'), ('Arnés', 'Seguridad'), ('Llave de tubo', 'Manual'),
+    ('Pulidora', 'Eléctrica'), ('Planta eléctrica', 'Eléctrica'), ('Diferencial', 'Izaje'), ('Eslinga', 'Izaje'),
+]
+OBSERVACIONES_INGRESO = [
+    'Llegó tarde por el transporte', 'Ingresa con visitante', 'Reporta dolor de espalda',
+    'Sale antes por cita médica', 'Reemplaza a un compañero', 'Capacitación de seguridad al inicio del turno',
+    'Se le entregó dotación nueva', 'Trabajo en altura autorizado',
+]
+OBSERVACIONES_PRODUCCION = ['Falla del malacate', 'Frente con agua', 'Carbón con mucha roca', 'Turno con un ayudante menos']
+
+# El metano pesa más: hay uno o dos por frente
+TIPOS_GAS = ['CH4', 'CO', 'CH4', 'O2', 'CO2', 'H2S']
+# valor normal y ruido por tipo (en la unidad de gases.LIMITES)
+NORMAL_GAS = {'CH4': (0.3, 0.05), 'CO': (8.0, 2.0), 'CO2': (0.2, 0.03), 'H2S': (2.0, 0.5), 'O2': (20.6, 0.05)}
+INTERVALO_GAS = 10  # segundos entre lecturas
+TURNOS = (6 * 60, 14 * 60, 22 * 60)  # minutos desde medianoche
+PESO_DOMINGO = 0.15
+DIA = 1440
+
+
+class BaseNoVacia(Exception):
+    pass
+
+
+def _ascii(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode().lower()
+
+
+def _hora(minutos):
+    return f'{minutos // 60:02d}:{minutos % 60:02d}:00'
+
+
+HORAS = [_hora(m) for m in range(DIA)]
+
+
+def _insertar(cursor, modelo, campos, filas):
+    columnas = ', '.join(connection.ops.quote_name(modelo._meta.get_field(campo).column) for campo in campos)
+    marcas = ', '.join(['%s'] * len(campos))
+    cursor.executemany(
+        f'INSERT INTO {connection.ops.quote_name(modelo._meta.db_table)} ({columnas}) VALUES ({marcas})', filas,
+    )
+
+
+class Lotes:
+    """Acumula filas por modelo y las inserta de a LOTE en su propia transacción."""
+
+    def __init__(self, campos):
+        self.campos = campos
+        self.filas = {modelo: [] for modelo in campos}
+        self.totales = {modelo: 0 for modelo in campos}
+
+    def agregar(self, modelo, fila):
+        filas = self.filas[modelo]
+        filas.append(fila)
+        if len(filas) >= LOTE:
+            self.vaciar(modelo)
+
+    def vaciar(self, *modelos):
+        for modelo in modelos or list(self.filas):
+            if not self.filas[modelo]:
+                continue
+            with transaction.atomic(), connection.cursor() as cursor:
+                _insertar(cursor, modelo, self.campos[modelo], self.filas[modelo])
+            self.totales[modelo] += len(self.filas[modelo])
+            self.filas[modelo] = []
+
+
+class Generador:
+    def __init__(self, semilla, hasta, dias):
+        self.azar = random.Random(semilla)
+        self.hasta = hasta
+        self.desde = hasta - datetime.timedelta(days=dias - 1)
+        self.dias = dias
+        self.fechas = [(self.desde + datetime.timedelta(days=d)).isoformat() for d in range(dias + 1)]
+
+    def _fecha(self, d):
+        return (self.desde + datetime.timedelta(days=d)).isoformat()
+
+    def cargos(self):
+        filas = [
+            (i, nombre, None, nivel, f'{self._fecha(-365)} 08:00:00')
+            for i, (nombre, nivel, _, _) in enumerate(CARGOS, 1)
+        ]
+        return Cargo, ['id', 'nombre_cargo', 'descripcion', 'nivel_acceso', 'fecha_actualizacion'], filas
+
+    def empleados(self, n, huellas):
+        azar = self.azar
+        pesos = [peso for _, _, peso, _ in CARGOS]
+        cedulas = azar.sample(range(10_000_000, 1_100_000_000), n)
+        # Por empleado: (cargo, primer día, último día) relativos a `desde`
+        self.personas = []
+        filas = []
+        for i in range(n):
+            cargo = azar.choices(range(len(CARGOS)), pesos)[0]
+            primero = azar.randrange(-5 * 365, 0) if azar.random() < 0.75 else azar.randrange(self.dias)
+            ultimo = self.dias - 1
+            sorteo = azar.random()
+            estado = 'activo'
+            if sorteo < 0.06:
+                estado = 'inactivo'
+                ultimo = azar.randrange(max(primero, 0), self.dias)
+            elif sorteo < 0.10:
+                estado = 'vacaciones'
+                ultimo = self.dias - 16
+            nombre, apellido, apellido2 = azar.choice(NOMBRES), azar.choice(APELLIDOS), azar.choice(APELLIDOS)
+            email = None
+            if azar.random() < 0.6:
+                email = f'{_ascii(nombre)}.{_ascii(apellido)}{i + 1}@koalgroup.co'
+            huella = azar.randbytes(TAMANO_PLANTILLA) if azar.random() < huellas else None
+            registro = self._fecha(primero)
+            filas.append((
+                i + 1, cargo + 1, str(cedulas[i]), f'{nombre} {apellido} {apellido2}',
+                f'3{azar.randrange(10 ** 9):09d}', email, estado, f'{registro} 08:00:00', registro, huella,
+                hashlib.sha1(huella).hexdigest() if huella else '', CARGOS[cargo][1], f'{registro} 08:00:00',
+            ))
+            self.personas.append((cargo, primero, ultimo))
+        campos = [
+            'id', 'cargo', 'cedula', 'nombres', 'telefono', 'email', 'estado', 'fecha_creacion', 'fecha_registro',
+            'huella', 'huella_hash', 'nivel_acceso', 'fecha_actualizacion',
+        ]
+        return Empleado, campos, filas
+
+    def proyectos(self, n):
+        azar = self.azar
+        supervisores = [i + 1 for i, (cargo, _, _) in enumerate(self.personas) if CARGOS[cargo][0] == 'Supervisor']
+        filas, usados = [], set()
+        for i in range(n):
+            nombre = f'{LUGARES_PROYECTO[i % len(LUGARES_PROYECTO)]} {NOMBRES_PROYECTO[i % len(NOMBRES_PROYECTO)]}'
+            if nombre in usados:
+                nombre = f'{nombre} {i + 1}'
+            usados.add(nombre)
+            inicio = self._fecha(-azar.randrange(30, 3 * 365))
+            estado = azar.choices(['en_progreso', 'finalizado', 'planificacion'], [85, 10, 5])[0]
+            supervisor = azar.choice(supervisores) if supervisores else None
+            filas.append((
+                i + 1, nombre, f'Explotación de carbón - {nombre}', inicio, estado, supervisor,
+                f'{inicio} 08:00:00', f'{inicio} 08:00:00',
+            ))
+        # Cada empleado trabaja casi siempre en el mismo proyecto
+        self.sede = [azar.randrange(n) + 1 for _ in self.personas]
+        self.n_proyectos = n
+        campos = ['id', 'nombre', 'descripcion', 'fecha_inicio', 'estado', 'supervisor', 'fecha_creacion',
+                  'fecha_actualizacion']
+        return Proyecto, campos, filas
+
+    def _pesos_dias(self):
+        return [PESO_DOMINGO if (self.desde + datetime.timedelta(days=d)).weekday() == 6 else 1 for d in range(self.dias)]
+
+    def ingresos(self, lotes, total, producciones, avisar):
+        """
+        Ingresos y producción, día por día (los ids quedan en orden de fecha). Las
+        cantidades salen aproximadas: se sortea la asistencia de cada empleado cada día.
+        """
+        azar = self.azar
+        pesos = self._pesos_dias()
+        acumulado = [0]
+        for peso in pesos:
+            acumulado.append(acumulado[-1] + peso)
+        # Probabilidad de asistir para llegar a `total` con los días hábiles de cada empleado
+        posibles = sum(
+            acumulado[ultimo + 1] - acumulado[max(primero, 0)]
+            for _, primero, ultimo in self.personas if ultimo >= max(primero, 0)
+        )
+        asiste = min(total / posibles, 0.98) if posibles else 0
+        producen = sum(
+            acumulado[ultimo + 1] - acumulado[max(primero, 0)]
+            for cargo, primero, ultimo in self.personas if CARGOS[cargo][3] and ultimo >= max(primero, 0)
+        )
+        produce = min(producciones / (producen * asiste), 1) if producen and asiste else 0
+
+        id_ingreso = id_produccion = 0
+        personas = list(enumerate(self.personas))
+        for d in range(self.dias):
+            fecha, siguiente = self.fechas[d], self.fechas[d + 1]
+            probabilidad = asiste * pesos[d]
+            semana = (self.desde.toordinal() + d) // 7
+            ultimo_dia = d == self.dias - 1
+            if fecha.endswith('-01'):
+                avisar(f'{fecha[:7]}: {id_ingreso} ingresos, {id_produccion} producciones')
+            for e, (cargo, primero, ultimo) in personas:
+                if d < primero or d > ultimo or azar.random() >= probabilidad:
+                    continue
+                proyecto = self.sede[e] if azar.random() < 0.9 else azar.randrange(self.n_proyectos) + 1
+                turno = TURNOS[(e + semana) % 3]
+                entrada = turno + azar.randint(-20, 15)
+                extra = azar.randint(15, 150) if azar.random() < 0.2 else azar.randint(-10, 20)
+                salida = entrada + 480 + extra
+                observacion = azar.choice(OBSERVACIONES_INGRESO) if azar.random() < 0.02 else None
+                salud = 'ok' if azar.random() < 0.985 else azar.choice(['reporte', 'fiebre'])
+                id_ingreso += 1
+                if ultimo_dia and turno == TURNOS[2]:
+                    hora_salida, estado, actualizado = None, 'activo', f'{fecha} {HORAS[entrada]}'
+                else:
+                    hora_salida, estado = HORAS[salida % DIA], 'cerrado'
+                    actualizado = f'{siguiente if salida >= DIA else fecha} {hora_salida}'
+                lotes.agregar(ControlDeIngreso, (
+                    id_ingreso, fecha, HORAS[entrada], hora_salida, salud, e + 1, proyecto,
+                    azar.choice(LUGARES_TRABAJO), estado, observacion, actualizado,
+                ))
+                media = CARGOS[cargo][3]
+                if media and hora_salida and azar.random() < produce:
+                    id_produccion += 1
+                    cantidad = max(azar.gauss(media, media / 4), 0.5)
+                    nota = azar.choice(OBSERVACIONES_PRODUCCION) if azar.random() < 0.03 else None
+                    lotes.agregar(Produccion, (
+                        id_produccion, proyecto, e + 1, fecha, f'{cantidad:.2f}', nota, actualizado, actualizado,
+                    ))
+
+    def herramientas(self, n):
+        azar = self.azar
+        self.cantidades = []
+        herramientas, listas = [], []
+        for i in range(n):
+            nombre, categoria = HERRAMIENTAS[i % len(HERRAMIENTAS)]
+            cantidad = azar.randint(1, 25)
+            estado = 'disponible' if azar.random() < 0.95 else 'mantenimiento'
+            actualizado = f'{self._fecha(-azar.randrange(1, 365))} 08:00:00'
+            herramientas.append((i + 1, f'{nombre} {i // len(HERRAMIENTAS) + 1}', categoria, cantidad, cantidad,
+                                 estado, actualizado))
+            listas.append((i + 1, f'{nombre} {i // len(HERRAMIENTAS) + 1} - revisión', categoria, 'activo', i + 1,
+                           actualizado))
+            self.cantidades.append(cantidad)
+        return [
+            (Herramienta, ['id', 'nombre', 'categoria', 'cantidad', 'disponible', 'estado', 'fecha_actualizacion'],
+             herramientas),
+            (ListaDeChequeo, ['id', 'nombre', 'categoria', 'estado', 'herramienta', 'fecha_actualizacion'], listas),
+        ]
+
+    def prestamos(self, lotes, total):
+        """Cada préstamo con su verificación; los que no se alcanzaron a devolver quedan abiertos."""
+        azar = self.azar
+        if not self.cantidades or not self.personas:
+            return
+        pesos = self._pesos_dias()
+        suma = sum(pesos)
+        abiertos = [0] * len(self.cantidades)
+        herramientas = range(len(self.cantidades))
+        generados = 0
+        for d in range(self.dias):
+            fecha = self.fechas[d]
+            # Reparto proporcional con el resto al último día
+            cuantos = round(total * pesos[d] / suma) if d < self.dias - 1 else total - generados
+            for _ in range(max(min(cuantos, total - generados), 0)):
+                # Alguien que ya entró y no se ha retirado (unos pocos intentos)
+                for _ in range(10):
+                    e = azar.randrange(len(self.personas))
+                    if self.personas[e][1] <= d <= self.personas[e][2]:
+                        break
+                h = azar.choices(herramientas, self.cantidades)[0]
+                dias = 0 if azar.random() < 0.7 else (1 if azar.random() < 0.66 else azar.randint(2, 5))
+                devolucion = None
+                if d + dias < self.dias - 1 or abiertos[h] >= self.cantidades[h]:
+                    devolucion = self.fechas[min(d + dias, self.dias - 1)]
+                else:
+                    abiertos[h] += 1
+                generados += 1
+                verificado = f'{fecha} {HORAS[azar.randint(330, 420)]}'
+                if azar.random() < 0.97:
+                    lotes.agregar(Verificacion, (generados, h + 1, 'aprobado', None, verificado, verificado))
+                else:
+                    lotes.agregar(Verificacion, (generados, h + 1, 'observado', 'Desgaste visible, usar con cuidado',
+                                                 verificado, verificado))
+                lotes.agregar(Prestamo, (
+                    generados, generados, fecha, devolucion, e + 1, h + 1,
+                    f'{devolucion or fecha} {HORAS[azar.randint(840, 1380)]}',
+                ))
+
+    def sensores(self, n):
+        azar = self.azar
+        filas = []
+        for i in range(n):
+            tipo = TIPOS_GAS[i % len(TIPOS_GAS)]
+            proyecto = i % self.n_proyectos + 1
+            filas.append((
+                i + 1, f'{tipo}-{proyecto:02d}-{i // self.n_proyectos + 1}', tipo,
+                azar.choice(LUGARES_TRABAJO), proyecto, True, f'{self._fecha(-30)} 08:00:00',
+            ))
+        self.sensores_gas = [(codigo, tipo) for _, codigo, tipo, *_ in filas]
+        return SensorGas, ['id', 'codigo', 'tipo_gas', 'ubicacion', 'proyecto', 'activo', 'fecha_actualizacion'], filas
+
+    def lecturas_gas(self, horas, avisar):
+        """
+        Una lectura cada INTERVALO_GAS s por sensor en las `horas` antes de que
+        empiece `hasta`, por la ingesta normal en tandas de diez minutos.
+        """
+        if not self.sensores_gas or horas <= 0:
+            return
+        azar = np.random.default_rng(self.azar.randrange(2 ** 32))
+        fin = datetime.datetime.combine(self.hasta, datetime.time(), datetime.timezone.utc).timestamp()
+        tiempos = fin - horas * 3600 + np.arange(0, horas * 3600, INTERVALO_GAS)
+        # Un pico decae en unos cinco minutos
+        decaimiento = np.exp(-np.arange(30) / 8)
+        valores = []
+        for _, tipo in self.sensores_gas:
+            normal, ruido = NORMAL_GAS[tipo]
+            serie = normal + azar.normal(0, ruido, len(tiempos))
+            if tipo == 'CH4':
+                picos = (azar.random(len(tiempos)) < 0.0005) * azar.uniform(0.8, 1.5, len(tiempos))
+                serie += np.convolve(picos, decaimiento)[:len(tiempos)]
+            valores.append(np.round(np.maximum(serie, 0), 3).tolist())
+        tanda = 600 // INTERVALO_GAS
+        for i in range(0, len(tiempos), tanda):
+            gases.ingresar_lecturas([
+                {'sensor': codigo, 't': t, 'valor': serie[i + j]}
+                for j, t in enumerate(tiempos[i:i + tanda].tolist())
+                for (codigo, _), serie in zip(self.sensores_gas, valores)
+            ])
+            if i and i % (tanda * 36) == 0:
+                avisar(f'Lecturas de gas: {i * len(self.sensores_gas)}')
+
+
+CAMPOS_LOTES = {
+    ControlDeIngreso: [
+        'id', 'fecha', 'hora_entrada', 'hora_salida', 'estado_salud', 'empleado', 'proyecto', 'lugar_trabajo',
+        'estado', 'observacion', 'fecha_actualizacion',
+    ],
+    Produccion: [
+        'id', 'proyecto', 'empleado', 'fecha', 'cantidad_producida', 'observaciones', 'fecha_registro',
+        'fecha_actualizacion',
+    ],
+    # Las verificaciones antes que los préstamos (OneToOne)
+    Verificacion: ['id', 'lista', 'estado', 'observaciones', 'fecha_verificacion', 'fecha_actualizacion'],
+    Prestamo: [
+        'id', 'verificacion', 'fecha_entrega', 'fecha_devolucion', 'empleado', 'herramienta_prestada',
+        'fecha_actualizacion',
+    ],
+}
+MODELOS = [
+    Cargo, Empleado, Proyecto, ControlDeIngreso, Presencia, Produccion, Herramienta, ListaDeChequeo, Verificacion,
+    Prestamo, SensorGas, BloqueLecturasGas, ResumenGas, AlertaGas,
+]
+
+
+def generar(empleados=10_000, ingresos=5_000_000, producciones=1_000_000, prestamos=200_000, proyectos=24,
+            herramientas=400, dias=730, hasta=None, huellas=0.5, sensores=30, horas_gas=24, semilla=1, avisar=None):
+    """
+    Llena una base vacía y devuelve {nombre del modelo: filas}. `hasta` es el último
+    día con datos (por defecto hoy) y `dias` cuántos días hacia atrás; las
+    lecturas de gas cubren las `horas_gas` anteriores a `hasta`.
+    `avisar(mensaje)` recibe el avance. BaseNoVacia si ya hay datos.
+    """
+    avisar = avisar or (lambda mensaje: None)
+    ocupados = [modelo.__name__ for modelo in MODELOS if modelo._base_manager.exists()]
+    if ocupados:
+        raise BaseNoVacia(f"La base ya tiene datos ({', '.join(ocupados)}); genere sobre una base recién migrada.")
+    if dias < 2:
+        raise ValueError('dias debe ser al menos 2.')
+    generador = Generador(semilla, hasta or datetime.date.today(), dias)
+    totales = {}
+
+    def insertar(modelo, campos, filas):
+        with transaction.atomic(), connection.cursor() as cursor:
+            for i in range(0, len(filas), LOTE):
+                _insertar(cursor, modelo, campos, filas[i:i + LOTE])
+        totales[modelo.__name__] = len(filas)
+        avisar(f'{modelo.__name__}: {len(filas)} filas')
+
+    insertar(*generador.cargos())
+    insertar(*generador.empleados(empleados, huellas))
+    insertar(*generador.proyectos(max(proyectos, 1)))
+    for modelo, campos, filas in generador.herramientas(herramientas):
+        insertar(modelo, campos, filas)
+
+    lotes = Lotes(CAMPOS_LOTES)
+    generador.ingresos(lotes, ingresos, producciones, avisar)
+    generador.prestamos(lotes, prestamos)
+    lotes.vaciar()
+    for modelo, filas in lotes.totales.items():
+        totales[modelo.__name__] = filas
+        avisar(f'{modelo.__name__}: {filas} filas')
+
+    # Al final, para no mover el azar de lo anterior
+    insertar(*generador.sensores(sensores))
+    generador.lecturas_gas(horas_gas, avisar)
+    for modelo in (BloqueLecturasGas, ResumenGas, AlertaGas):
+        totales[modelo.__name__] = modelo.objects.count()
+        avisar(f'{modelo.__name__}: {totales[modelo.__name__]} filas')
+
+    disponibilidad.recalcular()
+    with transaction.atomic():
+        totales['Presencia'] = presencia.recalcular()['adentro']
+    avisar(f"Presencia: {totales['Presencia']} adentro")
+    for modelo, filas in resumenes.reconstruir().items():
+        avisar(f'{modelo}: {filas} filas')
+    for modelo in apps.get_app_config('Adminitrativo').get_models():
+        if busqueda.indexado(modelo):
+            busqueda.reconstruir(modelo)
+        subir_version(modelo)
+    avisar('Resúmenes, índices de búsqueda y disponibilidad al día.')
+    return totales
@@ -1,3 +1,2086 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import datetime
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import AsyncClient, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import (
+    archivo, asistencia, eventos, gases, importacion, listados, metricas, presencia, rendimiento, reportes, sintetico,
+    views,
+)
+from .cedulas import CacheCedulas, abuscar, cache_cedulas
+from .ingesta import ingresar_eventos
+from .huellas import IndiceHuellas, TAMANO_PLANTILLA, indice as indice_huellas
+from .models import (
+    Cargo, Empleado, Proyecto, ControlDeIngreso,
+    Produccion, Herramienta, ListaDeChequeo, Verificacion, Prestamo,
+    ResumenProduccionEmpleado, ResumenProduccionProyecto, Informe, Cambio,
+    SensorGas, BloqueLecturasGas, ResumenGas, AlertaGas, Presencia,
+)
+from .resumenes import reconstruir as reconstruir_resumenes
+from .serializers import ProduccionSerializer
+
+
+def crear_datos_base():
+    cargo = Cargo.objects.create(nombre_cargo='Minero', nivel_acceso='bajo')
+    empleado = Empleado.objects.create(cargo=cargo, cedula='100', nombres='Ana Núñez', nivel_acceso='bajo')
+    proyecto = Proyecto.objects.create(nombre='Mina Norte', fecha_inicio=datetime.date(2024, 1, 1))
+    return cargo, empleado, proyecto
+
+
+def crear_datos_completos():
+    cargo, empleado, proyecto = crear_datos_base()
+    herramienta = Herramienta.objects.create(nombre='Pica', cantidad=5)
+    lista = ListaDeChequeo.objects.create(nombre='Pica - revisión', herramienta=herramienta)
+    for dia in (1, 2):
+        fecha = datetime.date(2024, 3, dia)
+        ControlDeIngreso.objects.create(
+            fecha=fecha, hora_entrada=datetime.time(6, 0), empleado=empleado, proyecto=proyecto,
+        )
+        Produccion.objects.create(proyecto=proyecto, empleado=empleado, fecha=fecha, cantidad_producida='12.50')
+        verificacion = Verificacion.objects.create(lista=lista, estado='aprobado')
+        Prestamo.objects.create(
+            verificacion=verificacion, fecha_entrega=fecha, empleado=empleado, herramienta_prestada=herramienta,
+        )
+    Cargo.objects.create(nombre_cargo='Supervisor', nivel_acceso='alto')
+    Empleado.objects.create(cargo=cargo, cedula='200', nombres='Luis Pérez', nivel_acceso='bajo')
+    Proyecto.objects.create(nombre='Mina Sur', fecha_inicio=datetime.date(2024, 2, 1), estado='activo')
+    Herramienta.objects.create(nombre='Pala', cantidad=3)
+    ListaDeChequeo.objects.create(nombre='Pala - revisión')
+    return cargo, empleado, proyecto
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user('supervisor', password='x')
+        self.client.force_authenticate(user)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.empleado, self.proyecto = crear_datos_base()
+        horas = [datetime.time(6, 0), datetime.time(14, 0), None]
+        for dia in range(1, 8):
+            for hora in horas:
+                ControlDeIngreso.objects.create(
+                    fecha=datetime.date(2024, 3, dia), hora_entrada=hora,
+                    empleado=self.empleado, proyecto=self.proyecto,
+                )
+
+    def recorrer(self, url):
+        ids, paginas = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            paginas.append(response.data)
+            url = response.data['next']
+        return ids, paginas
+
+    def test_recorre_todo_en_el_orden_del_viewset(self):
+        ids, paginas = self.recorrer('/api/control-ingresos/?page_size=4')
+        esperado = list(
+            ControlDeIngreso.objects.order_by('-fecha', '-hora_entrada', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, esperado)
+        self.assertEqual(len(paginas), 6)
+        self.assertIsNone(paginas[0]['previous'])
+
+    def test_previous_devuelve_la_pagina_anterior(self):
+        primera = self.client.get('/api/control-ingresos/?page_size=5').data
+        segunda = self.client.get(primera['next']).data
+        anterior = self.client.get(segunda['previous']).data
+        self.assertEqual(
+            [row['id'] for row in anterior['results']],
+            [row['id'] for row in primera['results']],
+        )
+
+    def test_no_cuenta_filas(self):
+        primera = self.client.get('/api/control-ingresos/?page_size=3').data
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(primera['next'])
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/control-ingresos/?cursor=basura')
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryPlanTests(APITestCase):
+    """
+    Corre EXPLAIN QUERY PLAN sobre cada SELECT que hacen los listados (primera
+    página y una página con cursor) y el dashboard, y falla si alguno vuelve a
+    recorrer una tabla completa sin índice.
+    """
+    LISTADOS = [
+        'cargos', 'empleados', 'proyectos', 'control-ingresos', 'produccion',
+        'herramientas', 'listas-chequeo', 'verificaciones', 'prestamos',
+    ]
+    DASHBOARD = ['/api/dashboard/stats/', '/api/dashboard/production-by-project/']
+    TABLE_SCAN = re.compile(r'^SCAN (\S+)$')
+
+    def setUp(self):
+        super().setUp()
+        crear_datos_completos()
+
+    def assertSinTableScan(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertTrue(selects, url)
+        with connection.cursor() as cursor:
+            for sql in selects:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                scans = [row[3] for row in cursor.fetchall() if self.TABLE_SCAN.match(row[3])]
+                self.assertEqual(scans, [], f'{url}: {sql}')
+        return response
+
+    def test_listados(self):
+        for nombre in self.LISTADOS:
+            with self.subTest(nombre):
+                response = self.assertSinTableScan(f'/api/{nombre}/?page_size=1')
+                self.assertSinTableScan(response.data['next'])
+
+    def test_dashboard(self):
+        for url in self.DASHBOARD:
+            with self.subTest(url):
+                self.assertSinTableScan(url)
+
+    def test_registros_abiertos(self):
+        consultas = [
+            ControlDeIngreso.objects.filter(hora_salida__isnull=True),
+            ControlDeIngreso.objects.filter(proyecto_id=1, hora_salida__isnull=True),
+            ControlDeIngreso.objects.filter(empleado_id=1, fecha__gte=datetime.date(2024, 3, 1)),
+            ControlDeIngreso.objects.filter(proyecto_id=1, fecha=datetime.date(2024, 3, 1)),
+            Produccion.objects.filter(proyecto_id=1, fecha__range=(datetime.date(2024, 3, 1), datetime.date(2024, 3, 31))),
+            Prestamo.objects.filter(fecha_devolucion__isnull=True),
+            Empleado.objects.filter(estado='activo'),
+        ]
+        for queryset in consultas:
+            with self.subTest(str(queryset.query)):
+                plan = queryset.explain()
+                self.assertIsNone(re.search(r'SCAN \S+$', plan, re.MULTILINE), plan)
+
+
+class ExpandTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cargo, self.empleado, self.proyecto = crear_datos_base()
+        self.proyecto.supervisor = Empleado.objects.create(
+            cargo=Cargo.objects.create(nombre_cargo='Supervisor', nivel_acceso='alto'),
+            cedula='900', nombres='Marta Ríos', nivel_acceso='alto',
+        )
+        self.proyecto.save()
+
+    def crear_ingresos(self, cantidad):
+        for dia in range(1, cantidad + 1):
+            ControlDeIngreso.objects.create(
+                fecha=datetime.date(2024, 3, dia), empleado=self.empleado, proyecto=self.proyecto,
+            )
+
+    def test_respuesta_plana_por_defecto(self):
+        self.crear_ingresos(1)
+        row = self.client.get('/api/control-ingresos/').data['results'][0]
+        self.assertEqual(row['empleado'], self.empleado.pk)
+        self.assertNotIn('empleado_detalle', row)
+        self.assertNotIn('proyecto_detalle', row)
+
+    def test_expand_anidado(self):
+        self.crear_ingresos(1)
+        url = '/api/control-ingresos/?expand=empleado.cargo,proyecto.supervisor'
+        row = self.client.get(url).data['results'][0]
+        self.assertEqual(row['empleado_detalle']['cargo_detalle']['nombre_cargo'], 'Minero')
+        supervisor = row['proyecto_detalle']['supervisor_detalle']
+        self.assertEqual(supervisor['nombres'], 'Marta Ríos')
+        self.assertNotIn('cargo_detalle', supervisor)
+
+    def test_fields(self):
+        self.crear_ingresos(1)
+        row = self.client.get('/api/control-ingresos/?fields=id,fecha&expand=empleado').data['results'][0]
+        self.assertEqual(set(row), {'id', 'fecha', 'empleado_detalle'})
+
+    def test_consultas_constantes(self):
+        url = '/api/control-ingresos/?expand=empleado.cargo,proyecto.supervisor.cargo'
+        self.crear_ingresos(2)
+        with CaptureQueriesContext(connection) as pocos:
+            self.client.get(url)
+        self.crear_ingresos(20)
+        with CaptureQueriesContext(connection) as muchos:
+            self.client.get(url)
+        self.assertEqual(len(pocos), len(muchos))
+        self.assertEqual(len(muchos), 1)
+
+
+class HuellaTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.empleado, self.proyecto = crear_datos_base()
+        self.empleado.huella = b'\x00\x01plantilla'
+        self.empleado.save()
+
+    def test_listados_no_leen_ni_devuelven_la_huella(self):
+        ControlDeIngreso.objects.create(fecha=datetime.date(2024, 3, 1), empleado=self.empleado, proyecto=self.proyecto)
+        for url in ['/api/empleados/', '/api/control-ingresos/?expand=empleado']:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertNotIn('"huella"', ctx.captured_queries[-1]['sql'], url)
+            self.assertNotIn('huella', str(response.data), url)
+
+    def test_descarga_cruda_con_etag(self):
+        url = f'/api/empleados/{self.empleado.pk}/huella/'
+        response = self.client.get(url)
+        self.assertEqual(response.content, b'\x00\x01plantilla')
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        repetida = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+        self.assertEqual(self.client.get('/api/empleados/abc/huella/').status_code, 404)
+
+    def test_subida_cruda(self):
+        url = f'/api/empleados/{self.empleado.pk}/huella/'
+        antes = self.client.get(url)['ETag']
+        response = self.client.put(url, b'nueva', content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 204)
+        self.assertNotEqual(response['ETag'], antes)
+        self.assertEqual(self.client.get(url).content, b'nueva')
+
+    def test_escritura_en_json(self):
+        url = f'/api/empleados/{self.empleado.pk}/'
+        response = self.client.patch(url, {'huella': base64.b64encode(b'desde json').decode()}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('huella', response.data)
+        self.assertEqual(self.client.get(f'{url}huella/').content, b'desde json')
+        response = self.client.post('/api/empleados/', {
+            'cargo': self.empleado.cargo_id, 'cedula': '300', 'nombres': 'Nuevo', 'nivel_acceso': 'bajo',
+            'huella': base64.b64encode(b'al crear').decode(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(bytes(Empleado.objects.get(cedula='300').huella), b'al crear')
+        # Un PATCH sin huella no la toca
+        self.client.patch(url, {'nombres': 'Ana María'}, format='json')
+        self.assertEqual(self.client.get(f'{url}huella/').content, b'desde json')
+        response = self.client.patch(url, {'huella': 'no es base64!'}, format='json')
+        self.assertEqual((response.status_code, list(response.data)), (400, ['huella']))
+
+    def test_descarga_masiva(self):
+        Empleado.objects.create(cargo=self.empleado.cargo, cedula='300', nombres='Sin Huella', nivel_acceso='bajo')
+        response = self.client.get('/api/empleados/huellas/')
+        cuerpo = b''.join(response.streaming_content)
+        pk, largo = struct.unpack('>QI', cuerpo[:12])
+        self.assertEqual((pk, cuerpo[12:12 + largo]), (self.empleado.pk, b'\x00\x01plantilla'))
+        self.assertEqual(len(cuerpo), 12 + largo)
+        repetida = self.client.get('/api/empleados/huellas/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+
+class IdentificacionHuellasTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cargo, self.empleado, _ = crear_datos_base()
+        rng = np.random.default_rng(7)
+        self.plantillas = {}
+        for i in range(20):
+            plantilla = rng.integers(0, 256, TAMANO_PLANTILLA, dtype=np.uint8).tobytes()
+            empleado = Empleado.objects.create(
+                cargo=self.cargo, cedula=f'H{i}', nombres=f'Empleado {i}', nivel_acceso='bajo', huella=plantilla,
+            )
+            self.plantillas[empleado.pk] = plantilla
+        indice_huellas.cargar()
+        self.addCleanup(setattr, indice_huellas, 'cargado_en', None)
+
+    def sonda_ruidosa(self, plantilla, bits=100):
+        sonda = bytearray(plantilla)
+        for i in range(bits):  # Cambia unos pocos bits, como una captura real
+            sonda[i * 2] ^= 1
+        return bytes(sonda)
+
+    def test_identifica_con_ruido(self):
+        pk, plantilla = list(self.plantillas.items())[5]
+        response = self.client.post(
+            '/api/huellas/identificar/', self.sonda_ruidosa(plantilla), content_type='application/octet-stream',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['empleado'], pk)
+        self.assertIn('latencia_ms', response.data)
+
+    def test_sin_coincidencia(self):
+        response = self.client.post('/api/huellas/identificar/', {'plantilla': 'AAAA'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(response.data['empleado'])
+
+    def test_actualizacion_incremental(self):
+        pk, plantilla = next(iter(self.plantillas.items()))
+        empleado = Empleado.objects.get(pk=pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            empleado.estado = 'inactivo'
+            empleado.save()
+        self.assertNotIn(pk, indice_huellas)
+        self.assertIsNone(indice_huellas.identificar(plantilla)['empleado'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = Empleado.objects.create(
+                cargo=self.cargo, cedula='N1', nombres='Nuevo', nivel_acceso='bajo', huella=plantilla,
+            )
+        self.assertEqual(indice_huellas.identificar(plantilla)['empleado'], nuevo.pk)
+
+    def test_latencia_con_10k_empleados(self):
+        indice = IndiceHuellas()
+        rng = np.random.default_rng(1)
+        plantillas = rng.integers(0, 256, (10_000, indice.tamano), dtype=np.uint8)
+        for pk, plantilla in enumerate(plantillas, start=1):
+            indice.actualizar(pk, plantilla.tobytes())
+        for _ in range(5):
+            resultado = indice.identificar(plantillas[1234].tobytes())
+        self.assertEqual(resultado['empleado'], 1235)
+        self.assertLess(indice.estadisticas()['latencia_promedio_ms'], 50)
+
+
+class IngestaLoteTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.empleado, self.proyecto = crear_datos_base()
+        self.url = '/api/control-ingresos/lote/'
+
+    def test_entradas_salidas_y_errores(self):
+        abierto = ControlDeIngreso.objects.create(
+            fecha=datetime.date(2024, 3, 1), hora_entrada=datetime.time(22, 0),
+            empleado=self.empleado, proyecto=self.proyecto,
+        )
+        eventos = [
+            {'tipo': 'salida', 'empleado': self.empleado.pk, 'hora_salida': '06:00'},
+            {'tipo': 'entrada', 'empleado': self.empleado.pk, 'proyecto': self.proyecto.pk,
+             'fecha': '2024-03-02', 'hora_entrada': '06:05'},
+            {'tipo': 'entrada', 'empleado': 9999, 'proyecto': self.proyecto.pk, 'fecha': '2024-03-02'},
+            {'tipo': 'entrada', 'empleado': self.empleado.pk, 'proyecto': self.proyecto.pk, 'fecha': 'ayer'},
+            {'tipo': 'salida', 'empleado': self.empleado.pk, 'hora_salida': '14:00'},
+        ]
+        response = self.client.post(self.url, eventos, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['creados'], response.data['cerrados'], response.data['errores']), (1, 2, 2))
+        estados = [r['estado'] for r in response.data['resultados']]
+        self.assertEqual(estados, ['cerrado', 'creado', 'error', 'error', 'cerrado'])
+        self.assertIn('empleado', response.data['resultados'][2]['errores'])
+        self.assertIn('fecha', response.data['resultados'][3]['errores'])
+
+        abierto.refresh_from_db()
+        self.assertEqual(abierto.hora_salida, datetime.time(6, 0))
+        nuevo = ControlDeIngreso.objects.get(pk=response.data['resultados'][1]['id'])
+        self.assertEqual((nuevo.hora_entrada, nuevo.hora_salida), (datetime.time(6, 5), datetime.time(14, 0)))
+
+    def test_tipos_invalidos_no_tumban_el_lote(self):
+        entrada = {'tipo': 'entrada', 'empleado': self.empleado.pk, 'proyecto': self.proyecto.pk, 'fecha': '2024-03-02'}
+        eventos = [
+            {**entrada, 'hora_entrada': 600},
+            {**entrada, 'fecha': [2024]},
+            {**entrada, 'lugar_trabajo': {'a': 1}},
+            {'tipo': 'salida', 'empleado': self.empleado.pk, 'hora_salida': 1400},
+            entrada,
+        ]
+        response = self.client.post(self.url, eventos, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['estado'] for r in response.data['resultados']], ['error'] * 4 + ['creado'])
+        self.assertEqual([set(r['errores']) for r in response.data['resultados'][:4]],
+                         [{'hora_entrada'}, {'fecha'}, {'lugar_trabajo'}, {'hora_salida'}])
+        self.assertEqual(ControlDeIngreso.objects.count(), 1)
+
+    def test_salida_por_id_y_por_empleado_del_mismo_registro(self):
+        abierto = ControlDeIngreso.objects.create(
+            fecha=datetime.date(2024, 3, 1), hora_entrada=datetime.time(22, 0),
+            empleado=self.empleado, proyecto=self.proyecto,
+        )
+        for eventos in (
+            [{'tipo': 'salida', 'id': abierto.pk, 'hora_salida': '06:00'},
+             {'tipo': 'salida', 'empleado': self.empleado.pk, 'hora_salida': '07:00'}],
+            [{'tipo': 'salida', 'empleado': self.empleado.pk, 'hora_salida': '06:00'},
+             {'tipo': 'salida', 'id': abierto.pk, 'hora_salida': '07:00'}],
+        ):
+            with self.subTest(primero=list(eventos[0])[1]):
+                ControlDeIngreso.objects.filter(pk=abierto.pk).update(hora_salida=None, estado='activo')
+                response = self.client.post(self.url, eventos, format='json')
+                self.assertEqual([r['estado'] for r in response.data['resultados']], ['cerrado', 'error'])
+                abierto.refresh_from_db()
+                self.assertEqual(abierto.hora_salida, datetime.time(6, 0))
+
+    def test_ndjson_con_consultas_constantes(self):
+        def cuerpo(n):
+            return '\n'.join(
+                json.dumps({'empleado': self.empleado.pk, 'proyecto': self.proyecto.pk, 'fecha': f'2024-03-{d % 28 + 1:02d}'})
+                for d in range(n)
+            )
+        with CaptureQueriesContext(connection) as pocos:
+            self.client.post(self.url, cuerpo(5), content_type='application/x-ndjson')
+        with CaptureQueriesContext(connection) as muchos:
+            response = self.client.post(self.url, cuerpo(60), content_type='application/x-ndjson')
+        self.assertEqual(response.data['creados'], 60)
+        self.assertEqual(len(pocos), len(muchos))
+
+
+class ResumenesProduccionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cargo, self.empleado, self.proyecto = crear_datos_base()
+        self.otro = Proyecto.objects.create(nombre='Mina Sur', fecha_inicio=datetime.date(2024, 1, 1))
+
+    def resumen(self, modelo=None, **filtro):
+        modelo = modelo or ResumenProduccionProyecto
+        return {
+            (getattr(r, 'proyecto_id', None) or r.empleado_id, r.periodo, r.fecha): (r.cantidad_total, r.registros)
+            for r in modelo.objects.filter(**filtro)
+        }
+
+    def test_crear_editar_borrar(self):
+        p1 = Produccion.objects.create(proyecto=self.proyecto, empleado=self.empleado, fecha=datetime.date(2024, 3, 5), cantidad_producida=Decimal('10'))
+        Produccion.objects.create(proyecto=self.proyecto, empleado=self.empleado, fecha=datetime.date(2024, 3, 20), cantidad_producida=Decimal('5'))
+        mes = self.resumen(periodo='mes')
+        self.assertEqual(mes[(self.proyecto.pk, 'mes', datetime.date(2024, 3, 1))], (Decimal('15'), 2))
+
+        p1.proyecto = self.otro
+        p1.fecha = datetime.date(2024, 4, 1)
+        p1.save()
+        mes = self.resumen(periodo='mes')
+        self.assertEqual(mes[(self.proyecto.pk, 'mes', datetime.date(2024, 3, 1))], (Decimal('5'), 1))
+        self.assertEqual(mes[(self.otro.pk, 'mes', datetime.date(2024, 4, 1))], (Decimal('10'), 1))
+        self.assertNotIn((self.proyecto.pk, 'dia', datetime.date(2024, 3, 5)), self.resumen(periodo='dia'))
+
+        Produccion.objects.filter(proyecto=self.otro).delete()
+        self.assertFalse(ResumenProduccionProyecto.objects.filter(proyecto=self.otro).exists())
+        empleado = self.resumen(ResumenProduccionEmpleado, periodo='total')
+        self.assertEqual(empleado[(self.empleado.pk, 'total', None)], (Decimal('5'), 1))
+
+    def test_reconstruir_coincide_con_incremental(self):
+        for dia in range(1, 40):
+            Produccion.objects.create(
+                proyecto=self.proyecto if dia % 2 else self.otro, empleado=self.empleado,
+                fecha=datetime.date(2024, 1, 1) + datetime.timedelta(days=dia * 3), cantidad_producida=Decimal(dia),
+            )
+        incremental = (self.resumen(), self.resumen(ResumenProduccionEmpleado))
+        reconstruir_resumenes()
+        self.assertEqual((self.resumen(), self.resumen(ResumenProduccionEmpleado)), incremental)
+
+    def test_escrituras_masivas(self):
+        fecha = datetime.date(2024, 3, 5)
+        Produccion.objects.create(proyecto=self.proyecto, empleado=self.empleado, fecha=fecha, cantidad_producida=Decimal('10'))
+        Produccion.objects.filter(proyecto=self.proyecto).update(cantidad_producida=Decimal('50'))
+        Produccion.objects.bulk_create([
+            Produccion(proyecto=self.proyecto, empleado=self.empleado, fecha=fecha, cantidad_producida=Decimal('5')),
+            Produccion(proyecto=self.otro, empleado=self.empleado, fecha=fecha, cantidad_producida=Decimal('7')),
+        ])
+        total = self.resumen(periodo='total')
+        self.assertEqual(total[(self.proyecto.pk, 'total', None)], (Decimal('55'), 2))
+
+        # Mover de proyecto y de mes por update y bulk_update: se recalcula también lo de antes
+        Produccion.objects.filter(proyecto=self.otro).update(proyecto=self.proyecto, fecha=datetime.date(2024, 4, 1))
+        filas = list(Produccion.objects.filter(cantidad_producida=Decimal('5')))
+        filas[0].fecha = datetime.date(2024, 4, 2)
+        Produccion.objects.bulk_update(filas, ['fecha'])
+        self.assertFalse(ResumenProduccionProyecto.objects.filter(proyecto=self.otro).exists())
+        incremental = (self.resumen(), self.resumen(ResumenProduccionEmpleado))
+        self.assertEqual(incremental[0][(self.proyecto.pk, 'mes', datetime.date(2024, 4, 1))], (Decimal('12'), 2))
+        reconstruir_resumenes()
+        self.assertEqual((self.resumen(), self.resumen(ResumenProduccionEmpleado)), incremental)
+
+    def test_dashboard_lee_resumenes(self):
+        hoy = timezone.localdate()
+        Produccion.objects.create(proyecto=self.proyecto, empleado=self.empleado, fecha=hoy, cantidad_producida=Decimal('30'))
+        Produccion.objects.create(proyecto=self.otro, empleado=self.empleado, fecha=hoy, cantidad_producida=Decimal('10'))
+        with CaptureQueriesContext(connection) as ctx:
+            stats = self.client.get('/api/dashboard/stats/').data
+            top = self.client.get('/api/dashboard/production-by-project/').data
+        self.assertFalse(any('"Adminitrativo_produccion"' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(stats['produccion_mensual'], Decimal('40'))
+        self.assertEqual([(p['id'], p['porcentaje_produccion']) for p in top], [(self.proyecto.pk, 75.0), (self.otro.pk, 25.0)])
+
+
+class CacheVersionadoTests(APITestCase):
+    URL = '/api/dashboard/production-by-project/'
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            _, self.empleado, self.proyecto = crear_datos_base()
+            Produccion.objects.create(proyecto=self.proyecto, empleado=self.empleado, fecha=timezone.localdate(), cantidad_producida=Decimal('8'))
+
+    def consultas(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response.data, len(ctx.captured_queries)
+
+    def comprobar_invalidacion(self):
+        _, primera = self.consultas(self.URL)
+        datos, segunda = self.consultas(self.URL)
+        self.assertGreater(primera, 0)
+        self.assertEqual(segunda, 0)
+        self.assertEqual(datos[0]['nombre_proyecto'], 'Mina Norte')
+
+        # Operación masiva: no dispara señales pero sí sube la versión
+        Proyecto.objects.filter(pk=self.proyecto.pk).update(nombre='Mina Renombrada')
+        datos, tercera = self.consultas(self.URL)
+        self.assertGreater(tercera, 0)
+        self.assertEqual(datos[0]['nombre_proyecto'], 'Mina Renombrada')
+
+        Produccion.objects.create(proyecto=self.proyecto, empleado=self.empleado, fecha=timezone.localdate(), cantidad_producida=Decimal('2'))
+        datos, _ = self.consultas(self.URL)
+        self.assertEqual(datos[0]['cantidad_total'], Decimal('10'))
+
+    def test_locmem(self):
+        backend = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas'}
+        with self.settings(CACHES={'default': backend}):
+            self.comprobar_invalidacion()
+        contadores = self.client.get('/api/cache/estadisticas/').data
+        self.assertGreaterEqual(contadores['ProduccionPorProyectoView.get']['hits'], 1)
+
+    def test_archivos(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio}
+            with self.settings(CACHES={'default': backend}):
+                self.comprobar_invalidacion()
+
+    def test_una_escritura_por_modelo_y_transaccion(self):
+        versiones = caches['default']
+        with mock.patch.object(versiones, 'set', wraps=versiones.set) as escrituras:
+            with self.captureOnCommitCallbacks(execute=True):
+                for cantidad in ('1', '1'):
+                    Produccion.objects.create(proyecto=self.proyecto, empleado=self.empleado,
+                                              fecha=timezone.localdate(), cantidad_producida=Decimal(cantidad))
+                ControlDeIngreso.objects.create(fecha=timezone.localdate(), hora_entrada=datetime.time(6),
+                                                empleado=self.empleado, proyecto=self.proyecto)
+                # Nada se publica antes del commit, pero la misma transacción ya ve lo nuevo
+                self.assertEqual(escrituras.call_count, 0)
+                self.assertEqual(self.consultas(self.URL)[0][0]['cantidad_total'], Decimal('10'))
+        publicadas = sorted(c.args[0] for c in escrituras.call_args_list if c.args[0].startswith('versiones:'))
+        # Ni los resúmenes, ni Presencia, ni Cambio
+        self.assertEqual(publicadas, ['versiones:Adminitrativo.controldeingreso', 'versiones:Adminitrativo.produccion'])
+
+        # Un rollback no publica nada
+        with mock.patch.object(versiones, 'set', wraps=versiones.set) as escrituras:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    Produccion.objects.all().update(cantidad_producida=Decimal('0'))
+                    transaction.set_rollback(True)
+        self.assertEqual((callbacks, escrituras.call_count), ([], 0))
+        self.assertEqual(self.consultas(self.URL)[0][0]['cantidad_total'], Decimal('10'))
+
+    def test_brief(self):
+        self.assertEqual(self.consultas('/api/proyectos/brief/')[0], [{'id': self.proyecto.pk, 'nombre': 'Mina Norte'}])
+        self.assertEqual(self.consultas('/api/proyectos/brief/')[1], 0)
+        self.proyecto.delete()
+        self.assertEqual(self.consultas('/api/proyectos/brief/')[0], [])
+
+
+class InformesTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.empleado, self.proyecto = crear_datos_completos()
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajustes = self.settings(INFORMES_DIR=self.directorio.name, INFORMES_SINCRONO=True)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def generar(self, **datos):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/reports/generate/', datos, format='json')
+        self.assertEqual(response.status_code, 202, response.data)
+        return self.client.get(f"/api/reports/{response.data['id']}/").data
+
+    def descargar(self, informe, **headers):
+        response = self.client.get(f"/api/reports/{informe['id']}/download/", headers=headers)
+        return response, b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_csv_asistencia_por_proyecto(self):
+        informe = self.generar(reportType='personnel', project=self.proyecto.pk, startDate='2024-03-02')
+        self.assertEqual((informe['estado'], informe['reportType'], informe['filas']), ('listo', 'attendance', 1))
+        response, contenido = self.descargar(informe)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        filas = list(csv.reader(io.StringIO(contenido.decode('utf-8-sig'))))
+        self.assertEqual(filas[0][:3], ['ID', 'Fecha', 'Hora entrada'])
+        self.assertEqual(filas[1][1], '2024-03-02')
+        self.assertEqual(filas[1][5], 'Ana Núñez')
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        informe = self.generar(reportType='production', format='xlsx')
+        self.assertEqual(informe['filas'], 2)
+        _, contenido = self.descargar(informe)
+        hoja = load_workbook(io.BytesIO(contenido), read_only=True).active
+        filas = list(hoja.values)
+        self.assertEqual(filas[0][-1], 'Cantidad producida')
+        self.assertEqual(len(filas), 3)
+
+    def test_range(self):
+        informe = self.generar(reportType='employee_list')
+        _, completo = self.descargar(informe)
+        response, parte = self.descargar(informe, Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(parte, completo[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(completo)}')
+        _, cola = self.descargar(informe, Range='bytes=-5')
+        self.assertEqual(cola, completo[-5:])
+        response, _ = self.descargar(informe, Range=f'bytes={len(completo)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_pendiente_y_errores(self):
+        response = self.client.post('/api/reports/generate/', {'reportType': 'nada', 'startDate': 'ayer'}, format='json')
+        self.assertEqual(set(response.data), {'reportType', 'startDate'})
+        # Sin ejecutar on_commit el informe sigue pendiente y no se puede descargar
+        response = self.client.post('/api/reports/generate/', {'reportType': 'tool_loans'}, format='json')
+        self.assertEqual(response.data['estado'], 'pendiente')
+        self.assertEqual(self.descargar(response.data)[0].status_code, 409)
+        self.assertEqual(self.client.get('/api/dashboard/stats/').data['informes_generados'], 0)
+        self.generar(reportType='tool_loans')
+        self.assertEqual(self.client.get('/api/dashboard/stats/').data['informes_generados'], 1)
+        self.assertEqual(Informe.objects.count(), 2)
+
+    def sin_latido(self, informe):
+        hace_una_hora = timezone.now() - datetime.timedelta(hours=1)
+        Informe.objects.filter(pk=informe.pk).update(fecha_creacion=hace_una_hora, fecha_actualizacion=hace_una_hora)
+
+    def test_interrumpido_por_reinicio(self):
+        viejo = Informe.objects.create(tipo='tool_loans', estado=Informe.ESTADO_PROCESANDO)
+        reciente = Informe.objects.create(tipo='tool_loans')
+        self.sin_latido(viejo)
+        datos = self.client.get(f'/api/reports/{viejo.pk}/').data
+        self.assertEqual(datos['estado'], 'error')
+        self.assertIn('reinició', datos['error'])
+        self.assertEqual(Informe.objects.get(pk=viejo.pk).estado, 'error')
+        self.assertEqual(self.client.get(f'/api/reports/{reciente.pk}/').data['estado'], 'pendiente')
+        # Si lo tiene el pool de este proceso, sigue esperando
+        viejo = Informe.objects.create(tipo='tool_loans')
+        self.sin_latido(viejo)
+        with mock.patch.object(reportes, '_en_curso', {viejo.pk}):
+            self.assertEqual(self.client.get(f'/api/reports/{viejo.pk}/').data['estado'], 'pendiente')
+        # Pedido hace mucho pero con latido reciente de otro worker: tampoco
+        Informe.objects.filter(pk=viejo.pk).update(estado=Informe.ESTADO_PROCESANDO, proceso='otro:1')
+        self.assertEqual(self.client.get(f'/api/reports/{viejo.pk}/').data['estado'], 'procesando')
+
+    def test_latido_y_dueno_que_llega_tarde(self):
+        informe = Informe.objects.create(tipo='tool_loans')
+        self.sin_latido(informe)
+        with mock.patch.object(reportes, 'LATIDO_SEGUNDOS', 0):
+            reportes.generar(informe.pk)
+        informe.refresh_from_db()
+        self.assertEqual(informe.estado, 'listo')
+        self.assertEqual(informe.proceso, reportes.proceso())
+        self.assertGreater(informe.fecha_actualizacion, timezone.now() - datetime.timedelta(minutes=1))
+
+        # Otro worker lo da por perdido mientras se escribe: el dueño no lo pasa a listo
+        escribir_csv = reportes.ESCRITORES['csv']
+        def perdido(destino, encabezado, datos):
+            Informe.objects.filter(pk=informe.pk).update(estado=Informe.ESTADO_ERROR, error='perdido')
+            return escribir_csv(destino, encabezado, datos)
+        informe = Informe.objects.create(tipo='tool_loans')
+        with mock.patch.dict(reportes.ESCRITORES, csv=perdido):
+            reportes.generar(informe.pk)
+        informe.refresh_from_db()
+        self.assertEqual((informe.estado, informe.error), ('error', 'perdido'))
+        # Con latido se entera antes y deja de escribir
+        informe = Informe.objects.create(tipo='tool_loans')
+        with mock.patch.dict(reportes.ESCRITORES, csv=perdido), mock.patch.object(reportes, 'LATIDO_SEGUNDOS', 0), \
+                self.assertLogs('Adminitrativo.reportes', 'ERROR'):
+            reportes.generar(informe.pk)
+        informe.refresh_from_db()
+        self.assertEqual((informe.estado, informe.error), ('error', 'perdido'))
+        self.assertEqual(os.listdir(self.directorio.name), [f'{Informe.objects.get(estado="listo").pk}.csv'])
+        # Y si lo marcaron antes de que saliera de la cola, ni empieza
+        reportes.generar(informe.pk)
+        self.assertEqual(Informe.objects.get(pk=informe.pk).estado, 'error')
+
+
+class GetCondicionalTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cargo, self.empleado, self.proyecto = crear_datos_completos()
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, headers=headers)
+        return response, len(ctx.captured_queries)
+
+    def test_listado(self):
+        url = '/api/empleados/?expand=cargo'
+        response, _ = self.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        response, consultas = self.get(url, If_None_Match=etag)
+        self.assertEqual((response.status_code, consultas), (304, 0))
+        response, _ = self.get(url, If_Modified_Since=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        # Cambia un modelo expandido: el listado deja de estar vigente
+        Cargo.objects.filter(pk=self.cargo.pk).update(nombre_cargo='Minero II')
+        response, _ = self.get(url, If_None_Match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['cargo_detalle']['nombre_cargo'], 'Minero II')
+        # Sin expand el cargo no importa, pero la ruta distinta da otro ETag
+        self.assertNotEqual(self.get('/api/empleados/')[0]['ETag'], etag)
+
+    def test_detalle(self):
+        url = f'/api/proyectos/{self.proyecto.pk}/'
+        response, _ = self.get(url)
+        etag = response['ETag']
+        response, consultas = self.get(url, If_None_Match=etag)
+        self.assertEqual((response.status_code, consultas), (304, 1))
+        # Otro proyecto cambia: este sigue vigente
+        Proyecto.objects.exclude(pk=self.proyecto.pk).update(estado='finalizado')
+        self.assertEqual(self.get(url, If_None_Match=etag)[0].status_code, 304)
+        self.proyecto.estado = 'finalizado'
+        self.proyecto.save(update_fields=['estado'])
+        self.assertEqual(self.get(url, If_None_Match=etag)[0].status_code, 200)
+        self.assertEqual(self.get('/api/proyectos/999/', If_None_Match=etag)[0].status_code, 404)
+        for url in ['/api/proyectos/abc/', '/api/empleados/abc/', '/api/herramientas/abc/']:
+            self.assertEqual(self.get(url)[0].status_code, 404, url)
+
+    def test_vistas_cacheadas(self):
+        response, _ = self.get('/api/dashboard/production-by-project/')
+        response, consultas = self.get('/api/dashboard/production-by-project/', If_None_Match=response['ETag'])
+        self.assertEqual((response.status_code, consultas), (304, 0))
+        response, _ = self.get('/api/dashboard/stats/')
+        self.assertFalse(response.has_header('Last-Modified'))  # Depende del mes en curso
+        self.assertEqual(self.get('/api/dashboard/stats/', If_None_Match=response['ETag'])[0].status_code, 304)
+
+
+class ListadoRapidoTests(APITestCase):
+    URLS = [
+        '/api/cargos/', '/api/empleados/', '/api/proyectos/', '/api/control-ingresos/', '/api/produccion/',
+        '/api/herramientas/', '/api/listas-chequeo/', '/api/verificaciones/', '/api/prestamos/',
+        '/api/produccion/?page_size=2', '/api/control-ingresos/?fields=id,hora_salida',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        _, self.empleado, self.proyecto = crear_datos_completos()
+        self.empleado.telefono = 'línea\u2028dos'
+        self.empleado.save()
+        Produccion.objects.create(
+            proyecto=self.proyecto, empleado=self.empleado, fecha=datetime.date(2024, 3, 3),
+            cantidad_producida=Decimal('7'), observaciones='ñandú "comillas"',
+        )
+        ControlDeIngreso.objects.filter(pk=ControlDeIngreso.objects.first().pk).update(
+            hora_salida=datetime.time(14, 30, 15, 123456),
+        )
+
+    def lento(self, url):
+        with mock.patch.object(listados.ListadoRapidoMixin, 'usar_listado_rapido', return_value=False):
+            return self.client.get(url)
+
+    def test_todos_los_viewsets_usan_el_camino_rapido(self):
+        for viewset in listados.ListadoRapidoMixin.__subclasses__():
+            with self.subTest(viewset=viewset.__name__):
+                self.assertIsNotNone(listados.columnas(viewset.serializer_class(expand=[])))
+
+    def test_misma_salida_que_el_serializer(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                while url:
+                    cache.clear()
+                    rapido = self.client.get(url)
+                    self.assertEqual(rapido.status_code, 200)
+                    # Mismos bytes que ModelSerializer + JSONRenderer de DRF
+                    self.assertEqual(rapido.content, JSONRenderer().render(self.lento(url).data))
+                    url = rapido.data['next']
+
+    def test_usa_el_serializer_con_expand(self):
+        response = self.client.get('/api/produccion/?expand=proyecto')
+        self.assertEqual(json.loads(response.content)['results'][0]['proyecto_detalle']['nombre'], 'Mina Norte')
+
+
+@unittest.skipUnless(os.environ.get('BENCHMARK'), 'Benchmark: BENCHMARK=1 python manage.py test Adminitrativo')
+class ListadoRapidoBenchmark(TestCase):
+    FILAS = 100_000
+
+    def test_100k_producciones(self):
+        _, empleado, proyecto = crear_datos_base()
+        inicio = datetime.date(2020, 1, 1)
+        Produccion.objects.bulk_create([
+            Produccion(
+                proyecto=proyecto, empleado=empleado, fecha=inicio + datetime.timedelta(days=i % 1500),
+                cantidad_producida=Decimal(i % 997) / 4, observaciones=f'turno {i % 3}',
+            ) for i in range(self.FILAS)
+        ], batch_size=2000)
+        queryset = Produccion.objects.order_by('fecha', 'id')
+
+        t0 = time.perf_counter()
+        lento = JSONRenderer().render(ProduccionSerializer(queryset, many=True, expand=[]).data)
+        t1 = time.perf_counter()
+        cols = listados.columnas(ProduccionSerializer(expand=[]))
+        salida = listados.preparar(cols)
+        rapido = listados.JSONRapidoRenderer().render([salida(fila) for fila in queryset.values(*[n for n, _ in cols])])
+        t2 = time.perf_counter()
+
+        self.assertEqual(rapido, lento)
+        print(f'\n{self.FILAS} filas: serializer {t1 - t0:.2f} s, rápido {t2 - t1:.2f} s ({(t1 - t0) / (t2 - t1):.1f}x)')
+        self.assertLess(t2 - t1, t1 - t0)
+
+
+class SincronizacionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cargo, self.empleado, self.proyecto = crear_datos_completos()
+        self.token = self.client.get('/api/sync/').data['token']
+
+    def sync(self, token=None, **params):
+        response = self.client.get('/api/sync/', {'token': token or self.token, **params})
+        if response.status_code == 200:
+            self.token = response.data['token']
+            response.data = json.loads(response.content)
+        return response
+
+    def test_solo_los_cambios(self):
+        self.assertEqual(self.sync().data['cambios'], {})
+        self.empleado.telefono = '555'
+        self.empleado.save()
+        self.empleado.save()  # Dos veces: se entrega una sola fila
+        Herramienta.objects.filter(nombre='Pala').update(cantidad=9)
+        ControlDeIngreso.objects.bulk_create([
+            ControlDeIngreso(fecha=datetime.date(2024, 4, 1), empleado=self.empleado, proyecto=self.proyecto),
+        ])
+        prestamo = Prestamo.objects.first()
+        prestamo_id = prestamo.pk
+        prestamo.delete()
+
+        with CaptureQueriesContext(connection) as ctx:
+            datos = self.sync().data
+        self.assertLessEqual(len(ctx.captured_queries), 6)
+        self.assertEqual([fila['telefono'] for fila in datos['cambios']['empleados']], ['555'])
+        # La Pica también cambia: el préstamo borrado le devuelve una unidad
+        herramientas = {fila['nombre']: fila for fila in datos['cambios']['herramientas']}
+        self.assertEqual((herramientas['Pala']['cantidad'], herramientas['Pala']['disponible']), (9, 9))
+        self.assertEqual(herramientas['Pica']['disponible'], 4)
+        self.assertEqual(datos['cambios']['control-ingresos'][0]['fecha'], '2024-04-01')
+        self.assertEqual(datos['eliminados'], {'prestamos': [prestamo_id]})
+        # Mismo formato que los listados
+        listado = json.loads(self.client.get('/api/empleados/?fields=id,telefono').content)['results']
+        self.assertIn({'id': self.empleado.pk, 'telefono': '555'}, listado)
+        self.assertEqual(set(datos['cambios']['empleados'][0]), set(json.loads(
+            self.client.get('/api/empleados/').content)['results'][0]))
+
+        self.assertEqual(self.sync().data['cambios'], {})
+
+    def test_bulk_update_registra_una_vez(self):
+        herramientas = list(Herramienta.objects.all())
+        for herramienta in herramientas:
+            herramienta.cantidad += 1
+        antes = Cambio.objects.count()
+        Herramienta.objects.bulk_update(herramientas, ['cantidad'])
+        self.assertEqual(Cambio.objects.count() - antes, len(herramientas))
+
+    def test_creado_y_borrado_en_la_ventana(self):
+        herramienta = Herramienta.objects.create(nombre='Taladro', cantidad=1)
+        pk = herramienta.pk
+        herramienta.delete()
+        datos = self.sync().data
+        self.assertEqual((datos['cambios'], datos['eliminados']), ({}, {'herramientas': [pk]}))
+
+    def test_paginado(self):
+        for i in range(5):
+            Herramienta.objects.create(nombre=f'H{i}', cantidad=i)
+        nombres, llamadas = [], 0
+        while True:
+            datos = self.sync(limite=2).data
+            llamadas += 1
+            nombres += [fila['nombre'] for fila in datos['cambios'].get('herramientas', [])]
+            if not datos['mas']:
+                break
+        self.assertEqual((nombres, llamadas), ([f'H{i}' for i in range(5)], 3))
+
+    def test_token_invalido_y_vencido(self):
+        self.assertEqual(self.sync(token='basura').status_code, 400)
+        Herramienta.objects.create(nombre='Vieja', cantidad=1)
+        Cambio.objects.update(fecha=timezone.now() - datetime.timedelta(days=60))
+        Herramienta.objects.create(nombre='Nueva', cantidad=1)
+        call_command('purgar_cambios', dias=30, stdout=io.StringIO())
+        response = self.sync()
+        self.assertEqual((response.status_code, response.data['reset']), (410, True))
+        # Un token nuevo sigue funcionando
+        self.token = self.client.get('/api/sync/').data['token']
+        self.assertEqual(self.sync().status_code, 200)
+
+
+class BusquedaTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cargo, self.empleado, self.proyecto = crear_datos_base()
+        self.otro = Empleado.objects.create(cargo=self.cargo, cedula='200', nombres='Núñez Núñez', nivel_acceso='bajo')
+        self.con_email = Empleado.objects.create(
+            cargo=self.cargo, cedula='1.234.567', nombres='Raúl Soto', email='rsoto@koal.co', nivel_acceso='bajo',
+        )
+        # Relleno para que bm25 tenga un corpus razonable
+        for i, nombre in enumerate(['Pedro Gómez', 'Luis Rojas', 'Marta Díaz', 'José Ruiz', 'Sara Vega']):
+            Empleado.objects.create(cargo=self.cargo, cedula=str(300 + i), nombres=nombre, nivel_acceso='bajo')
+
+    def buscar(self, url, texto, **params):
+        response = self.client.get(url, {'search': texto, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_sin_acentos_prefijos_y_ranking(self):
+        datos = self.buscar('/api/empleados/', 'NUNEZ')
+        # Más apariciones del término, más relevante
+        self.assertEqual([e['id'] for e in datos['results']], [self.otro.pk, self.empleado.pk])
+        self.assertEqual([e['id'] for e in self.buscar('/api/empleados/', 'ana nu')['results']], [self.empleado.pk])
+        self.assertEqual([e['id'] for e in self.buscar('/api/empleados/', '1234567')['results']], [self.con_email.pk])
+        self.assertEqual([e['id'] for e in self.buscar('/api/empleados/', 'rsoto@koal')['results']], [self.con_email.pk])
+        self.assertEqual(self.buscar('/api/empleados/', '***')['results'], [])
+        self.assertEqual([p['id'] for p in self.buscar('/api/proyectos/', 'norte')['results']], [self.proyecto.pk])
+
+    def test_paginacion_por_relevancia(self):
+        primera = self.buscar('/api/empleados/', 'nunez', page_size=1)
+        self.assertEqual([e['id'] for e in primera['results']], [self.otro.pk])
+        segunda = self.client.get(primera['next']).data
+        self.assertEqual([e['id'] for e in segunda['results']], [self.empleado.pk])
+        self.assertIsNone(segunda['next'])
+        self.assertEqual(self.client.get('/api/empleados/', {'search': 'x', 'cursor': 'roto'}).status_code, 404)
+
+    def test_ingresos_por_empleado_y_observacion(self):
+        fecha = datetime.date(2024, 3, 1)
+        de_ana = ControlDeIngreso.objects.create(fecha=fecha, empleado=self.empleado, proyecto=self.proyecto)
+        con_nota = ControlDeIngreso.objects.create(
+            fecha=fecha, empleado=self.otro, proyecto=self.proyecto, observacion='Llegó sin casco',
+        )
+        Proyecto.objects.filter(pk=self.proyecto.pk).update(nombre='Mina Este')
+        self.assertEqual([i['id'] for i in self.buscar('/api/control-ingresos/', 'ana')['results']], [de_ana.pk])
+        self.assertEqual([i['id'] for i in self.buscar('/api/control-ingresos/', 'CASCO')['results']], [con_nota.pk])
+        self.assertEqual(len(self.buscar('/api/control-ingresos/', 'este')['results']), 2)
+        self.assertEqual(self.buscar('/api/control-ingresos/', 'norte')['results'], [])
+
+        # Las escrituras masivas y los borrados también actualizan el índice
+        Empleado.objects.filter(pk=self.empleado.pk).update(nombres='Ana Molina')
+        self.assertEqual(self.buscar('/api/empleados/', 'molina')['results'][0]['id'], self.empleado.pk)
+        con_nota.delete()
+        self.assertEqual(self.buscar('/api/control-ingresos/', 'casco')['results'], [])
+
+    def test_reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM busqueda_empleado')
+        self.assertEqual(self.buscar('/api/empleados/', 'pedro')['results'], [])
+        call_command('reconstruir_busqueda', stdout=io.StringIO())
+        self.assertEqual(len(self.buscar('/api/empleados/', 'pedro')['results']), 1)
+
+
+class DisponibilidadTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.empleado, _ = crear_datos_base()
+        self.taladro = Herramienta.objects.create(nombre='Taladro', cantidad=2)
+        self.pala = Herramienta.objects.create(nombre='Pala', cantidad=1)
+        self.lista = ListaDeChequeo.objects.create(nombre='Revisión')
+
+    def prestar(self, herramienta):
+        verificacion = Verificacion.objects.create(lista=self.lista, estado='aprobado')
+        return self.client.post('/api/prestamos/', {
+            'verificacion': verificacion.pk, 'fecha_entrega': '2024-03-01',
+            'empleado': self.empleado.pk, 'herramienta_prestada': herramienta.pk,
+        }, format='json')
+
+    def disponibles(self):
+        with CaptureQueriesContext(connection) as ctx:
+            datos = self.client.get('/api/herramientas/disponibilidad/').data
+        self.assertEqual(len(ctx), 1)
+        return {fila['nombre']: fila['disponible'] for fila in datos}
+
+    def test_prestar_devolver_y_agotar(self):
+        self.assertEqual(self.disponibles(), {'Pala': 1, 'Taladro': 2})
+        primero = self.prestar(self.taladro).data['id']
+        self.assertEqual(self.prestar(self.taladro).status_code, 201)
+        response = self.prestar(self.taladro)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('herramienta_prestada', response.data)
+        self.assertEqual(Prestamo.objects.count(), 2)
+        self.assertEqual(self.disponibles(), {'Pala': 1, 'Taladro': 0})
+
+        self.client.patch(f'/api/prestamos/{primero}/', {'fecha_devolucion': '2024-03-02'}, format='json')
+        self.assertEqual(self.disponibles()['Taladro'], 1)
+        # Reabrir y cambiar de herramienta mueve los dos contadores
+        self.client.patch(
+            f'/api/prestamos/{primero}/', {'fecha_devolucion': None, 'herramienta_prestada': self.pala.pk}, format='json',
+        )
+        self.assertEqual(self.disponibles(), {'Pala': 0, 'Taladro': 1})
+        self.client.delete(f'/api/prestamos/{primero}/')
+        self.assertEqual(self.disponibles(), {'Pala': 1, 'Taladro': 1})
+
+    def test_cantidad_y_escrituras_masivas(self):
+        self.prestar(self.taladro)
+        response = self.client.patch(f'/api/herramientas/{self.taladro.pk}/', {'cantidad': 0}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(f'/api/herramientas/{self.taladro.pk}/', {'cantidad': 5, 'disponible': 99}, format='json')
+        self.assertEqual(response.data['disponible'], 4)
+        Herramienta.objects.filter(pk=self.taladro.pk).update(cantidad=3)
+        self.assertEqual(self.disponibles()['Taladro'], 2)
+        # Una instancia vieja no pisa el contador
+        self.taladro.cantidad = 2
+        self.taladro.save()
+        self.assertEqual(self.taladro.disponible, 1)
+        Prestamo.objects.update(fecha_devolucion=datetime.date(2024, 3, 2))
+        self.assertEqual(self.disponibles()['Taladro'], 2)
+
+
+class PrestamosConcurrentesTests(SimpleTestCase):
+    def test_sin_sobreasignar(self):
+        resultado = subprocess.run(
+            [sys.executable, 'manage.py', 'estres_prestamos', '--hilos', '10', '--operaciones', '15', '--unidades', '2'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        self.assertIn('errores 0, máximo abiertos', resultado.stdout)
+
+
+class AsistenciaTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cargo, self.ana, self.proyecto = crear_datos_base()
+        self.luis = Empleado.objects.create(cargo=self.cargo, cedula='200', nombres='Luis Pérez', nivel_acceso='bajo')
+        self.rosa = Empleado.objects.create(cargo=self.cargo, cedula='300', nombres='Rosa Díaz', nivel_acceso='bajo')
+        Empleado.objects.create(cargo=self.cargo, cedula='400', nombres='Inactivo', nivel_acceso='bajo', estado='retirado')
+        Empleado.objects.update(fecha_registro=datetime.date(2024, 1, 1))
+        # 2024-03-01 es viernes: viernes y sábado laborables, domingo no
+        turnos = [
+            (self.ana, 1, (22, 0), (7, 0)),  # cruza la medianoche
+            (self.ana, 2, (6, 0), None),  # sigue adentro
+            (self.luis, 2, (13, 0), (20, 0)),
+            (self.rosa, 1, (6, 0), (12, 0)),  # dos tramos el mismo día
+            (self.rosa, 1, (13, 0), (17, 30)),
+        ]
+        for empleado, dia, entrada, salida in turnos:
+            ControlDeIngreso.objects.create(
+                fecha=datetime.date(2024, 3, dia), hora_entrada=datetime.time(*entrada),
+                hora_salida=datetime.time(*salida) if salida else None, empleado=empleado, proyecto=self.proyecto,
+            )
+
+    def test_calculo(self):
+        response = self.client.get('/api/asistencia/', {'desde': '2024-03-01', 'hasta': '2024-03-03'})
+        self.assertEqual(response.status_code, 200)
+        filas = {fila['nombres']: fila for fila in response.data['empleados']}
+        self.assertEqual(list(filas), ['Ana Núñez', 'Luis Pérez', 'Rosa Díaz'])
+        self.assertEqual(filas['Ana Núñez'], {
+            'empleado_id': self.ana.pk, 'cedula': '100', 'nombres': 'Ana Núñez', 'horas_trabajadas': 9.0,
+            'horas_ordinarias': 8.0, 'horas_extra': 1.0, 'horas_nocturnas': 8.0, 'dias_trabajados': 2,
+            'ausencias': 0, 'registros_abiertos': 1,
+        })
+        self.assertEqual(
+            [filas['Luis Pérez'][c] for c in ('horas_trabajadas', 'horas_extra', 'horas_nocturnas', 'ausencias')],
+            [7.0, 0, 0, 1],
+        )
+        self.assertEqual(
+            [filas['Rosa Díaz'][c] for c in ('horas_trabajadas', 'horas_ordinarias', 'horas_extra', 'ausencias')],
+            [10.5, 8.0, 2.5, 1],
+        )
+
+        response = self.client.get('/api/asistencia/', {'desde': '2024-03-01', 'hasta': '2024-03-03', 'empleado': self.luis.pk})
+        self.assertEqual([fila['cedula'] for fila in response.data['empleados']], ['200'])
+        response = self.client.get('/api/asistencia/', {'desde': '2024-03-03', 'hasta': '2024-03-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('hasta', response.data)
+        response = self.client.get('/api/asistencia/', {'desde': '2024-02-30'})
+        self.assertEqual((response.status_code, set(response.data)), (400, {'desde'}))
+
+    def test_las_ausencias_se_cuentan_hasta_hoy(self):
+        Empleado.objects.filter(pk=self.rosa.pk).update(fecha_registro=datetime.date(2024, 3, 2))
+        with mock.patch('django.utils.timezone.localdate', return_value=datetime.date(2024, 3, 1)):
+            filas = {fila['nombres']: fila for fila in self.client.get('/api/asistencia/', {'desde': '2024-03-01'}).data['empleados']}
+        # Luis faltó el viernes; lo que sigue del mes todavía no cuenta. Rosa aún no estaba registrada
+        self.assertEqual(filas['Luis Pérez']['ausencias'], 1)
+        self.assertEqual(filas['Rosa Díaz']['ausencias'], 0)
+
+    def test_comando_csv(self):
+        salida = io.StringIO()
+        call_command('asistencia', '--desde', '2024-03-01', '--hasta', '2024-03-03', stdout=salida, stderr=io.StringIO())
+        filas = list(csv.DictReader(io.StringIO(salida.getvalue())))
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[2]['horas_extra'], '2.5')
+
+
+@unittest.skipUnless(os.environ.get('BENCHMARK'), 'Benchmark: BENCHMARK=1 python manage.py test Adminitrativo')
+class AsistenciaBenchmark(TestCase):
+    EMPLEADOS = 5000
+
+    def test_un_mes_5000_empleados(self):
+        cargo, _, proyecto = crear_datos_base()
+        Empleado.objects.bulk_create([
+            Empleado(cargo=cargo, cedula=f'9{i:06d}', nombres=f'Empleado {i}', nivel_acceso='bajo')
+            for i in range(self.EMPLEADOS)
+        ], batch_size=2000)
+        Empleado.objects.update(fecha_registro=datetime.date(2024, 1, 1))
+        ids = list(Empleado.objects.values_list('id', flat=True))
+        registros = []
+        for dia in range(1, 32):
+            for n, empleado_id in enumerate(ids):
+                if (n + dia) % 7 == 0:
+                    continue
+                entrada = (6 + (n % 3) * 8) % 24  # turnos de 6, 14 y 22 h
+                registros.append(ControlDeIngreso(
+                    fecha=datetime.date(2024, 3, dia), hora_entrada=datetime.time(entrada, 0),
+                    hora_salida=datetime.time((entrada + 9) % 24, n % 60), empleado_id=empleado_id, proyecto=proyecto,
+                ))
+        ControlDeIngreso.objects.bulk_create(registros, batch_size=5000)
+
+        inicio = time.perf_counter()
+        filas = asistencia.calcular(datetime.date(2024, 3, 1), datetime.date(2024, 3, 31), hoy=datetime.date(2024, 4, 1))
+        segundos = time.perf_counter() - inicio
+        print(f'\n{len(registros)} registros, {len(filas)} empleados: {segundos:.2f} s')
+        self.assertEqual(len(filas), self.EMPLEADOS + 1)
+        self.assertLess(segundos, 5)
+
+
+class ArchivoTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cargo, self.empleado, self.proyecto = crear_datos_base()
+        for fecha in (datetime.date(2024, 1, 10), datetime.date(2024, 2, 10), timezone.localdate()):
+            ControlDeIngreso.objects.create(
+                fecha=fecha, hora_entrada=datetime.time(6, 0), hora_salida=datetime.time(16, 0),
+                empleado=self.empleado, proyecto=self.proyecto, observacion=f'turno {fecha:%B}',
+            )
+            Produccion.objects.create(proyecto=self.proyecto, empleado=self.empleado, fecha=fecha, cantidad_producida='10.50')
+        self.enero = datetime.date(2024, 1, 1)
+
+    def test_lo_archivado_se_sigue_leyendo(self):
+        antes = self.client.get('/api/control-ingresos/').data['results']
+        archivado = ControlDeIngreso.objects.get(fecha__month=1, fecha__year=2024)
+        self.assertEqual(archivo.archivar(ControlDeIngreso, self.enero), 1)
+        self.assertEqual(ControlDeIngreso.objects.count(), 2)
+        self.assertEqual(ControlDeIngreso.objects.historico().count(), 3)
+
+        self.assertEqual(self.client.get('/api/control-ingresos/').data['results'], antes)
+        response = self.client.get(f'/api/control-ingresos/{archivado.pk}/')
+        self.assertEqual(response.data['observacion'], 'turno January')
+        # Solo lectura
+        response = self.client.patch(f'/api/control-ingresos/{archivado.pk}/', {'observacion': 'x'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        ids = [fila['id'] for fila in self.client.get('/api/control-ingresos/', {'search': 'january'}).data['results']]
+        self.assertEqual(ids, [archivado.pk])
+
+        self.assertEqual(archivo.restaurar(ControlDeIngreso, self.enero), 1)
+        self.assertEqual(ControlDeIngreso.objects.count(), 3)
+        self.assertEqual(self.client.get('/api/control-ingresos/').data['results'], antes)
+
+    def test_solo_meses_cerrados_y_sin_ingresos_abiertos(self):
+        with self.assertRaises(archivo.ErrorArchivo):
+            archivo.archivar(ControlDeIngreso, timezone.localdate())
+        ControlDeIngreso.objects.filter(fecha__month=1, fecha__year=2024).update(hora_salida=None)
+        with self.assertRaises(archivo.ErrorArchivo):
+            archivo.archivar(ControlDeIngreso, self.enero)
+        self.assertEqual(ControlDeIngreso.objects.count(), 3)
+
+    def test_resumenes_informes_y_asistencia(self):
+        archivo.archivar(Produccion, self.enero)
+        archivo.archivar(ControlDeIngreso, self.enero)
+        totales = lambda: list(ResumenProduccionEmpleado.objects.filter(periodo='total').values_list('cantidad_total', 'registros'))
+        self.assertEqual(totales(), [(Decimal('31.50'), 3)])
+        reconstruir_resumenes()
+        self.assertEqual(totales(), [(Decimal('31.50'), 3)])
+
+        encabezado, filas = reportes.filas(Informe(tipo='production', formato='csv'))
+        self.assertEqual(len(list(filas)), 3)
+        filas = asistencia.calcular(self.enero, datetime.date(2024, 1, 31), hoy=datetime.date(2024, 1, 10))
+        self.assertEqual(filas[0]['horas_extra'], 2.0)
+
+        # El CASCADE también llega al archivo y descuenta de los resúmenes
+        otro = Empleado.objects.create(cargo=self.cargo, cedula='200', nombres='Luis Pérez', nivel_acceso='bajo')
+        Produccion.objects.filter(fecha__month=2).update(empleado=otro)
+        self.empleado.delete()
+        self.assertEqual(Produccion.objects.historico().count(), 1)
+        self.assertEqual(ResumenProduccionProyecto.objects.get(periodo='total').cantidad_total, Decimal('10.50'))
+
+    def test_comando(self):
+        salida = io.StringIO()
+        call_command('archivar', '--hasta', '2024-03', stdout=salida)
+        self.assertIn('ControlDeIngreso 2024-02: 1 filas archivadas', salida.getvalue())
+        self.assertEqual(ControlDeIngreso.objects.count(), 1)
+        salida = io.StringIO()
+        call_command('archivar', '--listar', stdout=salida)
+        self.assertEqual(len(salida.getvalue().splitlines()), 4)
+        call_command('archivar', '--restaurar', '--mes', '2024-01', '--mes', '2024-02', stdout=io.StringIO())
+        self.assertEqual(ControlDeIngreso.objects.count(), 3)
+
+
+class VistasAsyncTests(TestCase):
+    def setUp(self):
+        cache_cedulas.limpiar()
+        self.cargo, self.empleado, self.proyecto = crear_datos_base()
+        self.user = get_user_model().objects.create_user('portero', password='clave')
+        credenciales = base64.b64encode(b'portero:clave').decode()
+        self.basic = {'Authorization': f'Basic {credenciales}'}
+
+    async def test_busqueda_por_cedula(self):
+        url = '/api/empleados/cedula/100/'
+        self.assertEqual((await self.async_client.get(url)).status_code, 403)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual((datos['id'], datos['nombre'], datos['area']), (self.empleado.pk, 'Ana Núñez', 'Minero'))
+        self.assertEqual(datos['cargo'], self.cargo.pk)
+        self.assertEqual((await self.async_client.get('/api/empleados/cedula/999/')).status_code, 404)
+        # Las rutas del router siguen igual
+        self.assertEqual((await self.async_client.get(f'/api/empleados/{self.empleado.pk}/')).status_code, 200)
+
+    async def test_basic_auth(self):
+        response = await self.async_client.get('/api/empleados/cedula/100/', headers=self.basic)
+        self.assertEqual(response.status_code, 200)
+        malo = {'Authorization': 'Basic ' + base64.b64encode(b'portero:otra').decode()}
+        self.assertEqual((await self.async_client.get('/api/empleados/cedula/100/', headers=malo)).status_code, 403)
+
+    async def test_registrar_entrada_y_salida(self):
+        url = '/api/control-ingresos/registrar/'
+        entrada = {'tipo': 'entrada', 'empleado': self.empleado.pk, 'proyecto': self.proyecto.pk,
+                   'fecha': '2024-03-01', 'hora_entrada': '06:00'}
+        response = await self.async_client.post(url, entrada, content_type='application/json', headers=self.basic)
+        self.assertEqual(response.status_code, 201)
+        registro_id = response.json()['id']
+
+        salida = {'tipo': 'salida', 'empleado': self.empleado.pk, 'hora_salida': '14:00'}
+        response = await self.async_client.post(url, salida, content_type='application/json', headers=self.basic)
+        self.assertEqual(response.json(), {'estado': 'cerrado', 'id': registro_id})
+        registro = await ControlDeIngreso.objects.aget(pk=registro_id)
+        self.assertEqual((registro.hora_salida, registro.estado), (datetime.time(14, 0), 'cerrado'))
+        self.assertTrue(await Cambio.objects.filter(objeto_id=registro_id).aexists())
+
+        response = await self.async_client.post(url, salida, content_type='application/json', headers=self.basic)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('empleado', response.json())
+
+    async def test_sesion_exige_csrf(self):
+        cliente = AsyncClient(enforce_csrf_checks=True)
+        await cliente.aforce_login(self.user)
+        evento = {'empleado': self.empleado.pk, 'proyecto': self.proyecto.pk, 'fecha': '2024-03-01'}
+        response = await cliente.post('/api/control-ingresos/registrar/', evento, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(await ControlDeIngreso.objects.aexists())
+
+
+class CacheCedulasTests(TestCase):
+    def setUp(self):
+        cache_cedulas.limpiar()
+        self.cargo, self.empleado, _ = crear_datos_base()
+
+    def buscar(self, cedula, consultas):
+        with CaptureQueriesContext(connection) as capturadas:
+            datos = async_to_sync(abuscar)(cedula)
+        self.assertEqual(len(capturadas), consultas)
+        return datos
+
+    def test_una_consulta_y_despues_sin_base(self):
+        datos = self.buscar('100', 1)
+        self.assertEqual(
+            {k: datos[k] for k in ('nombre', 'area', 'estado', 'nivel_acceso')},
+            {'nombre': 'Ana Núñez', 'area': 'Minero', 'estado': 'activo', 'nivel_acceso': 'bajo'},
+        )
+        self.assertEqual(self.buscar('100', 0), datos)
+        # Las cédulas desconocidas también quedan guardadas
+        self.assertIsNone(self.buscar('999', 1))
+        self.assertIsNone(self.buscar('999', 0))
+
+    def test_invalidacion(self):
+        async_to_sync(abuscar)('100')
+        self.empleado.nombres = 'Ana María Núñez'
+        self.empleado.save()
+        self.assertEqual((self.buscar('100', 1))['nombre'], 'Ana María Núñez')
+
+        self.cargo.nombre_cargo = 'Perforista'
+        self.cargo.save()
+        self.assertEqual((self.buscar('100', 1))['area'], 'Perforista')
+
+        Empleado.objects.filter(pk=self.empleado.pk).update(estado='inactivo')
+        self.assertEqual((self.buscar('100', 1))['estado'], 'inactivo')
+
+        self.empleado.cedula = '101'
+        self.empleado.save()
+        self.assertIsNone(self.buscar('100', 1))
+
+        self.assertIsNone(async_to_sync(abuscar)('300'))
+        Empleado.objects.create(cargo=self.cargo, cedula='300', nombres='Nuevo', nivel_acceso='bajo')
+        self.assertEqual((self.buscar('300', 1))['nombre'], 'Nuevo')
+
+        self.empleado.delete()
+        self.assertIsNone(self.buscar('101', 1))
+
+    def test_lru_acotado(self):
+        lru = CacheCedulas(maximo=2)
+        for cedula in ('1', '2'):
+            lru.guardar(cedula, {'id': int(cedula), 'cargo': 1}, lru.generacion())
+        lru.obtener('1')  # '2' queda como el menos usado
+        lru.guardar('3', None, lru.generacion())
+        self.assertEqual(list(lru._datos), ['1', '3'])
+        # Lo leído antes de una invalidación no se guarda
+        generacion = lru.generacion()
+        lru.invalidar_cargo(1)
+        lru.guardar('4', {'id': 4, 'cargo': 1}, generacion)
+        self.assertEqual(list(lru._datos), ['3'])
+
+
+@unittest.skipUnless(
+    all(importlib.util.find_spec(m) for m in ('gunicorn', 'uvicorn')), 'Requiere gunicorn y uvicorn',
+)
+class CargaServidoresTests(SimpleTestCase):
+    def test_wsgi_y_asgi_responden(self):
+        resultado = subprocess.run(
+            [sys.executable, 'manage.py', 'carga_servidores', '--clientes', '20', '--peticiones', '2', '--demora', '0.05'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=180,
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        self.assertIn('WSGI: 40/40 ok', resultado.stdout)
+        self.assertIn('ASGI: 40/40 ok', resultado.stdout)
+
+
+class SQLiteConcurrenciaTests(SimpleTestCase):
+    def test_50_escritores_sin_bloqueos(self):
+        # En otro proceso: el runner de pruebas no deja abrir conexiones desde hilos
+        resultado = subprocess.run(
+            [sys.executable, 'manage.py', 'estres_sqlite', '--escritores', '50', '--transacciones', '10'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        self.assertIn('journal_mode=wal', resultado.stdout)
+        self.assertIn('errores de bloqueo: 0, contador: 500/500', resultado.stdout)
+
+
+class DatosSinteticosTests(TestCase):
+    TAMANOS = dict(
+        empleados=60, ingresos=3000, producciones=500, prestamos=300, proyectos=4, herramientas=6, dias=90,
+        hasta=datetime.date(2024, 3, 31), sensores=3, horas_gas=1, semilla=7,
+    )
+
+    def setUp(self):
+        self.totales = sintetico.generar(**self.TAMANOS)
+
+    def huella(self):
+        filas = ControlDeIngreso.objects.order_by('id').values_list('fecha', 'hora_entrada', 'empleado_id')
+        return hashlib.sha1(repr(list(filas)).encode()).hexdigest()
+
+    def test_datos_coherentes_y_deterministas(self):
+        self.assertEqual(self.totales['Empleado'], 60)
+        self.assertAlmostEqual(self.totales['ControlDeIngreso'], 3000, delta=300)
+        self.assertAlmostEqual(self.totales['Produccion'], 500, delta=100)
+        self.assertEqual(self.totales['Prestamo'], 300)
+        # ids en orden de fecha y el último turno de la noche sigue abierto
+        fechas = list(ControlDeIngreso.objects.order_by('id').values_list('fecha', flat=True))
+        self.assertEqual(fechas, sorted(fechas))
+        self.assertEqual(fechas[-1], datetime.date(2024, 3, 31))
+        self.assertTrue(ControlDeIngreso.objects.filter(hora_salida__isnull=True, fecha=fechas[-1]).exists())
+        # Derivados al día: disponibilidad, resúmenes y búsqueda
+        for herramienta in Herramienta.objects.all():
+            abiertos = herramienta.prestamos.filter(fecha_devolucion__isnull=True).count()
+            self.assertEqual(herramienta.disponible, herramienta.cantidad - abiertos)
+        total = ResumenProduccionProyecto.objects.filter(periodo='total').aggregate(t=Sum('cantidad_total'))['t']
+        self.assertAlmostEqual(total, Produccion.objects.aggregate(t=Sum('cantidad_producida'))['t'], places=2)
+        empleado = Empleado.objects.order_by('id').first()
+        self.client.force_login(get_user_model().objects.create_user('sintetico'))
+        response = self.client.get('/api/empleados/', {'search': empleado.cedula})
+        self.assertEqual([fila['id'] for fila in response.json()['results']], [empleado.pk])
+
+        huella = self.huella()
+        with self.assertRaises(sintetico.BaseNoVacia):
+            sintetico.generar(**self.TAMANOS)
+        for modelo in reversed(sintetico.MODELOS):
+            modelo._base_manager.all()._raw_delete(modelo._base_manager.db)
+        sintetico.generar(**self.TAMANOS)
+        self.assertEqual(self.huella(), huella)
+
+    def test_benchmark_recorre_todos_los_endpoints(self):
+        with tempfile.TemporaryDirectory() as directorio, self.settings(INFORMES_DIR=directorio):
+            resultado = rendimiento.correr(repeticiones=2, calentamiento=0)
+            self.assertEqual(os.listdir(directorio), [])
+        self.assertEqual(resultado['sin_caso'], [])
+        self.assertEqual(resultado['filas']['Empleado'], 60)
+        for nombre, medida in resultado['endpoints'].items():
+            self.assertLess(medida['estado'], 400, nombre)
+            self.assertLessEqual(medida['p50_ms'], medida['p99_ms'])
+        self.assertEqual(resultado['endpoints']['control-ingresos listado (If-None-Match)']['estado'], 304)
+        self.assertGreater(resultado['endpoints']['empleados ?search=']['consultas'], 0)
+        # Las escrituras se deshicieron
+        self.assertFalse(Informe.objects.exists())
+        self.assertFalse(ControlDeIngreso.objects.filter(fecha=timezone.localdate()).exists())
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as archivo:
+            rendimiento.guardar(resultado, archivo.name)
+            base = rendimiento.cargar(archivo.name)
+        self.assertEqual(rendimiento.comparar(resultado, base), [])
+        base['endpoints']['dashboard stats']['consultas'] -= 1
+        base['endpoints']['asistencia mes']['p95_ms'] /= 10
+        base['endpoints']['asistencia mes']['p95_ms'] -= 2
+        self.assertEqual(
+            [(nombre, metrica) for nombre, metrica, _, _ in rendimiento.comparar(resultado, base)],
+            [('asistencia mes', 'p95_ms'), ('dashboard stats', 'consultas')],
+        )
+
+
+def valor_metrica(texto, linea):
+    """Valor de la línea `nombre{etiquetas}` de una exposición (0 si no está)."""
+    for fila in texto.splitlines():
+        if fila.startswith(linea + ' '):
+            return float(fila.rsplit(' ', 1)[1])
+    return 0
+
+
+class MetricasTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        metricas.registro.reiniciar()
+        self.cargo, self.empleado, self.proyecto = crear_datos_base()
+        Produccion.objects.create(
+            empleado=self.empleado, proyecto=self.proyecto, fecha=datetime.date(2024, 3, 1),
+            cantidad_producida=Decimal('4.50'),
+        )
+
+    def test_metricas_por_ruta(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/api/produccion/')
+        self.assertEqual(response.status_code, 200)
+        self.client.get('/api/produccion/', {'expand': 'empleado'})
+
+        response = self.client.get('/api/metricas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        texto = response.content.decode()
+        ruta = '{ruta="produccion-list"}'
+        self.assertEqual(
+            valor_metrica(texto, 'koal_http_peticiones_total{ruta="produccion-list",metodo="GET",estado="200"}'), 2,
+        )
+        # Cuenta las mismas consultas que ve Django (sesión y usuario incluidos)
+        self.assertGreaterEqual(valor_metrica(texto, f'koal_http_sql_consultas_total{ruta}'), len(consultas))
+        self.assertGreater(valor_metrica(texto, f'koal_http_sql_segundos_total{ruta}'), 0)
+        self.assertGreater(valor_metrica(texto, f'koal_http_serializacion_segundos_total{ruta}'), 0)
+        self.assertGreater(valor_metrica(texto, f'koal_http_respuesta_bytes_total{ruta}'), 0)
+
+        # Histograma acumulado: +Inf == _count
+        cubetas = [
+            valor_metrica(texto, f'koal_http_duracion_segundos_bucket{{ruta="produccion-list",metodo="GET",le="{le}"}}')
+            for le in [*map(str, metricas.CUBETAS), '+Inf']
+        ]
+        self.assertEqual(cubetas, sorted(cubetas))
+        self.assertEqual(cubetas[-1], 2)
+        self.assertEqual(valor_metrica(texto, 'koal_http_duracion_segundos_count{ruta="produccion-list",metodo="GET"}'), 2)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/metricas/').status_code, 403)
+
+    async def test_consultas_de_vistas_async(self):
+        cache_cedulas.limpiar()
+        await self.async_client.aforce_login(await get_user_model().objects.aget(username='supervisor'))
+        self.assertEqual((await self.async_client.get('/api/empleados/cedula/100/')).status_code, 200)
+        texto = metricas.exposicion()
+        self.assertEqual(
+            valor_metrica(texto, 'koal_http_peticiones_total{ruta="empleado-por-cedula",metodo="GET",estado="200"}'), 1,
+        )
+        # La consulta corre en el hilo de sync_to_async y aun así se cuenta
+        self.assertGreater(valor_metrica(texto, 'koal_http_sql_consultas_total{ruta="empleado-por-cedula"}'), 0)
+
+    def test_suma_los_procesos(self):
+        with tempfile.TemporaryDirectory() as directorio, self.settings(METRICAS_DIR=directorio):
+            otro = metricas.Registro()
+            medida = metricas.Medida()
+            medida.consultas = 3
+            otro.observar('produccion-list', 'GET', 200, 0.2, medida, 100)
+            otro.volcar()
+            self.client.get('/api/produccion/')
+            texto = metricas.exposicion()
+            self.assertEqual(len(os.listdir(directorio)), 2)
+        self.assertEqual(valor_metrica(texto, 'koal_metricas_procesos'), 2)
+        self.assertEqual(
+            valor_metrica(texto, 'koal_http_peticiones_total{ruta="produccion-list",metodo="GET",estado="200"}'), 2,
+        )
+        self.assertEqual(valor_metrica(texto, 'koal_http_duracion_segundos_count{ruta="produccion-list",metodo="GET"}'), 2)
+        self.assertGreater(valor_metrica(texto, 'koal_http_sql_consultas_total{ruta="produccion-list"}'), 3)
+        self.assertGreaterEqual(valor_metrica(texto, 'koal_http_duracion_segundos_sum{ruta="produccion-list",metodo="GET"}'), 0.2)
+
+
+class ImportacionEmpleadosTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cargo, self.empleado, _ = crear_datos_base()
+        self.empleado.telefono = '555'
+        self.empleado.save()
+        Cargo.objects.create(nombre_cargo='Supervisor', nivel_acceso='alto')
+
+    def importar(self, texto, nombre='nomina.csv', **params):
+        archivo = SimpleUploadedFile(nombre, texto.encode())
+        return self.client.post(f'/api/empleados/importar/?{"&".join(f"{k}={v}" for k, v in params.items())}',
+                                {'archivo': archivo}, format='multipart')
+
+    def test_upsert_por_cedula_con_errores_por_fila(self):
+        texto = (
+            'Cédula;Nombres;Cargo;Email\n'
+            '100;Ana Núñez Rojas;SUPERVISOR;ana@mina.co\n'
+            '300;Pedro Soto;Minero;\n'
+            '301;Sin Cargo;Geólogo;\n'
+            '300;Pedro Repetido;Minero;\n'
+            '302;Email Malo;Minero;no-es-email\n'
+            '303;;Minero;\n'
+            ';;;\n'
+            '304;Otro Ana;Minero;ana@mina.co\n'
+        )
+        response = self.importar(texto)
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(
+            {k: datos[k] for k in ('filas', 'creados', 'actualizados', 'errores', 'simulado')},
+            {'filas': 7, 'creados': 1, 'actualizados': 1, 'errores': 5, 'simulado': False},
+        )
+        self.assertEqual(
+            [(e['fila'], e['cedula'], list(e['errores'])) for e in datos['filas_con_error']],
+            [(4, '301', ['cargo']), (5, '300', ['cedula']), (6, '302', ['email']), (7, '303', ['nombres']),
+             (9, '304', ['email'])],
+        )
+
+        ana = Empleado.objects.get(cedula='100')
+        supervisor = Cargo.objects.get(nombre_cargo='Supervisor')
+        # Se actualizan solo las columnas del archivo (mismo id, teléfono y nivel intactos)
+        self.assertEqual((ana.pk, ana.nombres, ana.cargo, ana.email), (self.empleado.pk, 'Ana Núñez Rojas', supervisor, 'ana@mina.co'))
+        self.assertEqual((ana.telefono, ana.nivel_acceso), ('555', 'bajo'))
+        self.assertGreater(ana.fecha_actualizacion, self.empleado.fecha_actualizacion)
+        nuevo = Empleado.objects.get(cedula='300')
+        self.assertEqual((nuevo.nombres, nuevo.estado, nuevo.nivel_acceso, nuevo.email), ('Pedro Soto', 'activo', 'bajo', None))
+        self.assertEqual(Empleado.objects.count(), 2)
+        # Las escrituras masivas llegan al índice de búsqueda y al log de sincronización
+        response = self.client.get('/api/empleados/', {'search': 'soto'})
+        self.assertEqual([fila['id'] for fila in response.json()['results']], [nuevo.pk])
+        self.assertTrue(Cambio.objects.filter(objeto_id=nuevo.pk).exists())
+
+    def test_simular_no_guarda(self):
+        response = self.importar('cedula,nombres,cargo\n100,Otro Nombre,Minero\n400,Nueva,Minero\n', simular=1)
+        self.assertEqual((response.json()['creados'], response.json()['actualizados']), (1, 1))
+        self.assertTrue(response.json()['simulado'])
+        self.assertEqual(Empleado.objects.get(cedula='100').nombres, 'Ana Núñez')
+        self.assertFalse(Empleado.objects.filter(cedula='400').exists())
+
+    def test_cada_lote_en_su_transaccion(self):
+        # Si la importación se corta, lo de los lotes anteriores queda guardado
+        texto = 'cedula,nombres,cargo\n' + ''.join(f'{500 + i},Empleado {i},Minero\n' for i in range(4))
+        original = importacion.Importacion.empleado
+
+        def empleado(self_, valores, *args):
+            if valores['cedula'] == '503':
+                raise RuntimeError('se cortó')
+            return original(self_, valores, *args)
+
+        with mock.patch.object(importacion.Importacion, 'empleado', empleado), self.assertRaises(RuntimeError):
+            importacion.importar_empleados(importacion.leer(io.BytesIO(texto.encode()), 'a.csv'), lote=2)
+        self.assertEqual(list(Empleado.objects.filter(cedula__startswith='50').values_list('cedula', flat=True)
+                              .order_by('cedula')), ['500', '501'])
+
+    def test_archivo_invalido(self):
+        self.assertEqual(self.importar('nombres,cargo\nAna,Minero\n').status_code, 400)
+        self.assertIn('sueldo', self.importar('cedula,sueldo\n1,2\n').json()['detail'])
+        self.assertEqual(self.importar('x', nombre='nomina.pdf').status_code, 400)
+        self.assertEqual(self.client.post('/api/empleados/importar/', {}, format='multipart').status_code, 400)
+
+    def test_consultas_por_lote(self):
+        def csv_de(n, desde):
+            return 'cedula,nombres,cargo\n' + ''.join(f'{desde + i},Empleado {i},Minero\n' for i in range(n))
+
+        with CaptureQueriesContext(connection) as pocos:
+            importacion.importar_empleados(importacion.leer(io.BytesIO(csv_de(10, 1000).encode()), 'a.csv'))
+        with CaptureQueriesContext(connection) as muchos:
+            importacion.importar_empleados(importacion.leer(io.BytesIO(csv_de(500, 2000).encode()), 'a.csv'))
+        # Las lecturas no crecen con las filas (los INSERT sí: Django los parte por el límite de parámetros)
+        def lecturas(consultas):
+            return [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('SELECT')]
+
+        self.assertEqual(len(lecturas(pocos)), len(lecturas(muchos)))
+        self.assertEqual(Empleado.objects.count(), 511)
+
+    def test_comando_xlsx(self):
+        from openpyxl import Workbook
+
+        libro = Workbook()
+        hoja = libro.active
+        hoja.append(['CEDULA', 'Nombre', 'Nombre cargo', 'Estado'])
+        hoja.append([12345, 'Rosa Díaz', 'minero', 'inactivo'])
+        hoja.append([100.0, 'Ana Núñez', 'Minero', None])
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as archivo:
+            libro.save(archivo.name)
+            salida = io.StringIO()
+            call_command('importar_empleados', archivo.name, stdout=salida)
+        self.assertIn('1 creados, 1 actualizados, 0 con error', salida.getvalue())
+        self.assertEqual(Empleado.objects.get(cedula='12345').estado, 'inactivo')
+        self.assertEqual(Empleado.objects.get(cedula='100').estado, 'activo')
+        with self.assertRaises(CommandError):
+            call_command('importar_empleados', '/no/existe.csv')
+
+
+@unittest.skipUnless(os.environ.get('BENCHMARK'), 'Benchmark: BENCHMARK=1 python manage.py test Adminitrativo')
+class ImportacionEmpleadosBenchmark(TestCase):
+    FILAS = 50_000
+
+    def test_50k_filas(self):
+        cargos = [Cargo.objects.create(nombre_cargo=f'Cargo {i}', nivel_acceso='bajo').nombre_cargo for i in range(20)]
+        # Cada lote es una transacción: lo que dura el más largo es lo que espera un check-in
+        lotes, original = [], importacion.Importacion.lote
+
+        def cronometrado(self_, filas):
+            inicio = time.perf_counter()
+            original(self_, filas)
+            lotes.append(time.perf_counter() - inicio)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(['cedula', 'nombres', 'cargo', 'telefono', 'email'])
+            for i in range(self.FILAS):
+                escritor.writerow([f'8{i:07d}', f'Empleado {i}', cargos[i % 20], f'300{i:07d}', f'e{i}@mina.co'])
+            archivo.flush()
+            for vez in ('creación', 'actualización'):
+                inicio = time.perf_counter()
+                lotes.clear()
+                with open(archivo.name, 'rb') as entrada, mock.patch.object(importacion.Importacion, 'lote', cronometrado):
+                    resumen = importacion.importar_empleados(importacion.leer(entrada, archivo.name))
+                segundos = time.perf_counter() - inicio
+                print(f'\n{self.FILAS} filas ({vez}): {segundos:.2f} s, lote más largo {max(lotes) * 1000:.0f} ms')
+                self.assertEqual(resumen['creados'] + resumen['actualizados'], self.FILAS)
+                self.assertLess(segundos, 10)
+                self.assertLess(max(lotes), 0.5)
+        self.assertEqual(Empleado.objects.count(), self.FILAS)
+
+
+class GasesTests(APITestCase):
+    INICIO = datetime.datetime(2024, 3, 1, 6, 0, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        super().setUp()
+        gases.anillos.limpiar()
+        self.metano = SensorGas.objects.create(codigo='CH4-01', tipo_gas='CH4')
+        self.oxigeno = SensorGas.objects.create(codigo='O2-01', tipo_gas='O2')
+
+    def t(self, segundos):
+        return self.INICIO.timestamp() + segundos
+
+    def lecturas(self, codigo, valores, cada=10, desde=0):
+        return [{'sensor': codigo, 't': self.t(desde + i * cada), 'valor': v} for i, v in enumerate(valores)]
+
+    def test_ingesta_con_repetidas_y_errores(self):
+        lecturas = [
+            {'sensor': 'CH4-01', 't': self.t(0), 'valor': 0.3},
+            {'sensor': 'CH4-01', 't': (self.INICIO + datetime.timedelta(seconds=10)).isoformat(), 'valor': 0.4},
+            {'sensor': 'CH4-01', 't': self.t(10), 'valor': 0.9},  # repetida en el lote: queda la primera
+            {'sensor': 'NO-EXISTE', 't': self.t(0), 'valor': 1},
+            {'sensor': 'CH4-01', 't': self.t(20), 'valor': 'alto'},
+            {'sensor': 'CH4-01', 't': time.time() + 3600, 'valor': 0.3},
+        ]
+        resumen = gases.ingresar_lecturas(lecturas)
+        self.assertEqual(
+            (resumen['recibidas'], resumen['guardadas'], resumen['repetidas'], resumen['errores']), (6, 2, 1, 3),
+        )
+        self.assertEqual([e['indice'] for e in resumen['lecturas_con_error']], [3, 4, 5])
+        self.assertEqual(list(resumen['lecturas_con_error'][1]['errores']), ['valor'])
+
+        # Reenviar el lote (reintento del equipo) no duplica nada
+        resumen = gases.ingresar_lecturas(lecturas[:2] + self.lecturas('CH4-01', [0.5], desde=30))
+        self.assertEqual((resumen['guardadas'], resumen['repetidas']), (1, 2))
+        bloque = BloqueLecturasGas.objects.get()
+        ms, valores = gases.decodificar(bloque.minuto, bloque.datos)
+        self.assertEqual(bloque.registros, 3)
+        self.assertEqual(len(bloque.datos), 3 * gases.FORMATO.itemsize)
+        self.assertEqual((ms - ms[0]).tolist(), [0, 10_000, 30_000])
+        np.testing.assert_allclose(valores, [0.3, 0.4, 0.5], rtol=1e-6)
+        minuto = ResumenGas.objects.get(periodo=ResumenGas.PERIODO_MINUTO)
+        self.assertEqual(minuto.registros, 3)
+        self.assertAlmostEqual(minuto.suma, 1.2, places=5)
+
+    def test_resumenes_cuadran_con_el_crudo(self):
+        azar = np.random.default_rng(3)
+        valores = np.round(azar.uniform(0.1, 0.9, 900), 3).tolist()
+        lecturas = self.lecturas('CH4-01', valores, cada=10, desde=17)  # 2,5 h sin empezar en minuto redondo
+        orden = azar.permutation(len(lecturas))
+        # En desorden y en lotes que parten minutos y horas
+        for parte in np.array_split(orden, 7):
+            gases.ingresar_lecturas([lecturas[i] for i in parte])
+
+        ms, crudas = gases.crudo(self.metano.pk)
+        self.assertEqual(len(ms), 900)
+        self.assertTrue(np.all(np.diff(ms) > 0))
+        for periodo, ancho in ((ResumenGas.PERIODO_MINUTO, gases.MINUTO_MS), (ResumenGas.PERIODO_HORA, gases.HORA_MS)):
+            filas = ResumenGas.objects.filter(sensor=self.metano, periodo=periodo).order_by('inicio')
+            cubetas = ms // ancho * ancho
+            self.assertEqual([gases._ms(f.inicio) for f in filas], np.unique(cubetas).tolist())
+            for fila in filas:
+                dentro = crudas[cubetas == gases._ms(fila.inicio)]
+                self.assertEqual(fila.registros, len(dentro))
+                self.assertAlmostEqual(fila.suma, float(dentro.astype(np.float64).sum()), places=3)
+                self.assertAlmostEqual(fila.minimo, float(dentro.min()), places=5)
+                self.assertAlmostEqual(fila.maximo, float(dentro.max()), places=5)
+
+    def test_alertas_por_nivel(self):
+        sensible = SensorGas.objects.create(codigo='CH4-02', tipo_gas='CH4', limite_alerta=0.4)
+        resumen = gases.ingresar_lecturas(
+            self.lecturas('CH4-01', [0.5, 1.2, 1.7, 1.1])
+            + self.lecturas('O2-01', [20.8, 19.3, 19.4])
+            + self.lecturas('CH4-02', [0.3, 0.45])
+        )
+        alertas = {a['sensor']: a for a in resumen['alertas']}
+        self.assertEqual(len(alertas), 3)
+        # El peor nivel del lote con su peor lectura y desde cuándo
+        self.assertEqual(alertas['CH4-01']['nivel'], AlertaGas.NIVEL_ALARMA)
+        self.assertAlmostEqual(alertas['CH4-01']['valor'], 1.7, places=5)
+        self.assertEqual((alertas['CH4-01']['limite'], alertas['CH4-01']['lecturas']), (1.5, 1))
+        self.assertEqual(alertas['CH4-01']['inicio'], self.INICIO + datetime.timedelta(seconds=20))
+        # El oxígeno alerta por debajo
+        self.assertEqual(alertas['O2-01']['nivel'], AlertaGas.NIVEL_ALERTA)
+        self.assertAlmostEqual(alertas['O2-01']['valor'], 19.3, places=5)
+        self.assertEqual(alertas['O2-01']['lecturas'], 2)
+        self.assertEqual((alertas['CH4-02']['nivel'], alertas['CH4-02']['limite']), (AlertaGas.NIVEL_ALERTA, 0.4))
+        self.assertEqual(AlertaGas.objects.count(), 3)
+        # Normal: sin alertas
+        self.assertEqual(gases.ingresar_lecturas(self.lecturas('CH4-01', [0.2], desde=60))['alertas'], [])
+
+    def test_ultimas_de_memoria(self):
+        gases.ingresar_lecturas(self.lecturas('CH4-01', [0.1, 0.2, 0.3]))
+        self.assertEqual([l['valor'] for l in gases.ultimas(self.metano.pk)], [0.1, 0.2, 0.3])
+        # Lo nuevo (y uno atrasado) llega al anillo al confirmar, sin volver a la base
+        with self.captureOnCommitCallbacks(execute=True):
+            gases.ingresar_lecturas(self.lecturas('CH4-01', [0.4, 0.5], desde=30))
+        with self.captureOnCommitCallbacks(execute=True):
+            gases.ingresar_lecturas(self.lecturas('CH4-01', [0.25], desde=25))
+        with self.assertNumQueries(0):
+            ultimas = gases.ultimas(self.metano.pk)
+        self.assertEqual([l['valor'] for l in ultimas], [0.1, 0.2, 0.3, 0.25, 0.4, 0.5])
+        self.assertEqual(ultimas[-1]['t'], self.INICIO + datetime.timedelta(seconds=40))
+
+        anillo = gases.Anillo(3)
+        anillo.escribir(np.arange(5, dtype=np.int64), np.arange(5, dtype=np.float32))
+        anillo.escribir(np.array([5], dtype=np.int64), np.array([5], dtype=np.float32))
+        self.assertEqual(anillo.leer()[0].tolist(), [3, 4, 5])
+
+    def test_serie_elige_la_resolucion(self):
+        gases.ingresar_lecturas(self.lecturas('CH4-01', [0.2, 0.4] * 540))  # 3 h, cada 10 s
+        ahora = self.INICIO + datetime.timedelta(hours=3)
+        diez = self.INICIO + datetime.timedelta(minutes=10)
+        crudo = gases.serie(self.metano.pk, self.INICIO, diez, puntos=60, ahora=ahora)
+        self.assertEqual((crudo['resolucion'], crudo['paso_segundos'], len(crudo['puntos'])), ('crudo', 10, 60))
+        minuto = gases.serie(self.metano.pk, self.INICIO, diez, puntos=4, ahora=ahora)
+        self.assertEqual((minuto['resolucion'], minuto['paso_segundos'], len(minuto['puntos'])), ('minuto', 180, 4))
+        self.assertEqual(minuto['puntos'][0]['registros'], 18)
+        self.assertAlmostEqual(minuto['puntos'][0]['promedio'], 0.3, places=4)
+        hora = gases.serie(self.metano.pk, self.INICIO, ahora, paso=3600, ahora=ahora)
+        self.assertEqual(hora['resolucion'], 'hora')
+        self.assertEqual([p['registros'] for p in hora['puntos']], [360, 360, 360])
+        self.assertEqual((hora['puntos'][1]['minimo'], hora['puntos'][1]['maximo']), (0.2, 0.4))
+        # El crudo y los minutos viejos ya no están: se usa lo que se conserva
+        mes = ahora + datetime.timedelta(days=30)
+        self.assertEqual(gases.serie(self.metano.pk, self.INICIO, diez, puntos=60, ahora=mes)['resolucion'], 'minuto')
+        anio = ahora + datetime.timedelta(days=365)
+        self.assertEqual(gases.serie(self.metano.pk, self.INICIO, diez, puntos=60, ahora=anio)['resolucion'], 'hora')
+
+    def test_purgar_respeta_la_retencion(self):
+        gases.ingresar_lecturas(self.lecturas('CH4-01', [0.3] * 12, cada=10))
+        semana = self.INICIO + datetime.timedelta(days=gases.CRUDO_DIAS, hours=1)
+        self.assertEqual(gases.purgar(semana), {'BloqueLecturasGas': 2, 'ResumenGas': 0})
+        self.assertEqual(ResumenGas.objects.count(), 3)
+        self.assertEqual(gases.purgar(semana + datetime.timedelta(days=gases.MINUTOS_DIAS)),
+                         {'BloqueLecturasGas': 0, 'ResumenGas': 2})
+        self.assertEqual(ResumenGas.objects.get().periodo, ResumenGas.PERIODO_HORA)
+        salida = io.StringIO()
+        call_command('purgar_gases', stdout=salida)
+        self.assertIn('BloqueLecturasGas: 0 filas', salida.getvalue())
+
+    def test_api(self):
+        url = '/api/sensores-gas/'
+        response = self.client.post(f'{url}lecturas/', self.lecturas('CH4-01', [0.3, 1.6]), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['guardadas'], len(response.data['alertas'])), (2, 1))
+        response = self.client.post(
+            f'{url}lecturas/', {'lecturas': self.lecturas('O2-01', [20.9])}, format='json',
+        )
+        self.assertEqual(response.data['guardadas'], 1)
+        self.assertEqual(self.client.post(f'{url}lecturas/', {'sensor': 'CH4-01'}, format='json').status_code, 400)
+
+        response = self.client.get(f'{url}{self.metano.pk}/ultimas/')
+        self.assertEqual([l['valor'] for l in response.data['lecturas']], [0.3, 1.6])
+        rango = {'desde': self.INICIO.isoformat(), 'hasta': (self.INICIO + datetime.timedelta(minutes=1)).isoformat()}
+        response = self.client.get(f'{url}{self.metano.pk}/serie/', {**rango, 'paso': 60})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['puntos'][0]['maximo'], 1.6)
+        for malos in ({'desde': 'ayer'}, {'puntos': '0'}, {'paso': 'x'}, {'desde': rango['hasta'], 'hasta': rango['desde']}):
+            self.assertEqual(self.client.get(f'{url}{self.metano.pk}/serie/', malos).status_code, 400, malos)
+
+        response = self.client.get(f'{url}alertas/', {'desde': self.INICIO.isoformat()})
+        self.assertEqual([(a['sensor__codigo'], a['nivel']) for a in response.data], [('CH4-01', 'alarma')])
+
+
+def marcos_sse(texto):
+    """[(id, evento, datos)] de un pedazo de text/event-stream (sin comentarios ni retry)."""
+    marcos = []
+    for bloque in texto.split('\n\n'):
+        campos = dict(linea.split(': ', 1) for linea in bloque.splitlines() if ': ' in linea and linea[0] != ':')
+        if 'event' in campos:
+            marcos.append((campos['id'], campos['event'], json.loads(campos['data'])))
+    return marcos
+
+
+class EventosIngresosTests(TestCase):
+    URL = '/api/control-ingresos/eventos/'
+
+    def setUp(self):
+        self.cargo, self.empleado, self.proyecto = crear_datos_base()
+        self.otro = Empleado.objects.create(cargo=self.cargo, cedula='200', nombres='Luis Rojas', nivel_acceso='bajo')
+        self.proyecto_sur = Proyecto.objects.create(nombre='Mina Sur', fecha_inicio=datetime.date(2024, 1, 1))
+        get_user_model().objects.create_user('control', password='clave')
+        self.basic = {'Authorization': 'Basic ' + base64.b64encode(b'control:clave').decode()}
+        parche = mock.patch.object(eventos, 'bus', eventos.Bus())
+        self.bus = parche.start()
+        self.addCleanup(parche.stop)
+
+    def ingresar(self, lote):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ingresar_eventos(lote)
+
+    async def escuchar(self, parametros=None, **cabeceras):
+        """(tarea que junta el stream en una lista, lista)."""
+        response = await self.async_client.get(self.URL, parametros or {}, headers={**self.basic, **cabeceras})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        partes = []
+
+        async def juntar():
+            async for parte in response.streaming_content:
+                partes.append(parte.decode())
+        return asyncio.create_task(juntar()), partes
+
+    async def esperar(self, condicion):
+        for _ in range(200):
+            if condicion():
+                return
+            await asyncio.sleep(0.01)
+        self.fail('El stream no recibió lo esperado')
+
+    async def test_stream_por_proyecto_y_reanudacion(self):
+        todos, partes_todos = await self.escuchar()
+        norte, partes_norte = await self.escuchar({'proyecto': str(self.proyecto.pk)})
+        await self.esperar(lambda: self.bus.suscriptores() == 2)
+        entrada = {'tipo': 'entrada', 'fecha': '2024-03-01', 'hora_entrada': '06:00'}
+        await sync_to_async(self.ingresar)([
+            {**entrada, 'empleado': self.empleado.pk, 'proyecto': self.proyecto.pk},
+            {**entrada, 'empleado': self.otro.pk, 'proyecto': self.proyecto_sur.pk},
+        ])
+        await sync_to_async(self.ingresar)([{'tipo': 'salida', 'empleado': self.empleado.pk, 'hora_salida': '14:00'}])
+
+        await self.esperar(lambda: len(marcos_sse(''.join(partes_todos))) == 3)
+        marcos = marcos_sse(''.join(partes_todos))
+        self.assertEqual([(evento, datos['nombres']) for _, evento, datos in marcos],
+                         [('entrada', 'Ana Núñez'), ('entrada', 'Luis Rojas'), ('salida', 'Ana Núñez')])
+        self.assertEqual((marcos[2][2]['hora_salida'], marcos[2][2]['estado']), ('14:00:00', 'cerrado'))
+        self.assertTrue(partes_todos[0].startswith('retry: '))
+        await self.esperar(lambda: len(marcos_sse(''.join(partes_norte))) == 2)
+        self.assertEqual({datos['proyecto'] for _, _, datos in marcos_sse(''.join(partes_norte))}, {self.proyecto.pk})
+
+        # Al cortar la conexión se suelta la suscripción
+        todos.cancel()
+        norte.cancel()
+        await self.esperar(lambda: self.bus.suscriptores() == 0)
+
+        # Reconecta con el id del primero: recibe lo que se perdió
+        tarea, partes = await self.escuchar(**{'Last-Event-ID': marcos[0][0]})
+        await self.esperar(lambda: len(marcos_sse(''.join(partes))) == 2)
+        self.assertEqual([m[0] for m in marcos_sse(''.join(partes))], [m[0] for m in marcos[1:]])
+        tarea.cancel()
+        # Un id de otro arranque: que vuelva a bajar el listado
+        tarea, partes = await self.escuchar({'ultimo': 'ffffffff-2'})
+        await self.esperar(lambda: marcos_sse(''.join(partes)))
+        self.assertEqual(marcos_sse(''.join(partes))[0][1], 'reinicio')
+        tarea.cancel()
+
+    async def test_cola_llena_y_eventos_viejos_piden_reinicio(self):
+        bus = eventos.Bus(recientes=3)
+        with mock.patch.object(eventos, 'COLA', 2):
+            suscripcion, pendientes = bus.suscribir()
+        self.assertEqual(pendientes, [])
+        bus.publicar([('entrada', {'id': i, 'proyecto': 1}) for i in range(5)])
+        recibidos = await suscripcion.siguientes(espera=1)
+        self.assertEqual([(e.secuencia, e.marco.split(b'\n')[1]) for e in recibidos], [(5, b'event: reinicio')])
+        bus.desuscribir(suscripcion)
+
+        # Quedan los 3 últimos (3, 4, 5): desde el 2 alcanza, desde el 1 no
+        _, pendientes = bus.suscribir(ultimo=f'{bus.epoca}-2')
+        self.assertEqual([e.secuencia for e in pendientes], [3, 4, 5])
+        _, pendientes = bus.suscribir(ultimo=f'{bus.epoca}-1')
+        self.assertIn(b'event: reinicio', pendientes[0].marco)
+        _, pendientes = bus.suscribir({2}, ultimo=f'{bus.epoca}-2')
+        self.assertEqual(pendientes, [])
+
+    def test_solo_lo_confirmado_y_errores(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                ControlDeIngreso.objects.create(fecha=datetime.date(2024, 3, 1), empleado=self.empleado,
+                                                proyecto=self.proyecto)
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.client.get(self.URL).status_code, 403)
+        # Bajo WSGI no se sirve el stream
+        self.assertEqual(self.client.get(self.URL, headers=self.basic).status_code, 501)
+        response = async_to_sync(self.async_client.get)(self.URL, {'proyecto': 'norte'}, headers=self.basic)
+        self.assertEqual(response.status_code, 400)
+
+
+class PresenciaTests(APITestCase):
+    URL = '/api/presencia/'
+
+    def setUp(self):
+        super().setUp()
+        self.cargo, self.empleado, self.proyecto = crear_datos_base()
+        self.otro = Empleado.objects.create(cargo=self.cargo, cedula='200', nombres='Luis Rojas', nivel_acceso='bajo')
+        presencia.indice.vencer()
+        self.addCleanup(presencia.indice.vencer)
+
+    def ingreso(self, dia, hora, empleado=None, **extra):
+        return ControlDeIngreso.objects.create(
+            fecha=datetime.date(2024, 3, dia), hora_entrada=datetime.time(hora), empleado=empleado or self.empleado,
+            proyecto=self.proyecto, **extra,
+        )
+
+    def adentro(self):
+        return dict(Presencia.objects.values_list('empleado_id', 'registro_id'))
+
+    def test_entrada_salida_y_salida_olvidada(self):
+        viejo = self.ingreso(1, 6)  # nunca marcó la salida
+        self.assertEqual(self.adentro(), {self.empleado.pk: viejo.pk})
+        nuevo = self.ingreso(2, 6, lugar_trabajo='Nivel 3')
+        # Cuenta una sola vez, con el último ingreso
+        self.assertEqual(self.adentro(), {self.empleado.pk: nuevo.pk})
+        nuevo.hora_salida = datetime.time(14)
+        nuevo.save()
+        self.assertEqual(self.adentro(), {})
+
+        # Borrar el último deja otra vez adentro con el anterior, si seguía abierto (al hacer commit)
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.delete()
+        self.assertEqual(self.adentro(), {self.empleado.pk: viejo.pk})
+        # Un registro que pasa a otro empleado
+        viejo.empleado = self.otro
+        viejo.save()
+        self.assertEqual(self.adentro(), {self.otro.pk: viejo.pk})
+
+    def test_lote_de_ingesta(self):
+        self.ingreso(1, 22)
+        ingresar_eventos([
+            {'tipo': 'salida', 'empleado': self.empleado.pk, 'hora_salida': '06:00'},
+            {'tipo': 'entrada', 'empleado': self.otro.pk, 'proyecto': self.proyecto.pk,
+             'fecha': '2024-03-02', 'hora_entrada': '06:05', 'lugar_trabajo': 'Nivel 3'},
+        ])
+        registro = ControlDeIngreso.objects.get(empleado=self.otro)
+        self.assertEqual(self.adentro(), {self.otro.pk: registro.pk})
+        self.assertEqual(Presencia.objects.get().lugar_trabajo, 'Nivel 3')
+
+    def test_copia_en_memoria_y_api(self):
+        sur = Proyecto.objects.create(nombre='Mina Sur', fecha_inicio=datetime.date(2024, 1, 1))
+        self.ingreso(1, 6, lugar_trabajo='Nivel 3')
+        response = self.client.get(self.URL)
+        self.assertEqual(response.data['total'], 1)
+
+        # Con la copia cargada, los cambios llegan al hacer commit y la vista no consulta la base
+        with self.captureOnCommitCallbacks(execute=True):
+            ControlDeIngreso.objects.create(fecha=datetime.date(2024, 3, 1), hora_entrada=datetime.time(7),
+                                            empleado=self.otro, proyecto=sur)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(presencia.indice.lugares()), 2)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.URL)
+        self.assertFalse([q for q in consultas.captured_queries if 'presencia' in q['sql'].lower()])
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(
+            [(lugar['proyecto_nombre'], lugar['lugar_trabajo'], lugar['presentes']) for lugar in response.data['lugares']],
+            [('Mina Norte', 'Nivel 3', 1), ('Mina Sur', '', 1)],
+        )
+        persona = response.data['lugares'][0]['personas'][0]
+        self.assertEqual((persona['nombres'], persona['cedula']), ('Ana Núñez', '100'))
+        self.assertEqual(persona['desde'], datetime.datetime(2024, 3, 1, 6))
+
+        response = self.client.get(self.URL, {'proyecto': sur.pk, 'conteo': '1'})
+        self.assertEqual(response.data, {'total': 1, 'lugares': [
+            {'proyecto': sur.pk, 'proyecto_nombre': 'Mina Sur', 'lugar_trabajo': '', 'presentes': 1},
+        ]})
+        response = self.client.get(self.URL, {'lugar_trabajo': 'Nivel 4'})
+        self.assertEqual(response.data['total'], 0)
+        self.assertEqual(self.client.get(self.URL, {'proyecto': 'norte'}).status_code, 400)
+
+        # Un rollback no toca la copia
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                ControlDeIngreso.objects.filter(hora_salida__isnull=True).update(hora_salida=datetime.time(14))
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(len(presencia.indice), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            ControlDeIngreso.objects.filter(empleado=self.otro).delete()
+        self.assertEqual([p.nombres for grupo in presencia.indice.lugares() for p in grupo], ['Ana Núñez'])
+
+    def test_borrado_en_cascada(self):
+        sur = Proyecto.objects.create(nombre='Mina Sur', fecha_inicio=datetime.date(2024, 1, 1))
+        viejo = self.ingreso(1, 6)  # nunca marcó la salida
+        self.ingreso(1, 7, empleado=self.otro)
+
+        def borrar_proyecto(registros):
+            proyecto = Proyecto.objects.create(nombre=f'Mina {registros}', fecha_inicio=datetime.date(2024, 1, 1))
+            ControlDeIngreso.objects.bulk_create(
+                ControlDeIngreso(fecha=datetime.date(2024, 3, 2), hora_entrada=datetime.time(6), proyecto=proyecto,
+                                 empleado=self.empleado if i % 2 else self.otro, hora_salida=datetime.time(14))
+                for i in range(registros)
+            )
+            with CaptureQueriesContext(connection) as consultas:
+                with self.captureOnCommitCallbacks(execute=True):
+                    proyecto.delete()
+            return len([q for q in consultas.captured_queries if 'presencia' in q['sql'].lower()])
+
+        # Las consultas de presencia no crecen con los registros que se lleva el CASCADE
+        self.assertEqual(borrar_proyecto(2), borrar_proyecto(60))
+
+        # El último ingreso se va con su proyecto y el anterior, abierto en otro, vuelve a contar
+        nuevo = ControlDeIngreso.objects.create(fecha=datetime.date(2024, 3, 3), hora_entrada=datetime.time(6),
+                                                empleado=self.empleado, proyecto=sur)
+        self.assertEqual(self.adentro()[self.empleado.pk], nuevo.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            sur.delete()
+        self.assertEqual(self.adentro()[self.empleado.pk], viejo.pk)
+
+        # Un rollback descarta lo juntado
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                ControlDeIngreso.objects.filter(pk=viejo.pk).delete()
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.adentro()[self.empleado.pk], viejo.pk)
+
+    def test_reconciliar(self):
+        registro = self.ingreso(1, 6)
+        self.ingreso(1, 7, empleado=self.otro, hora_salida=datetime.time(15))
+        # La tabla se desarmó por fuera (SQL a mano, restauración)
+        Presencia.objects.all().delete()
+        Presencia.objects.create(empleado=self.otro, registro=ControlDeIngreso.objects.get(empleado=self.otro),
+                                 proyecto=self.proyecto, fecha=datetime.date(2024, 3, 1),
+                                 hora_entrada=datetime.time(7))
+        salida = io.StringIO()
+        call_command('reconciliar_presencia', stdout=salida)
+        self.assertIn('Corregidos: 1 faltaban, 1 sobraban, 0 con otro registro o lugar.', salida.getvalue())
+        self.assertIn('Presencia al día: 1 adentro.', salida.getvalue())
+        self.assertEqual(self.adentro(), {self.empleado.pk: registro.pk})
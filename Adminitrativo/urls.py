@@ -2,7 +2,7 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import views, vistas_async
 
 router = DefaultRouter()
 router.register(r'cargos', views.CargoViewSet, basename='cargo')
@@ -14,14 +14,31 @@ router.register(r'herramientas', views.HerramientaViewSet, basename='herramienta
 router.register(r'listas-chequeo', views.ListaDeChequeoViewSet, basename='listachequeo')
 router.register(r'verificaciones', views.VerificacionViewSet, basename='verificacion')
 router.register(r'prestamos', views.PrestamoViewSet, basename='prestamo')
+router.register(r'sensores-gas', views.SensorGasViewSet, basename='sensorgas')
 
 # URLs para las vistas personalizadas (no ViewSets)
 urlpatterns = [
+    # Vistas async de la portería (antes del router para que no las tome como pk)
+    path('empleados/cedula/<str:cedula>/', vistas_async.empleado_por_cedula, name='empleado-por-cedula'),
+    path('control-ingresos/registrar/', vistas_async.registrar_ingreso, name='controlingreso-registrar'),
+    path('control-ingresos/eventos/', vistas_async.eventos_ingresos, name='controlingreso-eventos'),
     path('', include(router.urls)),
     # Dashboard URLs
     path('dashboard/stats/', views.DashboardStatsView.as_view(), name='dashboard-stats'),
     path('dashboard/production-by-project/', views.ProduccionPorProyectoView.as_view(), name='dashboard-production-by-project'),
+    # Horas y ausencias para nómina
+    path('asistencia/', views.AsistenciaView.as_view(), name='asistencia'),
+    path('cache/estadisticas/', views.EstadisticasCacheView.as_view(), name='cache-estadisticas'),
+    path('metricas/', views.MetricasView.as_view(), name='metricas'),
+    # Sincronización incremental de las tablets
+    path('sync/', views.SincronizacionView.as_view(), name='sync'),
+    # Huellas
+    path('huellas/identificar/', views.IdentificarHuellaView.as_view(), name='huellas-identificar'),
+    path('huellas/estadisticas/', views.EstadisticasHuellasView.as_view(), name='huellas-estadisticas'),
+    # Quién está adentro
+    path('presencia/', views.PresenciaView.as_view(), name='presencia'),
     # Report URLs
     path('reports/generate/', views.ReportGeneratorView.as_view(), name='report-generate'),
-    # path('reports/download/<str:filename>/', views.download_report_file, name='report-download'), # Si implementas descarga directa
+    path('reports/<str:pk>/', views.ReportStatusView.as_view(), name='report-status'),
+    path('reports/<str:pk>/download/', views.ReportDownloadView.as_view(), name='report-download'),
 ]
\ No newline at end of file
@@ -0,0 +1,256 @@
+# Administrativo/versiones.py
+
+"""
+Contadores de versión por modelo y caché de respuestas que depende de ellos.
+
+Cada modelo tiene un número de versión en el caché de Django que sube con
+cada save/delete (señales) y con cada operación masiva (update, bulk_create,
+bulk_update vía VersionadoQuerySet), una sola vez por transacción: al hacer
+commit, con un set por modelo tocado. Las respuestas cacheadas incluyen en su
+clave la versión de cada modelo del que dependen: cuando algo cambia la clave
+cambia y la entrada vieja simplemente deja de usarse. No hay invalidación por
+TTL, y funciona igual con LocMemCache y FileBasedCache (no requiere Redis).
+Con varios workers el caché tiene que ser compartido (FileBasedCache en
+Koal_Group/settings.py): si no, cada proceso tiene sus propias versiones.
+"""
+
+import functools
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from rest_framework.response import Response
+
+ALIAS_CACHE = getattr(settings, 'RESPUESTAS_CACHE_ALIAS', 'default')
+# Las entradas de versiones viejas se quedan huérfanas; el TTL solo las limpia
+TIMEOUT_RESPUESTAS = getattr(settings, 'RESPUESTAS_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _cache():
+    return caches[ALIAS_CACHE]
+
+
+def _clave_version(etiqueta):
+    # (versión, momento del último cambio): una sola entrada, una sola escritura por cambio
+    return f'versiones:{etiqueta}'
+
+
+# Modelos de los que no depende ninguna respuesta cacheada: sus escrituras no suben
+# versión. Los resúmenes de producción cambian en la misma transacción que
+# Produccion, así que el dashboard se cachea con la versión de Produccion.
+SIN_VERSION = {
+    'Adminitrativo.resumenproduccionproyecto', 'Adminitrativo.resumenproduccionempleado',
+    'Adminitrativo.presencia', 'Adminitrativo.cambio',
+}
+
+
+def _pendientes():
+    """{modelo: (versión, momento)} escritos en la transacción en curso y aún sin publicar, o None."""
+    conexion = transaction.get_connection()
+    if not conexion.in_atomic_block:
+        return None
+    lista, pendientes = getattr(conexion, 'versiones_pendientes', (None, None))
+    # Django cambia run_on_commit por otra lista en cada commit o rollback
+    return pendientes if lista is conexion.run_on_commit else None
+
+
+def _estado(modelo):
+    etiqueta = modelo._meta.label_lower
+    pendiente = (_pendientes() or {}).get(etiqueta)
+    if pendiente is not None:
+        return pendiente
+    clave = _clave_version(etiqueta)
+    valor = _cache().get(clave)
+    if valor is None:
+        # Nunca reutilizar un número viejo: así no revive una entrada obsoleta
+        _cache().add(clave, (_nueva_version(), time.time()), timeout=None)
+        valor = _cache().get(clave)
+    return valor
+
+
+def version(modelo):
+    """Versión actual de un modelo. Si no existe (o se desalojó) se crea a partir del reloj."""
+    return _estado(modelo)[0]
+
+
+def ultima_modificacion(*modelos):
+    """
+    Momento (epoch, segundos) del último cambio en cualquiera de los modelos.
+    Si no se conoce (caché nuevo o desalojado) se toma el momento actual.
+    """
+    return max(_estado(modelo)[1] for modelo in modelos)
+
+
+_ultima_version = 0
+_lock_version = threading.Lock()
+
+
+def _nueva_version():
+    # Un valor nuevo del reloj en vez de incr(): en FileBasedCache incr() es leer
+    # y escribir, y dos workers podían dejar el mismo número
+    global _ultima_version
+    with _lock_version:
+        _ultima_version = max(time.time_ns(), _ultima_version + 1)
+        return _ultima_version
+
+
+def _publicar(pendientes):
+    conexion = transaction.get_connection()
+    if getattr(conexion, 'versiones_pendientes', (None, None))[1] is pendientes:
+        conexion.versiones_pendientes = (None, None)
+    for etiqueta, estado in pendientes.items():
+        _cache().set(_clave_version(etiqueta), estado, timeout=None)
+
+
+def subir_version(modelo):
+    """
+    Invalida todo lo que depende de `modelo`. Fuera de una transacción se publica
+    ya; dentro, una sola vez por modelo al hacer commit. Hasta entonces las
+    lecturas de la misma transacción ven una versión provisional que no sale de
+    esta conexión.
+    """
+    etiqueta = modelo._meta.label_lower
+    if etiqueta in SIN_VERSION:
+        return
+    conexion = transaction.get_connection()
+    if not conexion.in_atomic_block:
+        _publicar({etiqueta: (_nueva_version(), time.time())})
+        return
+    pendientes = _pendientes()
+    if pendientes is None:
+        pendientes = {}
+        transaction.on_commit(functools.partial(_publicar, pendientes))
+        conexion.versiones_pendientes = (conexion.run_on_commit, pendientes)
+    # Otro número en cada escritura (sin tocar el caché): lo cacheado antes en esta
+    # misma transacción queda con una versión que nunca se publica
+    pendientes[etiqueta] = (_nueva_version(), time.time())
+
+
+CAMPO_ACTUALIZACION = 'fecha_actualizacion'
+
+
+def _tiene_actualizacion(modelo):
+    return any(campo.name == CAMPO_ACTUALIZACION for campo in modelo._meta.concrete_fields)
+
+
+# Se envía (sender=modelo, using=alias, pks=[...]) dentro de la transacción de cada
+# update/bulk_create/bulk_update, que no disparan post_save.
+escritura_masiva = Signal()
+
+
+class VersionadoQuerySet(models.QuerySet):
+    """
+    QuerySet cuyas operaciones masivas (que no disparan señales) también suben
+    la versión, envían `escritura_masiva` y, si el modelo lo tiene, marcan
+    `fecha_actualizacion`.
+    """
+
+    def update(self, **kwargs):
+        if _tiene_actualizacion(self.model):
+            kwargs.setdefault(CAMPO_ACTUALIZACION, timezone.now())
+        if not escritura_masiva.has_listeners(self.model):
+            filas = super().update(**kwargs)
+        else:
+            with transaction.atomic(using=self.db):
+                # Los pk se leen antes porque el update puede sacarlos del filtro
+                pks = list(self.values_list('pk', flat=True))
+                filas = super().update(**kwargs)
+                escritura_masiva.send(sender=self.model, using=self.db, pks=pks)
+        subir_version(self.model)
+        return filas
+
+    def bulk_create(self, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objetos = super().bulk_create(*args, **kwargs)
+            escritura_masiva.send(sender=self.model, using=self.db, pks=[obj.pk for obj in objetos if obj.pk is not None])
+        subir_version(self.model)
+        return objetos
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        # bulk_update no llama a pre_save, así que auto_now no se aplica solo
+        if _tiene_actualizacion(self.model) and CAMPO_ACTUALIZACION not in fields:
+            ahora = timezone.now()
+            for obj in objs:
+                setattr(obj, CAMPO_ACTUALIZACION, ahora)
+            fields = [*fields, CAMPO_ACTUALIZACION]
+        # Django hace un update() por tanda: ese ya envía escritura_masiva (aquí sería dos veces)
+        filas = super().bulk_update(objs, fields, *args, **kwargs)
+        subir_version(self.model)
+        return filas
+
+
+class ModeloVersionado(models.Model):
+    objects = VersionadoQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, update_fields=None, **kwargs):
+        # Con update_fields Django solo guarda esos campos, auto_now incluido
+        if update_fields and _tiene_actualizacion(type(self)):
+            update_fields = {*update_fields, CAMPO_ACTUALIZACION}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+# --- Caché de respuestas ---
+
+class _Contadores:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = defaultdict(lambda: {'hits': 0, 'misses': 0, 'no_modificados': 0})
+
+    def sumar(self, nombre, tipo):
+        with self._lock:
+            self._datos[nombre][tipo] += 1
+
+    def resumen(self):
+        with self._lock:
+            return {nombre: dict(valores) for nombre, valores in self._datos.items()}
+
+
+contadores = _Contadores()
+
+
+def cachear_respuesta(*modelos, extra=None):
+    """
+    Decora un método get(self, request, ...) de una vista DRF. La clave incluye
+    la ruta completa (con query string), la versión de cada modelo en `modelos`
+    y, opcionalmente, `extra()` (p. ej. el mes en curso). También responde 304
+    a If-None-Match / If-Modified-Since (ver condicional.py).
+    """
+    def decorador(metodo):
+        from .condicional import etag_de, no_modificado, poner_validadores
+
+        nombre = metodo.__qualname__
+
+        @functools.wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            versiones = '.'.join(str(version(modelo)) for modelo in modelos)
+            clave = f'respuesta:{nombre}:{request.get_full_path()}:{versiones}'
+            if extra is not None:
+                clave = f'{clave}:{extra()}'
+            # La misma clave sirve de ETag; Last-Modified solo si no depende de `extra`
+            etag = etag_de(clave)
+            ultima = ultima_modificacion(*modelos) if extra is None else None
+            response = no_modificado(request, etag, ultima)
+            if response is not None:
+                contadores.sumar(nombre, 'no_modificados')
+                return response
+            datos = _cache().get(clave)
+            if datos is not None:
+                contadores.sumar(nombre, 'hits')
+                return poner_validadores(Response(datos), etag, ultima)
+            contadores.sumar(nombre, 'misses')
+            response = metodo(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                _cache().set(clave, response.data, TIMEOUT_RESPUESTAS)
+                poner_validadores(response, etag, ultima)
+            return response
+        return envoltura
+    return decorador
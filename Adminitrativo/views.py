@@ -1,19 +1,44 @@
 # Administrativo/views.py
 
-from rest_framework import viewsets, permissions, status # permissions y status son útiles
+from rest_framework import viewsets, permissions, serializers, status # permissions y status son útiles
 from rest_framework.response import Response # Para respuestas personalizadas si es necesario
 from rest_framework.decorators import action # Para acciones personalizadas en ViewSets
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.views import APIView
 from django.db.models import Count, Sum, Q, F # Para consultas más complejas si las necesitas
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+import base64
+import datetime
+import binascii
+import hashlib
+import struct
 
 from .models import (
     Cargo, Empleado, Proyecto, ControlDeIngreso,
-    Produccion, Herramienta, ListaDeChequeo, Verificacion, Prestamo
+    Produccion, Herramienta, ListaDeChequeo, Verificacion, Prestamo,
+    ResumenProduccion, ResumenProduccionProyecto, Informe, SensorGas, AlertaGas
 )
 from .serializers import (
     CargoSerializer, EmpleadoSerializer, ProyectoSerializer, ControlDeIngresoSerializer,
     ProduccionSerializer, HerramientaSerializer, ListaDeChequeoSerializer,
-    VerificacionSerializer, PrestamoSerializer
+    VerificacionSerializer, PrestamoSerializer, SensorGasSerializer, parse_expand
 )
+from .archivo import HistoricoMixin
+from .busqueda import BusquedaMixin
+from .condicional import ConditionalGetMixin
+from .disponibilidad import SinDisponibilidad
+from .huellas import indice as indice_huellas
+from .importacion import ErrorImportacion, importar_empleados, leer as leer_importacion
+from .ingesta import ingresar_eventos
+from .listados import ListadoRapidoMixin
+from .parsers import NDJSONParser, OctetStreamParser
+from . import asistencia, gases, metricas, presencia, reportes, sincronizacion
+from .versiones import cachear_respuesta, contadores as contadores_cache
 
 # (Opcional) Permisos: Puedes empezar con AllowAny y luego ajustar a IsAuthenticated, etc.
 # class IsAdminOrReadOnly(permissions.BasePermission):
@@ -27,80 +52,373 @@ from .serializers import (
 #         return request.user and request.user.is_staff
 
 
-class CargoViewSet(viewsets.ModelViewSet):
-    queryset = Cargo.objects.all().order_by('nombre_cargo')
+class ExpandableViewSetMixin:
+    """
+    Arma el select_related/prefetch_related del queryset a partir de `?expand=`,
+    así cada listado cuesta un número fijo de consultas sin importar su tamaño.
+    Sin `?expand=` la respuesta es plana y no se hace ningún JOIN.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        expand = parse_expand(self.request.query_params.get('expand'))
+        select_related, prefetch_related, defer = self.get_serializer_class().expansion_plan(expand)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if defer:
+            queryset = queryset.defer(*defer)
+        return queryset
+
+
+class CargoViewSet(ConditionalGetMixin, ListadoRapidoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = Cargo.objects.all().order_by('nombre_cargo', 'id')
     serializer_class = CargoSerializer
     # permission_classes = [permissions.IsAuthenticated] # Ejemplo de permiso
 
-class EmpleadoViewSet(viewsets.ModelViewSet):
-    queryset = Empleado.objects.select_related('cargo').all().order_by('nombres') # Optimiza la carga del cargo
+def etag_coincide(request, etag):
+    """True si el If-None-Match de la petición ya tiene este ETag."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    etiquetas = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return etag in etiquetas
+
+
+class EmpleadoViewSet(ConditionalGetMixin, BusquedaMixin, ListadoRapidoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = Empleado.objects.all().order_by('nombres', 'id') # El cargo se une solo con ?expand=cargo
     serializer_class = EmpleadoSerializer
     # permission_classes = [permissions.IsAuthenticated]
     # Podrías añadir filtros aquí si lo necesitas (django-filter)
     # filterset_fields = ['cargo', 'estado', 'nivel_acceso']
-    # search_fields = ['nombres', 'cedula', 'email']
-
-class ProyectoViewSet(viewsets.ModelViewSet):
-    queryset = Proyecto.objects.select_related('supervisor__cargo').all().order_by('-fecha_creacion') # Optimiza supervisor y su cargo
+    # ?search= busca en nombres, cédula y email (índice FTS5, ver busqueda.py)
+
+    @action(detail=True, methods=['get', 'put'], url_path='huella', parser_classes=[OctetStreamParser])
+    def huella(self, request, pk=None):
+        """
+        GET: plantilla de huella en bytes crudos (application/octet-stream), con ETag.
+        PUT: reemplaza la plantilla con el cuerpo crudo de la petición.
+        """
+        if request.method == 'PUT':
+            empleado = self.get_object()
+            empleado.huella = bytes(request.data) or None
+            empleado.save(update_fields=['huella'])
+            return Response(status=status.HTTP_204_NO_CONTENT, headers={'ETag': f'"{empleado.huella_hash}"'})
+
+        try:
+            datos = Empleado.objects.filter(pk=pk).values('huella_hash').first()
+        except (TypeError, ValueError, ValidationError):  # pk no numérico, como get_object_or_404
+            raise Http404
+        if datos is None:
+            raise Http404
+        if not datos['huella_hash']:
+            return Response({'detail': 'El empleado no tiene huella registrada.'}, status=status.HTTP_404_NOT_FOUND)
+        etag = f'"{datos["huella_hash"]}"'
+        if etag_coincide(request, etag):
+            return HttpResponseNotModified(headers={'ETag': etag})
+        # El blob solo se lee cuando el cliente no tiene la versión actual
+        huella = Empleado.objects.filter(pk=pk).values_list('huella', flat=True).first()
+        response = HttpResponse(bytes(huella or b''), content_type='application/octet-stream')
+        response['ETag'] = etag
+        return response
+
+    @action(detail=False, methods=['get'], url_path='huellas')
+    def huellas(self, request):
+        """
+        Todas las plantillas para los equipos de enrolamiento, en binario y en streaming.
+        Cada registro es: id (uint64 big-endian) + longitud (uint32 big-endian) + bytes.
+        Filtros opcionales: ?estado=activo, ?ids=1,2,3. Soporta If-None-Match.
+        """
+        queryset = Empleado.objects.exclude(huella_hash='').order_by('id')
+        estado = request.query_params.get('estado')
+        if estado:
+            queryset = queryset.filter(estado=estado)
+        ids = request.query_params.get('ids')
+        if ids:
+            try:
+                queryset = queryset.filter(pk__in=[int(i) for i in ids.split(',') if i.strip()])
+            except ValueError:
+                return Response({'detail': 'ids debe ser una lista de enteros.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # ETag del conjunto a partir de los hashes, sin leer ningún blob
+        digest = hashlib.sha1()
+        for pk, huella_hash in queryset.values_list('id', 'huella_hash').iterator(chunk_size=2000):
+            digest.update(f'{pk}:{huella_hash};'.encode())
+        etag = f'"{digest.hexdigest()}"'
+        if etag_coincide(request, etag):
+            return HttpResponseNotModified(headers={'ETag': etag})
+
+        def registros():
+            for pk, huella in queryset.values_list('id', 'huella').iterator(chunk_size=500):
+                huella = bytes(huella or b'')
+                yield struct.pack('>QI', pk, len(huella)) + huella
+
+        response = StreamingHttpResponse(registros(), content_type='application/octet-stream')
+        response['ETag'] = etag
+        return response
+
+    @action(detail=False, methods=['post'], url_path='importar', parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """
+        Carga la nómina de RR. HH. (campo `archivo`, CSV o XLSX) con upsert por cédula.
+        Responde con los totales y las filas con error; ?simular=1 valida sin guardar.
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({'detail': 'Falta el archivo (campo "archivo").'}, status=status.HTTP_400_BAD_REQUEST)
+        simular = request.query_params.get('simular', '').lower() in ('1', 'true', 'si', 'sí')
+        try:
+            resumen = importar_empleados(leer_importacion(archivo, archivo.name), simular=simular)
+        except ErrorImportacion as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({**resumen, 'simulado': simular})
+
+class ProyectoViewSet(ConditionalGetMixin, BusquedaMixin, ListadoRapidoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = Proyecto.objects.all().order_by('-fecha_creacion', '-id') # ?expand=supervisor.cargo une supervisor y su cargo
     serializer_class = ProyectoSerializer
     # permission_classes = [permissions.IsAuthenticated]
     # filterset_fields = ['estado', 'supervisor']
-    # search_fields = ['nombre', 'descripcion']
+    # ?search= busca por nombre (índice FTS5, ver busqueda.py)
 
     # Ejemplo de una acción personalizada para obtener solo ID y nombre (para selects en el frontend)
     @action(detail=False, methods=['get'], url_path='brief')
+    @cachear_respuesta(Proyecto)
     def brief_list(self, request):
         proyectos = Proyecto.objects.values('id', 'nombre').order_by('nombre')
-        return Response(proyectos)
+        return Response(list(proyectos))
 
 
-class ControlDeIngresoViewSet(viewsets.ModelViewSet):
-    queryset = ControlDeIngreso.objects.select_related('empleado', 'proyecto').all().order_by('-fecha', '-hora_entrada')
+class ControlDeIngresoViewSet(ConditionalGetMixin, BusquedaMixin, ListadoRapidoMixin, HistoricoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = ControlDeIngreso.objects.all().order_by('-fecha', '-hora_entrada', '-id')
     serializer_class = ControlDeIngresoSerializer
+    # ?search= por observación, empleado o proyecto, en orden cronológico
+    busqueda_por_relevancia = False
+    # Los GET incluyen los meses archivados (archivo.py)
     # permission_classes = [permissions.IsAuthenticated]
     # filterset_fields = ['empleado', 'proyecto', 'fecha', 'estado_salud']
 
-class ProduccionViewSet(viewsets.ModelViewSet):
-    queryset = Produccion.objects.select_related('empleado', 'proyecto').all().order_by('-fecha')
+    @action(detail=False, methods=['post'], url_path='lote', parser_classes=[JSONParser, NDJSONParser])
+    def lote(self, request):
+        """
+        Ingesta por lotes de entradas/salidas (JSON array, {"eventos": [...]} o NDJSON).
+        Responde con un resultado por evento; los errores no anulan el resto del lote.
+        """
+        eventos = request.data.get('eventos') if isinstance(request.data, dict) else request.data
+        if not isinstance(eventos, list):
+            return Response({'detail': 'Se esperaba una lista de eventos.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ingresar_eventos(eventos))
+
+class ProduccionViewSet(ConditionalGetMixin, ListadoRapidoMixin, HistoricoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = Produccion.objects.all().order_by('-fecha', '-id')
     serializer_class = ProduccionSerializer
     # permission_classes = [permissions.IsAuthenticated]
     # filterset_fields = ['empleado', 'proyecto', 'fecha']
 
-class HerramientaViewSet(viewsets.ModelViewSet):
-    queryset = Herramienta.objects.all().order_by('nombre')
+class HerramientaViewSet(ConditionalGetMixin, ListadoRapidoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = Herramienta.objects.all().order_by('nombre', 'id')
     serializer_class = HerramientaSerializer
     # permission_classes = [permissions.IsAuthenticated]
     # filterset_fields = ['categoria', 'estado']
     # search_fields = ['nombre']
 
-class ListaDeChequeoViewSet(viewsets.ModelViewSet):
-    queryset = ListaDeChequeo.objects.select_related('herramienta').all().order_by('nombre')
+    @action(detail=False, methods=['get'], url_path='disponibilidad')
+    @cachear_respuesta(Herramienta)
+    def disponibilidad(self, request):
+        """Unidades totales y disponibles de todas las herramientas, en una consulta."""
+        herramientas = Herramienta.objects.values('id', 'nombre', 'categoria', 'cantidad', 'disponible').order_by('nombre', 'id')
+        return Response(list(herramientas))
+
+class ListaDeChequeoViewSet(ConditionalGetMixin, ListadoRapidoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = ListaDeChequeo.objects.all().order_by('nombre', 'id')
     serializer_class = ListaDeChequeoSerializer
     # permission_classes = [permissions.IsAuthenticated]
     # filterset_fields = ['categoria', 'estado', 'herramienta']
 
-class VerificacionViewSet(viewsets.ModelViewSet):
-    queryset = Verificacion.objects.select_related('lista').all().order_by('-fecha_verificacion')
+class VerificacionViewSet(ConditionalGetMixin, ListadoRapidoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = Verificacion.objects.all().order_by('-fecha_verificacion', '-id')
     serializer_class = VerificacionSerializer
     # permission_classes = [permissions.IsAuthenticated]
     # filterset_fields = ['lista', 'estado']
 
-class PrestamoViewSet(viewsets.ModelViewSet):
-    queryset = Prestamo.objects.select_related('verificacion__lista', 'empleado', 'herramienta_prestada').all().order_by('-fecha_entrega')
+class PrestamoViewSet(ConditionalGetMixin, ListadoRapidoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = Prestamo.objects.all().order_by('-fecha_entrega', '-id')
     serializer_class = PrestamoSerializer
     # permission_classes = [permissions.IsAuthenticated]
     # filterset_fields = ['empleado', 'herramienta_prestada', 'fecha_devolucion'] # fecha_devolucion=None para los no devueltos
 
+    def perform_create(self, serializer):
+        self._guardar(serializer)
+
+    def perform_update(self, serializer):
+        self._guardar(serializer)
+
+    def _guardar(self, serializer):
+        # Sin unidades disponibles: 400 en el campo, como cualquier otra validación
+        try:
+            serializer.save()
+        except SinDisponibilidad as exc:
+            raise serializers.ValidationError({'herramienta_prestada': [str(exc)]})
+
+
+def _fecha_hora(valor):
+    try:
+        fecha = parse_datetime(valor)
+    except ValueError:
+        return None
+    if fecha is not None and timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+class SensorGasViewSet(ConditionalGetMixin, ListadoRapidoMixin, ExpandableViewSetMixin, viewsets.ModelViewSet):
+    queryset = SensorGas.objects.all().order_by('codigo', 'id')
+    serializer_class = SensorGasSerializer
+    # permission_classes = [permissions.IsAuthenticated]
+    # Las lecturas no pasan por aquí: ver gases.py
+
+    @action(detail=False, methods=['post'], url_path='lecturas', parser_classes=[JSONParser, NDJSONParser])
+    def lecturas(self, request):
+        """
+        Lote de lecturas de los sensores (JSON array, {"lecturas": [...]} o NDJSON):
+        {"sensor": "CH4-NA-01", "t": "2024-03-01T06:00:05Z", "valor": 0.42}.
+        Responde con los totales, los errores por índice y las alertas del lote.
+        """
+        lecturas = request.data.get('lecturas') if isinstance(request.data, dict) else request.data
+        if not isinstance(lecturas, list):
+            return Response({'detail': 'Se esperaba una lista de lecturas.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(lecturas) > gases.MAXIMO_LOTE:
+            return Response({'detail': f'Máximo {gases.MAXIMO_LOTE} lecturas por lote.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(gases.ingresar_lecturas(lecturas))
+
+    @action(detail=True, methods=['get'], url_path='ultimas')
+    def ultimas(self, request, pk=None):
+        """Las últimas lecturas del sensor, de memoria (gases.anillos)."""
+        sensor = self.get_object()
+        return Response({'sensor': sensor.pk, 'codigo': sensor.codigo, 'lecturas': gases.ultimas(sensor.pk)})
+
+    @action(detail=True, methods=['get'], url_path='serie')
+    def serie(self, request, pk=None):
+        """
+        Lecturas agrupadas entre ?desde= y ?hasta= (ISO 8601; por defecto la última hora),
+        en ?puntos= cubetas (1000) o de ?paso= segundos. Usa la resolución más gruesa que alcanza.
+        """
+        sensor = self.get_object()
+        errores, valores = {}, {}
+        for campo in ('desde', 'hasta'):
+            texto = request.query_params.get(campo)
+            valores[campo] = _fecha_hora(texto) if texto else None
+            if texto and valores[campo] is None:
+                errores[campo] = ['Fecha y hora inválida, use ISO 8601.']
+        for campo in ('puntos', 'paso'):
+            texto = request.query_params.get(campo)
+            try:
+                valores[campo] = int(texto) if texto else None
+                if valores[campo] is not None and valores[campo] < 1:
+                    raise ValueError
+            except ValueError:
+                errores[campo] = ['Debe ser un entero positivo.']
+        if errores:
+            return Response(errores, status=status.HTTP_400_BAD_REQUEST)
+        hasta = valores['hasta'] or timezone.now()
+        desde = valores['desde'] or hasta - datetime.timedelta(hours=1)
+        if desde >= hasta:
+            return Response({'hasta': ['Debe ser posterior a desde.']}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(gases.serie(sensor.pk, desde, hasta, valores['puntos'] or gases.PUNTOS, valores['paso']))
+
+    @action(detail=False, methods=['get'], url_path='alertas')
+    def alertas(self, request):
+        """Alertas y alarmas desde ?desde= (por defecto las últimas 24 h), las más recientes primero."""
+        texto = request.query_params.get('desde')
+        desde = _fecha_hora(texto) if texto else timezone.now() - datetime.timedelta(hours=24)
+        if desde is None:
+            return Response({'desde': ['Fecha y hora inválida, use ISO 8601.']}, status=status.HTTP_400_BAD_REQUEST)
+        alertas = (
+            AlertaGas.objects.filter(inicio__gte=desde).order_by('-inicio', '-id')
+            .values('id', 'sensor', 'sensor__codigo', 'nivel', 'inicio', 'valor', 'limite', 'lecturas')[:500]
+        )
+        return Response(list(alertas))
+
+
+# --- Identificación de huellas (torniquetes) ---
+
+class IdentificarHuellaView(APIView):
+    """
+    POST con la plantilla capturada (bytes crudos application/octet-stream, o
+    JSON {"plantilla": "<base64>"}) -> empleado identificado 1:N contra el
+    índice en memoria de huellas.py.
+    """
+    parser_classes = [OctetStreamParser, JSONParser]
+
+    def post(self, request, format=None):
+        if isinstance(request.data, (bytes, bytearray)):
+            plantilla = bytes(request.data)
+        else:
+            try:
+                plantilla = base64.b64decode(request.data.get('plantilla', ''), validate=True)
+            except (binascii.Error, ValueError):
+                return Response({'detail': 'plantilla debe ser base64.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not plantilla:
+            return Response({'detail': 'Falta la plantilla.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        indice_huellas.asegurar_cargado()
+        resultado = indice_huellas.identificar(plantilla)
+        if resultado['empleado'] is None:
+            return Response(resultado, status=status.HTTP_404_NOT_FOUND)
+        resultado['nombres'] = Empleado.objects.filter(pk=resultado['empleado']).values_list('nombres', flat=True).first()
+        return Response(resultado)
+
+
+class EstadisticasHuellasView(APIView):
+    def get(self, request, format=None):
+        return Response(indice_huellas.estadisticas())
+
+
+# --- Quién está adentro (llamado a lista) ---
+
+class PresenciaView(APIView):
+    """
+    GET: cuántos y quiénes están adentro por proyecto y lugar de trabajo, de la
+    copia en memoria de presencia.py (sin consultas). ?proyecto= y
+    ?lugar_trabajo= filtran; ?conteo=1 omite la lista de personas.
+    """
+
+    def get(self, request, format=None):
+        proyecto = request.query_params.get('proyecto')
+        if proyecto:
+            try:
+                proyecto = int(proyecto)
+            except ValueError:
+                return Response({'proyecto': ['Debe ser un id entero.']}, status=status.HTTP_400_BAD_REQUEST)
+        solo_conteo = request.query_params.get('conteo') in ('1', 'true')
+        presencia.indice.asegurar_cargado()
+        lugares = []
+        for grupo in presencia.indice.lugares(proyecto or None, request.query_params.get('lugar_trabajo')):
+            lugar = {
+                'proyecto': grupo[0].proyecto, 'proyecto_nombre': grupo[0].proyecto_nombre,
+                'lugar_trabajo': grupo[0].lugar_trabajo, 'presentes': len(grupo),
+            }
+            if not solo_conteo:
+                lugar['personas'] = [
+                    {'empleado': p.empleado, 'nombres': p.nombres, 'cedula': p.cedula, 'registro': p.registro,
+                     'desde': datetime.datetime.combine(p.fecha, p.hora_entrada)}
+                    for p in grupo
+                ]
+            lugares.append(lugar)
+        return Response({'total': sum(lugar['presentes'] for lugar in lugares), 'lugares': lugares})
+
 
 # --- Vistas para el Dashboard (Ejemplos) ---
 # Estas vistas serían más personalizadas y podrían no ser ModelViewSets.
 # Podrías usar APIView o funciones decoradas con @api_view.
 
-from rest_framework.views import APIView
-
 class DashboardStatsView(APIView):
     # permission_classes = [permissions.IsAuthenticated]
 
+    @cachear_respuesta(Proyecto, Empleado, Produccion, Informe, extra=lambda: timezone.localdate().replace(day=1))
     def get(self, request, format=None):
         # Estas son consultas de ejemplo, ajústalas a tu lógica real
         proyectos_activos = Proyecto.objects.filter(
@@ -108,106 +426,267 @@ class DashboardStatsView(APIView):
         ).count()
         total_personal = Empleado.objects.filter(estado='activo').count()
 
-        # Producción mensual estimada y informes generados son más complejos
-        # y podrían requerir cálculos o tablas adicionales.
-        # Aquí solo pongo placeholders.
-        produccion_mensual_estimada = "1,250 t (calculado)" # Placeholder
-        informes_generados = 0 # Placeholder, necesitarías un modelo de "InformeGenerado" o similar
+        # Producción del mes en curso: una fila de resumen por proyecto
+        produccion_mensual = ResumenProduccionProyecto.objects.filter(
+            periodo=ResumenProduccion.PERIODO_MES, fecha=timezone.localdate().replace(day=1)
+        ).aggregate(total=Sum('cantidad_total'))['total'] or 0
+        informes_generados = Informe.objects.filter(estado=Informe.ESTADO_LISTO).count()
 
         data = {
             'proyectos_activos': proyectos_activos,
             'total_personal': total_personal,
-            'produccion_mensual_estimada': produccion_mensual_estimada,
+            'produccion_mensual_estimada': f"{produccion_mensual:,.0f} t",
+            'produccion_mensual': produccion_mensual,
             'informes_generados': informes_generados,
         }
         return Response(data)
 
 class ProduccionPorProyectoView(APIView):
     # permission_classes = [permissions.IsAuthenticated]
+    @cachear_respuesta(Proyecto, Produccion)
     def get(self, request, format=None):
-        # Ejemplo: Suma de producción por proyecto
-        # Esto es una simplificación. Necesitarías definir cómo calcular el "porcentaje"
-        # o qué métrica exacta mostrar.
-        produccion_data = Produccion.objects.values(
-            id_proyecto=F('proyecto__id'), # Usar el ID del proyecto directamente
-            nombre_proyecto=F('proyecto__nombre')
-        ).annotate(
-            cantidad_total=Sum('cantidad_producida')
-        ).order_by('-cantidad_total')[:5] # Top 5 por ejemplo
-
-        # Para calcular porcentaje, necesitarías un total de referencia.
-        # Aquí solo simularemos el formato que espera el frontend.
+        # Top 5 de proyectos por producción acumulada, leído de los resúmenes
+        # (una fila 'total' por proyecto), no de la tabla Produccion.
+        totales = ResumenProduccionProyecto.objects.filter(periodo=ResumenProduccion.PERIODO_TOTAL)
+        total_general = totales.aggregate(total=Sum('cantidad_total'))['total'] or 0
+        produccion_data = totales.values(
+            'cantidad_total', id_proyecto=F('proyecto_id'), nombre_proyecto=F('proyecto__nombre')
+        ).order_by('-cantidad_total')[:5]
+
         response_data = [
             {
                 "id": item['id_proyecto'],
                 "nombre_proyecto": item['nombre_proyecto'],
-                # El cálculo de porcentaje_produccion debe ser significativo
-                "porcentaje_produccion": (float(item['cantidad_total']) / 1000) * 10 if item['cantidad_total'] else 0 # Simulación
+                "cantidad_total": item['cantidad_total'],
+                # Participación del proyecto en la producción total
+                "porcentaje_produccion": round(float(item['cantidad_total'] / total_general) * 100, 2) if total_general else 0
             } for item in produccion_data
         ]
         return Response(response_data)
 
 
-# --- Vista para Reportes (Ejemplo básico) ---
-# La generación de reportes puede ser compleja. Podrías usar librerías como
-# ReportLab para PDF, OpenPyXL para Excel, o simplemente devolver JSON.
+class SincronizacionView(APIView):
+    """
+    Cambios desde un token de sincronización (ver sincronizacion.py).
+    ?token=...&limite=1000. Sin token devuelve solo el token actual.
+    """
+    # Las filas salen de values() como en los listados: mismo renderer
+    renderer_classes = ListadoRapidoMixin.renderer_classes
+
+    def get(self, request, format=None):
+        token = request.query_params.get('token')
+        if not token:
+            return Response({
+                'token': sincronizacion.generar_token(sincronizacion.secuencia_actual()),
+                'mas': False, 'cambios': {}, 'eliminados': {},
+            })
+        try:
+            limite = int(request.query_params.get('limite', sincronizacion.LIMITE))
+        except ValueError:
+            limite = sincronizacion.LIMITE
+        limite = max(1, min(limite, sincronizacion.LIMITE_MAXIMO))
+        try:
+            secuencia = sincronizacion.leer_token(token)
+            return Response(sincronizacion.cambios_desde(secuencia, limite))
+        except sincronizacion.TokenInvalido as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except sincronizacion.TokenVencido as exc:
+            return Response({'detail': str(exc), 'reset': True}, status=status.HTTP_410_GONE)
+
+
+class MetricasView(APIView):
+    """
+    Métricas por ruta de todos los workers en formato de texto de Prometheus
+    (ver metricas.py). El scraper entra con basic_auth como cualquier cliente.
+    """
+    renderer_classes = [metricas.PrometheusRenderer]
+
+    def get(self, request, format=None):
+        return Response(metricas.exposicion())
+
+
+class EstadisticasCacheView(APIView):
+    """Aciertos y fallos del caché de respuestas (por proceso)."""
+    def get(self, request, format=None):
+        return Response(contadores_cache.resumen())
+
+
+class AsistenciaView(APIView):
+    """
+    Horas trabajadas, extra, nocturnas y ausencias por empleado (ver asistencia.py).
+    ?desde=2024-03-01&hasta=2024-03-31 (por defecto el mes en curso), ?empleado=<id>.
+    """
+    renderer_classes = ListadoRapidoMixin.renderer_classes
+
+    # Las ausencias se cuentan hasta hoy: la respuesta cambia de un día al otro
+    @cachear_respuesta(Empleado, ControlDeIngreso, extra=timezone.localdate)
+    def get(self, request, format=None):
+        errores = {}
+        fechas = {}
+        for campo in ('desde', 'hasta'):
+            valor = request.query_params.get(campo)
+            try:
+                fechas[campo] = parse_date(valor) if valor else None
+            except ValueError:  # bien formada pero imposible, p. ej. 2024-02-30
+                fechas[campo] = None
+            if valor and fechas[campo] is None:
+                errores[campo] = ['Fecha inválida, use AAAA-MM-DD.']
+        empleado = request.query_params.get('empleado')
+        if empleado is not None and not empleado.isdigit():
+            errores['empleado'] = ['Debe ser el id del empleado.']
+        if not errores:
+            try:
+                desde, hasta = asistencia.periodo(fechas['desde'], fechas['hasta'])
+            except ValueError as exc:
+                errores['hasta'] = [str(exc)]
+        if errores:
+            return Response(errores, status=status.HTTP_400_BAD_REQUEST)
+        filas = asistencia.calcular(desde, hasta, empleados=[int(empleado)] if empleado else None)
+        return Response({
+            'desde': desde, 'hasta': hasta, 'jornada_horas': asistencia.JORNADA_HORAS, 'empleados': filas,
+        })
+
+
+# --- Reportes ---
+# Se generan en segundo plano (Adminitrativo/reportes.py): el POST devuelve 202
+# con el id del informe, el cliente consulta el estado y luego lo descarga.
+
+def informe_a_dict(request, informe):
+    return {
+        "id": informe.pk,
+        "name": reportes.nombre(informe),
+        "url": request.build_absolute_uri(reverse('report-download', args=[informe.pk])),
+        "status_url": request.build_absolute_uri(reverse('report-status', args=[informe.pk])),
+        "reportType": informe.tipo,
+        "format": informe.formato,
+        "estado": informe.estado,
+        "filas": informe.filas,
+        "tamano": informe.tamano,
+        "error": informe.error or None,
+        "generatedDate": (informe.fecha_fin_proceso or informe.fecha_creacion).isoformat(),
+    }
 
-from django.http import JsonResponse, HttpResponse # Para descargar archivos
-# from reportlab.pdfgen import canvas # Ejemplo para PDF
 
 class ReportGeneratorView(APIView):
     # permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, format=None):
-        report_type = request.data.get('reportType')
-        project_id = request.data.get('project')
-        start_date_str = request.data.get('startDate')
-        end_date_str = request.data.get('endDate')
-
-        # Aquí iría tu lógica para filtrar datos y generar el reporte
-        # basado en los parámetros.
-        # Por ejemplo, si es 'employee_list':
-        # queryset = Empleado.objects.all()
-        # if project_id:
-        #    queryset = queryset.filter(proyectos_asignados__id=project_id) # Si tienes una relación ManyToMany
-        # if start_date_str and end_date_str: # Filtrar por rango de fechas si aplica al tipo de reporte
-        #    queryset = queryset.filter(fecha_contratacion__range=[start_date_str, end_date_str])
-
-        # serializer = EmpleadoSerializer(queryset, many=True)
-        # report_data = serializer.data
-
-        # Simulación de respuesta
-        report_name = f"Informe de {report_type} ({project_id or 'Todos'})"
-        # En un caso real, generarías un archivo y devolverías su URL o el archivo mismo.
-        simulated_url = f"/api/administrativo/reports/download/simulated_report_{report_type}.pdf"
-
-        return Response({
-            "id": f"report_{request_id_generator.get_id()}", # Necesitarías un generador de IDs únicos
-            "name": report_name,
-            "url": simulated_url,
-            "generatedDate": timezone.now().isoformat(),
-            # "data": report_data # Si devuelves datos JSON directamente
-        }, status=status.HTTP_200_OK)
-
-# Necesitarás un generador de IDs si el ID del reporte se crea dinámicamente
-import shortuuid
-class RequestIdGenerator:
-    def get_id(self):
-        return shortuuid.uuid()
-request_id_generator = RequestIdGenerator()
-
-
-# (Opcional) Vista para descargar el archivo de reporte (si generas archivos)
-# def download_report_file(request, filename):
-#     # Aquí buscarías el archivo en tu sistema de archivos o almacenamiento en la nube
-#     # y lo servirías. Esto es una simplificación.
-#     # from django.conf import settings
-#     # import os
-#     # file_path = os.path.join(settings.MEDIA_ROOT, 'reports', filename)
-#     # if os.path.exists(file_path):
-#     #     with open(file_path, 'rb') as fh:
-#     #         response = HttpResponse(fh.read(), content_type="application/pdf") # o el content_type correcto
-#     #         response['Content-Disposition'] = f'inline; filename="{os.path.basename(file_path)}"'
-#     #         return response
-#     # raise Http404
-#     return HttpResponse(f"Descarga simulada de {filename}", content_type="text/plain")
\ No newline at end of file
+        errores = {}
+        try:
+            tipo = reportes.tipo_canonico(request.data.get('reportType'))
+        except reportes.ErrorInforme as exc:
+            errores['reportType'] = [str(exc)]
+        formato = request.data.get('format') or 'csv'
+        if formato not in reportes.FORMATOS:
+            errores['format'] = [f"Formato no soportado. Opciones: {', '.join(reportes.FORMATOS)}."]
+
+        project_id = request.data.get('project') or None
+        proyecto = None
+        if project_id is not None:
+            try:
+                proyecto = Proyecto.objects.get(pk=int(project_id))
+            except (TypeError, ValueError, Proyecto.DoesNotExist):
+                errores['project'] = [f'El proyecto {project_id} no existe.']
+
+        fechas = {}
+        for campo, clave in (('fecha_inicio', 'startDate'), ('fecha_fin', 'endDate')):
+            valor = request.data.get(clave) or None
+            try:
+                fechas[campo] = parse_date(valor) if valor else None
+            except ValueError:
+                fechas[campo] = None
+            if valor and fechas[campo] is None:
+                errores[clave] = ['Fecha inválida, use AAAA-MM-DD.']
+        if errores:
+            return Response(errores, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            informe = Informe.objects.create(tipo=tipo, formato=formato, proyecto=proyecto, **fechas)
+            reportes.encolar(informe)
+        informe.refresh_from_db()
+        return Response(informe_a_dict(request, informe), status=status.HTTP_202_ACCEPTED)
+
+
+class ReportStatusView(APIView):
+    def get(self, request, pk, format=None):
+        try:
+            informe = Informe.objects.select_related('proyecto').get(pk=pk)
+        except Informe.DoesNotExist:
+            raise Http404
+        informe = reportes.revisar_interrumpido(informe)
+        return Response(informe_a_dict(request, informe))
+
+
+def rango_solicitado(header, tamano):
+    """
+    Interpreta un header Range de un solo rango (bytes=a-b, bytes=a-, bytes=-n).
+    Devuelve (inicio, fin) inclusivo, None si no aplica, o False si no es satisfacible.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None  # Rangos múltiples: se responde el archivo completo
+    inicio, _, fin = header[len('bytes='):].strip().partition('-')
+    try:
+        if inicio == '':
+            largo = int(fin)
+            if largo <= 0:
+                return False
+            return max(tamano - largo, 0), tamano - 1
+        inicio = int(inicio)
+        fin = int(fin) if fin else tamano - 1
+    except ValueError:
+        return None
+    if inicio >= tamano or fin < inicio:
+        return False
+    return inicio, min(fin, tamano - 1)
+
+
+def leer_archivo(ruta, inicio, largo, bloque=64 * 1024):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            datos = archivo.read(min(bloque, largo))
+            if not datos:
+                break
+            largo -= len(datos)
+            yield datos
+
+
+class ReportDownloadView(APIView):
+    """Sirve el archivo del informe con soporte de Range (descargas reanudables)."""
+
+    def get(self, request, pk, format=None):
+        try:
+            informe = Informe.objects.select_related('proyecto').get(pk=pk)
+        except Informe.DoesNotExist:
+            raise Http404
+        informe = reportes.revisar_interrumpido(informe)
+        if informe.estado != Informe.ESTADO_LISTO:
+            return Response(informe_a_dict(request, informe), status=status.HTTP_409_CONFLICT)
+        ruta = reportes.ruta(informe)
+        if not ruta.exists():
+            raise Http404
+
+        tamano = ruta.stat().st_size
+        etag = f'"{informe.pk}-{tamano}"'
+        rango = rango_solicitado(request.headers.get('Range'), tamano)
+        if_range = request.headers.get('If-Range')
+        if if_range and if_range != etag:
+            rango = None  # El archivo cambió: se manda completo
+        if rango is False:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{tamano}'
+            return response
+
+        inicio, fin = rango or (0, tamano - 1)
+        response = StreamingHttpResponse(
+            leer_archivo(ruta, inicio, fin - inicio + 1), content_type=reportes.FORMATOS[informe.formato],
+            status=status.HTTP_206_PARTIAL_CONTENT if rango else status.HTTP_200_OK,
+        )
+        if rango:
+            response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+        response['Content-Length'] = str(fin - inicio + 1)
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        nombre_archivo = f"informe_{informe.tipo}_{informe.pk}.{informe.formato}"
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+        return response
@@ -0,0 +1,138 @@
+# Administrativo/vistas_async.py
+
+"""
+Vistas async para los endpoints de la portería (búsqueda por cédula y
+check-in), pensadas para correr bajo ASGI (Koal_Group/asgi.py).
+
+Son solo I/O: con una vista async el worker no se queda con un hilo tomado
+mientras un cliente lento (radio, 3G del frente) manda o recibe la petición,
+así que un solo proceso atiende muchas conexiones a la vez. Bajo WSGI también
+funcionan (Django las corre en un event loop por petición), pero sin ganancia.
+
+`eventos_ingresos` es el stream SSE de la sala de control (eventos.py);
+ese sí necesita ASGI: bajo WSGI tendría tomado un hilo por panel.
+
+Son vistas de Django y no de DRF (DRF no tiene vistas async), así que la
+autenticación se hace aquí con las mismas reglas que la API: sesión (con
+CSRF en los métodos que escriben) o Basic.
+"""
+
+import base64
+import binascii
+import json
+from functools import wraps
+
+from django.contrib.auth import aauthenticate
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.authentication import CSRFCheck
+from rest_framework.exceptions import NotAuthenticated
+
+from . import eventos
+from .cedulas import abuscar
+from .ingesta import ErrorEvento, aregistrar_evento
+
+
+async def _usuario_basic(request):
+    cabecera = request.headers.get('Authorization', '')
+    tipo, _, credenciales = cabecera.partition(' ')
+    if tipo.lower() != 'basic' or not credenciales:
+        return None
+    try:
+        usuario, separador, clave = base64.b64decode(credenciales, validate=True).decode('utf-8').partition(':')
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    if not separador:
+        return None
+    user = await aauthenticate(request, username=usuario, password=clave)
+    return user if user is not None and user.is_active else None
+
+
+def _csrf_valido(request):
+    # Igual que SessionAuthentication.enforce_csrf de DRF
+    verificador = CSRFCheck(lambda req: None)
+    verificador.process_request(request)
+    return verificador.process_view(request, None, (), {}) is None
+
+
+def requiere_usuario(vista):
+    """Sesión o Basic, como DEFAULT_AUTHENTICATION_CLASSES. Sin credenciales: 403 como DRF."""
+    @csrf_exempt
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        user = await request.auser()
+        if user.is_authenticated:
+            if request.method not in ('GET', 'HEAD', 'OPTIONS') and not _csrf_valido(request):
+                return JsonResponse({'detail': 'CSRF Failed.'}, status=403)
+        else:
+            user = await _usuario_basic(request)
+            if user is None:
+                return JsonResponse({'detail': str(NotAuthenticated.default_detail)}, status=403)
+            request.user = user
+        return await vista(request, *args, **kwargs)
+    return envoltura
+
+
+@require_GET
+@requiere_usuario
+async def empleado_por_cedula(request, cedula):
+    """
+    GET /api/empleados/cedula/<cedula>/: lo que necesita la portería en una sola
+    llamada (nombre, cargo/área, estado, nivel de acceso), desde el caché de cedulas.py.
+    """
+    datos = await abuscar(cedula)
+    if datos is None:
+        return JsonResponse({'error': 'Empleado no encontrado'}, status=404)
+    return JsonResponse(datos)
+
+
+@require_POST
+@requiere_usuario
+async def registrar_ingreso(request):
+    """POST /api/control-ingresos/registrar/: una entrada o salida (mismo formato que /lote/)."""
+    try:
+        evento = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'detail': 'JSON inválido.'}, status=400)
+    try:
+        resultado = await aregistrar_evento(evento)
+    except ErrorEvento as exc:
+        return JsonResponse(exc.errores, status=400)
+    return JsonResponse(resultado, status=201 if resultado['estado'] == 'creado' else 200)
+
+
+@require_GET
+@requiere_usuario
+async def eventos_ingresos(request):
+    """
+    GET /api/control-ingresos/eventos/: stream SSE (text/event-stream) con cada
+    entrada, salida o borrado al hacer commit. ?proyecto=1,2 filtra; al
+    reconectar se sigue desde Last-Event-ID (o ?ultimo=).
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'El stream de eventos necesita ASGI (Koal_Group/asgi.py).'}, status=501)
+    proyectos = None
+    if request.GET.get('proyecto'):
+        try:
+            proyectos = {int(pk) for pk in request.GET['proyecto'].split(',')}
+        except ValueError:
+            return JsonResponse({'proyecto': ['Ids de proyecto separados por coma.']}, status=400)
+    ultimo = request.headers.get('Last-Event-ID') or request.GET.get('ultimo')
+
+    async def flujo():
+        suscripcion, pendientes = eventos.bus.suscribir(proyectos, ultimo)
+        try:
+            yield f'retry: {eventos.REINTENTO_MS}\n\n'.encode() + b''.join(e.marco for e in pendientes)
+            while True:
+                nuevos = await suscripcion.siguientes()
+                # Sin eventos, un comentario: mantiene viva la conexión a través de proxies
+                yield b''.join(e.marco for e in nuevos) if nuevos else b': ping\n\n'
+        finally:
+            eventos.bus.desuscribir(suscripcion)
+
+    response = StreamingHttpResponse(flujo(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: no acumular el stream
+    return response
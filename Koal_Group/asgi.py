@@ -0,0 +1,25 @@
+"""
+ASGI config for Koal_Group project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Las vistas async de la portería (Adminitrativo/vistas_async.py) solo rinden
+bajo ASGI, p. ej.:
+
+    uvicorn Koal_Group.asgi:application --workers 1
+
+El stream SSE de la sala de control (Adminitrativo/eventos.py) solo se sirve
+bajo ASGI, y con un solo worker: el bus de eventos es por proceso.
+
+Para comparar con WSGI en la máquina de destino: manage.py carga_servidores
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Koal_Group.settings')
+
+application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir la petición completa (latencia, SQL, bytes por ruta)
+    'Adminitrativo.metricas.MetricasMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Middleware para CORS
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -72,18 +75,107 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Koal_Group.wsgi.application'
+# Para las vistas async (Adminitrativo/vistas_async.py): uvicorn Koal_Group.asgi:application
+ASGI_APPLICATION = 'Koal_Group.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Perfil de producción para SQLite (ver Koal_Group/sqlite/base.py):
+# - WAL: las lecturas no bloquean a la escritura ni al revés.
+# - synchronous=NORMAL: seguro con WAL, sin fsync en cada commit.
+# - cache_size / mmap_size: 64 MB de caché de páginas y 256 MB mapeados.
+# - transaction_mode IMMEDIATE + timeout: las transacciones toman el cerrojo
+#   de escritura al empezar y esperan su turno en vez de fallar.
+# - CONN_MAX_AGE: conexiones persistentes (sin abrir una por petición).
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 20000',
+    'PRAGMA cache_size = -65536',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+]
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': 'Koal_Group.sqlite',
+        # KOAL_SQLITE permite apuntar a otra base (la usa carga_servidores)
+        'NAME': os.environ.get('KOAL_SQLITE', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(SQLITE_PRAGMAS),
+        },
+    }
+}
+
+
+# Caché: las respuestas del dashboard y los ETag/304 dependen de versiones por
+# modelo (Adminitrativo/versiones.py), que tienen que ser las mismas en todos
+# los workers (gunicorn -w N, uvicorn): por eso un caché en disco compartido y
+# no LocMem, que es por proceso. KOAL_CACHE cambia el directorio.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('KOAL_CACHE', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
     }
 }
 
+# Informes generados (Adminitrativo/reportes.py). Con INFORMES_SINCRONO = True
+# se generan en el mismo hilo al hacer commit (útil en pruebas).
+INFORMES_DIR = BASE_DIR / 'informes'
+INFORMES_HILOS = 2
+INFORMES_SINCRONO = False
+# El worker que genera un informe refresca su latido cada INFORMES_LATIDO_SEGUNDOS.
+# Uno sin terminar y sin latido hace más de INFORMES_VENCIMIENTO_SEGUNDOS se da
+# por perdido (reinicio) y pasa a error
+INFORMES_LATIDO_SEGUNDOS = 60
+INFORMES_VENCIMIENTO_SEGUNDOS = 900
+
+# Días que se conservan en el registro de cambios de /api/sync/ (purgar_cambios)
+SYNC_RETENCION_DIAS = 30
+
+# Caché en memoria de la búsqueda por cédula (Adminitrativo/cedulas.py)
+CEDULAS_CACHE_MAXIMO = 10000
+CEDULAS_TTL_SEGUNDOS = 60
+
+# Cálculo de asistencia para nómina (Adminitrativo/asistencia.py)
+ASISTENCIA_JORNADA_HORAS = 8
+ASISTENCIA_FRANJA_NOCTURNA = (21, 6)  # 21:00 a 06:00
+ASISTENCIA_DIAS_LABORABLES = (0, 1, 2, 3, 4, 5)  # lunes a sábado
+
+# Meses que se quedan en las tablas vivas; lo anterior lo pasa `manage.py archivar`
+# a db.archivo.sqlite3 (Adminitrativo/archivo.py)
+ARCHIVO_MESES_VIVOS = 3
+
+# Métricas por ruta para Prometheus (Adminitrativo/metricas.py, GET /api/metricas/).
+# Con varios workers (gunicorn -w N) cada proceso vuelca lo suyo en esta carpeta
+# y el endpoint suma todo; sin carpeta cada proceso responde solo lo propio.
+METRICAS_DIR = os.environ.get('KOAL_METRICAS_DIR')
+METRICAS_INTERVALO = 5  # segundos entre volcados
+
+# Monitoreo de gases (Adminitrativo/gases.py). Lo viejo lo borra `manage.py purgar_gases`;
+# los resúmenes por hora no se borran.
+GASES_ULTIMAS = 300  # lecturas por sensor en memoria
+GASES_RECARGA_SEGUNDOS = 60
+GASES_CRUDO_DIAS = 7
+GASES_MINUTOS_DIAS = 90
+
+# Stream SSE de la portería (Adminitrativo/eventos.py): eventos que se guardan
+# para reconectar con Last-Event-ID y los que puede acumular un panel lento.
+EVENTOS_RECIENTES = 1000
+EVENTOS_COLA = 1000
+EVENTOS_PING_SEGUNDOS = 15
+
+# Quién está adentro (Adminitrativo/presencia.py): cada cuánto se recarga
+# entera la copia en memoria, para ver lo que escriben otros workers.
+PRESENCIA_RECARGA_SEGUNDOS = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -140,4 +232,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Paginación por cursor (keyset): sin COUNT(*) y mismo costo en cualquier página
+    'DEFAULT_PAGINATION_CLASS': 'Adminitrativo.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
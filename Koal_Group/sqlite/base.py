@@ -0,0 +1,105 @@
+# Koal_Group/sqlite/base.py
+
+"""
+Backend SQLite de producción (ENGINE = 'Koal_Group.sqlite').
+
+Es el backend estándar de Django con una sola diferencia: las transacciones
+de escritura de un mismo proceso pasan de a una por un cerrojo por base de
+datos. Junto con `transaction_mode = 'IMMEDIATE'` (el BEGIN ya toma el
+cerrojo de escritura de SQLite) y `busy_timeout`, los escritores concurrentes
+hacen fila en vez de fallar con "database is locked": dentro del proceso
+esperan en el cerrojo (sin los reintentos con sleep de SQLite) y entre
+procesos espera el busy_timeout.
+
+Los pragmas (WAL, synchronous, mmap, caché) van en OPTIONS['init_command'],
+ver settings.py. Opciones propias: OPTIONS['serializar_escrituras'] (True) y
+OPTIONS['archivo']: base de los meses archivados (Adminitrativo/archivo.py)
+que se adjunta como esquema `archivo` en cada conexión. Con True (por
+defecto) es `<nombre>.archivo.sqlite3` junto a la base, y solo se adjunta si
+ya existe; la base en memoria de las pruebas adjunta un archivo en memoria.
+"""
+
+import threading
+from pathlib import Path
+
+from django.db.backends.sqlite3 import base
+from django.db.backends.sqlite3.base import Database
+
+_cerrojos = {}
+
+
+def _cerrojo(nombre):
+    return _cerrojos.setdefault(str(nombre), threading.Lock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    serializar_escrituras = True
+    espera_escritura = 5  # segundos; se toma de OPTIONS['timeout']
+    _cerrojo_tomado = None
+    opcion_archivo = True
+    archivo = None  # Ruta adjuntada como esquema `archivo` en la conexión actual
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.serializar_escrituras = kwargs.pop('serializar_escrituras', True)
+        self.opcion_archivo = kwargs.pop('archivo', True)
+        self.espera_escritura = kwargs.get('timeout', 5)
+        return kwargs
+
+    def ruta_archivo(self):
+        if not self.opcion_archivo:
+            return None
+        if self.opcion_archivo is not True:
+            return str(self.opcion_archivo)
+        nombre = str(self.settings_dict['NAME'])
+        if self.is_in_memory_db():
+            return nombre.replace('?', '_archivo?', 1) if nombre.startswith('file:') else ':memory:'
+        ruta = Path(nombre)
+        return str(ruta.with_name(f'{ruta.stem}.archivo{ruta.suffix}'))
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        ruta = self.ruta_archivo()
+        self.archivo = None
+        # ATTACH no se puede dentro de una transacción: va al abrir la conexión
+        if ruta and (self.is_in_memory_db() or Path(ruta).exists()):
+            conn.execute('ATTACH DATABASE ? AS archivo', [ruta])
+            self.archivo = ruta
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # La base en memoria de las pruebas no comparte archivo: no hace falta
+        if self.serializar_escrituras and not self.is_in_memory_db():
+            cerrojo = _cerrojo(self.settings_dict['NAME'])
+            if not cerrojo.acquire(timeout=self.espera_escritura):
+                with self.wrap_database_errors:
+                    raise Database.OperationalError('database is locked (cola de escritura)')
+            self._cerrojo_tomado = cerrojo
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._soltar_cerrojo()
+            raise
+
+    def _soltar_cerrojo(self):
+        cerrojo, self._cerrojo_tomado = self._cerrojo_tomado, None
+        if cerrojo is not None:
+            cerrojo.release()
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self._soltar_cerrojo()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._soltar_cerrojo()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._soltar_cerrojo()
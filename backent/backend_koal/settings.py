@@ -46,11 +46,29 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend_koal.wsgi.application'
+ASGI_APPLICATION = 'backend_koal.asgi.application'
 
+# SQLite para producción: WAL, pragmas, conexiones persistentes y
+# transacciones IMMEDIATE (los escritores esperan en vez de fallar con
+# "database is locked"). transaction_mode e init_command requieren Django 5.1.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode = WAL;'
+                'PRAGMA synchronous = NORMAL;'
+                'PRAGMA busy_timeout = 20000;'
+                'PRAGMA cache_size = -65536;'
+                'PRAGMA mmap_size = 268435456;'
+                'PRAGMA temp_store = MEMORY'
+            ),
+        },
     }
 }
 